@@ -14,6 +14,12 @@ from app.models.tenant import Tenant, TenantMember  # noqa: F401
 from app.models.person import Person  # noqa: F401
 from app.models.usage_credit import TenantUsageCredit  # noqa: F401
 from app.models.credit_purchase import CreditPurchase  # noqa: F401
+from app.models.transaction_daily_rollup import TransactionDailyRollup  # noqa: F401
+from app.models.category_token_stat import CategoryTokenStat  # noqa: F401
+from app.models.ai_suggestion_cache import AISuggestionCache  # noqa: F401
+from app.models.cnpj_registry_cache import CnpjRegistryCache  # noqa: F401
+from app.models.company_enrichment import CompanyEnrichmentRun, CompanyEnrichmentTask  # noqa: F401
+from app.models.categorization_job import CategorizationJob  # noqa: F401
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
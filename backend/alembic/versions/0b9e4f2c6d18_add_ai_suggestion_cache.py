@@ -0,0 +1,41 @@
+"""add ai suggestion cache
+
+Revision ID: 0b9e4f2c6d18
+Revises: f3c8d1e5a7b2
+Create Date: 2026-10-17 14:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0b9e4f2c6d18"
+down_revision: Union[str, Sequence[str], None] = "f3c8d1e5a7b2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ai_suggestion_cache",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("tenant_id", sa.Integer(), nullable=False),
+        sa.Column("cache_key", sa.String(length=40), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=True),
+        sa.Column("confidence", sa.Float(), nullable=False),
+        sa.Column("reason", sa.String(length=200), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ux_ai_suggestion_cache_key",
+        "ai_suggestion_cache",
+        ["tenant_id", "cache_key"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_ai_suggestion_cache_key", table_name="ai_suggestion_cache")
+    op.drop_table("ai_suggestion_cache")
@@ -0,0 +1,30 @@
+"""add cnpj registry cache
+
+Revision ID: 5d2a7c9e1f43
+Revises: 0b9e4f2c6d18
+Create Date: 2026-10-17 15:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "5d2a7c9e1f43"
+down_revision: Union[str, Sequence[str], None] = "0b9e4f2c6d18"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "cnpj_registry_cache",
+        sa.Column("cnpj", sa.String(length=14), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("fetched_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("cnpj"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("cnpj_registry_cache")
@@ -0,0 +1,71 @@
+"""add company enrichment queue
+
+Revision ID: 9c3e6a1d4b82
+Revises: 5d2a7c9e1f43
+Create Date: 2026-10-17 17:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "9c3e6a1d4b82"
+down_revision: Union[str, Sequence[str], None] = "5d2a7c9e1f43"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # NULL = nunca conferido: o agendador reenriquece essas empresas aos poucos
+    op.add_column("companies", sa.Column("registry_checked_at", sa.DateTime(), nullable=True))
+
+    op.create_table(
+        "company_enrichment_queue",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("tenant_id", sa.Integer(), nullable=False),
+        sa.Column("company_id", sa.Integer(), nullable=False),
+        sa.Column("cnpj", sa.String(length=14), nullable=False),
+        sa.Column("reason", sa.String(length=20), nullable=False),
+        sa.Column("status", sa.String(length=12), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("run_after", sa.DateTime(), nullable=False),
+        sa.Column("last_error", sa.String(length=200), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ux_company_enrichment_queue_company",
+        "company_enrichment_queue",
+        ["tenant_id", "company_id"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_company_enrichment_queue_status_run_after",
+        "company_enrichment_queue",
+        ["status", "run_after"],
+    )
+
+    op.create_table(
+        "company_enrichment_runs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("trigger", sa.String(length=20), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("duration_ms", sa.Integer(), nullable=False),
+        sa.Column("enqueued_stale", sa.Integer(), nullable=False),
+        sa.Column("claimed", sa.Integer(), nullable=False),
+        sa.Column("updated", sa.Integer(), nullable=False),
+        sa.Column("not_found", sa.Integer(), nullable=False),
+        sa.Column("retried", sa.Integer(), nullable=False),
+        sa.Column("failed", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("company_enrichment_runs")
+    op.drop_index("ix_company_enrichment_queue_status_run_after", table_name="company_enrichment_queue")
+    op.drop_index("ux_company_enrichment_queue_company", table_name="company_enrichment_queue")
+    op.drop_table("company_enrichment_queue")
+    op.drop_column("companies", "registry_checked_at")
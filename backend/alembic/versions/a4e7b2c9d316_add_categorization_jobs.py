@@ -0,0 +1,62 @@
+"""add categorization jobs
+
+Revision ID: a4e7b2c9d316
+Revises: 9c3e6a1d4b82
+Create Date: 2026-10-17 19:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "a4e7b2c9d316"
+down_revision: Union[str, Sequence[str], None] = "9c3e6a1d4b82"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "categorization_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("tenant_id", sa.Integer(), nullable=False),
+        sa.Column("company_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(length=12), nullable=False),
+        sa.Column("start_dt", sa.DateTime(), nullable=True),
+        sa.Column("end_dt", sa.DateTime(), nullable=True),
+        sa.Column("use_ai", sa.Boolean(), nullable=False),
+        sa.Column("batch_size", sa.Integer(), nullable=False),
+        sa.Column("cursor_occurred_at", sa.DateTime(), nullable=True),
+        sa.Column("cursor_id", sa.Integer(), nullable=True),
+        sa.Column("scanned", sa.Integer(), nullable=False),
+        sa.Column("suggested", sa.Integer(), nullable=False),
+        sa.Column("updated", sa.Integer(), nullable=False),
+        sa.Column("skipped", sa.Integer(), nullable=False),
+        sa.Column("batches", sa.Integer(), nullable=False),
+        sa.Column("providers", sa.JSON(), nullable=True),
+        sa.Column("elapsed_ms", sa.Integer(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.String(length=200), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("heartbeat_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_categorization_jobs_status_heartbeat",
+        "categorization_jobs",
+        ["status", "heartbeat_at"],
+    )
+    op.create_index(
+        "ix_categorization_jobs_tenant_company",
+        "categorization_jobs",
+        ["tenant_id", "company_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_categorization_jobs_tenant_company", table_name="categorization_jobs")
+    op.drop_index("ix_categorization_jobs_status_heartbeat", table_name="categorization_jobs")
+    op.drop_table("categorization_jobs")
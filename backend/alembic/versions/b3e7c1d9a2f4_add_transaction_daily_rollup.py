@@ -0,0 +1,54 @@
+"""add transaction daily rollup
+
+Revision ID: b3e7c1d9a2f4
+Revises: 920886c5b127
+Create Date: 2026-10-17 09:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "b3e7c1d9a2f4"
+down_revision: Union[str, Sequence[str], None] = "920886c5b127"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "transaction_daily_rollup",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("tenant_id", sa.Integer(), nullable=False),
+        sa.Column("company_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=True),
+        sa.Column("kind", sa.String(length=3), nullable=False),
+        sa.Column("amount_cents", sa.BigInteger(), nullable=False),
+        sa.Column("tx_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["company_id"], ["companies.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_transaction_daily_rollup_key",
+        "transaction_daily_rollup",
+        ["tenant_id", "company_id", "day", "category_id", "kind"],
+        unique=False,
+    )
+
+    # backfill inicial (mesma agregação de scripts/rebuild_daily_rollup.py)
+    op.execute(
+        """
+        INSERT INTO transaction_daily_rollup (tenant_id, company_id, day, category_id, kind, amount_cents, tx_count)
+        SELECT tenant_id, company_id, date(occurred_at), category_id, kind, SUM(amount_cents), COUNT(id)
+        FROM transactions
+        WHERE occurred_at IS NOT NULL
+        GROUP BY tenant_id, company_id, date(occurred_at), category_id, kind
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transaction_daily_rollup_key", table_name="transaction_daily_rollup")
+    op.drop_table("transaction_daily_rollup")
@@ -0,0 +1,39 @@
+"""add transactions report indexes
+
+Revision ID: c5a2f8e41b07
+Revises: b3e7c1d9a2f4
+Create Date: 2026-10-17 10:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "c5a2f8e41b07"
+down_revision: Union[str, Sequence[str], None] = "b3e7c1d9a2f4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_transactions_tenant_company_occurred",
+        "transactions",
+        ["tenant_id", "company_id", "occurred_at", "id"],
+        unique=False,
+        postgresql_include=["kind", "amount_cents", "category_id"],
+    )
+    op.create_index(
+        "ix_transactions_uncategorized",
+        "transactions",
+        ["tenant_id", "company_id", "occurred_at", "id"],
+        unique=False,
+        postgresql_where=sa.text("category_id IS NULL"),
+        sqlite_where=sa.text("category_id IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_uncategorized", table_name="transactions")
+    op.drop_index("ix_transactions_tenant_company_occurred", table_name="transactions")
@@ -0,0 +1,27 @@
+"""add company data_version
+
+Revision ID: d7b4e2a9c310
+Revises: c5a2f8e41b07
+Create Date: 2026-10-17 11:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "d7b4e2a9c310"
+down_revision: Union[str, Sequence[str], None] = "c5a2f8e41b07"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "companies",
+        sa.Column("data_version", sa.Integer(), nullable=False, server_default=sa.text("0")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("companies", "data_version")
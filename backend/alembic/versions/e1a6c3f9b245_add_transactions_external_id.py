@@ -0,0 +1,33 @@
+"""add transactions external_id
+
+Revision ID: e1a6c3f9b245
+Revises: d7b4e2a9c310
+Create Date: 2026-10-17 12:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "e1a6c3f9b245"
+down_revision: Union[str, Sequence[str], None] = "d7b4e2a9c310"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("transactions", sa.Column("external_id", sa.String(length=80), nullable=True))
+    op.create_index(
+        "ux_transactions_external_id",
+        "transactions",
+        ["tenant_id", "company_id", "external_id"],
+        unique=True,
+        postgresql_where=sa.text("external_id IS NOT NULL"),
+        sqlite_where=sa.text("external_id IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_transactions_external_id", table_name="transactions")
+    op.drop_column("transactions", "external_id")
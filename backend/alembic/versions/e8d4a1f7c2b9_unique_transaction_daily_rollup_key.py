@@ -0,0 +1,64 @@
+"""unique transaction daily rollup key
+
+Revision ID: e8d4a1f7c2b9
+Revises: a4e7b2c9d316
+Create Date: 2026-10-17 18:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "e8d4a1f7c2b9"
+down_revision: Union[str, Sequence[str], None] = "a4e7b2c9d316"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_KEY = "tenant_id, company_id, day, COALESCE(category_id, 0), kind"
+
+
+def upgrade() -> None:
+    # UPDATE-then-INSERT concorrente pode ter duplicado linhas: consolida antes do índice único
+    op.execute(
+        f"""
+        UPDATE transaction_daily_rollup AS r
+        SET amount_cents = (
+                SELECT SUM(d.amount_cents) FROM transaction_daily_rollup d
+                WHERE d.tenant_id = r.tenant_id AND d.company_id = r.company_id AND d.day = r.day
+                  AND COALESCE(d.category_id, 0) = COALESCE(r.category_id, 0) AND d.kind = r.kind
+            ),
+            tx_count = (
+                SELECT SUM(d.tx_count) FROM transaction_daily_rollup d
+                WHERE d.tenant_id = r.tenant_id AND d.company_id = r.company_id AND d.day = r.day
+                  AND COALESCE(d.category_id, 0) = COALESCE(r.category_id, 0) AND d.kind = r.kind
+            )
+        WHERE r.id IN (
+            SELECT MIN(id) FROM transaction_daily_rollup GROUP BY {_KEY} HAVING COUNT(*) > 1
+        )
+        """
+    )
+    op.execute(
+        f"""
+        DELETE FROM transaction_daily_rollup
+        WHERE id NOT IN (SELECT MIN(id) FROM transaction_daily_rollup GROUP BY {_KEY})
+        """
+    )
+
+    op.drop_index("ix_transaction_daily_rollup_key", table_name="transaction_daily_rollup")
+    op.create_index(
+        "ux_transaction_daily_rollup_key",
+        "transaction_daily_rollup",
+        ["tenant_id", "company_id", "day", sa.text("COALESCE(category_id, 0)"), "kind"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_transaction_daily_rollup_key", table_name="transaction_daily_rollup")
+    op.create_index(
+        "ix_transaction_daily_rollup_key",
+        "transaction_daily_rollup",
+        ["tenant_id", "company_id", "day", "category_id", "kind"],
+        unique=False,
+    )
@@ -0,0 +1,40 @@
+"""add category token stats
+
+Revision ID: f3c8d1e5a7b2
+Revises: e1a6c3f9b245
+Create Date: 2026-10-17 13:00:00.000000
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "f3c8d1e5a7b2"
+down_revision: Union[str, Sequence[str], None] = "e1a6c3f9b245"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # backfill fica com scripts/mine_category_rules.py (tokenização é feita em Python)
+    op.create_table(
+        "category_token_stats",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("tenant_id", sa.Integer(), nullable=False),
+        sa.Column("token", sa.String(length=40), nullable=False),
+        sa.Column("category_id", sa.Integer(), nullable=False),
+        sa.Column("hits", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ux_category_token_stats_key",
+        "category_token_stats",
+        ["tenant_id", "token", "category_id"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_category_token_stats_key", table_name="category_token_stats")
+    op.drop_table("category_token_stats")
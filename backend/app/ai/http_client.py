@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Awaitable
+
+import httpx
+
+from app.core.settings import settings
+
+# Loop asyncio dedicado (thread daemon) dono de um httpx.AsyncClient compartilhado.
+# As rotas de sugestão são síncronas (threadpool do FastAPI); elas submetem corrotinas
+# aqui e esperam o resultado. Assim o pool de conexões (keep-alive/TLS) sobrevive entre
+# chamadas e os lotes de uma mesma chamada vão em paralelo sobre ele.
+
+_lock = threading.Lock()
+_loop: asyncio.AbstractEventLoop | None = None
+_client: httpx.AsyncClient | None = None
+
+
+def _ensure_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    if _loop is not None:
+        return _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="ia-cnpj-ai-http", daemon=True).start()
+            _loop = loop
+    return _loop
+
+
+def run_async(coro: Awaitable[Any], *, timeout: float | None = None) -> Any:
+    """Executa `coro` no loop compartilhado e bloqueia até o resultado (cancela no timeout)."""
+    fut = asyncio.run_coroutine_threadsafe(coro, _ensure_loop())
+    try:
+        return fut.result(timeout)
+    except TimeoutError:
+        fut.cancel()
+        raise
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Cliente compartilhado; só deve ser usado dentro do loop de run_async."""
+    global _client
+    if _client is None:
+        limit = max(1, int(settings.OPENAI_MAX_CONCURRENCY))
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+            timeout=float(settings.OPENAI_TIMEOUT_S),
+        )
+    return _client
+
+
+async def _aclose() -> None:
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.aclose()
+
+
+def close() -> None:
+    """Fecha o cliente compartilhado (testes / troca de config); o loop continua de pé."""
+    if _loop is not None:
+        run_async(_aclose(), timeout=5)
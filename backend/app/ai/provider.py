@@ -2,10 +2,18 @@ from __future__ import annotations
 
 import httpx
 
+import asyncio
+import hashlib
+import random
+import time
 from dataclasses import dataclass
 from pathlib import Path
 import json
-from typing import Protocol, Sequence, Optional, List
+from typing import Dict, Protocol, Sequence, Optional, List
+
+from app.ai.http_client import get_async_client, run_async
+from app.core.resilience import get_guard, remaining_s
+from app.services.categorization import normalize_text
 
 
 # -----------------------------
@@ -36,6 +44,7 @@ class SuggestOutputItem:
     confidence: float = 0.0
     rule: str = "ai"
     notes: Optional[str] = None
+    category_id: Optional[int] = None
 
 
 class AISuggestCategoriesProvider(Protocol):
@@ -45,9 +54,12 @@ class AISuggestCategoriesProvider(Protocol):
         items: Sequence[SuggestInputItem],
         *,
         include_no_match: bool = False,
-    ) -> List[SuggestOutputItem]:
+        categories: Sequence[dict] = (),
+        cache: Optional["SuggestCache"] = None,
+    ) -> Optional[List[SuggestOutputItem]]:
         """
-        Retorna uma lista com sugestões por transação.
+        Retorna uma lista com sugestões por transação (None = provider indisponível).
+        - categories: [{id, name}] permitidas; cache: SuggestCache opcional (tenant).
         - Se include_no_match=False: pode retornar somente as que tiverem category_name.
         - Se include_no_match=True: pode retornar também itens sem match (category_name=None).
         """
@@ -59,12 +71,41 @@ class AISuggestCategoriesProvider(Protocol):
 # -----------------------------
 
 
-def _load_prompt(name: str) -> str:
-    base = Path(__file__).parent / "prompts" / name
-    try:
-        return base.read_text(encoding="utf-8")
-    except Exception:
-        return ""
+class PromptFile:
+    """
+    Prompt versionado em app/ai/prompts, carregado uma vez e relido só quando o mtime
+    muda (o stat é feito no máximo a cada `check_interval_s`).
+    """
+
+    def __init__(self, name: str, *, path: Optional[Path] = None, check_interval_s: float = 2.0) -> None:
+        self.name = name
+        self.path = path or Path(__file__).parent / "prompts" / name
+        self.check_interval_s = check_interval_s
+        self._text = ""
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._refresh()
+
+    def _refresh(self) -> None:
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            self._text, self._mtime = "", None
+            return
+        if mtime != self._mtime:
+            try:
+                self._text = self.path.read_text(encoding="utf-8")
+            except OSError:
+                self._text = ""
+            self._mtime = mtime
+
+    @property
+    def text(self) -> str:
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval_s:
+            self._checked_at = now
+            self._refresh()
+        return self._text
 
 class NullSuggestProvider:
     """
@@ -77,6 +118,8 @@ class NullSuggestProvider:
         items: Sequence[SuggestInputItem],
         *,
         include_no_match: bool = False,
+        categories: Sequence[dict] = (),
+        cache: Optional["SuggestCache"] = None,
     ) -> List[SuggestOutputItem]:
         if include_no_match:
             return [
@@ -85,175 +128,247 @@ class NullSuggestProvider:
             ]
         return []
 
-class OpenAISuggestProvider:
-    """Provider OpenAI (D12).
-    Guardrails:
-    - Se faltar config/erro/timeout: retorna None => caller cai no rule-based.
-    - Nunca loga chave/prompt completo.
-    """
+@dataclass(frozen=True)
+class CachedSuggestion:
+    """Resposta da IA guardada por descrição normalizada (category_id None = sem sugestão)."""
+    category_id: Optional[int]
+    confidence: float = 0.0
+    reason: Optional[str] = None
 
-    def __init__(self):
-        pass
 
-    def suggest_categories(self, req, include_no_match: bool = False):
-        # carrega config (settings ou env fallback já existe em get_ai_config)
-        try:
-            import importlib
-            mod = importlib.import_module("app.core.settings")
-            s = getattr(mod, "settings", None) or (mod.get_settings() if hasattr(mod, "get_settings") else None) or mod.Settings()
-            api_key = (getattr(s, "OPENAI_API_KEY", "") or "").strip()
-            model = (getattr(s, "OPENAI_MODEL", "gpt-4o-mini") or "gpt-4o-mini").strip()
-            base_url = (getattr(s, "OPENAI_BASE_URL", "https://api.openai.com/v1") or "https://api.openai.com/v1").strip().rstrip("/")
-            timeout_s = int(getattr(s, "OPENAI_TIMEOUT_S", 25) or 25)
-        except Exception:
-            return None
+class SuggestCache(Protocol):
+    def get_many(self, keys: Sequence[str]) -> Dict[str, CachedSuggestion]:
+        ...
 
-        if not api_key:
-            return None
+    def set_many(self, entries: Dict[str, CachedSuggestion]) -> None:
+        ...
 
-        # monta payload com o mínimo necessário (auditável)
-        prompt = _load_prompt("suggest_categories_v1.md")
-        if not prompt:
-            return None
 
-        # tenta extrair campos comuns do request pydantic
-        try:
-            payload = req.model_dump() if hasattr(req, "model_dump") else dict(req)
-        except Exception:
-            payload = {}
-
-        # chama /responses (mais novo). Se não existir, cai pra /chat/completions.
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        }
+def normalize_description(description: Optional[str]) -> str:
+    """Chave de deduplicação: minúsculas, sem acento, espaços colapsados."""
+    return " ".join(normalize_text(description).split())
 
-        # instrução: retornar JSON puro
-        user_input = json.dumps(payload, ensure_ascii=False)
 
-        try:
-            with httpx.Client(timeout=timeout_s) as client:
-                url = f"{base_url}/responses"
-                body = {
-                    "model": model,
-                    "input": [
-                        {"role": "system", "content": prompt},
-                        {"role": "user", "content": user_input},
-                    ],
-                    "text": {"format": {"type": "json_object"}},
-                }
-                r = client.post(url, headers=headers, json=body)
-                if r.status_code >= 400:
-                    # fallback para chat.completions
-                    url2 = f"{base_url}/chat/completions"
-                    body2 = {
-                        "model": model,
-                        "messages": [
-                            {"role": "system", "content": prompt},
-                            {"role": "user", "content": user_input},
-                        ],
-                        "response_format": {"type": "json_object"},
-                        "temperature": 0,
-                    }
-                    r2 = client.post(url2, headers=headers, json=body2)
-                    if r2.status_code >= 400:
-                        return None
-                    data = r2.json()
-                    txt = data["choices"][0]["message"]["content"]
-                else:
-                    data = r.json()
-                    # responses: pega texto agregado
-                    # melhor esforço: output_text ou content
-                    txt = data.get("output_text")
-                    if not txt:
-                        # tenta varrer output
-                        out = data.get("output", [])
-                        txt = ""
-                        for item in out:
-                            for c in item.get("content", []):
-                                if c.get("type") in ("output_text", "text"):
-                                    txt += c.get("text", "")
-                        txt = txt.strip()
-
-                if not txt:
-                    return None
+class RetryBudget:
+    """Retentativas compartilhadas por todos os lotes de uma chamada (evita tempestade de retries)."""
 
-                parsed = json.loads(txt)
-                return parsed
-        except Exception:
-            return None
+    def __init__(self, tokens: int) -> None:
+        self.tokens = max(0, int(tokens))
 
+    def take(self) -> bool:
+        if self.tokens <= 0:
+            return False
+        self.tokens -= 1
+        return True
 
-def get_provider(name: str | None) -> AISuggestCategoriesProvider:
-    """
-    Factory simples. Hoje só null.
-    Amanhã: 'openai', 'anthropic', etc.
-    """
-    n = (name or "null").strip().lower()
-    if n in ("null", "noop", "none", ""):
-        return NullSuggestProvider()
-    # placeholder para próximos providers
-    raise ValueError(f"Unknown AI provider: {n!r}")
 
+_RETRY_STATUS = {408, 409, 429}
+_RETRY_AFTER_MAX_S = 10.0
 
-# --- D08: config + switch (settings -> provider) ------------------------------
 
-def get_ai_config():
-    """Lê AI_ENABLED/AI_PROVIDER via pydantic-settings (preferencial) e cai para env como fallback."""
+def _retry_after_s(resp: httpx.Response) -> Optional[float]:
+    raw = (resp.headers.get("retry-after") or "").strip()
     try:
-        import importlib
-        mod = importlib.import_module("app.core.settings")
-        s = None
-        if hasattr(mod, "settings"):
-            s = getattr(mod, "settings")
-        elif hasattr(mod, "get_settings"):
-            s = mod.get_settings()
-        elif hasattr(mod, "Settings"):
-            s = mod.Settings()
-        enabled = bool(getattr(s, "AI_ENABLED", False))
-        provider = str(getattr(s, "AI_PROVIDER", "null") or "null")
-        return enabled, provider
-    except Exception:
-        import os
-        v = (os.getenv("AI_ENABLED", "false") or "false").strip().lower()
-        enabled = v in ("1", "true", "yes", "on")
-        provider = (os.getenv("AI_PROVIDER", "null") or "null").strip()
-        return enabled, provider
-
-def get_active_provider():
-    enabled, name = get_ai_config()
-    if not enabled:
+        return min(_RETRY_AFTER_MAX_S, max(0.0, float(raw))) if raw else None
+    except ValueError:
         return None
-    return get_provider(name)
 
-def provider_suggest_categories(req, include_no_match: bool = False):
-    """Tenta provider quando AI_ENABLED=true. Se não houver provider aplicável, retorna None (caller faz fallback)."""
-    prov = get_active_provider()
-    if prov is None:
-        return None
 
-    import inspect
-    for meth_name in ("suggest_categories", "suggest", "suggest_categories_for_transactions", "suggest_transaction_categories"):
-        if hasattr(prov, meth_name):
-            fn = getattr(prov, meth_name)
+class OpenAISuggestProvider:
+    """Provider OpenAI (D12).
+    - Deduplica por descrição normalizada e consulta o cache (tenant, descrição) antes de chamar a API.
+    - Faltantes vão em lotes de até OPENAI_BATCH_SIZE, em paralelo (OPENAI_MAX_CONCURRENCY)
+      sobre o httpx.AsyncClient compartilhado (app/ai/http_client.py), só /chat/completions.
+    - Retry com backoff exponencial + jitter em 408/409/429/5xx/erro de rede, limitado por lote
+      (OPENAI_MAX_RETRIES), pelo orçamento da chamada (RetryBudget) e pelo prazo OPENAI_DEADLINE_S.
+    Guardrails:
+    - Se faltar config: retorna None => caller cai no rule-based. Lote que falhar fica sem sugestão.
+    - Nunca loga chave/prompt completo.
+    """
+
+    prompt_name = "suggest_categories_v1.md"
+
+    def __init__(self, *, source=None, **overrides):
+        # source: Settings recém-lido (reload do registry); default = singleton do processo
+        from app.core.settings import settings
+
+        s = source if source is not None else settings
+
+        cfg = {
+            "api_key": (s.OPENAI_API_KEY or "").strip(),
+            "model": (s.OPENAI_MODEL or "gpt-4o-mini").strip(),
+            "base_url": (s.OPENAI_BASE_URL or "https://api.openai.com/v1").strip().rstrip("/"),
+            "timeout_s": float(s.OPENAI_TIMEOUT_S or 25),
+            "batch_size": int(s.OPENAI_BATCH_SIZE),
+            "max_concurrency": int(s.OPENAI_MAX_CONCURRENCY),
+            "max_retries": int(s.OPENAI_MAX_RETRIES),
+            "retry_budget_ratio": float(s.OPENAI_RETRY_BUDGET_RATIO),
+            "backoff_base_s": float(s.OPENAI_BACKOFF_BASE_S),
+            "deadline_s": float(s.OPENAI_DEADLINE_S),
+        }
+        cfg.update({k: v for k, v in overrides.items() if v is not None})
+        for k, v in cfg.items():
+            setattr(self, k, v)
+        self._prompt = PromptFile(self.prompt_name)
+
+    @property
+    def prompt(self) -> str:
+        return self._prompt.text
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key and self.prompt)
+
+    def cache_key(self, normalized: str) -> str:
+        raw = f"{self.model}|{self.prompt_name}|{normalized}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def suggest_categories(
+        self,
+        company_id: int,
+        items: Sequence[SuggestInputItem],
+        *,
+        include_no_match: bool = False,
+        categories: Sequence[dict] = (),
+        cache: Optional[SuggestCache] = None,
+    ) -> Optional[List[SuggestOutputItem]]:
+        if not self.configured or not categories:
+            return None
+        allowed = {int(c["id"]): str(c["name"]) for c in categories}
+
+        groups: Dict[str, List[SuggestInputItem]] = {}
+        for it in items:
+            groups.setdefault(self.cache_key(normalize_description(it.description)), []).append(it)
+
+        known = cache.get_many(list(groups)) if cache is not None else {}
+        pending = [(key, its[0]) for key, its in groups.items() if key not in known]
+        if pending:
+            # prazo da request (se houver) encurta o prazo da chamada
+            left = remaining_s()
+            deadline_s = self.deadline_s if left is None else max(0.0, min(self.deadline_s, left))
             try:
-                sig = inspect.signature(fn)
-                params = [p for p in sig.parameters.values()]
-                argc = len(params)
-                if argc <= 1:
-                    return fn()
-                if argc == 2:
-                    return fn(req)
-                if argc == 3:
-                    return fn(req, include_no_match)
-                kwargs = {}
-                if "req" in sig.parameters: kwargs["req"] = req
-                if "payload" in sig.parameters: kwargs["payload"] = req
-                if "include_no_match" in sig.parameters: kwargs["include_no_match"] = include_no_match
-                if kwargs:
-                    return fn(**kwargs)
-                return fn(req)
+                with get_guard("openai").bulkhead():
+                    fetched = run_async(
+                        self._fetch(company_id, pending, [{"id": i, "name": n} for i, n in allowed.items()], deadline_s),
+                        timeout=deadline_s + 1.0,
+                    )
             except Exception:
-                return None
+                fetched = {}
+            if fetched and cache is not None:
+                cache.set_many(fetched)
+            known.update(fetched)
+
+        out: List[SuggestOutputItem] = []
+        for key, its in groups.items():
+            hit = known.get(key)
+            ok = hit is not None and hit.category_id in allowed
+            for it in its:
+                if ok:
+                    out.append(SuggestOutputItem(
+                        id=it.id,
+                        category_name=allowed[hit.category_id],
+                        category_id=hit.category_id,
+                        confidence=float(hit.confidence),
+                        rule="ai",
+                        notes=hit.reason,
+                    ))
+                elif include_no_match:
+                    out.append(SuggestOutputItem(id=it.id, category_name=None, confidence=0.0, rule="no_match"))
+        return out
+
+    async def _fetch(self, company_id: int, pending, categories, deadline_s: Optional[float] = None) -> Dict[str, CachedSuggestion]:
+        size = max(1, int(self.batch_size))
+        batches = [pending[i:i + size] for i in range(0, len(pending), size)]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.deadline_s if deadline_s is None else deadline_s)
+        budget = RetryBudget(max(1, int(len(batches) * self.retry_budget_ratio)))
+        sem = asyncio.Semaphore(max(1, int(self.max_concurrency)))
+        client = get_async_client()
+        results: Dict[str, CachedSuggestion] = {}
+
+        async def one(batch):
+            async with sem:
+                parsed = await self._post_batch(client, company_id, batch, categories, budget, deadline)
+            if parsed is None:
+                return  # lote falhou: não cacheia
+            for key, it in batch:
+                results[key] = parsed.get(it.id) or CachedSuggestion(category_id=None)
+
+        await asyncio.gather(*(one(b) for b in batches))
+        return results
+
+    def _body(self, company_id: int, batch, categories) -> dict:
+        payload = {
+            "company_id": company_id,
+            "transactions": [
+                {
+                    "id": it.id,
+                    "description": it.description,
+                    "amount": (it.amount_cents if it.kind == "in" else -it.amount_cents) / 100.0,
+                    "date": it.occurred_at,
+                }
+                for _key, it in batch
+            ],
+            "categories": categories,
+        }
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": self.prompt},
+                {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+            ],
+            "response_format": {"type": "json_object"},
+            "temperature": 0,
+        }
 
-    return None
+    async def _post_batch(self, client, company_id, batch, categories, budget, deadline):
+        loop = asyncio.get_running_loop()
+        url = f"{self.base_url}/chat/completions"
+        headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+        body = self._body(company_id, batch, categories)
+
+        guard = get_guard("openai")
+        attempt = 0
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            if not guard.allow():
+                return None  # circuito aberto: falha na hora, sem rede
+            retry_after = None
+            t0 = time.perf_counter()
+            try:
+                r = await client.post(url, headers=headers, json=body, timeout=min(self.timeout_s, remaining))
+                guard.record(time.perf_counter() - t0, failure=r.status_code >= 500 or r.status_code in (408, 429))
+                if r.status_code < 400:
+                    return self._parse(r.json())
+                if r.status_code < 500 and r.status_code not in _RETRY_STATUS:
+                    return None
+                retry_after = _retry_after_s(r)
+            except (httpx.HTTPError, asyncio.CancelledError) as e:
+                guard.record(time.perf_counter() - t0, failure=True)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+            except (ValueError, KeyError, IndexError, TypeError):
+                return None  # resposta fora do contrato: retry não ajuda
+
+            attempt += 1
+            delay = retry_after if retry_after is not None else self.backoff_base_s * (2 ** (attempt - 1)) * (0.5 + random.random() / 2)
+            if attempt > self.max_retries or loop.time() + delay >= deadline or not budget.take():
+                return None
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _parse(data: dict) -> Dict[int, CachedSuggestion]:
+        txt = data["choices"][0]["message"]["content"]
+        parsed = json.loads(txt or "{}")
+        out: Dict[int, CachedSuggestion] = {}
+        for sug in parsed.get("suggestions") or []:
+            try:
+                tx_id = int(sug["transaction_id"])
+                cat_id = int(sug["suggested_category_id"])
+                conf = max(0.0, min(1.0, float(sug.get("confidence") or 0.0)))
+            except (KeyError, TypeError, ValueError):
+                continue
+            out[tx_id] = CachedSuggestion(category_id=cat_id, confidence=conf, reason=(str(sug.get("reason") or "") or None))
+        return out
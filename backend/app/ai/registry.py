@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from app.ai import http_client
+from app.ai.provider import (
+    AISuggestCategoriesProvider,
+    NullSuggestProvider,
+    OpenAISuggestProvider,
+    SuggestCache,
+    SuggestInputItem,
+    SuggestOutputItem,
+)
+from app.core.settings import Settings, settings
+
+logger = logging.getLogger(__name__)
+
+# D08: config + switch (settings -> provider), resolvido uma vez.
+# reload() lê AI_ENABLED/AI_PROVIDER, instancia e valida o provider (config + prompt)
+# no startup ou sob demanda (POST /admin/ai/reload, que relê env/.env). O caminho quente
+# é só `registry.suggest(...)`: leitura de atributo + chamada + contadores.
+
+_NULL_NAMES = ("null", "noop", "none", "")
+
+
+class ProviderStats:
+    """Contadores por provider: chamadas, erros, itens e latência."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.items = 0
+        self.latency_sum_ms = 0.0
+        self.latency_max_ms = 0.0
+
+    def observe(self, elapsed_s: float, *, items: int, error: bool) -> None:
+        ms = elapsed_s * 1000.0
+        with self._lock:
+            self.calls += 1
+            self.items += items
+            self.latency_sum_ms += ms
+            self.latency_max_ms = max(self.latency_max_ms, ms)
+            if error:
+                self.errors += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "items": self.items,
+                "latency_avg_ms": round(self.latency_sum_ms / self.calls, 3) if self.calls else 0.0,
+                "latency_max_ms": round(self.latency_max_ms, 3),
+            }
+
+
+def build_provider(name: str | None, source: Settings | None = None) -> AISuggestCategoriesProvider:
+    """Factory: null | openai. Nome desconhecido => ValueError (falha no startup, não na request)."""
+    n = (name or "null").strip().lower()
+    if n in _NULL_NAMES:
+        return NullSuggestProvider()
+    if n == "openai":
+        return OpenAISuggestProvider(source=source)
+    # placeholder para próximos providers
+    raise ValueError(f"Unknown AI provider: {n!r}")
+
+
+def _config_problem(provider: AISuggestCategoriesProvider) -> Optional[str]:
+    if isinstance(provider, OpenAISuggestProvider):
+        if not provider.api_key:
+            return "OPENAI_API_KEY vazio"
+        if not provider.prompt:
+            return f"prompt {provider.prompt_name} ausente"
+    return None
+
+
+class ProviderRegistry:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.name = "null"
+        self.provider: Optional[AISuggestCategoriesProvider] = None
+        self.problem: Optional[str] = None
+        self._stats: Dict[str, ProviderStats] = {}
+        self._current_stats: Optional[ProviderStats] = None
+
+    def reload(self, *, from_env: bool = False) -> "ProviderRegistry":
+        """
+        Resolve o provider a partir de `settings`. from_env=True relê env/.env (Settings() novo:
+        o singleton é montado só no import) e, se a config for válida (provider resolvido ou IA
+        desligada), publica os campos AI_*/OPENAI_* no singleton e fecha o cliente HTTP da IA,
+        que é recriado na próxima chamada com o timeout/concorrência novos.
+        """
+        source = Settings() if from_env else settings
+        enabled = bool(source.AI_ENABLED)
+        name = (source.AI_PROVIDER or "null").strip().lower() or "null"
+        provider = build_provider(name, source) if enabled else None
+        problem = _config_problem(provider) if provider is not None else None
+        if problem:
+            # guardrail D12: config incompleta => sem provider (caller cai no rule-based)
+            logger.warning("ai_provider_disabled provider=%s reason=%s", name, problem)
+            provider = None
+
+        if from_env and problem is None:
+            for field in Settings.model_fields:
+                if field.startswith(("AI_", "OPENAI_")):
+                    setattr(settings, field, getattr(source, field))
+            http_client.close()
+        self.enabled, self.name, self.problem = enabled, name, problem
+        self._current_stats = self._stats.setdefault(name, ProviderStats(name))
+        self.provider = provider
+        return self
+
+    @property
+    def active(self) -> Optional[AISuggestCategoriesProvider]:
+        return self.provider
+
+    def suggest(
+        self,
+        company_id: int,
+        items: Sequence[SuggestInputItem],
+        *,
+        include_no_match: bool = False,
+        categories: Sequence[dict] = (),
+        cache: Optional[SuggestCache] = None,
+    ) -> Optional[List[SuggestOutputItem]]:
+        """Chama o provider ativo; None se não houver provider ou se ele falhar (caller faz fallback)."""
+        provider = self.provider
+        if provider is None or not items:
+            return None
+        stats = self._current_stats
+        t0 = time.perf_counter()
+        try:
+            out = provider.suggest_categories(
+                company_id, items, include_no_match=include_no_match, categories=categories, cache=cache
+            )
+        except Exception:
+            logger.exception("ai_provider_failed provider=%s company_id=%s", self.name, company_id)
+            stats.observe(time.perf_counter() - t0, items=len(items), error=True)
+            return None
+        stats.observe(time.perf_counter() - t0, items=len(items), error=out is None)
+        return out
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "provider": self.name,
+            "active": self.provider is not None,
+            "problem": self.problem,
+            "providers": {name: s.snapshot() for name, s in self._stats.items()},
+        }
+
+
+ai_registry = ProviderRegistry()
+
+
+def get_ai_config() -> tuple[bool, str]:
+    """(AI_ENABLED, AI_PROVIDER) efetivos do último reload."""
+    return ai_registry.enabled, ai_registry.name
+
+
+def get_active_provider() -> Optional[AISuggestCategoriesProvider]:
+    return ai_registry.active
+
+
+def provider_suggest_categories(
+    company_id: int,
+    items: Sequence[SuggestInputItem],
+    *,
+    include_no_match: bool = False,
+    categories: Sequence[dict] = (),
+    cache: Optional[SuggestCache] = None,
+) -> Optional[List[SuggestOutputItem]]:
+    """Tenta o provider ativo (AI_ENABLED=true). None => caller faz fallback."""
+    return ai_registry.suggest(
+        company_id, items, include_no_match=include_no_match, categories=categories, cache=cache
+    )
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.ai.registry import ai_registry
+from app.auth.jwt import require_auth
+from app.core.onboarding_admin import assert_onboarding_admin
+
+router = APIRouter(prefix="/admin/ai", tags=["admin-ai"])
+
+
+@router.get("/provider")
+def get_provider_stats(claims=Depends(require_auth)):
+    assert_onboarding_admin((claims.get("sub") or "").strip().lower())
+    return ai_registry.stats()
+
+
+@router.post("/reload")
+def reload_provider(claims=Depends(require_auth)):
+    """Relê env/.env e re-resolve o provider (AI_ENABLED/AI_PROVIDER/OPENAI_*) sem restart."""
+    assert_onboarding_admin((claims.get("sub") or "").strip().lower())
+    try:
+        ai_registry.reload(from_env=True)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return ai_registry.stats()
@@ -0,0 +1,15 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends
+
+from app.auth.jwt import require_auth
+from app.core.onboarding_admin import assert_onboarding_admin
+from app.db import pool_stats
+
+router = APIRouter(prefix="/admin/db", tags=["admin-db"])
+
+
+@router.get("/pool")
+def get_pool_stats(claims=Depends(require_auth)):
+    assert_onboarding_admin((claims.get("sub") or "").strip().lower())
+    return pool_stats()
@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 from app.auth.jwt import require_auth
 from app.core.onboarding_admin import assert_onboarding_admin
 from app.core.security import hash_password
+from app.core.tenant_cache import invalidate_tenant_member
 from app.db import get_admin_db
 from app.models.tenant import Tenant, TenantMember
 from app.models.user import User
@@ -73,6 +74,7 @@ def create_client(payload: AdminProvisionIn, db: Session = Depends(get_admin_db)
     db.add(member)
 
     db.commit()
+    invalidate_tenant_member(email)
 
     return {
         "ok": True,
@@ -4,11 +4,16 @@ import logging
 from uuid import uuid4
 
 from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.tenant import get_current_tenant_id
-from app.deps import get_db
-from app.services.ai_consult_service import run_ai_consult
+from app.api import reports as rep
+from app.core.tenant import get_current_tenant_id, get_current_tenant_id_async
+from app.deps import get_async_db, get_db
+from app.models.company import Company
+from app.services import categorization_jobs
+from app.services.ai_consult_service import run_ai_consult_async
 from app.api.transaction import suggest_categories as tx_suggest_categories, apply_suggestions as tx_apply_suggestions
 from app.schemas.ai import (
     AiConsultRequest,
@@ -17,6 +22,8 @@ from app.schemas.ai import (
     AISuggestCategoriesResponse,
     AIApplySuggestionsRequest,
     AIApplySuggestionsResponse,
+    CategorizeJobCreate,
+    CategorizeJobOut,
 )
 
 router = APIRouter(prefix="/ai", tags=["ai"])
@@ -30,14 +37,15 @@ def _fmt_brl(cents: int) -> str:
 
 
 @router.post("/consult", response_model=AiConsultResponse)
-def consult(payload: AiConsultRequest, request: Request, db: Session = Depends(get_db), tenant_id: int = Depends(get_current_tenant_id)):
+async def consult(
+    payload: AiConsultRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    tenant_id: int = Depends(get_current_tenant_id_async),
+):
     request_id = request.headers.get('x-request-id') or uuid4().hex
     try:
-        result = run_ai_consult(
-            db=db,
-            payload=payload,
-            tenant_id=tenant_id,
-        )
+        result = await run_ai_consult_async(db=db, payload=payload, tenant_id=tenant_id)
         return result
     except HTTPException:
         raise
@@ -81,7 +89,55 @@ def ai_apply_suggestions(
         limit=payload.limit,
         dry_run=payload.dry_run,
         include_no_match=payload.include_no_match,
+        cursor=payload.cursor,
         db=db,
         tenant_id=tenant_id,
     )
 
+
+
+@router.post("/categorize-jobs", response_model=CategorizeJobOut, status_code=202)
+def create_categorize_job(
+    payload: CategorizeJobCreate,
+    db: Session = Depends(get_db),
+    tenant_id: int = Depends(get_current_tenant_id),
+):
+    """
+    Categoriza todo o backlog sem categoria da empresa em background (lotes com checkpoint).
+    Já existe job ativo para a empresa => devolve o mesmo job.
+    """
+    company = db.scalar(select(Company).where(Company.id == payload.company_id, Company.tenant_id == tenant_id))
+    if not company:
+        raise HTTPException(status_code=404, detail="Empresa nao encontrada")
+
+    start_dt = rep._parse_iso_date_or_datetime(payload.start, is_end=False) if payload.start else None
+    end_dt = rep._parse_iso_date_or_datetime(payload.end, is_end=True) if payload.end else None
+    if start_dt is not None and end_dt is not None and start_dt > end_dt:
+        raise HTTPException(status_code=422, detail={
+            "error_code": "INVALID_PERIOD",
+            "message": "start não pode ser maior que end",
+        })
+
+    job, _created = categorization_jobs.create_job(
+        db,
+        tenant_id=tenant_id,
+        company_id=payload.company_id,
+        start_dt=start_dt,
+        end_dt=end_dt,
+        use_ai=payload.use_ai,
+        batch_size=payload.batch_size,
+    )
+    categorization_jobs.categorization_worker.wake()
+    return categorization_jobs.job_out(job)
+
+
+@router.get("/categorize-jobs/{job_id}", response_model=CategorizeJobOut)
+def get_categorize_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    tenant_id: int = Depends(get_current_tenant_id),
+):
+    job = categorization_jobs.get_job(db, tenant_id=tenant_id, job_id=job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job nao encontrado")
+    return categorization_jobs.job_out(job)
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 import httpx
 
+from app.core.resilience import ProviderUnavailable
 from app.core.tenant import get_current_tenant_id
 from app.db import get_db
 from app.schemas.billing import CreateCheckoutRequest, CreateCheckoutResponse, PurchaseHistoryItem
@@ -36,6 +37,15 @@ def create_checkout(
         except Exception:
             pass
         raise HTTPException(status_code=502, detail=detail) from exc
+    except ProviderUnavailable as exc:
+        detail = {
+            "message": "Gateway de pagamento indisponível no momento. Tente novamente em instantes.",
+            "provider": exc.provider,
+            "reason": exc.reason,
+        }
+        raise HTTPException(status_code=503, detail=detail) from exc
+    except httpx.HTTPError as exc:
+        raise HTTPException(status_code=502, detail={"message": "Falha de comunicação com o gateway de pagamento."}) from exc
 
     return CreateCheckoutResponse(
         purchase_id=purchase.id,
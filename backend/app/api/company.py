@@ -1,15 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, Path as FastAPIPath
+from fastapi import APIRouter, Depends, HTTPException, Path as FastAPIPath, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from sqlalchemy.exc import SQLAlchemyError
 import logging
 
-from app.deps import get_db
+from app.deps import get_async_db, get_db
 from app.models.company import Company
-from app.schemas.company import CompanyCreate, CompanyOut
-from app.core.tenant import get_current_tenant_id
+from app.core.settings import settings
+from app.schemas.company import (
+    CompanyBulkLookupJobOut,
+    CompanyBulkLookupRequest,
+    CompanyBulkLookupResponse,
+    CompanyCreate,
+    CompanyOut,
+)
+from app.core.tenant import get_current_tenant_id, get_current_tenant_id_async
+from app.services.company_bulk_lookup import (
+    get_bulk_lookup_job,
+    run_bulk_lookup,
+    start_bulk_lookup_job,
+    sync_max,
+)
 from app.services.company_lookup_service import (
-    get_or_create_company_by_cnpj,
+    get_or_create_company_by_cnpj_async,
     normalize_cnpj,
 )
 
@@ -55,13 +70,13 @@ def list_companies(db: Session = Depends(get_db), tenant_id: int = Depends(get_c
 
 
 @router.get("/by-cnpj/{cnpj}", response_model=CompanyOut)
-def get_company_by_cnpj(
+async def get_company_by_cnpj(
     cnpj: str = FastAPIPath(...),
-    db: Session = Depends(get_db),
-    tenant_id: int = Depends(get_current_tenant_id),
+    db: AsyncSession = Depends(get_async_db),
+    tenant_id: int = Depends(get_current_tenant_id_async),
 ):
     try:
-        return get_or_create_company_by_cnpj(
+        return await get_or_create_company_by_cnpj_async(
             db=db,
             tenant_id=tenant_id,
             cnpj=cnpj,
@@ -79,6 +94,47 @@ def get_company_by_cnpj(
         raise HTTPException(status_code=500, detail="Internal error")
 
 
+@router.post("/bulk-lookup", response_model=CompanyBulkLookupResponse | CompanyBulkLookupJobOut)
+def bulk_lookup_companies(
+    payload: CompanyBulkLookupRequest,
+    mode: str = Query("sync", pattern="^(sync|job)$"),
+    db: Session = Depends(get_db),
+    tenant_id: int = Depends(get_current_tenant_id),
+):
+    """
+    Enriquece uma lista de CNPJs de uma vez.
+    mode=sync devolve o status por CNPJ na resposta (até sync_max(): teto pela taxa do provedor);
+    mode=job responde 202 e o progresso fica em GET /companies/bulk-lookup/{job_id}.
+    """
+    n = len(payload.cnpjs)
+    if n > settings.CNPJ_BULK_MAX:
+        raise HTTPException(status_code=413, detail=f"Maximo de {settings.CNPJ_BULK_MAX} CNPJs por chamada")
+
+    if mode == "job":
+        job = start_bulk_lookup_job(tenant_id, payload.cnpjs)
+        return JSONResponse(status_code=202, content=job.as_dict(include_items=False))
+
+    limit = sync_max()
+    if n > limit:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Acima de {limit} CNPJs use mode=job",
+        )
+    try:
+        return run_bulk_lookup(db, tenant_id, payload.cnpjs)
+    except SQLAlchemyError:
+        logger.exception("DB error on bulk lookup tenant_id=%s", tenant_id)
+        raise HTTPException(status_code=503, detail="Database unavailable")
+
+
+@router.get("/bulk-lookup/{job_id}", response_model=CompanyBulkLookupJobOut)
+def get_bulk_lookup_job_status(job_id: str, tenant_id: int = Depends(get_current_tenant_id)):
+    job = get_bulk_lookup_job(tenant_id, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Nao encontrado")
+    return job.as_dict()
+
+
 @router.get("/{company_id}", response_model=CompanyOut)
 def get_company(company_id: int, db: Session = Depends(get_db), tenant_id: int = Depends(get_current_tenant_id)):
     try:
@@ -2,32 +2,43 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
 
+import anyio
 from fastapi import APIRouter, Depends, HTTPException, Query
 
 from fastapi import Body, Request, Response
-from io import BytesIO
-import os
-import datetime as _dt
-
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.pdfgen import canvas
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case, select
+from sqlalchemy import select
 
-from app.deps import get_db
-from app.models.transaction import Transaction
+from app.deps import get_async_db
 from app.models.company import Company
-from app.models.category import Category
 from app.schemas.ai import AiConsultRequest
-from app.schemas.reports import CategoryBreakdown, ContextResponse, DailyResponse, Period, SummaryResponse, TopCategoriesResponse, Totals, TransactionBrief, DailyPoint
-from app.core.tenant import get_current_tenant_id
-from app.services.ai_consult_service import run_ai_consult
+from app.schemas.reports import (
+    CompareResponse,
+    ContextResponse,
+    DailyPoint,
+    DailyResponse,
+    Period,
+    SeriesResponse,
+    SummaryResponse,
+    TopCategoriesResponse,
+)
+from app.core.settings import settings
+from app.core.tenant import get_current_tenant_id_async
+from app.services.ai_consult_service import run_ai_consult_async
+from app.services.pdf_cache import content_key, get_pdf_store
+from app.services.pdf_render import PdfRenderBusy, PdfRenderer, iter_chunks
+from app.services.period_comparison import DEFAULT_MOVING_AVERAGE_DAYS, compare_periods
+from app.services.report_series import GRANULARITIES, build_series, count_buckets
+from app.services.report_service import aggregate_period, daily_points_query, recent_transactions
+from app.services.report_cache import cached_report_async, etag_matches, report_etag, report_key
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
+# PDF do AI Consult: render fora do event loop (pool de processos, ver pdf_render)
+pdf_renderer = PdfRenderer(settings.PDF_RENDER_PROCESSES, settings.PDF_RENDER_MAX_PENDING)
+
 
 def _parse_iso_date_or_datetime(s: str, *, is_end: bool) -> datetime:
     """Aceita ISO date (YYYY-MM-DD) ou ISO datetime (YYYY-MM-DDTHH:MM:SS[.fff][Z|±HH:MM]).
@@ -75,7 +86,7 @@ def _parse_iso_date_or_datetime(s: str, *, is_end: bool) -> datetime:
         return datetime(d.year, d.month, d.day, 23, 59, 59, 999999)
     return datetime(d.year, d.month, d.day, 0, 0, 0)
 
-def _ensure_company(db: Session, company_id: int, tenant_id: int) -> None:
+def _get_company(db: Session, company_id: int, tenant_id: int) -> Company:
     c = db.scalar(select(Company).where(Company.id == company_id).where(Company.tenant_id == tenant_id))
     if c is None:
         raise HTTPException(status_code=404, detail={
@@ -83,6 +94,11 @@ def _ensure_company(db: Session, company_id: int, tenant_id: int) -> None:
             'company_id': company_id,
             'message': 'Empresa não encontrada',
         })
+    return c
+
+
+def _ensure_company(db: Session, company_id: int, tenant_id: int) -> None:
+    _get_company(db, company_id, tenant_id)
 
 def _resolve_period(start: str | None, end: str | None) -> tuple[datetime, datetime, Period]:
     now = datetime.now(timezone.utc).replace(tzinfo=None)
@@ -112,398 +128,278 @@ def _resolve_period(start: str | None, end: str | None) -> tuple[datetime, datet
     return start_dt, end_dt, period
 
 
-def _totals_row(db: Session, company_id: int, start_dt: datetime, end_dt: datetime, tenant_id: int) -> Totals:
-    q = select(
-        func.coalesce(func.sum(case((Transaction.kind == "in", Transaction.amount_cents), else_=0)), 0).label("in_cents"),
-        func.coalesce(func.sum(case((Transaction.kind == "out", Transaction.amount_cents), else_=0)), 0).label("out_cents"),
-        func.count(Transaction.id).label("cnt"),
-    ).where(
-        Transaction.company_id == company_id,
-        Transaction.tenant_id == tenant_id,
-        Transaction.occurred_at.is_not(None),
-        Transaction.occurred_at >= start_dt,
-        Transaction.occurred_at <= end_dt,
-    )
-
-    r = db.execute(q).one()
-    entradas = int(r.in_cents or 0)
-    saidas = int(r.out_cents or 0)
-    cnt = int(r.cnt or 0)
-    return Totals(
-        entradas_cents=entradas,
-        saidas_cents=saidas,
-        saldo_cents=entradas - saidas,
-        qtd_transacoes=cnt,
-    )
-
-
-def _by_category(db: Session, company_id: int, start_dt: datetime, end_dt: datetime, tenant_id: int) -> list[CategoryBreakdown]:
-    total_cents = func.coalesce(func.sum(Transaction.amount_cents), 0).label("total_cents")
+_REPORT_CACHE_CONTROL = "private, no-cache"
 
-    q = (
-        select(
-            Transaction.category_id,
-            func.coalesce(Category.name, "Sem categoria").label("category_name"),
-            func.coalesce(func.sum(case((Transaction.kind == "in", Transaction.amount_cents), else_=0)), 0).label("in_cents"),
-            func.coalesce(func.sum(case((Transaction.kind == "out", Transaction.amount_cents), else_=0)), 0).label("out_cents"),
-            func.count(Transaction.id).label("cnt"),
-            total_cents,
-        )
-        .select_from(Transaction)
-        .outerjoin(Category, Category.id == Transaction.category_id)
-        .where(
-            Transaction.company_id == company_id,
-        Transaction.tenant_id == tenant_id,
-            Transaction.occurred_at.is_not(None),
-            Transaction.occurred_at >= start_dt,
-            Transaction.occurred_at <= end_dt,
-        )
-        .group_by(Transaction.category_id, Category.name)
-        .order_by(total_cents.desc())
-    )
 
-    out: list[CategoryBreakdown] = []
-    for r in db.execute(q).all():
-        entradas = int(r.in_cents or 0)
-        saidas = int(r.out_cents or 0)
-        out.append(
-            CategoryBreakdown(
-                category_id=r.category_id,
-                category_name=str(r.category_name),
-                entradas_cents=entradas,
-                saidas_cents=saidas,
-                saldo_cents=entradas - saidas,
-                qtd_transacoes=int(r.cnt or 0),
-            )
-        )
-    return out
+def _not_modified(request: Request, response: Response, key: str) -> Response | None:
+    """
+    Anota ETag na resposta; se o cliente já tem essa versão, devolve o 304 (sem agregar).
+    A chave muda com companies.data_version, que toda escrita de transação incrementa.
+    """
+    etag = report_etag(key)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = _REPORT_CACHE_CONTROL
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": _REPORT_CACHE_CONTROL})
+    return None
 
 
 @router.get("/summary", response_model=SummaryResponse)
-def summary(
+async def summary(
+    request: Request,
+    response: Response,
     company_id: int = Query(..., ge=1),
     start: str | None = Query(None, description="YYYY-MM-DD ou ISO datetime"),
     end: str | None = Query(None, description="YYYY-MM-DD ou ISO datetime"),
-    db: Session = Depends(get_db), tenant_id: int = Depends(get_current_tenant_id),
+    db: AsyncSession = Depends(get_async_db), tenant_id: int = Depends(get_current_tenant_id_async),
 ):
     start_dt, end_dt, period = _resolve_period(start, end)
-    _ensure_company(db, company_id, tenant_id)
-    totals = _totals_row(db, company_id, start_dt, end_dt, tenant_id)
-    by_cat = _by_category(db, company_id, start_dt, end_dt, tenant_id)
-    return SummaryResponse(company_id=company_id, period=period, totals=totals, by_category=by_cat)
+
+    def _key(db: Session) -> str:
+        company = _get_company(db, company_id, tenant_id)
+        return report_key("summary", tenant_id=tenant_id, company=company, start=start, end=end, start_dt=start_dt, end_dt=end_dt)
+
+    def _compute(db: Session):
+        agg = aggregate_period(db, tenant_id=tenant_id, company_id=company_id, start_dt=start_dt, end_dt=end_dt)
+        return SummaryResponse(company_id=company_id, period=period, totals=agg.totals, by_category=agg.by_category)
+
+    key = await db.run_sync(_key)
+    return _not_modified(request, response, key) or await cached_report_async(db, key, _compute)
 
 
 @router.get("/daily", response_model=DailyResponse)
-def daily(
+async def daily(
+    request: Request,
+    response: Response,
     company_id: int = Query(..., ge=1),
     start: str | None = Query(None),
     end: str | None = Query(None),
-    db: Session = Depends(get_db), tenant_id: int = Depends(get_current_tenant_id),
+    db: AsyncSession = Depends(get_async_db), tenant_id: int = Depends(get_current_tenant_id_async),
 ):
     start_dt, end_dt, period = _resolve_period(start, end)
-    _ensure_company(db, company_id, tenant_id)
-
-    day = func.date(Transaction.occurred_at).label("day")
-    q = (
-        select(
-            day,
-            func.coalesce(func.sum(case((Transaction.kind == "in", Transaction.amount_cents), else_=0)), 0).label("in_cents"),
-            func.coalesce(func.sum(case((Transaction.kind == "out", Transaction.amount_cents), else_=0)), 0).label("out_cents"),
-        )
-        .where(
-            Transaction.company_id == company_id,
-        Transaction.tenant_id == tenant_id,
-            Transaction.occurred_at.is_not(None),
-            Transaction.occurred_at >= start_dt,
-            Transaction.occurred_at <= end_dt,
-        )
-        .group_by(day)
-        .order_by(day.asc())
-    )
 
-    series: list[DailyPoint] = []
-    for r in db.execute(q).all():
-        entradas = int(r.in_cents or 0)
-        saidas = int(r.out_cents or 0)
-        series.append(
-            DailyPoint(
-                date=str(r.day),
-                entradas_cents=entradas,
-                saidas_cents=saidas,
-                saldo_cents=entradas - saidas,
+    def _key(db: Session) -> str:
+        company = _get_company(db, company_id, tenant_id)
+        return report_key("daily", tenant_id=tenant_id, company=company, start=start, end=end, start_dt=start_dt, end_dt=end_dt)
+
+    def _compute(db: Session):
+        q = daily_points_query(db, tenant_id=tenant_id, company_id=company_id, start_dt=start_dt, end_dt=end_dt)
+
+        series: list[DailyPoint] = []
+        for r in db.execute(q).all():
+            entradas = int(r.in_cents or 0)
+            saidas = int(r.out_cents or 0)
+            series.append(
+                DailyPoint(
+                    date=str(r.day),
+                    entradas_cents=entradas,
+                    saidas_cents=saidas,
+                    saldo_cents=entradas - saidas,
+                )
             )
+
+        return DailyResponse(company_id=company_id, period=period, series=series)
+
+    key = await db.run_sync(_key)
+    return _not_modified(request, response, key) or await cached_report_async(db, key, _compute)
+
+
+@router.get("/series", response_model=SeriesResponse)
+async def series(
+    request: Request,
+    response: Response,
+    company_id: int = Query(..., ge=1),
+    start: str | None = Query(None, description="YYYY-MM-DD ou ISO datetime"),
+    end: str | None = Query(None, description="YYYY-MM-DD ou ISO datetime"),
+    granularity: str = Query("day", description="day | week | month"),
+    by_category: bool = Query(False, description="Inclui uma série por categoria"),
+    db: AsyncSession = Depends(get_async_db), tenant_id: int = Depends(get_current_tenant_id_async),
+):
+    start_dt, end_dt, period = _resolve_period(start, end)
+
+    g = (granularity or "day").lower().strip()
+    if g not in GRANULARITIES:
+        raise HTTPException(status_code=422, detail={
+            "error_code": "INVALID_GRANULARITY",
+            "message": "granularity inválida (use: day | week | month)",
+            "value": granularity,
+        })
+    points = count_buckets(start_dt.date(), end_dt.date(), g)
+    if points > settings.REPORTS_SERIES_MAX_POINTS:
+        raise HTTPException(status_code=422, detail={
+            "error_code": "SERIES_TOO_LONG",
+            "message": "Período longo demais para a granularidade (use week ou month)",
+            "points": points,
+            "max_points": settings.REPORTS_SERIES_MAX_POINTS,
+        })
+
+    def _key(db: Session) -> str:
+        company = _get_company(db, company_id, tenant_id)
+        return report_key(
+            "series", tenant_id=tenant_id, company=company, start=start, end=end, start_dt=start_dt, end_dt=end_dt,
+            granularity=g, by_category=by_category,
+        )
+
+    def _compute(db: Session):
+        items, cats = build_series(
+            db,
+            tenant_id=tenant_id,
+            company_id=company_id,
+            start_dt=start_dt,
+            end_dt=end_dt,
+            granularity=g,
+            by_category=by_category,
         )
+        return SeriesResponse(company_id=company_id, period=period, granularity=g, series=items, by_category=cats)
 
-    return DailyResponse(company_id=company_id, period=period, series=series)
+    key = await db.run_sync(_key)
+    return _not_modified(request, response, key) or await cached_report_async(db, key, _compute)
 
 
 @router.get("/context", response_model=ContextResponse)
-def context(
+async def context(
+    request: Request,
+    response: Response,
     company_id: int = Query(..., ge=1),
     start: str | None = Query(None),
     end: str | None = Query(None),
     limit: int = Query(20, ge=1, le=200),
-    db: Session = Depends(get_db), tenant_id: int = Depends(get_current_tenant_id),
+    db: AsyncSession = Depends(get_async_db), tenant_id: int = Depends(get_current_tenant_id_async),
 ):
     start_dt, end_dt, period = _resolve_period(start, end)
-    _ensure_company(db, company_id, tenant_id)
-    totals = _totals_row(db, company_id, start_dt, end_dt, tenant_id)
-    by_cat = _by_category(db, company_id, start_dt, end_dt, tenant_id)
-
-    q = (
-        select(
-            Transaction.id,
-            Transaction.occurred_at,
-            Transaction.kind,
-            Transaction.amount_cents,
-            Transaction.category_id,
-            func.coalesce(Category.name, "Sem categoria").label("category_name"),
-            Transaction.description,
+
+    def _key(db: Session) -> str:
+        company = _get_company(db, company_id, tenant_id)
+        return report_key(
+            "context", tenant_id=tenant_id, company=company, start=start, end=end, start_dt=start_dt, end_dt=end_dt, limit=limit
         )
-        .select_from(Transaction)
-        .outerjoin(Category, Category.id == Transaction.category_id)
-        .where(
-            Transaction.company_id == company_id,
-        Transaction.tenant_id == tenant_id,
-            Transaction.occurred_at.is_not(None),
-            Transaction.occurred_at >= start_dt,
-            Transaction.occurred_at <= end_dt,
+
+    def _compute(db: Session):
+        agg = aggregate_period(db, tenant_id=tenant_id, company_id=company_id, start_dt=start_dt, end_dt=end_dt)
+        recent = recent_transactions(
+            db,
+            tenant_id=tenant_id,
+            company_id=company_id,
+            start_dt=start_dt,
+            end_dt=end_dt,
+            limit=limit,
         )
-        .order_by(Transaction.occurred_at.desc())
-        .limit(limit)
-    )
 
-    recent: list[TransactionBrief] = []
-    for r in db.execute(q).all():
-        recent.append(
-            TransactionBrief(
-                id=r.id,
-                occurred_at=r.occurred_at,
-                kind=r.kind,
-                amount_cents=int(r.amount_cents),
-                category_id=r.category_id,
-                category_name=str(r.category_name),
-                description=r.description or "",
-            )
+        return ContextResponse(
+            company_id=company_id,
+            period=period,
+            totals=agg.totals,
+            by_category=agg.by_category,
+            recent_transactions=recent,
         )
 
-    return ContextResponse(
-        company_id=company_id,
-        period=period,
-        totals=totals,
-        by_category=by_cat,
-        recent_transactions=recent,
-    )
+    key = await db.run_sync(_key)
+    return _not_modified(request, response, key) or await cached_report_async(db, key, _compute)
 
 
 @router.get("/top-categories", response_model=TopCategoriesResponse)
-def top_categories(
+async def top_categories(
+    request: Request,
+    response: Response,
     company_id: int,
     start: str | None = None,
     end: str | None = None,
     metric: str = "saidas",
     limit: int = 5,
-    db: Session = Depends(get_db), tenant_id: int = Depends(get_current_tenant_id),
+    db: AsyncSession = Depends(get_async_db), tenant_id: int = Depends(get_current_tenant_id_async),
 ):
-    _ensure_company(db, company_id, tenant_id)
     start_dt, end_dt, period = _resolve_period(start, end)
-    _ensure_company(db, company_id, tenant_id)
-    items = _by_category(db, company_id, start_dt, end_dt, tenant_id)
-
     m = (metric or "saidas").lower().strip()
-    if m not in ("entradas", "saidas", "saldo"):
-        raise HTTPException(status_code=422, detail={
-            "error_code": "INVALID_METRIC",
-            "message": "metric inválida (use: entradas | saidas | saldo)",
-            "value": metric,
-        })
-
-    key = (lambda c: c.entradas_cents) if m == "entradas" else (lambda c: c.saidas_cents) if m == "saidas" else (lambda c: abs(c.saldo_cents))
-    items = sorted(items, key=key, reverse=True)[: max(1, min(limit, 20))]
-
-    return TopCategoriesResponse(company_id=company_id, period=period, metric=m, items=items)
+    n = max(1, min(limit, 20))
+
+    def _key(db: Session) -> str:
+        company = _get_company(db, company_id, tenant_id)
+
+        if m not in ("entradas", "saidas", "saldo"):
+            raise HTTPException(status_code=422, detail={
+                "error_code": "INVALID_METRIC",
+                "message": "metric inválida (use: entradas | saidas | saldo)",
+                "value": metric,
+            })
+        return report_key(
+            "top-categories", tenant_id=tenant_id, company=company, start=start, end=end, start_dt=start_dt, end_dt=end_dt,
+            metric=m, limit=n,
+        )
 
+    def _compute(db: Session):
+        items = aggregate_period(db, tenant_id=tenant_id, company_id=company_id, start_dt=start_dt, end_dt=end_dt).by_category
+        key = (lambda c: c.entradas_cents) if m == "entradas" else (lambda c: c.saidas_cents) if m == "saidas" else (lambda c: abs(c.saldo_cents))
+        items = sorted(items, key=key, reverse=True)[:n]
+        return TopCategoriesResponse(company_id=company_id, period=period, metric=m, items=items)
 
-# === AI Consult PDF (proxy do /ai/consult) ===
-_DEJAVU_TTF = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+    cache_key = await db.run_sync(_key)
+    return _not_modified(request, response, cache_key) or await cached_report_async(db, cache_key, _compute)
 
-def _pdf_font_name():
-    if os.path.exists(_DEJAVU_TTF):
-        try:
-            pdfmetrics.registerFont(TTFont("DejaVu", _DEJAVU_TTF))
-        except Exception:
-            pass
-        return "DejaVu"
-    return "Helvetica"
-
-def _build_pdf_bytes(title: str, payload: dict, consult: dict) -> bytes:
-    buf = BytesIO()
-    c = canvas.Canvas(buf, pagesize=A4)
-    font = _pdf_font_name()
-    width, height = A4
-
-    c.setTitle(title)
-    c.setFont(font, 16)
-    c.drawString(20*mm, height - 20*mm, title)
-
-    c.setFont(font, 10)
-    generated_at = _dt.datetime.now(_dt.timezone.utc).isoformat(timespec="seconds").replace("+00:00","Z")
-    y = height - 30*mm
-    c.drawString(20*mm, y, f"Gerado em: {generated_at}")
-    y -= 8*mm
-    c.drawString(20*mm, y, f"company_id: {payload.get('company_id')}")
-    y -= 8*mm
-    # compat: period{start,end} OU start/end no root; fallback consult.period
-    period = {}
-    _p = payload.get('period')
-    if isinstance(_p, dict):
-        period.update(_p)
-    if payload.get('start') and not period.get('start'):
-        period['start'] = payload.get('start')
-    if payload.get('end') and not period.get('end'):
-        period['end'] = payload.get('end')
-    if not period.get('start') and not period.get('end'):
-        _cp = consult.get('period') if isinstance(consult, dict) else None
-        if isinstance(_cp, dict) and (_cp.get('start') or _cp.get('end')):
-            period = _cp
-    c.drawString(20*mm, y, f"period: {period.get('start')} → {period.get('end')}")
-    y -= 12*mm
-
-    # PDF Premium (seções) — evita dump bruto do JSON
-    c.setFont(font, 9)
-    left = 20*mm
-
-    def _new_text(ypos):
-        t = c.beginText(left, ypos)
-        t.setLeading(12)
-        return t
-
-    text = _new_text(y)
-
-    def _flush_page():
-        nonlocal text
-        c.drawText(text)
-        c.showPage()
-        c.setFont(font, 9)
-        text = _new_text(height - 20*mm)
-
-    def _line(msg=""):
-        nonlocal text
-        if text.getY() < 20*mm:
-            _flush_page()
-        msg = "" if msg is None else str(msg)
-        text.textLine(msg[:180])
-
-    def _h(title):
-        _line(title)
-        _line("-" * min(80, len(title)))
-        _line("")
-
-    def _first(d, *keys):
-        if not isinstance(d, dict):
-            return None
-        for k in keys:
-            v = d.get(k)
-            if v is not None:
-                return v
-        return None
-
-    def _money(v):
-        if v is None:
-            return "-"
-        try:
-            if isinstance(v, int):
-                cents = v
-            elif isinstance(v, float):
-                cents = int(round(v * 100))
-            elif isinstance(v, str):
-                vv = v.strip().replace(",", ".")
-                cents = int(vv) if vv.isdigit() else int(round(float(vv) * 100))
-            else:
-                cents = int(v)
-            sign = "-" if cents < 0 else ""
-            cents = abs(cents)
-            val = cents / 100.0
-            sbr = f"{val:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-            return f"{sign}R$ {sbr}"
-        except Exception:
-            return str(v)
-
-    data = consult if isinstance(consult, dict) else {}
-
-    _h("Resumo")
-    headline = data.get("headline")
-    if headline:
-        _line(headline)
-        _line("")
-
-    numbers = data.get("numbers") if isinstance(data.get("numbers"), dict) else {}
-    if numbers:
-        _h("Indicadores do período")
-        entradas = _first(numbers, "entradas_cents", "in_cents", "income_cents", "entradas")
-        saidas   = _first(numbers, "saidas_cents", "out_cents", "expense_cents", "saidas")
-        saldo    = _first(numbers, "saldo_cents", "balance_cents", "saldo")
-        _line(f"Entradas: {_money(entradas)}")
-        _line(f"Saídas:   {_money(saidas)}")
-        _line(f"Saldo:    {_money(saldo)}")
-        _line("")
-
-    cats = data.get("top_categories") if isinstance(data.get("top_categories"), list) else []
-    if cats:
-        _h("Top categorias (saídas)")
-        for i, ccat in enumerate(cats[:6], start=1):
-            if not isinstance(ccat, dict):
-                continue
-            name = ccat.get("category_name") or f"category_id={ccat.get('category_id')}"
-            outv = _first(ccat, "saidas_cents", "out_cents", "saidas")
-            balv = _first(ccat, "saldo_cents", "balance_cents", "saldo")
-            _line(f"{i}. {name} — saídas {_money(outv)} | saldo {_money(balv)}")
-        _line("")
-
-    def _bullets(title, items):
-        if not items:
-            return
-        _h(title)
-        for it in items[:12]:
-            _line(f"• {it}")
-        _line("")
-
-    _bullets("Insights", data.get("insights") if isinstance(data.get("insights"), list) else [])
-    _bullets("Riscos", data.get("risks") if isinstance(data.get("risks"), list) else [])
-    _bullets("Ações recomendadas", data.get("actions") if isinstance(data.get("actions"), list) else [])
-
-    txs = data.get("recent_transactions") if isinstance(data.get("recent_transactions"), list) else []
-    if txs:
-        _h("Transações recentes (amostra)")
-        for tx in txs[:10]:
-            if not isinstance(tx, dict):
-                continue
-            dte = tx.get("date") or tx.get("created_at") or ""
-            desc = tx.get("description") or tx.get("memo") or ""
-            amt = _first(tx, "amount_cents", "value_cents", "amount", "value")
-            _line(f"- {dte} | {_money(amt)} | {desc}")
-        _line("")
-
-    _h("Anexo técnico (campos)")
-    _line(", ".join(sorted(data.keys())))
-
-    c.drawText(text)
-    c.showPage()
-    c.save()
-    return buf.getvalue()
 
-@router.post(
-    "/ai-consult/pdf",
-    summary="Gera PDF do /ai/consult (serviço interno)",
-    responses={200: {"content": {"application/pdf": {}}}},
-)
-async def report_ai_consult_pdf(
+@router.get("/compare", response_model=CompareResponse)
+async def compare(
     request: Request,
-    payload: dict = Body(...),
-    db: Session = Depends(get_db),
-    tenant_id: int = Depends(get_current_tenant_id),
+    response: Response,
+    company_id: int = Query(..., ge=1),
+    start: str | None = Query(None, description="YYYY-MM-DD ou ISO datetime"),
+    end: str | None = Query(None, description="YYYY-MM-DD ou ISO datetime"),
+    window: int = Query(DEFAULT_MOVING_AVERAGE_DAYS, ge=1, le=90, description="Dias da média móvel"),
+    db: AsyncSession = Depends(get_async_db), tenant_id: int = Depends(get_current_tenant_id_async),
 ):
-    payload_in = payload or {}
+    start_dt, end_dt, period = _resolve_period(start, end)
+
+    def _key(db: Session) -> str:
+        company = _get_company(db, company_id, tenant_id)
+        return report_key(
+            "compare", tenant_id=tenant_id, company=company, start=start, end=end, start_dt=start_dt, end_dt=end_dt, window=window
+        )
+
+    def _compute(db: Session):
+        cmp = compare_periods(
+            db, tenant_id=tenant_id, company_id=company_id, start_dt=start_dt, end_dt=end_dt, moving_average_days=window
+        )
+        return CompareResponse(
+            company_id=company_id,
+            period=period,
+            comparison=cmp.totals,
+            by_category=cmp.by_category,
+            moving_average_days=cmp.moving_average_days,
+            series=cmp.series,
+        )
+
+    key = await db.run_sync(_key)
+    return _not_modified(request, response, key) or await cached_report_async(db, key, _compute)
+
+
+_PDF_TITLE = "IA-CNPJ — Relatório AI Consult"
+_PDF_FILENAME = "ai-consult.pdf"
+
+
+def _ai_consult_pdf_key(db: Session, payload: AiConsultRequest, tenant_id: int) -> str:
+    """Chave do PDF sem rodar o consult: só a linha da empresa (data_version) + período normalizado."""
+    company = _get_company(db, payload.company_id, tenant_id)
+    start_dt, end_dt, _period = _resolve_period(payload.start, payload.end)
+    key = report_key(
+        "ai_consult_pdf", tenant_id=tenant_id, company=company, start=payload.start, end=payload.end,
+        start_dt=start_dt, end_dt=end_dt, limit=payload.limit, question=payload.question or "",
+        # ids podem se repetir após recriar o banco; o cnpj não
+        cnpj=company.cnpj,
+    )
+    return content_key(key)
+
+
+def _pdf_file_response(request: Request, path, key: str) -> Response:
+    # FileResponse: sendfile quando o servidor suporta, Range/If-Range pelo Starlette
+    etag = report_etag(key)
+    headers = {"ETag": etag, "Cache-Control": _REPORT_CACHE_CONTROL}
+    if request.method in ("GET", "HEAD") and etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(
+        path, media_type="application/pdf", headers=headers, filename=_PDF_FILENAME, content_disposition_type="inline"
+    )
+
+
+async def _ai_consult_pdf(request: Request, payload_in: dict, db: AsyncSession, tenant_id: int) -> Response:
     payload_consult = dict(payload_in)
 
     _p = payload_consult.get("period") or {}
@@ -516,11 +412,25 @@ async def report_ai_consult_pdf(
 
     try:
         consult_payload = AiConsultRequest(**payload_consult)
-        consult = run_ai_consult(
-            db=db,
-            payload=consult_payload,
-            tenant_id=tenant_id,
+    except Exception as e:
+        raise HTTPException(
+            status_code=502,
+            detail={"msg": "falha ao executar ai-consult", "error": str(e)[:500]},
         )
+
+    # repetição do mesmo PDF (mesma data_version): nem consult nem render
+    store = get_pdf_store()
+    key = await db.run_sync(lambda s: _ai_consult_pdf_key(s, consult_payload, tenant_id))
+    if store is not None:
+        # disco (e o lock do diretório no put) fora do event loop
+        cached = await anyio.to_thread.run_sync(store.path, key)
+        if cached is not None:
+            return _pdf_file_response(request, cached, key)
+    elif request.method in ("GET", "HEAD") and etag_matches(request.headers.get("if-none-match"), report_etag(key)):
+        return Response(status_code=304, headers={"ETag": report_etag(key), "Cache-Control": _REPORT_CACHE_CONTROL})
+
+    try:
+        consult = await run_ai_consult_async(db=db, payload=consult_payload, tenant_id=tenant_id)
     except HTTPException:
         raise
     except Exception as e:
@@ -529,10 +439,57 @@ async def report_ai_consult_pdf(
             detail={"msg": "falha ao executar ai-consult", "error": str(e)[:500]},
         )
 
-    pdf = _build_pdf_bytes("IA-CNPJ — Relatório AI Consult", payload_in, consult)
+    try:
+        pdf = await pdf_renderer.render(_PDF_TITLE, payload_in, consult)
+    except PdfRenderBusy:
+        raise HTTPException(
+            status_code=503,
+            detail={"error_code": "PDF_BUSY", "message": "geração de PDF ocupada, tente novamente"},
+            headers={"Retry-After": "1"},
+        )
 
-    return Response(
-        content=pdf,
+    if store is not None:
+        path = await anyio.to_thread.run_sync(store.put, key, pdf)
+        return _pdf_file_response(request, path, key)
+    return StreamingResponse(
+        iter_chunks(pdf),
         media_type="application/pdf",
-        headers={"Content-Disposition": 'inline; filename="ai-consult.pdf"'},
+        headers={
+            "Content-Disposition": f'inline; filename="{_PDF_FILENAME}"',
+            "ETag": report_etag(key),
+            "Cache-Control": _REPORT_CACHE_CONTROL,
+        },
     )
+
+
+@router.post(
+    "/ai-consult/pdf",
+    summary="Gera PDF do /ai/consult (serviço interno)",
+    responses={200: {"content": {"application/pdf": {}}}},
+)
+async def report_ai_consult_pdf(
+    request: Request,
+    payload: dict = Body(...),
+    db: AsyncSession = Depends(get_async_db),
+    tenant_id: int = Depends(get_current_tenant_id_async),
+):
+    return await _ai_consult_pdf(request, payload or {}, db, tenant_id)
+
+
+@router.get(
+    "/ai-consult/pdf",
+    summary="PDF do /ai/consult para download (cacheável: ETag + Range)",
+    responses={200: {"content": {"application/pdf": {}}}, 304: {"description": "Não modificado"}},
+)
+async def report_ai_consult_pdf_download(
+    request: Request,
+    company_id: int = Query(..., ge=1),
+    start: str | None = None,
+    end: str | None = None,
+    limit: int = Query(20, ge=1, le=200),
+    question: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+    tenant_id: int = Depends(get_current_tenant_id_async),
+):
+    payload = {"company_id": company_id, "start": start, "end": end, "limit": limit, "question": question}
+    return await _ai_consult_pdf(request, {k: v for k, v in payload.items() if v is not None}, db, tenant_id)
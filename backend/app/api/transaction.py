@@ -1,22 +1,44 @@
+import json
 from datetime import datetime, timezone
-from typing import Any
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import func, select
 
-from app.deps import get_db
+from app.db import AsyncSessionLocal
+from app.deps import get_async_db, get_db
 from app.api import reports as rep
-from app.schemas.reports import TransactionBrief
+from app.core.settings import settings
 from app.models.company import Company
 from app.models.category import Category
 from app.models.transaction import Transaction
-from app.core.tenant import get_current_tenant_id
-from app.schemas.transaction import TransactionCreate, TransactionOut, TransactionCategoryPatch, BulkCategorizeRequest, BulkCategorizeResponse
+from app.core.tenant import get_current_tenant_id, get_current_tenant_id_async
+from app.tenant_context import set_tenant_on_async_session
+from app.services import categorization
+from app.services import categorize_apply
+from app.services import categorization_suggest
+from app.services import daily_rollup_service as daily_rollup
+from app.services import learned_rules
+from app.services import transaction_ingest as ingest
+from app.services import transaction_listing as listing
+from app.services.report_cache import bump_company_version, cached_report, report_key
+from app.schemas.transaction import TransactionCreate, TransactionOut, TransactionCategoryPatch, BulkCategorizeRequest, BulkCategorizeResponse, BulkIngestResponse
+from app.schemas.transaction import UncategorizedCount, UncategorizedSuggestion, UncategorizedTransaction
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
 @router.post("", response_model=TransactionOut)
-def create_transaction(payload: TransactionCreate, db: Session = Depends(get_db), tenant_id: int = Depends(get_current_tenant_id)):
+async def create_transaction(
+    payload: TransactionCreate,
+    db: AsyncSession = Depends(get_async_db),
+    tenant_id: int = Depends(get_current_tenant_id_async),
+):
+    return await db.run_sync(lambda s: _create_transaction(s, payload, tenant_id))
+
+
+def _create_transaction(db: Session, payload: TransactionCreate, tenant_id: int) -> TransactionOut:
     # valida company
     company = db.scalar(select(Company).where(Company.id == payload.company_id).where(Company.tenant_id == tenant_id))
     if not company:
@@ -43,6 +65,10 @@ def create_transaction(payload: TransactionCreate, db: Session = Depends(get_db)
  )
     db.add(t)
     db.flush()
+    daily_rollup.record_transaction(db, t)
+    if t.category_id is not None:
+        learned_rules.record_recategorization(db, tenant_id=tenant_id, changes=[(t.description, None, t.category_id)])
+    bump_company_version(db, tenant_id=tenant_id, company_id=t.company_id)
 
     out = TransactionOut(
         id=t.id,
@@ -58,25 +84,190 @@ def create_transaction(payload: TransactionCreate, db: Session = Depends(get_db)
     return out
 
 @router.get("", response_model=list[TransactionOut])
-def list_transactions(company_id: int | None = None, db: Session = Depends(get_db), tenant_id: int = Depends(get_current_tenant_id)):
-    q = select(Transaction).where(Transaction.tenant_id == tenant_id).order_by(Transaction.id.desc())
-    if company_id is not None:
-        q = q.where(Transaction.company_id == company_id).where(Transaction.tenant_id == tenant_id)
-    return list(db.scalars(q))
+async def list_transactions(
+    company_id: int | None = None,
+    start: str | None = Query(None, description="YYYY-MM-DD ou ISO datetime"),
+    end: str | None = Query(None, description="YYYY-MM-DD ou ISO datetime"),
+    kind: Literal["in", "out"] | None = None,
+    category_id: int | None = None,
+    fields: str | None = Query(None, description="Projeção, ex.: id,amount_cents,occurred_at"),
+    cursor: str | None = Query(None, description="X-Next-Cursor da página anterior"),
+    limit: int | None = Query(None, ge=1, le=listing.MAX_PAGE_SIZE, description="json: default 500; ndjson: sem limite"),
+    format: Literal["json", "ndjson"] = "json",
+    db: AsyncSession = Depends(get_async_db),
+    tenant_id: int = Depends(get_current_tenant_id_async),
+):
+    """
+    Lista transações (occurred_at DESC, id DESC) por keyset: a próxima página vem em
+    X-Next-Cursor. format=ndjson faz streaming de tudo a partir do cursor (memória constante).
+    """
+    filters = listing.ListFilters(
+        tenant_id=tenant_id,
+        company_id=company_id,
+        start_dt=rep._parse_iso_date_or_datetime(start, is_end=False) if start else None,
+        end_dt=rep._parse_iso_date_or_datetime(end, is_end=True) if end else None,
+        kind=kind,
+        category_id=category_id,
+    )
+    projection = listing.parse_fields(fields)
+    after = listing.decode_cursor(cursor)
+
+    if format == "ndjson":
+        queries = listing.page_queries(filters, projection, after, None)
+        return StreamingResponse(_stream_ndjson(queries, projection, tenant_id, limit), media_type="application/x-ndjson")
+
+    page_size = limit or listing.DEFAULT_PAGE_SIZE
+    rows = []
+    for q in listing.page_queries(filters, projection, after, page_size + 1):
+        rows.extend((await db.execute(q)).all())
+        if len(rows) > page_size:
+            break
+
+    headers = {}
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        headers["X-Next-Cursor"] = listing.encode_cursor(listing.row_cursor(rows[-1]))
+    return JSONResponse([listing.row_to_dict(r, projection) for r in rows], headers=headers)
+
+
+async def _stream_ndjson(queries: list, projection: tuple[str, ...], tenant_id: int, limit: int | None):
+    # sessão própria: a do Depends fecha antes do corpo terminar de ser enviado
+    remaining = limit
+    async with AsyncSessionLocal() as s:
+        await set_tenant_on_async_session(s, tenant_id)
+        for q in queries:
+            if remaining is not None:
+                q = q.limit(remaining)
+            result = await s.stream(q.execution_options(yield_per=listing.STREAM_BATCH_SIZE))
+            async for batch in result.partitions():
+                yield "".join(
+                    json.dumps(listing.row_to_dict(r, projection), ensure_ascii=False, separators=(",", ":")) + "\n"
+                    for r in batch
+                )
+                if remaining is not None:
+                    remaining -= len(batch)
+            if remaining is not None and remaining <= 0:
+                return
+
+_BULK_CONTENT_TYPES = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ofx": "ofx",
+    "application/ofx": "ofx",
+}
+
+
+@router.post("/bulk", response_model=BulkIngestResponse)
+async def bulk_create_transactions(
+    request: Request,
+    company_id: int = Query(..., ge=1),
+    format: Literal["json", "ndjson", "csv", "ofx"] | None = Query(None, description="default: pelo Content-Type"),
+    db: AsyncSession = Depends(get_async_db),
+    tenant_id: int = Depends(get_current_tenant_id_async),
+):
+    """
+    Importa transações em lote (JSON array, NDJSON, CSV ou OFX) numa única transação.
+    Linhas inválidas vão para `errors` sem abortar o lote; `external_id` (FITID no OFX)
+    torna o reenvio idempotente.
+    """
+    content_type = (request.headers.get("content-type") or "").split(";")[0].strip().lower()
+    fmt = format or _BULK_CONTENT_TYPES.get(content_type)
+    if fmt is None:
+        raise HTTPException(status_code=415, detail={
+            "error_code": "UNSUPPORTED_FORMAT",
+            "message": "use Content-Type json | x-ndjson | text/csv | x-ofx (ou ?format=)",
+            "value": content_type,
+        })
+
+    company = await db.scalar(select(Company).where(Company.id == company_id).where(Company.tenant_id == tenant_id))
+    if not company:
+        raise HTTPException(status_code=404, detail="Empresa (company_id) nao existe")
+
+    categories = await db.run_sync(lambda s: ingest.CategoryMap.load(s, tenant_id))
+    result = ingest.IngestResult(company_id=company_id)
+    seen_keys: set[str] = set()
 
-@router.get("/uncategorized", response_model=list[TransactionBrief])
+    async def _ingest(chunk):
+        await db.run_sync(
+            lambda s: ingest.ingest_chunk(
+                s, chunk, result=result, tenant_id=tenant_id, categories=categories, seen_keys=seen_keys
+            )
+        )
+
+    try:
+        if fmt == "ndjson":
+            chunk = []
+            async for item in _ndjson_rows(request):
+                chunk.append(item)
+                if len(chunk) >= ingest.CHUNK_SIZE:
+                    await _ingest(chunk)
+                    chunk = []
+            if chunk:
+                await _ingest(chunk)
+        else:
+            body = await request.body()
+            if fmt == "json":
+                rows = ingest.parse_json_array(body)
+            elif fmt == "csv":
+                rows = ingest.parse_csv(ingest.decode_text(body))
+            else:
+                rows = ingest.parse_ofx(ingest.decode_text(body))
+            for chunk in ingest.chunked(rows):
+                await _ingest(chunk)
+    except ingest.RowError as e:
+        raise HTTPException(status_code=422, detail={"error_code": "INVALID_PAYLOAD", "message": str(e)})
+
+    if result.inserted:
+        await db.run_sync(lambda s: bump_company_version(s, tenant_id=tenant_id, company_id=company_id))
+    await db.commit()
+
+    return BulkIngestResponse(
+        company_id=company_id,
+        received=result.received,
+        inserted=result.inserted,
+        duplicates=result.duplicates,
+        error_count=result.error_count,
+        errors=result.errors,
+    )
+
+
+async def _ndjson_rows(request: Request):
+    # lê o corpo em pedaços: o lote inteiro nunca fica em memória
+    line_no = 0
+    buf = b""
+    async for piece in request.stream():
+        buf += piece
+        *lines, buf = buf.split(b"\n")
+        for line in lines:
+            line_no += 1
+            item = ingest.parse_ndjson_line(line)
+            if item is not None:
+                yield line_no, item
+    if buf.strip():
+        yield line_no + 1, ingest.parse_ndjson_line(buf)
+
+
+@router.get("/uncategorized", response_model=list[UncategorizedTransaction])
 def uncategorized(
+    response: Response,
     company_id: int = Query(..., ge=1),
     start: str | None = None,
     end: str | None = None,
     limit: int = Query(50, ge=1, le=200),
-    include_no_match: bool = Query(False),
-    offset: int = Query(0, ge=0),
+    include_no_match: bool = Query(False, description="com suggest=true: devolve também a sugestão no_match"),
+    suggest: bool = Query(False, description="coluna suggestion (regras aprendidas + fixas, sem IA)"),
+    cursor: str | None = Query(None, description="X-Next-Cursor da página anterior"),
+    offset: int = Query(0, ge=0, deprecated=True, description="legado; use cursor"),
     db: Session = Depends(get_db), tenant_id: int = Depends(get_current_tenant_id),
 ):
     """
-    Lista transações sem categoria (category_id IS NULL) no período.
-    Útil para limpeza de dados (data quality).
+    Lista transações sem categoria (category_id IS NULL) no período, em (occurred_at DESC, id DESC)
+    por keyset sobre o índice parcial: a próxima página vem em X-Next-Cursor.
+    Útil para limpeza de dados (data quality); o total fica em /transactions/uncategorized/count.
     """
     # valida empresa e período (reaproveita do reports)
     company = db.scalar(select(Company).where(Company.id == company_id).where(Company.tenant_id == tenant_id));
@@ -85,29 +276,34 @@ def uncategorized(
         raise HTTPException(status_code=404, detail="Empresa nao encontrada")
     start_dt, end_dt, _period = rep._resolve_period(start, end)
 
-    q = (
-        select(
-            Transaction.id,
-            Transaction.occurred_at,
-            Transaction.kind,
-            Transaction.amount_cents,
-            Transaction.category_id,
-            Transaction.description,
-        )
-        .where(Transaction.company_id == company_id).where(Transaction.tenant_id == tenant_id)
-        .where(Transaction.occurred_at >= start_dt)
-        .where(Transaction.occurred_at <= end_dt)
-        .where(Transaction.category_id.is_(None))
-        .order_by(Transaction.occurred_at.desc(), Transaction.id.desc())
-        .offset(offset)
-        .limit(limit)
+    rows = categorization_suggest.uncategorized_page(
+        db,
+        tenant_id=tenant_id,
+        company_id=company_id,
+        start_dt=start_dt,
+        end_dt=end_dt,
+        limit=limit + 1,
+        after=listing.decode_cursor(cursor),
+        offset=offset,
     )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = listing.encode_cursor(listing.row_cursor(rows[-1]))
+
+    suggestions: dict[int, dict] = {}
+    if suggest and rows:
+        suggestions = {
+            s["id"]: s
+            for s in categorization_suggest.suggest_for_rows(
+                db, tenant_id=tenant_id, company_id=company_id, rows=rows, include_no_match=include_no_match, use_ai=False
+            )
+        }
 
-    rows = db.execute(q).all()
-    out: list[TransactionBrief] = []
+    out: list[UncategorizedTransaction] = []
     for r in rows:
+        s = suggestions.get(r.id)
         out.append(
-            TransactionBrief(
+            UncategorizedTransaction(
                 id=r.id,
                 occurred_at=r.occurred_at.isoformat(),
                 kind=r.kind,
@@ -115,54 +311,70 @@ def uncategorized(
                 category_id=None,
                 category_name="Sem categoria",
                 description=r.description,
+                suggestion=UncategorizedSuggestion(
+                    suggested_category_id=s["suggested_category_id"],
+                    confidence=s["confidence"],
+                    rule=s["rule"],
+                    provider=s["provider"],
+                ) if s else None,
             )
         )
     return out
 
 
+@router.get("/uncategorized/count", response_model=UncategorizedCount)
+def uncategorized_count(
+    company_id: int = Query(..., ge=1),
+    start: str | None = None,
+    end: str | None = None,
+    db: Session = Depends(get_db), tenant_id: int = Depends(get_current_tenant_id),
+):
+    """
+    Total de transações sem categoria no período sem varrer as linhas: dias inteiros vêm do
+    rollup diário (category_id NULL) e só as bordas parciais contam pelo índice parcial.
+    Cacheado pela data_version da empresa (qualquer escrita invalida).
+    """
+    company = db.scalar(select(Company).where(Company.id == company_id).where(Company.tenant_id == tenant_id));
+    
+    if not company:
+        raise HTTPException(status_code=404, detail="Empresa nao encontrada")
+    start_dt, end_dt, period = rep._resolve_period(start, end)
+
+    def _compute() -> UncategorizedCount:
+        n = _count_uncategorized(db, tenant_id=tenant_id, company_id=company_id, start_dt=start_dt, end_dt=end_dt)
+        return UncategorizedCount(company_id=company_id, period=period, uncategorized_count=n)
+
+    key = report_key(
+        "uncategorized_count", tenant_id=tenant_id, company=company, start=start, end=end, start_dt=start_dt, end_dt=end_dt
+    )
+    return cached_report(key, _compute)
+
+
+def _count_uncategorized(db: Session, *, tenant_id: int, company_id: int, start_dt: datetime, end_dt: datetime) -> int:
+    if not settings.REPORTS_USE_DAILY_ROLLUP:
+        return int(db.scalar(
+            select(func.count())
+            .select_from(Transaction)
+            .where(Transaction.tenant_id == tenant_id, Transaction.company_id == company_id)
+            .where(Transaction.occurred_at >= start_dt, Transaction.occurred_at <= end_dt)
+            .where(Transaction.category_id.is_(None))
+        ) or 0)
+
+    src = daily_rollup.union_parts(
+        daily_rollup.daily_source_parts(tenant_id=tenant_id, company_id=company_id, start_dt=start_dt, end_dt=end_dt)
+    ).subquery("src")
+    return int(db.scalar(
+        select(func.coalesce(func.sum(src.c.tx_count), 0)).where(src.c.category_id.is_(None))
+    ) or 0)
+
+
 # -----------------------------
 # Data Quality: sugestões de categoria (rule-based)
 # -----------------------------
 
-def _normalize_text(s: str) -> str:
-    return (s or "").strip().lower()
-
-def _rules() -> list[dict[str, Any]]:
-    # Ordem importa: primeira regra que casar vence (confidence pode variar)
-    return [
-        {"rule": "pix|qr|transfer", "keywords": ["pix", "qr", "transfer"], "category_name": "Vendas", "confidence": 0.70},
-        {"rule": "venda|cliente|pedido", "keywords": ["venda", "cliente", "pedido"], "category_name": "Vendas", "confidence": 0.80},
-        {"rule": "frete|entrega|transport", "keywords": ["frete", "entrega", "transport"], "category_name": "Fretes", "confidence": 0.75},
-        {"rule": "aluguel|locacao", "keywords": ["aluguel", "locacao", "locação"], "category_name": "Aluguel", "confidence": 0.85},
-        {"rule": "luz|energia|celesc", "keywords": ["luz", "energia", "celesc"], "category_name": "Energia", "confidence": 0.85},
-        {"rule": "agua|água|samae", "keywords": ["agua", "água", "samae"], "category_name": "Água", "confidence": 0.85},
-        {"rule": "internet|wifi|provedor", "keywords": ["internet", "wifi", "provedor"], "category_name": "Internet", "confidence": 0.80},
-        {"rule": "servidor|server|hosting|vps|cloud|aws|azure|gcp|dominio|dns", "keywords": ["servidor","server","hosting","vps","cloud","aws","azure","gcp","dominio","domínio","dns"], "category_name": "Internet", "confidence": 0.78},
-        {"rule": "mercado|super|padaria", "keywords": ["mercado", "super", "padaria"], "category_name": "Compras", "confidence": 0.75},
-        {"rule": "combustivel|gasolina|posto", "keywords": ["combustivel", "combustível", "gasolina", "posto"], "category_name": "Combustível", "confidence": 0.80},
-        {"rule": "salario|folha|pagamento", "keywords": ["salario", "salário", "folha", "pagamento"], "category_name": "Salários", "confidence": 0.80},
-        {"rule": "imposto|taxa|das|simples", "keywords": ["imposto", "taxa", "das", "simples"], "category_name": "Impostos", "confidence": 0.80},
-        {"rule": "teste|testes|qa|homolog|homologacao|homologação|experimento", "keywords": ["teste","testes","qa","homolog","homologacao","homologação","experimento"], "category_name": "Testes", "confidence": 0.60},
-    ]
-
 # Alias público para testes/contratos (evita ImportError)
-RULES = _rules()
-
-def _ensure_categories_by_name(db: Session, tenant_id: int, names: list[str]) -> dict[str, int]:
-    # cria categorias que não existirem, e retorna mapa name->id
-    existing = list(db.scalars(select(Category).where(Category.tenant_id == tenant_id)))
-    mp = {c.name: c.id for c in existing}
-    changed = False
-    for name in names:
-        if name not in mp:
-            c = Category(name=name, tenant_id=tenant_id)
-            db.add(c)
-            db.flush()
-            mp[name] = c.id
-            changed = True
-    if changed:
-        db.commit()
-    return mp
+RULES = list(categorization.DEFAULT_RULES)
+
 
 @router.get("/suggest-categories")
 def suggest_categories(
@@ -174,7 +386,9 @@ def suggest_categories(
     db: Session = Depends(get_db), tenant_id: int = Depends(get_current_tenant_id),
 ):
     """
-    Sugere categoria para transações sem categoria (rule-based).
+    Sugere categoria para transações sem categoria: primeiro regras aprendidas do
+    histórico do tenant (provider "learned"), depois as regras fixas (rule-based) e,
+    com AI_ENABLED=true, o provider de IA para o que sobrar (provider "openai").
     Retorna lista: {id, suggested_category_id, confidence, rule, description, provider, reason, signals}
     """
     company = db.scalar(select(Company).where(Company.id == company_id).where(Company.tenant_id == tenant_id));
@@ -183,71 +397,10 @@ def suggest_categories(
         raise HTTPException(status_code=404, detail="Empresa nao encontrada")
     start_dt, end_dt, _period = rep._resolve_period(start, end)
 
-    # pega uncategorized bruto (igual ao endpoint /uncategorized)
-    q = (
-        select(
-            Transaction.id,
-            Transaction.description,
-            Transaction.amount_cents,
-            Transaction.kind,
-            Transaction.occurred_at,
-        )
-        .where(Transaction.company_id == company_id).where(Transaction.tenant_id == tenant_id)
-        .where(Transaction.occurred_at >= start_dt)
-        .where(Transaction.occurred_at <= end_dt)
-        .where(Transaction.category_id.is_(None))
-        .order_by(Transaction.occurred_at.desc(), Transaction.id.desc())
-        .limit(limit)
+    rows = categorization_suggest.uncategorized_page(
+        db, tenant_id=tenant_id, company_id=company_id, start_dt=start_dt, end_dt=end_dt, limit=limit, after=None
     )
-    rows = db.execute(q).all()
-
-    rules = _rules()
-    needed_names = sorted({r["category_name"] for r in rules})
-    cat_map = _ensure_categories_by_name(db, tenant_id, needed_names)
-
-    out = []
-    for r in rows:
-        desc = _normalize_text(r.description or "")
-        suggested = None
-        matched_kw = None
-        for rule in rules:
-            for k in rule["keywords"]:
-                if k in desc:
-                    suggested = rule
-                    matched_kw = k
-                    break
-            if suggested:
-                break
-        if suggested:
-            out.append({
-                "id": r.id,
-                "suggested_category_id": cat_map.get(suggested["category_name"]),
-                "confidence": suggested["confidence"],
-                "rule": suggested["rule"],
-                "description": r.description or "",
-                # D11: auditável
-                "provider": "rule-based",
-                "reason": (f"keyword match: {matched_kw}" if matched_kw else f"matched rule: {suggested['rule']}"),
-                "signals": ([f"rule:{suggested['rule']}"] + ([f"kw:{matched_kw}"] if matched_kw else [])),
-            })
-        elif include_no_match:
-            out.append({
-                "id": r.id,
-                "suggested_category_id": None,
-                "confidence": 0.0,
-                "rule": "no_match",
-                "description": r.description or "",
-                # D11: auditável
-                "provider": "rule-based",
-                "reason": "no keyword match",
-                "signals": ["rule:no_match"],
-            })
-    # por padrão, NÃO devolve no_match (só sugestões aplicáveis)
-    if not include_no_match:
-        out = [x for x in out if x.get("suggested_category_id") is not None]
-    return out
-
-
+    return categorization_suggest.suggest_for_rows(db, tenant_id=tenant_id, company_id=company_id, rows=rows, include_no_match=include_no_match)
 
 
 @router.post("/apply-suggestions")
@@ -255,73 +408,76 @@ def apply_suggestions(
     company_id: int = Query(..., ge=1),
     start: str | None = None,
     end: str | None = None,
-    limit: int = Query(200, ge=1, le=500),
+    limit: int = Query(200, ge=1, le=5000),
     dry_run: bool = Query(False),
     include_no_match: bool = Query(False),
+    cursor: str | None = Query(None, description="next_cursor da chamada anterior"),
     db: Session = Depends(get_db), tenant_id: int = Depends(get_current_tenant_id),
 ):
     """
     Aplica sugestões de categoria (rule-based) para transações sem categoria no período.
     - dry_run=true: não altera nada, só retorna o que faria.
+    - Escrita set-based (um UPDATE por categoria/bloco, uma transação); backlog maior que
+      `limit` continua com `cursor=<next_cursor>` até next_cursor vir null.
     """
     company = db.scalar(select(Company).where(Company.id == company_id).where(Company.tenant_id == tenant_id));
     
     if not company:
         raise HTTPException(status_code=404, detail="Empresa nao encontrada")
     start_dt, end_dt, _period = rep._resolve_period(start, end)
+    period = {"start": start_dt.date().isoformat(), "end": end_dt.date().isoformat()}
 
-    suggestions = suggest_categories(
+    rows = categorization_suggest.uncategorized_page(
+        db,
+        tenant_id=tenant_id,
         company_id=company_id,
-        start=start,
-        end=end,
+        start_dt=start_dt,
+        end_dt=end_dt,
         limit=limit,
-        include_no_match=include_no_match,
-        db=db,
-        tenant_id=tenant_id,
+        after=listing.decode_cursor(cursor),
     )
+    suggestions = categorization_suggest.suggest_for_rows(
+        db, tenant_id=tenant_id, company_id=company_id, rows=rows, include_no_match=include_no_match
+    )
+    # página cheia => pode haver mais backlog depois da última linha lida
+    next_cursor = listing.encode_cursor(listing.row_cursor(rows[-1])) if len(rows) == limit else None
 
     suggested_count = sum(1 for s in suggestions if s.get('suggested_category_id'))
 
     if dry_run:
         return {
             "company_id": company_id,
-            "period": {"start": start_dt.date().isoformat(), "end": end_dt.date().isoformat()},
+            "period": period,
             "dry_run": True,
+            "scanned": len(rows),
             "suggested": suggested_count,
             "updated": 0,
+            "next_cursor": next_cursor,
             "items": suggestions,
         }
 
-    items = [
-        {"id": s["id"], "category_id": s["suggested_category_id"]}
-        for s in suggestions
-        if s.get("suggested_category_id")
-    ]
-
-    if not items:
-        return {
-            "company_id": company_id,
-            "period": {"start": start_dt.date().isoformat(), "end": end_dt.date().isoformat()},
-            "dry_run": False,
-            "suggested": suggested_count,
-            "updated": 0,
-            "missing_ids": [],
-            "skipped_ids": [],
-            "invalid_category_ids": [],
-        }
-
-    req = BulkCategorizeRequest(company_id=company_id, items=items)
-    res = bulk_categorize(req, db=db)
+    ids_by_category: dict[int, list[int]] = {}
+    for s in suggestions:
+        if s.get("suggested_category_id"):
+            ids_by_category.setdefault(s["suggested_category_id"], []).append(s["id"])
 
-    # compat pydantic v1/v2
-    payload = res.model_dump() if hasattr(res, "model_dump") else dict(res)
+    res = categorize_apply.apply_categories(
+        db, tenant_id=tenant_id, company_id=company_id, ids_by_category=ids_by_category
+    )
+    db.commit()
 
     return {
         "company_id": company_id,
-        "period": {"start": start_dt.date().isoformat(), "end": end_dt.date().isoformat()},
+        "period": period,
         "dry_run": False,
+        "scanned": len(rows),
         "suggested": suggested_count,
-        **payload,
+        "updated": res.updated,
+        "updated_by_category": res.updated_by_category,
+        "next_cursor": next_cursor,
+        "missing_ids": [],
+        "skipped_ids": res.skipped_ids,
+        "invalid_category_ids": res.invalid_category_ids,
     }
 
 @router.patch("/{tx_id}/category", response_model=TransactionOut)
@@ -337,7 +493,7 @@ def set_transaction_category(
         raise HTTPException(status_code=404, detail="Empresa nao encontrada")
 
     tx = db.get(Transaction, tx_id)
-    if not tx or tx.company_id != company_id:
+    if not tx or tx.company_id != company_id or tx.tenant_id != tenant_id:
         raise HTTPException(status_code=404, detail="Transacao nao existe para essa empresa")
 
     cat = db.scalar(select(Category).where(Category.id == payload.category_id).where(Category.tenant_id == tenant_id))
@@ -347,6 +503,19 @@ def set_transaction_category(
     if hasattr(cat, "company_id") and getattr(cat, "company_id") != company_id:
         raise HTTPException(status_code=422, detail="Categoria nao pertence a esta empresa")
 
+    daily_rollup.shift_category(
+        db,
+        tenant_id=tenant_id,
+        company_id=company_id,
+        tx_ids=[tx.id],
+        new_category_id=payload.category_id,
+    )
+    learned_rules.record_recategorization(
+        db,
+        tenant_id=tenant_id,
+        changes=[(tx.description, tx.category_id, payload.category_id)],
+    )
+    bump_company_version(db, tenant_id=tenant_id, company_id=company_id)
     tx.category_id = payload.category_id
     db.commit()
     db.refresh(tx)
@@ -354,13 +523,13 @@ def set_transaction_category(
 
 
 @router.post("/bulk-categorize", response_model=BulkCategorizeResponse)
-def bulk_categorize(payload: BulkCategorizeRequest, db: Session = Depends(get_db)):
+def bulk_categorize(payload: BulkCategorizeRequest, db: Session = Depends(get_db), tenant_id: int = Depends(get_current_tenant_id)):
     tx_ids = payload.transaction_ids
 
     if not tx_ids:
         return BulkCategorizeResponse(company_id=0, updated=0)
 
-    tx_rows = list(db.scalars(select(Transaction).where(Transaction.id.in_(tx_ids))))
+    tx_rows = list(db.scalars(select(Transaction).where(Transaction.id.in_(tx_ids)).where(Transaction.tenant_id == tenant_id)))
 
     if not tx_rows:
         raise HTTPException(status_code=404, detail="Nenhuma transacao encontrada para os IDs informados")
@@ -369,7 +538,6 @@ def bulk_categorize(payload: BulkCategorizeRequest, db: Session = Depends(get_db
     if len(company_ids) > 1:
         raise HTTPException(status_code=422, detail="Transacoes de empresas diferentes no mesmo lote")
 
-    tenant_id = get_current_tenant_id()
     cat = db.scalar(select(Category).where(Category.id == payload.category_id).where(Category.tenant_id == tenant_id))
     if not cat:
         raise HTTPException(status_code=404, detail="Categoria (category_id) nao existe")
@@ -377,6 +545,20 @@ def bulk_categorize(payload: BulkCategorizeRequest, db: Session = Depends(get_db
     if hasattr(cat, "company_id") and getattr(cat, "company_id") != tx_rows[0].company_id:
         raise HTTPException(status_code=422, detail="Categoria nao pertence a mesma empresa do lote")
 
+    daily_rollup.shift_category(
+        db,
+        tenant_id=tenant_id,
+        company_id=tx_rows[0].company_id,
+        tx_ids=[tx.id for tx in tx_rows],
+        new_category_id=payload.category_id,
+    )
+    learned_rules.record_recategorization(
+        db,
+        tenant_id=tenant_id,
+        changes=[(tx.description, tx.category_id, payload.category_id) for tx in tx_rows],
+    )
+    bump_company_version(db, tenant_id=tenant_id, company_id=tx_rows[0].company_id)
+
     updated = 0
     for tx in tx_rows:
         tx.category_id = payload.category_id
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+import anyio
+
+
+class CacheUnavailable(Exception):
+    """Backend remoto fora do ar (conexão/timeout): o chamador trata como miss e segue sem cache."""
+
+
+class CacheBackend:
+    """
+    Interface mínima de cache (get/set/clear) com contadores de hit/miss.
+    Valores devem ser JSON-serializáveis (o backend Redis serializa em JSON).
+    """
+
+    name = "base"
+    # cliente de rede síncrono: nos caminhos async, aget/aset rodam numa thread
+    blocking = False
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any | None:
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._set(key, value)
+
+    async def aget(self, key: str) -> Any | None:
+        """get() a partir do event loop."""
+        if self.blocking:
+            return await anyio.to_thread.run_sync(self.get, key)
+        return self.get(key)
+
+    async def aset(self, key: str, value: Any) -> None:
+        """set() a partir do event loop."""
+        if self.blocking:
+            await anyio.to_thread.run_sync(self.set, key, value)
+        else:
+            self.set(key, value)
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def _get(self, key: str) -> Any | None:
+        raise NotImplementedError
+
+    def _set(self, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """LRU em processo com TTL por entrada (thread-safe)."""
+
+    name = "memory"
+
+    def __init__(self, *, max_entries: int = 2048, ttl_s: float = 300) -> None:
+        super().__init__()
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_s = float(ttl_s)
+        self.evictions = 0
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Any | None:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: Any) -> None:
+        expires_at = time.monotonic() + self.ttl_s
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        out = super().stats()
+        out.update({"entries": len(self._data), "max_entries": self.max_entries, "evictions": self.evictions})
+        return out
+
+
+class RedisCache(CacheBackend):
+    """
+    Backend compatível com Redis. Recebe um client com a API do redis-py
+    (`get`, `set(name, value, ex=)`, `scan_iter`, `delete`) — em testes, um fake local.
+    """
+
+    name = "redis"
+    blocking = True
+
+    def __init__(
+        self,
+        client: Any,
+        *,
+        ttl_s: float = 300,
+        prefix: str = "ia-cnpj:",
+        errors: tuple[type[BaseException], ...] = (OSError,),
+    ) -> None:
+        super().__init__()
+        self.client = client
+        self.ttl_s = int(ttl_s)
+        self.prefix = prefix
+        # exceções do client que significam "Redis indisponível" (redis.RedisError no redis-py)
+        self.errors = errors
+
+    def _get(self, key: str) -> Any | None:
+        try:
+            raw = self.client.get(self.prefix + key)
+        except self.errors as e:
+            raise CacheUnavailable(str(e)) from e
+        if raw is None:
+            return None
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8")
+        return json.loads(raw)
+
+    def _set(self, key: str, value: Any) -> None:
+        try:
+            self.client.set(self.prefix + key, json.dumps(value, separators=(",", ":")), ex=max(1, self.ttl_s))
+        except self.errors as e:
+            raise CacheUnavailable(str(e)) from e
+
+    def delete(self, key: str) -> None:
+        try:
+            self.client.delete(self.prefix + key)
+        except self.errors as e:
+            raise CacheUnavailable(str(e)) from e
+
+    def clear(self) -> None:
+        try:
+            keys = list(self.client.scan_iter(match=self.prefix + "*"))
+            if keys:
+                self.client.delete(*keys)
+        except self.errors as e:
+            raise CacheUnavailable(str(e)) from e
+
+
+def redis_cache_from_url(url: str, **kwargs: Any) -> RedisCache:
+    try:
+        import redis  # type: ignore
+    except Exception as e:  # pragma: no cover - dependência opcional
+        raise RuntimeError("REPORT_CACHE_BACKEND=redis exige o pacote 'redis' instalado") from e
+    return RedisCache(redis.Redis.from_url(url), errors=(redis.RedisError, OSError), **kwargs)
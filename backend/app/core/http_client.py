@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import threading
+
+import httpx
+
+from app.core.settings import settings
+
+# Cliente HTTP síncrono compartilhado pelo processo (integrações externas: consulta de CNPJ).
+# httpx.Client é thread-safe: as rotas sync e as threads do anyio reaproveitam o mesmo pool
+# (keep-alive + sessão TLS) em vez de um handshake novo por consulta. Timeout vai por request.
+
+_lock = threading.Lock()
+_client: httpx.Client | None = None
+
+
+def get_http_client() -> httpx.Client:
+    global _client
+    if _client is not None:
+        return _client
+    with _lock:
+        if _client is None:
+            size = max(1, int(settings.HTTP_POOL_MAX_CONNECTIONS))
+            _client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=size,
+                    max_keepalive_connections=size,
+                    keepalive_expiry=float(settings.HTTP_POOL_KEEPALIVE_S),
+                ),
+                headers={"Accept": "application/json"},
+            )
+    return _client
+
+
+def close_http_client() -> None:
+    global _client
+    with _lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Limites (ms) do histograma de espera por conexão; o último bucket é "+Inf"
+WAIT_BUCKETS_MS: tuple[float, ...] = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolMetrics:
+    """
+    Telemetria de um pool SQLAlchemy: checkouts, conexões abertas/invalidadas,
+    timeouts e histograma do tempo de espera por conexão.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._pool = None
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.wait_count = 0
+            self.wait_sum_ms = 0.0
+            self.wait_max_ms = 0.0
+            self._wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def observe_wait(self, elapsed_s: float, *, timed_out: bool = False) -> None:
+        ms = elapsed_s * 1000.0
+        with self._lock:
+            self.wait_count += 1
+            self.wait_sum_ms += ms
+            self.wait_max_ms = max(self.wait_max_ms, ms)
+            self._wait_buckets[bisect.bisect_left(WAIT_BUCKETS_MS, ms)] += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def attach(self, pool) -> None:
+        """Registra os listeners de pool (checkout/connect/invalidate)."""
+        self._pool = pool
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "invalidate", self._on_invalidate)
+
+    def _on_checkout(self, *_args) -> None:
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_connect(self, *_args) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def _on_invalidate(self, *_args) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def _pool_status(self) -> dict:
+        pool = self._pool
+        if pool is None:
+            return {"pool_class": None}
+        out: dict = {"pool_class": type(pool).__name__}
+        # QueuePool expõe tamanho/ocupação; Null/Singleton pools não
+        for attr in ("size", "checkedin", "checkedout", "overflow"):
+            fn = getattr(pool, attr, None)
+            if callable(fn):
+                try:
+                    out[attr] = int(fn())
+                except Exception:
+                    out[attr] = None
+        max_overflow = getattr(pool, "_max_overflow", None)
+        if max_overflow is not None:
+            out["max_overflow"] = int(max_overflow)
+        return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            buckets = {f"le_{int(b)}ms": n for b, n in zip(WAIT_BUCKETS_MS, self._wait_buckets)}
+            buckets["le_inf"] = self._wait_buckets[-1]
+            data = {
+                "checkouts": self.checkouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait": {
+                    "count": self.wait_count,
+                    "sum_ms": round(self.wait_sum_ms, 3),
+                    "avg_ms": round(self.wait_sum_ms / self.wait_count, 3) if self.wait_count else 0.0,
+                    "max_ms": round(self.wait_max_ms, 3),
+                    "buckets": buckets,
+                },
+            }
+        return {"name": self.name, **self._pool_status(), **data}
+
+
+def _timed_do_get(pool, do_get):
+    t0 = time.perf_counter()
+    try:
+        conn = do_get()
+    except PoolTimeoutError:
+        # pool esgotado além de pool_timeout
+        pool._ia_metrics.observe_wait(time.perf_counter() - t0, timed_out=True)
+        raise
+    pool._ia_metrics.observe_wait(time.perf_counter() - t0)
+    return conn
+
+
+class _TimedPoolMixin:
+    """Mede quanto cada checkout esperou por uma conexão (fila do pool)."""
+
+    _ia_metrics: PoolMetrics
+
+    def _do_get(self):
+        return _timed_do_get(self, super()._do_get)
+
+    def recreate(self):
+        # recreate() reaproveita o dispatch (listeners); só reaponta as métricas
+        new = super().recreate()
+        new._ia_metrics = self._ia_metrics
+        self._ia_metrics._pool = new
+        return new
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_pool(pool, metrics: PoolMetrics) -> None:
+    pool._ia_metrics = metrics
+    metrics.attach(pool)
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Limitador de taxa (thread-safe) para chamadas a provedores externos.
+    acquire() bloqueia até haver ficha (ou recusa se passar de max_wait_s); rate_per_s <= 0 desliga o limite.
+    """
+
+    def __init__(self, rate_per_s: float, *, burst: int = 1) -> None:
+        self.rate_per_s = float(rate_per_s)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.rejected = 0
+
+    def _reserve(self, max_wait_s: float | None = None) -> float | None:
+        """
+        Consome uma ficha (pode ficar negativo) e devolve quanto esperar por ela;
+        None (sem consumir) se a espera passaria de max_wait_s.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate_per_s)
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return 0.0
+            delay = (1.0 - self._tokens) / self.rate_per_s
+            if max_wait_s is not None and delay > max_wait_s:
+                self.rejected += 1
+                return None
+            self._tokens -= 1.0
+            self.waits += 1
+            return delay
+
+    def acquire(self, max_wait_s: float | None = None) -> bool:
+        """Espera a vez; False (sem esperar) se a ficha só viria depois de max_wait_s."""
+        if self.rate_per_s <= 0:
+            return True
+        delay = self._reserve(max_wait_s)
+        if delay is None:
+            return False
+        if delay > 0:
+            time.sleep(delay)
+        return True
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+import httpx
+from fastapi import HTTPException
+
+from app.core.settings import settings
+
+# Resiliência das integrações externas (BrasilAPI, OpenAI, gateways de pagamento).
+# Cada provider tem um ProviderGuard com:
+# - circuit breaker: PROVIDER_BREAKER_FAILURES falhas seguidas => aberto por
+#   PROVIDER_BREAKER_RESET_S (falha em ms, sem rede); depois meio-aberto deixa uma
+#   chamada de teste passar e fecha no primeiro sucesso;
+# - bulkhead: no máximo PROVIDER_MAX_INFLIGHT chamadas simultâneas por provider, para
+#   um provider lento não prender o threadpool inteiro;
+# - prazo da request (REQUEST_DEADLINE_S, middleware): o timeout de cada chamada é
+#   min(timeout do provider, tempo que resta para a request);
+# - histograma de latência + contadores por desfecho.
+
+LATENCY_BUCKETS_MS: tuple[float, ...] = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("ia_cnpj_request_deadline", default=None)
+
+
+class ProviderUnavailable(Exception):
+    """Chamada recusada sem tocar a rede: circuito aberto, bulkhead cheio ou prazo esgotado."""
+
+    def __init__(self, provider: str, reason: str) -> None:
+        super().__init__(f"{provider}: {reason}")
+        self.provider = provider
+        self.reason = reason
+
+
+# -----------------------------
+# Prazo por request
+# -----------------------------
+
+@contextmanager
+def deadline(seconds: float | None) -> Iterator[None]:
+    """Define o prazo (relativo) do contexto atual; prazo externo mais curto prevalece."""
+    if not seconds or seconds <= 0:
+        yield
+        return
+    target = time.monotonic() + float(seconds)
+    current = _deadline.get()
+    token = _deadline.set(target if current is None else min(current, target))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_s() -> float | None:
+    """Segundos até o prazo da request atual (None = sem prazo)."""
+    target = _deadline.get()
+    return None if target is None else target - time.monotonic()
+
+
+class RequestDeadlineMiddleware:
+    """ASGI puro: abre o prazo REQUEST_DEADLINE_S para cada request HTTP (propaga via contextvars)."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        with deadline(float(settings.REQUEST_DEADLINE_S or 0)):
+            return await self.app(scope, receive, send)
+
+
+# -----------------------------
+# Guard por provider
+# -----------------------------
+
+def is_provider_failure(exc: BaseException) -> bool:
+    """Erros que indicam provider degradado (abrem o circuito); 4xx de negócio não contam."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status >= 500 or status in (408, 429)
+    if isinstance(exc, httpx.HTTPError):
+        return True  # timeout / conexão / protocolo
+    if isinstance(exc, HTTPException):
+        return exc.status_code >= 500
+    return False
+
+
+class ProviderGuard:
+    def __init__(
+        self,
+        name: str,
+        *,
+        failure_threshold: int,
+        reset_timeout_s: float,
+        max_inflight: int,
+        bulkhead_wait_s: float = 0.0,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout_s = float(reset_timeout_s)
+        self.max_inflight = max(1, int(max_inflight))
+        self.bulkhead_wait_s = max(0.0, float(bulkhead_wait_s))
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_inflight)
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: float | None = None
+
+        self.inflight = 0
+        self.counts = {
+            "ok": 0,
+            "failure": 0,
+            "rejected_open": 0,
+            "rejected_bulkhead": 0,
+            "rejected_deadline": 0,
+            "opened": 0,
+        }
+        self._latency_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self._latency_sum_ms = 0.0
+        self._latency_count = 0
+
+    # --- circuit breaker ---
+
+    def allow(self) -> bool:
+        """Pode chamar agora? Em meio-aberto só uma chamada de teste por vez."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self._opened_at < self.reset_timeout_s:
+                    self.counts["rejected_open"] += 1
+                    return False
+                self.state = HALF_OPEN
+                self._probe_started = None
+            # chamada de teste que nunca voltou não trava o circuito em meio-aberto
+            if self._probe_started is not None and now - self._probe_started < self.reset_timeout_s:
+                self.counts["rejected_open"] += 1
+                return False
+            self._probe_started = now
+            return True
+
+    def record(self, elapsed_s: float, *, failure: bool) -> None:
+        ms = elapsed_s * 1000.0
+        with self._lock:
+            self._latency_buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+            self._latency_sum_ms += ms
+            self._latency_count += 1
+            self._probe_started = None
+            if not failure:
+                self.counts["ok"] += 1
+                self._failures = 0
+                self.state = CLOSED
+                return
+            self.counts["failure"] += 1
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.counts["opened"] += 1
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+    # --- prazo ---
+
+    def timeout(self, default_s: float) -> float:
+        """Timeout da próxima chamada respeitando o prazo da request; esgotado => ProviderUnavailable."""
+        self._reject_if_expired()
+        left = remaining_s()
+        return float(default_s) if left is None else max(0.001, min(float(default_s), left))
+
+    # --- bulkhead + medição ---
+
+    def _reject_if_expired(self) -> None:
+        left = remaining_s()
+        if left is not None and left <= 0:
+            with self._lock:
+                self.counts["rejected_deadline"] += 1
+            raise ProviderUnavailable(self.name, "deadline")
+
+    @contextmanager
+    def bulkhead(self) -> Iterator[None]:
+        """Só a vaga no bulkhead (para quem mede/registra cada tentativa por conta própria)."""
+        self._reject_if_expired()
+        if self.bulkhead_wait_s > 0:
+            acquired = self._slots.acquire(timeout=self.bulkhead_wait_s)
+        else:
+            acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self.counts["rejected_bulkhead"] += 1
+            raise ProviderUnavailable(self.name, "bulkhead_full")
+        with self._lock:
+            self.inflight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.inflight -= 1
+            self._slots.release()
+
+    @contextmanager
+    def call(self) -> Iterator["ProviderGuard"]:
+        """
+        Envolve uma chamada síncrona ao provider: prazo, bulkhead e circuito; mede e
+        registra o desfecho (exceções classificadas por is_provider_failure).
+        """
+        with self.bulkhead():
+            if not self.allow():
+                raise ProviderUnavailable(self.name, "circuit_open")
+            t0 = time.perf_counter()
+            try:
+                yield self
+            except BaseException as e:
+                self.record(time.perf_counter() - t0, failure=is_provider_failure(e))
+                raise
+            self.record(time.perf_counter() - t0, failure=False)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            buckets = {f"le_{int(b)}ms": n for b, n in zip(LATENCY_BUCKETS_MS, self._latency_buckets)}
+            buckets["le_inf"] = self._latency_buckets[-1]
+            state = self.state
+            if state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout_s:
+                state = HALF_OPEN  # próxima chamada é a de teste
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "inflight": self.inflight,
+                "max_inflight": self.max_inflight,
+                **self.counts,
+                "latency": {
+                    "count": self._latency_count,
+                    "avg_ms": round(self._latency_sum_ms / self._latency_count, 3) if self._latency_count else 0.0,
+                    "buckets": buckets,
+                },
+            }
+
+
+_guards: dict[str, ProviderGuard] = {}
+_guards_lock = threading.Lock()
+
+
+def get_guard(name: str) -> ProviderGuard:
+    """Guard do provider (criado na primeira chamada com os PROVIDER_* atuais)."""
+    guard = _guards.get(name)
+    if guard is not None:
+        return guard
+    with _guards_lock:
+        guard = _guards.get(name)
+        if guard is None:
+            guard = ProviderGuard(
+                name,
+                failure_threshold=settings.PROVIDER_BREAKER_FAILURES,
+                reset_timeout_s=settings.PROVIDER_BREAKER_RESET_S,
+                max_inflight=settings.PROVIDER_MAX_INFLIGHT,
+                bulkhead_wait_s=settings.PROVIDER_BULKHEAD_WAIT_S,
+            )
+            _guards[name] = guard
+    return guard
+
+
+def reset_guards() -> None:
+    """Descarta os guards (testes / troca de config)."""
+    with _guards_lock:
+        _guards.clear()
+
+
+def provider_stats() -> dict:
+    with _guards_lock:
+        guards = list(_guards.values())
+    return {g.name: g.snapshot() for g in guards}
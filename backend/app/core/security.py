@@ -5,13 +5,15 @@ from typing import Any, Dict
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from passlib.hash import pbkdf2_sha256
 import jwt
 
 from app.core.settings import settings
-from app.deps import get_db
-from app.tenant_context import set_tenant_on_session
+from app.core.tenant_cache import resolve_tenant_id, resolve_tenant_id_async
+from app.deps import get_async_db, get_db
+from app.tenant_context import set_tenant_on_async_session, set_tenant_on_session
 import secrets
 
 bearer = HTTPBearer(auto_error=False)
@@ -85,10 +87,7 @@ def decode_token(token: str) -> Dict[str, Any]:
         )
 
 
-def require_auth(
-    credentials=Depends(bearer),
-    db: Session = Depends(get_db),
-):
+def _decode_bearer_claims(credentials) -> Dict[str, Any]:
     # auth ON?
     import os
     from fastapi import HTTPException
@@ -113,30 +112,58 @@ def require_auth(
         or getattr(settings, "AUTH_JWT_SECRET", "")
     )
     try:
-        claims = jwt.decode(token, secret, algorithms=["HS256"])
+        return jwt.decode(token, secret, algorithms=["HS256"])
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+
+def _checked_tenant_id(claims: Dict[str, Any], tenant_id: Any) -> int:
+    if tenant_id in (None, "", 0):
+        raise HTTPException(status_code=401, detail="Missing tenant_id")
+
+    tenant_id = int(tenant_id)
+    claims["tenant_id"] = tenant_id
+    return tenant_id
+
+
+def require_auth(
+    credentials=Depends(bearer),
+    db: Session = Depends(get_db),
+):
+    claims = _decode_bearer_claims(credentials)
     sub = (claims.get("sub") or "").strip()
     tenant_id = claims.get("tenant_id", None)
 
-    # Se tenant_id não veio no JWT, resolve via DB pelo sub (email)
+    # Claim tenant_id assinado é a fonte; sem ele, resolve pelo sub (email) com cache
     if tenant_id in (None, "", 0):
         try:
-            from app.models.tenant import TenantMember
-            m = db.query(TenantMember).filter(TenantMember.email == sub).first()
-            if m:
-                tenant_id = m.tenant_id
+            tenant_id = resolve_tenant_id(db, sub)
         except Exception:
             tenant_id = None
 
-    if tenant_id in (None, "", 0):
-        raise HTTPException(status_code=401, detail="Missing tenant_id")
-
-    tenant_id = int(tenant_id)
-    claims["tenant_id"] = tenant_id
+    tenant_id = _checked_tenant_id(claims, tenant_id)
 
     # seta tenant no contexto da sessão (Postgres RLS / SQLite info)
     set_tenant_on_session(db, tenant_id)
     return claims
 
+
+async def require_auth_async(
+    credentials=Depends(bearer),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Mesmo contrato de require_auth, com a sessão async."""
+    claims = _decode_bearer_claims(credentials)
+    sub = (claims.get("sub") or "").strip()
+    tenant_id = claims.get("tenant_id", None)
+
+    if tenant_id in (None, "", 0):
+        try:
+            tenant_id = await resolve_tenant_id_async(db, sub)
+        except Exception:
+            tenant_id = None
+
+    tenant_id = _checked_tenant_id(claims, tenant_id)
+
+    await set_tenant_on_async_session(db, tenant_id)
+    return claims
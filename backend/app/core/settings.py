@@ -30,10 +30,85 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = "gpt-4o-mini"
     OPENAI_BASE_URL: str = "https://api.openai.com/v1"
     OPENAI_TIMEOUT_S: int = 25
+    # Sugestão de categorias via OpenAI: lotes paralelos + retry com orçamento + cache por descrição
+    OPENAI_BATCH_SIZE: int = 25
+    OPENAI_MAX_CONCURRENCY: int = 4
+    OPENAI_MAX_RETRIES: int = 2
+    OPENAI_RETRY_BUDGET_RATIO: float = 0.5
+    OPENAI_BACKOFF_BASE_S: float = 0.25
+    OPENAI_DEADLINE_S: float = 60.0
+    AI_SUGGEST_CACHE_TTL_S: int = 2592000
+    # apply-suggestions: ids por UPDATE (um UPDATE ... WHERE id IN (...) por categoria e bloco)
+    CATEGORIZE_APPLY_CHUNK: int = 1000
+    # Jobs de categorização do backlog (/ai/categorize-jobs): lote por checkpoint e lease do worker
+    CATEGORIZE_JOB_WORKER_ENABLED: bool = True
+    CATEGORIZE_JOB_POLL_S: float = 5.0
+    CATEGORIZE_JOB_BATCH: int = 500
+    CATEGORIZE_JOB_LEASE_S: int = 300
+    CATEGORIZE_JOB_MAX_ATTEMPTS: int = 3
+    # lotes por fatia: depois disso o job volta para o fim da fila (0 = roda até o fim)
+    CATEGORIZE_JOB_SLICE_BATCHES: int = 20
+
+    # Relatórios: dias inteiros lidos do rollup diário (transaction_daily_rollup)
+    REPORTS_USE_DAILY_ROLLUP: bool = True
+    # /reports/series: máximo de pontos (buckets) por resposta
+    REPORTS_SERIES_MAX_POINTS: int = 1000
+    # Cache de relatórios: memory | redis | off (invalidação por companies.data_version)
+    REPORT_CACHE_BACKEND: str = "memory"
+    REPORT_CACHE_TTL_S: int = 300
+    REPORT_CACHE_MAX_ENTRIES: int = 2048
+    REPORT_CACHE_REDIS_URL: str = ""
+    # Cache email -> tenant_id (tokens sem claim tenant_id): memory | redis | off
+    TENANT_CACHE_BACKEND: str = "memory"
+    TENANT_CACHE_TTL_S: int = 300
+    TENANT_CACHE_MAX_ENTRIES: int = 10000
+    # Regras aprendidas por tenant (token -> categoria), consultadas antes das regras fixas
+    LEARNED_RULES_ENABLED: bool = True
+    LEARNED_RULES_MIN_SUPPORT: int = 3
+    LEARNED_RULES_MIN_SHARE: float = 0.8
 
     CNPJ_LOOKUP_PROVIDER: str = "brasilapi"
     CNPJ_LOOKUP_BASE_URL: str = "https://brasilapi.com.br/api/cnpj/v1"
     CNPJ_LOOKUP_TIMEOUT_S: int = 12
+    # Cache global dos dados públicos de CNPJ (LRU em processo + tabela cnpj_registry_cache)
+    CNPJ_CACHE_ENABLED: bool = True
+    CNPJ_CACHE_FRESH_S: int = 604800
+    CNPJ_CACHE_STALE_S: int = 2592000
+    CNPJ_CACHE_MAX_ENTRIES: int = 5000
+    # Limite de taxa ao provedor (0 = sem limite) e lote /companies/bulk-lookup
+    CNPJ_LOOKUP_RATE_PER_S: float = 5.0
+    CNPJ_LOOKUP_RATE_BURST: int = 5
+    CNPJ_BULK_CONCURRENCY: int = 8
+    CNPJ_BULK_UPSERT_BATCH: int = 100
+    CNPJ_BULK_SYNC_MAX: int = 200
+    CNPJ_BULK_MAX: int = 20000
+    # Enriquecimento em background (fila company_enrichment_queue): a request só enfileira;
+    # o agendador reenfileira empresas com dados cadastrais mais velhos que COMPANY_REFRESH_MAX_AGE_S
+    COMPANY_ENRICH_ASYNC: bool = True
+    COMPANY_ENRICH_WORKER_ENABLED: bool = True
+    COMPANY_ENRICH_POLL_S: float = 5.0
+    COMPANY_ENRICH_BATCH: int = 50
+    COMPANY_ENRICH_CONCURRENCY: int = 4
+    COMPANY_ENRICH_MAX_ATTEMPTS: int = 5
+    COMPANY_REFRESH_MAX_AGE_S: int = 2592000
+    COMPANY_REFRESH_SCAN_INTERVAL_S: int = 3600
+    COMPANY_REFRESH_SCAN_LIMIT: int = 500
+    # Resiliência das integrações externas (circuit breaker + bulkhead por provider, prazo por request)
+    REQUEST_DEADLINE_S: float = 60.0
+    PROVIDER_BREAKER_FAILURES: int = 5
+    PROVIDER_BREAKER_RESET_S: float = 30.0
+    PROVIDER_MAX_INFLIGHT: int = 16
+    PROVIDER_BULKHEAD_WAIT_S: float = 0.05
+    # PDF do AI Consult: processos do pool de render (0 = thread) e renders em voo antes de 503
+    PDF_RENDER_PROCESSES: int = 2
+    PDF_RENDER_MAX_PENDING: int = 32
+    # Cache dos PDFs prontos (chave: tenant + empresa + data_version + período); fs | off
+    PDF_CACHE_BACKEND: str = "fs"
+    PDF_CACHE_DIR: str = ""
+    PDF_CACHE_MAX_BYTES: int = 536870912
+    # Pool do cliente HTTP compartilhado (integrações externas)
+    HTTP_POOL_MAX_CONNECTIONS: int = 20
+    HTTP_POOL_KEEPALIVE_S: float = 30.0
 
     ASAAS_ENABLED: bool = Field(default=False, validation_alias=AliasChoices("IA_CNPJ_ASAAS_ENABLED","ASAAS_ENABLED"))
     ASAAS_API_KEY: str = Field(default="", validation_alias=AliasChoices("IA_CNPJ_ASAAS_API_KEY","ASAAS_API_KEY"))
@@ -51,10 +126,19 @@ class Settings(BaseSettings):
     PAGBANK_TOKEN: str = Field(default="", validation_alias=AliasChoices("IA_CNPJ_PAGBANK_TOKEN","PAGBANK_TOKEN"))
     PAGBANK_BASE_URL: str = Field(default="https://sandbox.api.pagseguro.com", validation_alias=AliasChoices("IA_CNPJ_PAGBANK_BASE_URL","PAGBANK_BASE_URL"))
     PAGBANK_WEBHOOK_URL: str = Field(default="", validation_alias=AliasChoices("IA_CNPJ_PAGBANK_WEBHOOK_URL","PAGBANK_WEBHOOK_URL"))
+    PAGBANK_TIMEOUT_S: int = Field(default=30, validation_alias=AliasChoices("IA_CNPJ_PAGBANK_TIMEOUT_S","PAGBANK_TIMEOUT_S"))
 
     APP_NAME: str = "IA-CNPJ API"
     ENV: str = Field(default="lab", validation_alias=AliasChoices("IA_CNPJ_ENV","ENV"))  # lab|prod
     DATABASE_URL: str = Field(default="sqlite:///./lab.db", validation_alias=AliasChoices("IA_CNPJ_DATABASE_URL","DATABASE_URL"))
+    # Pool de conexões (sync e async usam os mesmos limites; SQLite em memória ignora)
+    DB_POOL_SIZE: int = Field(default=5, validation_alias=AliasChoices("IA_CNPJ_DB_POOL_SIZE","DB_POOL_SIZE"))
+    DB_MAX_OVERFLOW: int = Field(default=10, validation_alias=AliasChoices("IA_CNPJ_DB_MAX_OVERFLOW","DB_MAX_OVERFLOW"))
+    DB_POOL_TIMEOUT_S: float = Field(default=10.0, validation_alias=AliasChoices("IA_CNPJ_DB_POOL_TIMEOUT_S","DB_POOL_TIMEOUT_S"))
+    DB_POOL_RECYCLE_S: int = Field(default=1800, validation_alias=AliasChoices("IA_CNPJ_DB_POOL_RECYCLE_S","DB_POOL_RECYCLE_S"))
+    DB_POOL_PRE_PING: bool = Field(default=True, validation_alias=AliasChoices("IA_CNPJ_DB_POOL_PRE_PING","DB_POOL_PRE_PING"))
+    # statement_timeout do Postgres (ms) nas sessões de request (SET LOCAL); scripts/workers sem limite; 0 = desliga
+    DB_STATEMENT_TIMEOUT_MS: int = Field(default=15000, validation_alias=AliasChoices("IA_CNPJ_DB_STATEMENT_TIMEOUT_MS","DB_STATEMENT_TIMEOUT_MS"))
     # Auth (JWT)
     AUTH_ENABLED: bool = Field(default=False, validation_alias=AliasChoices("IA_CNPJ_AUTH_ENABLED","AUTH_ENABLED"))
     AUTH_PROTECT_DOCS: bool = Field(default=False, validation_alias=AliasChoices("IA_CNPJ_AUTH_PROTECT_DOCS","AUTH_PROTECT_DOCS"))
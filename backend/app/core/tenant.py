@@ -1,44 +1,33 @@
-from sqlalchemy import text
 from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
 
-from app.deps import get_db
-from app.core.security import require_auth
-from app.models.tenant import TenantMember
+from app.core.security import require_auth, require_auth_async
 
 
-def get_current_tenant_id(
-    payload: dict = Depends(require_auth),
-    db: Session = Depends(get_db),
-) -> int:
-    """
-    Resolve tenant_id real baseado no email (sub) do JWT.
-    Em Postgres: SET app.tenant_id
-    Em SQLite (lab): guarda em db.info["tenant_id"]
-    """
-    email = payload.get("sub")
-    if not email:
+def _tenant_from_claims(payload: dict) -> int:
+    if not payload.get("sub"):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="token inválido (sub ausente)",
         )
 
-    member = (
-        db.query(TenantMember)
-        .filter(TenantMember.email == email)
-        .first()
-    )
-
-    if not member:
+    tenant_id = payload.get("tenant_id")
+    if tenant_id in (None, "", 0):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="usuário não pertence a nenhum tenant",
         )
+    return int(tenant_id)
+
+
+def get_current_tenant_id(payload: dict = Depends(require_auth)) -> int:
+    """
+    tenant_id da requisição: claim assinado do JWT (ou resolvido por email, com cache,
+    em require_auth). require_auth já aplicou o tenant na sessão da requisição
+    (Postgres: set_config app.tenant_id / SQLite lab: db.info["tenant_id"]).
+    """
+    return _tenant_from_claims(payload)
 
-    dialect = db.get_bind().dialect.name
-    if str(dialect).startswith("postgres"):
-        db.execute(text("SELECT set_config(\'app.tenant_id\', :tid, true)"), {"tid": str(int(member.tenant_id))})
-    else:
-        db.info["tenant_id"] = member.tenant_id
 
-    return member.tenant_id
+async def get_current_tenant_id_async(payload: dict = Depends(require_auth_async)) -> int:
+    """Versão async de get_current_tenant_id (endpoints `async def` com AsyncSession)."""
+    return _tenant_from_claims(payload)
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import CacheBackend, CacheUnavailable, MemoryCache, redis_cache_from_url
+from app.core.settings import settings
+from app.models.tenant import TenantMember
+
+logger = logging.getLogger(__name__)
+
+# Cache opcional: fora do ar (CacheUnavailable) vira miss e o tenant sai do banco;
+# nunca derruba a autenticação.
+
+_cache: CacheBackend | None = None
+_cache_ready = False
+
+
+def _build_cache() -> CacheBackend | None:
+    backend = (settings.TENANT_CACHE_BACKEND or "").strip().lower()
+    if backend in ("", "off", "none", "disabled"):
+        return None
+    if backend == "redis":
+        return redis_cache_from_url(
+            settings.REPORT_CACHE_REDIS_URL, ttl_s=settings.TENANT_CACHE_TTL_S, prefix="ia-cnpj:tenant:"
+        )
+    return MemoryCache(max_entries=settings.TENANT_CACHE_MAX_ENTRIES, ttl_s=settings.TENANT_CACHE_TTL_S)
+
+
+def get_tenant_cache() -> CacheBackend | None:
+    global _cache, _cache_ready
+    if not _cache_ready:
+        _cache = _build_cache()
+        _cache_ready = True
+    return _cache
+
+
+def set_tenant_cache(cache: CacheBackend | None) -> None:
+    """Troca o backend (testes / bootstrap)."""
+    global _cache, _cache_ready
+    _cache = cache
+    _cache_ready = True
+
+
+def _key(email: str) -> str:
+    return (email or "").strip()
+
+
+def invalidate_tenant_member(email: str | None = None) -> None:
+    """Descarta o mapeamento email -> tenant (todos, se email=None) após mudar membership."""
+    cache = get_tenant_cache()
+    if cache is None:
+        return
+    try:
+        if email is None:
+            cache.clear()
+        else:
+            cache.delete(_key(email))
+    except CacheUnavailable:
+        # membership já commitada: a entrada antiga (se houver) expira pelo TTL
+        logger.warning("tenant_cache_invalidate_failed email=%s", email, exc_info=True)
+
+
+def _member_query(email: str):
+    return select(TenantMember.tenant_id).where(TenantMember.email == email).limit(1)
+
+
+def _cached(cache: CacheBackend | None, email: str) -> int | None:
+    if cache is None:
+        return None
+    try:
+        hit = cache.get(_key(email))
+    except CacheUnavailable:
+        logger.warning("tenant_cache_get_failed", exc_info=True)
+        return None
+    return int(hit) if hit is not None else None
+
+
+def _remember(cache: CacheBackend | None, email: str, tenant_id: int | None) -> None:
+    if tenant_id is None or cache is None:
+        return
+    try:
+        cache.set(_key(email), int(tenant_id))
+    except CacheUnavailable:
+        logger.warning("tenant_cache_set_failed", exc_info=True)
+
+
+async def _cached_async(cache: CacheBackend | None, email: str) -> int | None:
+    if cache is None:
+        return None
+    try:
+        hit = await cache.aget(_key(email))
+    except CacheUnavailable:
+        logger.warning("tenant_cache_get_failed", exc_info=True)
+        return None
+    return int(hit) if hit is not None else None
+
+
+async def _remember_async(cache: CacheBackend | None, email: str, tenant_id: int | None) -> None:
+    if tenant_id is None or cache is None:
+        return
+    try:
+        await cache.aset(_key(email), int(tenant_id))
+    except CacheUnavailable:
+        logger.warning("tenant_cache_set_failed", exc_info=True)
+
+
+def resolve_tenant_id(db: Session, email: str) -> int | None:
+    """tenant_id do membro `email` (cache TTL; só resultados positivos são guardados)."""
+    if not email:
+        return None
+    cache = get_tenant_cache()
+    hit = _cached(cache, email)
+    if hit is not None:
+        return hit
+
+    tenant_id = db.scalar(_member_query(email))
+    _remember(cache, email, tenant_id)
+    return tenant_id
+
+
+async def resolve_tenant_id_async(db: AsyncSession, email: str) -> int | None:
+    """Versão async de resolve_tenant_id (cache de rede numa thread, fora do event loop)."""
+    if not email:
+        return None
+    cache = get_tenant_cache()
+    hit = await _cached_async(cache, email)
+    if hit is not None:
+        return hit
+
+    tenant_id = await db.scalar(_member_query(email))
+    await _remember_async(cache, email, tenant_id)
+    return tenant_id
@@ -1,20 +1,110 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from app.core.pool_metrics import PoolMetrics, TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_pool
 from app.core.settings import settings
 from app.utils.db_sequence_fix import fix_sequences
 
 _is_sqlite = settings.DATABASE_URL.startswith("sqlite")
+# SQLite em memória precisa do SingletonThreadPool/StaticPool padrão
+_is_memory_sqlite = _is_sqlite and (":memory:" in settings.DATABASE_URL or settings.DATABASE_URL.rstrip("/") == "sqlite:")
+
+sync_pool_metrics = PoolMetrics("sync")
+async_pool_metrics = PoolMetrics("async")
+
+
+def _connect_args() -> dict:
+    if _is_sqlite:
+        return {"check_same_thread": False}
+    return {}
+
+
+def _pool_kwargs(*, is_async: bool) -> dict:
+    if _is_memory_sqlite:
+        return {}
+    return {
+        "poolclass": TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_S,
+        "pool_recycle": settings.DB_POOL_RECYCLE_S,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
 
 engine = create_engine(
     settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if _is_sqlite else {},
+    connect_args=_connect_args(),
+    **_pool_kwargs(is_async=False),
 )
+instrument_pool(engine.pool, sync_pool_metrics)
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
 
+def _async_database_url(url: str) -> str:
+    # psycopg3 já é async (postgresql+psycopg); SQLite usa aiosqlite
+    if url.startswith("sqlite:"):
+        return "sqlite+aiosqlite:" + url[len("sqlite:"):]
+    return url
+
+
+# Engine async (endpoints quentes); mesmo banco do engine sync
+async_engine = create_async_engine(
+    _async_database_url(settings.DATABASE_URL),
+    connect_args=_connect_args(),
+    **_pool_kwargs(is_async=True),
+)
+instrument_pool(async_engine.sync_engine.pool, async_pool_metrics)
+
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+def pool_stats() -> dict:
+    """Ocupação e espera dos pools sync/async (dimensionamento pool x workers)."""
+    return {
+        "pools": [sync_pool_metrics.stats(), async_pool_metrics.stats()],
+        "config": {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout_s": settings.DB_POOL_TIMEOUT_S,
+            "pool_recycle_s": settings.DB_POOL_RECYCLE_S,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+            "statement_timeout_ms": 0 if _is_sqlite else settings.DB_STATEMENT_TIMEOUT_MS,
+        },
+    }
+
+
+def scope_statement_timeout(db) -> None:
+    """
+    statement_timeout só nas sessões de request (get_db / get_async_db / get_admin_db):
+    SET LOCAL a cada transação, então a conexão volta ao pool sem limite e scripts,
+    workers e backfills (mesmo engine) não herdam o corte de DB_STATEMENT_TIMEOUT_MS.
+    Aceita Session ou AsyncSession.
+    """
+    timeout_ms = int(settings.DB_STATEMENT_TIMEOUT_MS or 0)
+    if _is_sqlite or timeout_ms <= 0:
+        return
+
+    def _set_timeout(_session, _transaction, connection) -> None:
+        # guarda por statement no servidor: query presa não segura a conexão do pool
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+
+    event.listen(getattr(db, "sync_session", db), "after_begin", _set_timeout)
+
+
+def dialect_insert(db, table):
+    """insert() do dialeto da sessão (sqlite/postgresql): habilita ON CONFLICT nas duas bases."""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
+
+
 def get_admin_db():
     db = SessionLocal()
+    scope_statement_timeout(db)
     try:
         fix_sequences(db, settings.DATABASE_URL)
         if not _is_sqlite:
@@ -34,6 +124,7 @@ from sqlalchemy.orm import Session
 # dependency padrão FastAPI
 def get_db() -> "Session":
     db = SessionLocal()
+    scope_statement_timeout(db)
     try:
         yield db
     finally:
@@ -1,9 +1,16 @@
-from typing import Generator
-from app.db import SessionLocal
+from typing import AsyncGenerator, Generator
+from app.db import AsyncSessionLocal, SessionLocal, scope_statement_timeout
 
 def get_db() -> Generator:
     db = SessionLocal()
+    scope_statement_timeout(db)
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator:
+    async with AsyncSessionLocal() as db:
+        scope_statement_timeout(db)
+        yield db
@@ -1,4 +1,5 @@
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -8,14 +9,23 @@ from fastapi.responses import JSONResponse
 
 from app.core.settings import settings
 from app.auth.jwt import require_auth
+from app.core.resilience import RequestDeadlineMiddleware, provider_stats
+from app.services.pdf_cache import get_pdf_store, pdf_cache_stats
+from app.services.report_cache import report_cache_stats
+from app.services.cnpj_registry_cache import cnpj_cache_stats
+from app.services.categorization_jobs import categorization_job_stats, categorization_worker
+from app.services.company_enrichment import company_enrichment_stats, enrichment_worker
+from app.ai.registry import ai_registry
 
 from app.api.auth import router as auth_router
 from app.api.company import router as company_router
 from app.api.category import router as category_router
 from app.api.transaction import router as transaction_router
-from app.api.reports import router as reports_router
+from app.api.reports import pdf_renderer, router as reports_router
 from app.api.ai import router as ai_router
 from app.api.admin_onboarding import router as admin_onboarding_router
+from app.api.admin_db import router as admin_db_router
+from app.api.admin_ai import router as admin_ai_router
 from app.api.persons import router as persons_router
 from app.api.usage_credits import router as usage_credits_router
 from app.api.billing import router as billing_router, public_router as billing_public_router
@@ -28,6 +38,9 @@ if bool(getattr(settings, "AUTH_PROTECT_DOCS", False)) and not bool(getattr(sett
 if getattr(settings, "ENV", "lab") == "prod" and not bool(getattr(settings, "AUTH_ENABLED", False)):
     raise RuntimeError("SECURITY: ENV=prod requer AUTH_ENABLED=true (failsafe)")
 
+# Provider de IA resolvido/validado uma vez (provider desconhecido => falha no boot)
+ai_registry.reload()
+
 DOCS_PROTECTED = bool(getattr(settings, "AUTH_ENABLED", False)) and (
     getattr(settings, "ENV", "lab") == "prod" or bool(getattr(settings, "AUTH_PROTECT_DOCS", False))
 )
@@ -35,12 +48,32 @@ DOCS_PROTECTED = bool(getattr(settings, "AUTH_ENABLED", False)) and (
 DOC_DEPS = [Depends(require_auth)] if DOCS_PROTECTED else []
 PROTECTED_DEPS = [Depends(require_auth)] if bool(getattr(settings, "AUTH_ENABLED", False)) else []
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # worker de enriquecimento de empresas (vários processos dividem a fila via SKIP LOCKED)
+    if settings.COMPANY_ENRICH_WORKER_ENABLED:
+        enrichment_worker.start()
+    # jobs de categorização do backlog (retomam do checkpoint após restart)
+    if settings.CATEGORIZE_JOB_WORKER_ENABLED:
+        categorization_worker.start()
+    # fonte registrada e processos de render do PDF sobem antes da primeira request;
+    # PDF_CACHE_BACKEND inválido falha aqui, não na primeira request
+    pdf_renderer.start()
+    get_pdf_store()
+    yield
+    pdf_renderer.shutdown()
+    categorization_worker.stop()
+    enrichment_worker.stop()
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     version="0.3.0",
     docs_url=None,
     redoc_url=None,
     openapi_url=None,
+    lifespan=lifespan,
 )
 
 DEFAULT_CORS_ALLOW_ORIGINS = [
@@ -80,8 +113,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # paginação por keyset (GET /transactions, /transactions/uncategorized) lida pelo frontend
+    expose_headers=["X-Next-Cursor"],
 )
 
+# prazo por request propagado às integrações externas (app/core/resilience.py)
+app.add_middleware(RequestDeadlineMiddleware)
+
 app.include_router(auth_router)
 app.include_router(auth_router, prefix="/api/v1")
 
@@ -98,6 +136,10 @@ app.include_router(ai_router, dependencies=PROTECTED_DEPS)
 app.include_router(ai_router, prefix="/api/v1", dependencies=PROTECTED_DEPS)
 app.include_router(admin_onboarding_router, dependencies=PROTECTED_DEPS)
 app.include_router(admin_onboarding_router, prefix="/api/v1", dependencies=PROTECTED_DEPS)
+app.include_router(admin_db_router, dependencies=PROTECTED_DEPS)
+app.include_router(admin_db_router, prefix="/api/v1", dependencies=PROTECTED_DEPS)
+app.include_router(admin_ai_router, dependencies=PROTECTED_DEPS)
+app.include_router(admin_ai_router, prefix="/api/v1", dependencies=PROTECTED_DEPS)
 
 app.include_router(persons_router, dependencies=PROTECTED_DEPS)
 app.include_router(persons_router, prefix="/api/v1", dependencies=PROTECTED_DEPS)
@@ -122,6 +164,13 @@ def health():
         "auth_protect_docs": bool(getattr(settings, "AUTH_PROTECT_DOCS", False)),
         "build_sha": getattr(settings, "BUILD_SHA", ""),
         "docs_protected": bool(DOCS_PROTECTED),
+        "report_cache": report_cache_stats(),
+        "cnpj_cache": cnpj_cache_stats(),
+        "company_enrichment": company_enrichment_stats(),
+        "categorize_jobs": categorization_job_stats(),
+        "pdf_render": pdf_renderer.snapshot(),
+        "pdf_cache": pdf_cache_stats(),
+        "providers": provider_stats(),
     }
 
 
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+
+class AISuggestionCache(Base):
+    """
+    Cache persistente das sugestões do provider de IA por (tenant, descrição normalizada).
+    `cache_key` = sha1(modelo | prompt | descrição normalizada); category_id NULL = IA não sugeriu nada.
+    """
+
+    __tablename__ = "ai_suggestion_cache"
+    __table_args__ = (
+        Index(
+            "ux_ai_suggestion_cache_key",
+            "tenant_id",
+            "cache_key",
+            unique=True,
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+
+    tenant_id: Mapped[int] = mapped_column(nullable=False)
+    cache_key: Mapped[str] = mapped_column(String(40), nullable=False)
+    category_id: Mapped[int | None] = mapped_column(nullable=True)
+    confidence: Mapped[float] = mapped_column(Float, default=0.0)
+    reason: Mapped[str | None] = mapped_column(String(200), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
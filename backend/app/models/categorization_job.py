@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, Boolean, DateTime, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+
+class CategorizationJob(Base):
+    """
+    Job de categorização do backlog inteiro de uma empresa (sem categoria).
+    O checkpoint (cursor_occurred_at, cursor_id) é gravado na mesma transação do UPDATE
+    de cada lote: depois de queda/redeploy o job continua do último lote confirmado.
+    status: pending | running | done | failed
+    """
+
+    __tablename__ = "categorization_jobs"
+    __table_args__ = (
+        Index("ix_categorization_jobs_status_heartbeat", "status", "heartbeat_at"),
+        Index("ix_categorization_jobs_tenant_company", "tenant_id", "company_id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+
+    tenant_id: Mapped[int] = mapped_column(nullable=False)
+    company_id: Mapped[int] = mapped_column(nullable=False)
+
+    status: Mapped[str] = mapped_column(String(12), nullable=False, default="pending")
+    # período opcional (NULL = histórico inteiro com occurred_at)
+    start_dt: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    end_dt: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    use_ai: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    batch_size: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # última linha processada (keyset occurred_at DESC, id DESC)
+    cursor_occurred_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    cursor_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+
+    scanned: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    suggested: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    skipped: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    batches: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # {"learned": n, "rule-based": n, "openai": n, "no_match": n}
+    providers: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # tempo de processamento somado entre retomadas (base do rows/s)
+    elapsed_ms: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[str | None] = mapped_column(String(200), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
@@ -0,0 +1,31 @@
+from sqlalchemy import Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+
+class CategoryTokenStat(Base):
+    """
+    Índice aprendido token -> categoria por tenant: quantas transações categorizadas
+    com `category_id` têm `token` na descrição. Mantido incrementalmente pelas rotas de
+    categorização; rebuild via scripts/mine_category_rules.py.
+    """
+
+    __tablename__ = "category_token_stats"
+    __table_args__ = (
+        Index(
+            "ux_category_token_stats_key",
+            "tenant_id",
+            "token",
+            "category_id",
+            unique=True,
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+
+    tenant_id: Mapped[int] = mapped_column(nullable=False)
+    token: Mapped[str] = mapped_column(String(40), nullable=False)
+    category_id: Mapped[int] = mapped_column(nullable=False)
+
+    hits: Mapped[int] = mapped_column(Integer, default=0)
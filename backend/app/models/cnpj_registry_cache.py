@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+
+class CnpjRegistryCache(Base):
+    """
+    Cache global (sem tenant) dos dados públicos de um CNPJ, já normalizados por
+    _build_company_business_data. payload = JSON (datas ISO, Decimal como string).
+    """
+
+    __tablename__ = "cnpj_registry_cache"
+
+    cnpj: Mapped[str] = mapped_column(String(14), primary_key=True)
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+    fetched_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -1,7 +1,7 @@
-from datetime import date
+from datetime import date, datetime
 from decimal import Decimal
 
-from sqlalchemy import Boolean, Date, JSON, Numeric, String, UniqueConstraint
+from sqlalchemy import Boolean, Date, DateTime, Integer, JSON, Numeric, String, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db import Base
@@ -53,4 +53,10 @@ class Company(Base):
 
     qsa: Mapped[list | None] = mapped_column(JSON, nullable=True)
 
+    # última vez que os dados cadastrais vieram do provedor (política de reenriquecimento)
+    registry_checked_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
     tenant_id: Mapped[int] = mapped_column(nullable=False, index=True)
+
+    # incrementado a cada escrita em transações/categorização (chave do cache de relatórios)
+    data_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default=text("0"))
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+
+class CompanyEnrichmentTask(Base):
+    """
+    Fila persistente de (re)enriquecimento de empresas no provedor de CNPJ.
+    Uma linha por empresa: reenfileirar = voltar a linha para `pending`.
+    status: pending | running | done | failed
+    """
+
+    __tablename__ = "company_enrichment_queue"
+    __table_args__ = (
+        Index(
+            "ux_company_enrichment_queue_company",
+            "tenant_id",
+            "company_id",
+            unique=True,
+        ),
+        Index("ix_company_enrichment_queue_status_run_after", "status", "run_after"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+
+    tenant_id: Mapped[int] = mapped_column(nullable=False)
+    company_id: Mapped[int] = mapped_column(nullable=False)
+    cnpj: Mapped[str] = mapped_column(String(14), nullable=False)
+
+    # missing (sem dados cadastrais) | stale (dados antigos) | manual
+    reason: Mapped[str] = mapped_column(String(20), nullable=False)
+    status: Mapped[str] = mapped_column(String(12), nullable=False, default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    run_after: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    last_error: Mapped[str | None] = mapped_column(String(200), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class CompanyEnrichmentRun(Base):
+    """Métricas de cada rodada do worker de enriquecimento (só rodadas com trabalho)."""
+
+    __tablename__ = "company_enrichment_runs"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+
+    trigger: Mapped[str] = mapped_column(String(20), nullable=False)
+    started_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    duration_ms: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    enqueued_stale: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    claimed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    not_found: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    retried: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    failed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
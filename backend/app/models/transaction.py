@@ -1,10 +1,42 @@
-from sqlalchemy import String, Integer, ForeignKey, DateTime
+from sqlalchemy import String, Integer, ForeignKey, DateTime, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 from app.db import Base
 from datetime import datetime
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # predicado padrão de relatórios/sugestões: tenant + empresa + faixa de occurred_at
+        # (INCLUDE deixa as agregações index-only no Postgres)
+        Index(
+            "ix_transactions_tenant_company_occurred",
+            "tenant_id",
+            "company_id",
+            "occurred_at",
+            "id",
+            postgresql_include=["kind", "amount_cents", "category_id"],
+        ),
+        # data quality: só as transações sem categoria
+        Index(
+            "ix_transactions_uncategorized",
+            "tenant_id",
+            "company_id",
+            "occurred_at",
+            "id",
+            postgresql_where=text("category_id IS NULL"),
+            sqlite_where=text("category_id IS NULL"),
+        ),
+        # idempotência da importação em lote (/transactions/bulk)
+        Index(
+            "ux_transactions_external_id",
+            "tenant_id",
+            "company_id",
+            "external_id",
+            unique=True,
+            postgresql_where=text("external_id IS NOT NULL"),
+            sqlite_where=text("external_id IS NOT NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 
@@ -21,4 +53,7 @@ class Transaction(Base):
     occurred_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
 
     description: Mapped[str] = mapped_column(String(200), default="")
+
+    # chave de idempotência do lançamento de origem (FITID do OFX, id do extrato...)
+    external_id: Mapped[str | None] = mapped_column(String(80), nullable=True)
     tenant_id: Mapped[int] = mapped_column(nullable=False, index=True)
@@ -0,0 +1,41 @@
+from datetime import date
+
+from sqlalchemy import BigInteger, Date, ForeignKey, Index, Integer, String, func, literal_column
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+
+class TransactionDailyRollup(Base):
+    """
+    Agregado diário de transações por (tenant, empresa, dia, categoria, kind).
+    Mantido incrementalmente pelas rotas de escrita; rebuild via scripts/rebuild_daily_rollup.py.
+    """
+
+    __tablename__ = "transaction_daily_rollup"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+
+    tenant_id: Mapped[int] = mapped_column(nullable=False)
+    company_id: Mapped[int] = mapped_column(ForeignKey("companies.id"), nullable=False)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    category_id: Mapped[int | None] = mapped_column(nullable=True)
+
+    # "in" (entrada) ou "out" (saida)
+    kind: Mapped[str] = mapped_column(String(3))
+
+    amount_cents: Mapped[int] = mapped_column(BigInteger, default=0)
+    tx_count: Mapped[int] = mapped_column(Integer, default=0)
+
+
+# Chave única da linha. category_id NULL ("sem categoria") entra como 0 para o índice
+# tratar NULLs como iguais (ids de categoria começam em 1); é também o alvo do ON CONFLICT.
+ROLLUP_KEY = [
+    TransactionDailyRollup.tenant_id,
+    TransactionDailyRollup.company_id,
+    TransactionDailyRollup.day,
+    func.coalesce(TransactionDailyRollup.category_id, literal_column("0")),
+    TransactionDailyRollup.kind,
+]
+
+Index("ux_transaction_daily_rollup_key", *ROLLUP_KEY, unique=True)
@@ -4,7 +4,7 @@ from datetime import date, datetime
 from decimal import Decimal
 from pydantic import BaseModel, Field, AliasChoices, ConfigDict, model_validator
 
-from app.schemas.reports import Period, Totals, CategoryBreakdown, TransactionBrief
+from app.schemas.reports import Period, PeriodComparisonTotals, Totals, CategoryBreakdown, TransactionBrief
 
 
 class PeriodIn(BaseModel):
@@ -93,6 +93,7 @@ class AiConsultResponse(BaseModel):
     numbers: Totals
     top_categories: list[CategoryBreakdown]
     recent_transactions: list[TransactionBrief]
+    comparison: PeriodComparisonTotals | None = None
 
 
 class AIPeriod(BaseModel):
@@ -134,18 +135,55 @@ class AIApplySuggestionsRequest(BaseModel):
     company_id: int = Field(..., ge=1)
     start: str | None = Field(default=None, validation_alias=AliasChoices("start", "start_date"))
     end: str | None = Field(default=None, validation_alias=AliasChoices("end", "end_date"))
-    limit: int = Field(200, ge=1, le=500)
+    limit: int = Field(200, ge=1, le=5000)
     dry_run: bool = False
     include_no_match: bool = False
+    cursor: str | None = None
 
 
 class AIApplySuggestionsResponse(BaseModel):
     company_id: int
     period: dict
     dry_run: bool
+    scanned: int = 0
     suggested: int
     updated: int
+    updated_by_category: dict[int, int] = {}
+    next_cursor: str | None = None
     items: list[AISuggestedItem] = []
     missing_ids: list[int] = []
     skipped_ids: list[int] = []
     invalid_category_ids: list[int] = []
+
+
+class CategorizeJobCreate(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    company_id: int = Field(..., ge=1)
+    # sem período: todo o histórico sem categoria
+    start: str | None = Field(default=None, validation_alias=AliasChoices("start", "start_date"))
+    end: str | None = Field(default=None, validation_alias=AliasChoices("end", "end_date"))
+    use_ai: bool = False
+    batch_size: int | None = Field(default=None, ge=1, le=5000)
+
+
+class CategorizeJobOut(BaseModel):
+    job_id: int
+    company_id: int
+    status: str
+    period: dict
+    use_ai: bool
+    batch_size: int
+    batches: int
+    scanned: int
+    suggested: int
+    updated: int
+    skipped: int
+    providers: dict[str, int] = {}
+    rows_per_s: float = 0.0
+    cursor: str | None = None
+    attempts: int = 0
+    last_error: str | None = None
+    created_at: datetime | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
@@ -51,3 +51,35 @@ class CompanyOut(BaseModel):
     qsa: list | None = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class CompanyBulkLookupRequest(BaseModel):
+    cnpjs: list[str] = Field(min_length=1)
+
+
+class CompanyBulkLookupItem(BaseModel):
+    input: str
+    cnpj: str | None = None
+    # invalid | duplicate | existing | created | enriched | not_found | error
+    status: str
+    company_id: int | None = None
+    error: str | None = None
+
+
+class CompanyBulkLookupResponse(BaseModel):
+    total: int
+    unique: int
+    counts: dict[str, int]
+    items: list[CompanyBulkLookupItem]
+
+
+class CompanyBulkLookupJobOut(BaseModel):
+    job_id: str
+    # queued | running | done | failed
+    status: str
+    total: int
+    unique: int
+    done: int
+    counts: dict[str, int]
+    error: str | None = None
+    items: list[CompanyBulkLookupItem] | None = None
@@ -68,3 +68,72 @@ class TopCategoriesResponse(BaseModel):
     period: Period
     metric: str
     items: list[CategoryBreakdown]
+
+
+class PeriodDelta(BaseModel):
+    entradas_cents: int
+    saidas_cents: int
+    saldo_cents: int
+    qtd_transacoes: int
+    entradas_pct: float | None = Field(default=None, description="Variação % (None se a base é zero)")
+    saidas_pct: float | None = None
+
+
+class PeriodComparisonTotals(BaseModel):
+    previous_period: Period
+    yoy_period: Period
+    current: Totals
+    previous: Totals
+    yoy: Totals
+    vs_previous: PeriodDelta
+    vs_yoy: PeriodDelta
+
+
+class CategoryComparison(BaseModel):
+    category_id: int | None
+    category_name: str
+    entradas_cents: int
+    saidas_cents: int
+    previous_entradas_cents: int
+    previous_saidas_cents: int
+    yoy_entradas_cents: int
+    yoy_saidas_cents: int
+    saidas_delta_cents: int
+    saidas_delta_pct: float | None = None
+
+
+class TrendPoint(DailyPoint):
+    entradas_mm_cents: int
+    saidas_mm_cents: int
+
+
+class CompareResponse(BaseModel):
+    company_id: int
+    period: Period
+    comparison: PeriodComparisonTotals
+    by_category: list[CategoryComparison]
+    moving_average_days: int
+    series: list[TrendPoint]
+
+
+class SeriesPoint(BaseModel):
+    date: str = Field(description="Início do bucket (YYYY-MM-DD)")
+    entradas_cents: int
+    saidas_cents: int
+    saldo_cents: int
+    saldo_acumulado_cents: int
+    qtd_transacoes: int
+
+
+class CategorySeries(BaseModel):
+    category_id: int | None
+    category_name: str
+    series: list[SeriesPoint]
+
+
+class SeriesResponse(BaseModel):
+    company_id: int
+    period: Period
+    granularity: str
+    series: list[SeriesPoint]
+    by_category: list[CategorySeries] | None = None
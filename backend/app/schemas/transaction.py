@@ -2,6 +2,8 @@ from pydantic import BaseModel, ConfigDict
 from typing import Literal
 from datetime import datetime
 
+from app.schemas.reports import Period, TransactionBrief
+
 
 class TransactionCreate(BaseModel):
     company_id: int
@@ -38,3 +40,36 @@ class BulkCategorizeRequest(BaseModel):
 class BulkCategorizeResponse(BaseModel):
     company_id: int
     updated: int
+
+
+class BulkIngestError(BaseModel):
+    row: int
+    external_id: str | None = None
+    error: str
+
+
+class BulkIngestResponse(BaseModel):
+    company_id: int
+    received: int
+    inserted: int
+    duplicates: int
+    error_count: int
+    errors: list[BulkIngestError]
+
+
+class UncategorizedSuggestion(BaseModel):
+    suggested_category_id: int | None = None
+    confidence: float = 0.0
+    rule: str = "no_match"
+    provider: str = "rule-based"
+
+
+class UncategorizedTransaction(TransactionBrief):
+    # só com suggest=true (regras aprendidas + regras fixas; sem IA)
+    suggestion: UncategorizedSuggestion | None = None
+
+
+class UncategorizedCount(BaseModel):
+    company_id: int
+    period: Period
+    uncategorized_count: int
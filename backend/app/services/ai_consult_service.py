@@ -1,15 +1,17 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone
-from typing import Any
+from datetime import datetime, timezone
+from typing import Any, Callable
 
-from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.api import reports as rep
-from app.models.category import Category
 from app.models.company import Company
-from app.models.transaction import Transaction
+from app.services.period_comparison import PeriodComparison, compare_periods
+from app.services.report_service import aggregate_period
+from app.services.report_service import recent_transactions as report_recent_transactions
+from app.services.report_cache import cached_report, cached_report_async, report_key
 
 
 def _infer_company_open_status(company: Company) -> bool | None:
@@ -75,142 +77,107 @@ def _build_company_summary(company: Company | None) -> dict | None:
     }
 
 
+def _consult_plan(db: Session, payload: Any, tenant_id: int) -> tuple[str, Callable[[Session], dict]]:
+    """Chave de cache (linha da empresa + período) e o cálculo do consult, sem calcular ainda."""
+    company = rep._get_company(db, payload.company_id, tenant_id)
+
+    start_dt, end_dt, period = rep._resolve_period(payload.start, payload.end)
+
+    key = report_key(
+        "ai-consult",
+        tenant_id=tenant_id,
+        company=company,
+        start=payload.start,
+        end=payload.end,
+        start_dt=start_dt,
+        end_dt=end_dt,
+        limit=payload.limit,
+    )
+    def _build(s: Session) -> dict:
+        return _build_consult(
+            db=s,
+            payload=payload,
+            tenant_id=tenant_id,
+            company=company,
+            start_dt=start_dt,
+            end_dt=end_dt,
+            period=period,
+        )
+
+    return key, _build
+
+
 def run_ai_consult(
     *,
     db: Session,
     payload: Any,
     tenant_id: int,
 ) -> dict:
-    rep._ensure_company(db, payload.company_id, tenant_id)
+    key, build = _consult_plan(db, payload, tenant_id)
+    return cached_report(key, lambda: build(db))
 
-    company = db.scalar(
-        select(Company)
-        .where(Company.id == payload.company_id)
-        .where(Company.tenant_id == tenant_id)
-    )
 
-    start_dt, end_dt, period = rep._resolve_period(payload.start, payload.end)
-    totals = rep._totals_row(db, payload.company_id, start_dt, end_dt, tenant_id)
-    by_cat = rep._by_category(db, payload.company_id, start_dt, end_dt, tenant_id)
-    semcat = next((c for c in by_cat if getattr(c, "category_id", None) is None), None)
+async def run_ai_consult_async(
+    *,
+    db: AsyncSession,
+    payload: Any,
+    tenant_id: int,
+) -> dict:
+    """Versão async: consultas via run_sync; o cache fica fora do event loop (cached_report_async)."""
+    key, build = await db.run_sync(lambda s: _consult_plan(s, payload, tenant_id))
+    return await cached_report_async(db, key, build)
 
-    try:
-        days_prev = (end_dt.date() - start_dt.date()).days + 1
-        prev_end = start_dt.date() - timedelta(days=1)
-        prev_start = prev_end - timedelta(days=days_prev - 1)
-
-        prev_start_dt = datetime(prev_start.year, prev_start.month, prev_start.day, 0, 0, 0)
-        prev_end_dt = datetime(prev_end.year, prev_end.month, prev_end.day, 23, 59, 59, 999999)
-
-        totals_prev = rep._totals_row(db, payload.company_id, prev_start_dt, prev_end_dt, tenant_id)
-        prev_saidas = int(getattr(totals_prev, "saidas_cents", 0) or 0)
-    except Exception:
-        prev_saidas = 0
-
-    q_recent = (
-        select(
-            Transaction.id,
-            Transaction.occurred_at,
-            Transaction.kind,
-            Transaction.amount_cents,
-            Transaction.category_id,
-            func.coalesce(Category.name, "Sem categoria").label("category_name"),
-            Transaction.description,
-        )
-        .select_from(Transaction)
-        .outerjoin(Category, Category.id == Transaction.category_id)
-        .where(
-            Transaction.company_id == payload.company_id,
-            Transaction.tenant_id == tenant_id,
-            Transaction.occurred_at.is_not(None),
-            Transaction.occurred_at >= start_dt,
-            Transaction.occurred_at <= end_dt,
-        )
-        .order_by(Transaction.occurred_at.desc())
-        .limit(payload.limit)
+
+def _build_consult(
+    *,
+    db: Session,
+    payload: Any,
+    tenant_id: int,
+    company: Company,
+    start_dt: datetime,
+    end_dt: datetime,
+    period: Any,
+) -> dict:
+    # descrições/recorrentes (transações do período) + comparação atual/anterior/ano
+    # anterior com série diária (uma query no rollup): todos os sinais saem daqui
+    agg = aggregate_period(
+        db,
+        tenant_id=tenant_id,
+        company_id=payload.company_id,
+        start_dt=start_dt,
+        end_dt=end_dt,
+        with_descriptions=True,
+    )
+    cmp = compare_periods(
+        db,
+        tenant_id=tenant_id,
+        company_id=payload.company_id,
+        start_dt=start_dt,
+        end_dt=end_dt,
     )
+    totals = agg.totals
+    by_cat = agg.by_category
+    semcat = next((c for c in by_cat if getattr(c, "category_id", None) is None), None)
+    previous = cmp.totals.previous
+    prev_saidas = previous.saidas_cents
 
     recent_transactions = [
-        {
-            "id": r.id,
-            "occurred_at": r.occurred_at,
-            "kind": r.kind,
-            "amount_cents": int(r.amount_cents),
-            "category_id": r.category_id,
-            "category_name": str(r.category_name),
-            "description": r.description or "",
-        }
-        for r in db.execute(q_recent).all()
+        tx.model_dump()
+        for tx in report_recent_transactions(
+            db,
+            tenant_id=tenant_id,
+            company_id=payload.company_id,
+            start_dt=start_dt,
+            end_dt=end_dt,
+            limit=payload.limit,
+        )
     ]
 
     by_out = sorted(by_cat or [], key=lambda c: int(getattr(c, "saidas_cents", 0) or 0), reverse=True)
     top_out_cats = [c for c in by_out if int(getattr(c, "saidas_cents", 0) or 0) > 0][:3]
 
-    desc_raw = func.coalesce(Transaction.description, "")
-    desc_key = func.lower(func.trim(desc_raw))
-    desc_key = case((desc_key == "", "(sem descrição)"), else_=desc_key)
-
-    q_desc = (
-        select(
-            desc_key.label("k"),
-            func.sum(Transaction.amount_cents).label("sum_cents"),
-            func.count(Transaction.id).label("cnt"),
-            func.max(desc_raw).label("sample"),
-        )
-        .where(
-            Transaction.company_id == payload.company_id,
-            Transaction.tenant_id == tenant_id,
-            Transaction.occurred_at.is_not(None),
-            Transaction.occurred_at >= start_dt,
-            Transaction.occurred_at <= end_dt,
-            Transaction.kind == "out",
-        )
-        .group_by(desc_key)
-        .order_by(func.sum(Transaction.amount_cents).desc(), desc_key.asc())
-        .limit(5)
-    )
-
-    rows_desc = db.execute(q_desc).all()
-    top_desc = []
-    for r in rows_desc:
-        sample = (getattr(r, "sample", "") or getattr(r, "k", "") or "(sem descrição)").strip()
-        top_desc.append(
-            {
-                "sample": sample[:80],
-                "sum": int(getattr(r, "sum_cents", 0) or 0),
-                "cnt": int(getattr(r, "cnt", 0) or 0),
-            }
-        )
-
-    q_rec = (
-        select(
-            desc_key.label("k"),
-            func.sum(Transaction.amount_cents).label("sum_cents"),
-            func.count(Transaction.id).label("cnt"),
-            func.max(desc_raw).label("sample"),
-        )
-        .where(
-            Transaction.company_id == payload.company_id,
-            Transaction.tenant_id == tenant_id,
-            Transaction.occurred_at.is_not(None),
-            Transaction.occurred_at >= start_dt,
-            Transaction.occurred_at <= end_dt,
-            Transaction.kind == "out",
-        )
-        .group_by(desc_key)
-        .having(func.count(Transaction.id) >= 2)
-        .order_by(func.sum(Transaction.amount_cents).desc(), desc_key.asc())
-        .limit(3)
-    )
-
-    rows_rec = db.execute(q_rec).all()
-    recurring = []
-    for r in rows_rec:
-        s = (getattr(r, "sample", "") or getattr(r, "k", "") or "(sem descrição)").strip()
-        s_sum = int(getattr(r, "sum_cents", 0) or 0)
-        s_cnt = int(getattr(r, "cnt", 0) or 0)
-        if s_cnt >= 2 and s_sum >= 1000:
-            recurring.append({"sample": s[:80], "sum": s_sum, "cnt": s_cnt})
+    top_desc = [g.as_dict() for g in agg.top_descriptions]
+    recurring = [g.as_dict() for g in agg.recurring]
 
     entradas = int(getattr(totals, "entradas_cents", 0) or 0)
     saidas = int(getattr(totals, "saidas_cents", 0) or 0)
@@ -241,6 +208,8 @@ def run_ai_consult(
     if prev_saidas and saidas > prev_saidas:
         risks.append("As saídas cresceram em relação ao período anterior equivalente.")
 
+    _comparison_signals(cmp, insights=insights, risks=risks, actions=actions)
+
     if avg_daily_out_cents > 0:
         insights.append(f"Média diária de saídas no período: {avg_daily_out_cents} cents.")
 
@@ -294,4 +263,51 @@ def run_ai_consult(
         },
         "top_categories": top_categories,
         "recent_transactions": recent_transactions_out,
+        "comparison": cmp.totals,
     }
+
+
+_TREND_RATIO = 1.2
+_CATEGORY_GROWTH_PCT = 20.0
+_CATEGORY_GROWTH_MIN_CENTS = 1000
+_ENTRADAS_SHIFT_PCT = 10.0
+
+
+def _comparison_signals(cmp: PeriodComparison, *, insights: list, risks: list, actions: list) -> None:
+    """Sinais derivados da comparação de períodos (sem queries adicionais)."""
+    totals = cmp.totals
+    vs_prev, vs_yoy = totals.vs_previous, totals.vs_yoy
+
+    if vs_prev.entradas_pct is not None and vs_prev.entradas_pct <= -_ENTRADAS_SHIFT_PCT:
+        risks.append(f"As entradas caíram {abs(vs_prev.entradas_pct):.1f}% em relação ao período anterior equivalente.")
+        actions.append("Investigar a queda de receita: clientes, sazonalidade e recebimentos em atraso.")
+    elif vs_prev.entradas_pct is not None and vs_prev.entradas_pct >= _ENTRADAS_SHIFT_PCT:
+        insights.append(f"As entradas cresceram {vs_prev.entradas_pct:.1f}% em relação ao período anterior equivalente.")
+
+    if totals.previous.saldo_cents > 0 and totals.current.saldo_cents < 0:
+        risks.append("O saldo ficou negativo depois de um período anterior positivo.")
+
+    if vs_yoy.saidas_pct is not None and vs_yoy.saidas_pct != 0:
+        direction = "acima" if vs_yoy.saidas_pct > 0 else "abaixo"
+        insights.append(f"Saídas {abs(vs_yoy.saidas_pct):.1f}% {direction} do mesmo período do ano anterior.")
+
+    growing = [
+        c
+        for c in cmp.by_category
+        if c.previous_saidas_cents > 0
+        and c.saidas_delta_cents >= _CATEGORY_GROWTH_MIN_CENTS
+        and (c.saidas_delta_pct or 0) >= _CATEGORY_GROWTH_PCT
+    ]
+    if growing:
+        top = max(growing, key=lambda c: c.saidas_delta_cents)
+        risks.append(f"Saídas em '{top.category_name}' subiram {top.saidas_delta_pct:.1f}% frente ao período anterior.")
+        actions.append(f"Revisar os gastos da categoria '{top.category_name}'.")
+
+    # tendência: média móvel do fim da janela x média móvel da primeira janela completa
+    w = cmp.moving_average_days
+    if len(cmp.series) >= 2 * w:
+        first, last = cmp.series[w - 1].saidas_mm_cents, cmp.series[-1].saidas_mm_cents
+        if first > 0 and last >= first * _TREND_RATIO:
+            risks.append(f"Tendência de alta nas saídas diárias (média móvel de {w} dias).")
+        elif first > 0 and last * _TREND_RATIO <= first:
+            insights.append(f"Tendência de queda nas saídas diárias (média móvel de {w} dias).")
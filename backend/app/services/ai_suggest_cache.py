@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.ai.provider import CachedSuggestion
+from app.core.settings import settings
+from app.db import dialect_insert
+from app.models.ai_suggestion_cache import AISuggestionCache as Entry
+
+_IN_CHUNK = 500
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class DbSuggestCache:
+    """SuggestCache do provider de IA sobre a tabela ai_suggestion_cache (escopo: um tenant). Não faz commit."""
+
+    def __init__(self, db: Session, tenant_id: int, *, ttl_s: int | None = None) -> None:
+        self.db = db
+        self.tenant_id = tenant_id
+        self.ttl_s = settings.AI_SUGGEST_CACHE_TTL_S if ttl_s is None else ttl_s
+        self.writes = 0
+
+    def get_many(self, keys: Sequence[str]) -> dict[str, CachedSuggestion]:
+        keys = list(keys)
+        if not keys or self.ttl_s <= 0:
+            return {}
+        fresh_after = _now() - timedelta(seconds=self.ttl_s)
+        out: dict[str, CachedSuggestion] = {}
+        for i in range(0, len(keys), _IN_CHUNK):
+            q = select(Entry.cache_key, Entry.category_id, Entry.confidence, Entry.reason).where(
+                Entry.tenant_id == self.tenant_id,
+                Entry.cache_key.in_(keys[i:i + _IN_CHUNK]),
+                Entry.created_at >= fresh_after,
+            )
+            for r in self.db.execute(q):
+                out[r.cache_key] = CachedSuggestion(category_id=r.category_id, confidence=float(r.confidence or 0.0), reason=r.reason)
+        return out
+
+    def set_many(self, entries: dict[str, CachedSuggestion]) -> None:
+        """Grava/renova as entradas com INSERT ... ON CONFLICT DO UPDATE (corrida entre requests não vira erro)."""
+        if not entries or self.ttl_s <= 0:
+            return
+        now = _now()
+        rows = [
+            {
+                "tenant_id": self.tenant_id,
+                "cache_key": key,
+                "category_id": s.category_id,
+                "confidence": float(s.confidence or 0.0),
+                "reason": (s.reason or None) and s.reason[:200],
+                "created_at": now,
+            }
+            for key, s in sorted(entries.items())
+        ]
+        stmt = dialect_insert(self.db, Entry.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["tenant_id", "cache_key"],
+            set_={col: stmt.excluded[col] for col in ("category_id", "confidence", "reason", "created_at")},
+        )
+        self.db.execute(stmt, rows)
+        self.writes += len(entries)
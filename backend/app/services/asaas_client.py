@@ -3,6 +3,7 @@ from typing import Any
 
 import httpx
 
+from app.core.resilience import get_guard
 from app.core.settings import settings
 
 
@@ -80,9 +81,10 @@ class AsaasClient:
 
         effective_billing_type = "PIX" if str(billing_type or "").upper() == "PIX" else billing_type
 
-        with httpx.Client(
+        guard = get_guard("asaas")
+        with guard.call(), httpx.Client(
             base_url=self.base_url,
-            timeout=self.timeout_s,
+            timeout=guard.timeout(self.timeout_s),
             headers=self._headers(),
         ) as client:
             customer_id = self._create_customer(
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Any, Sequence
+
+# Categorização rule-based (data quality).
+# As regras viram UM regex combinado (compilado uma vez por versão das regras).
+# Descrições e palavras-chave são normalizadas (minúsculas, sem acento) e o
+# casamento respeita fronteira de palavra: palavras-chave curtas (<= 3 letras)
+# exigem a palavra inteira ("das" não casa "vendas"); as demais casam como
+# prefixo de palavra ("transfer" casa "transferência", "super" casa "supermercado").
+# Precedência igual à do laço antigo: vence a primeira regra da lista e, dentro
+# dela, a primeira palavra-chave listada que aparece na descrição.
+
+DEFAULT_RULES: tuple[dict[str, Any], ...] = (
+    {"rule": "pix|qr|transfer", "keywords": ["pix", "qr", "transfer"], "category_name": "Vendas", "confidence": 0.70},
+    {"rule": "venda|cliente|pedido", "keywords": ["venda", "cliente", "pedido"], "category_name": "Vendas", "confidence": 0.80},
+    {"rule": "frete|entrega|transport", "keywords": ["frete", "entrega", "transport"], "category_name": "Fretes", "confidence": 0.75},
+    {"rule": "aluguel|locacao", "keywords": ["aluguel", "locacao", "locação"], "category_name": "Aluguel", "confidence": 0.85},
+    {"rule": "luz|energia|celesc", "keywords": ["luz", "energia", "celesc"], "category_name": "Energia", "confidence": 0.85},
+    {"rule": "agua|água|samae", "keywords": ["agua", "água", "samae"], "category_name": "Água", "confidence": 0.85},
+    {"rule": "internet|wifi|provedor", "keywords": ["internet", "wifi", "provedor"], "category_name": "Internet", "confidence": 0.80},
+    {"rule": "servidor|server|hosting|vps|cloud|aws|azure|gcp|dominio|dns", "keywords": ["servidor","server","hosting","vps","cloud","aws","azure","gcp","dominio","domínio","dns"], "category_name": "Internet", "confidence": 0.78},
+    {"rule": "mercado|super|padaria", "keywords": ["mercado", "super", "padaria"], "category_name": "Compras", "confidence": 0.75},
+    {"rule": "combustivel|gasolina|posto", "keywords": ["combustivel", "combustível", "gasolina", "posto"], "category_name": "Combustível", "confidence": 0.80},
+    {"rule": "salario|folha|pagamento", "keywords": ["salario", "salário", "folha", "pagamento"], "category_name": "Salários", "confidence": 0.80},
+    {"rule": "imposto|taxa|das|simples", "keywords": ["imposto", "taxa", "das", "simples"], "category_name": "Impostos", "confidence": 0.80},
+    {"rule": "teste|testes|qa|homolog|homologacao|homologação|experimento", "keywords": ["teste","testes","qa","homolog","homologacao","homologação","experimento"], "category_name": "Testes", "confidence": 0.60},
+)
+
+_WHOLE_WORD_MAX_LEN = 3
+
+
+def _build_fold_table() -> dict[int, str]:
+    # minúsculas latinas acentuadas -> base ASCII (tamanho preservado: 1 char -> 1 char)
+    table: dict[int, str] = {}
+    for cp in range(0x00C0, 0x0250):
+        ch = chr(cp)
+        base = "".join(c for c in unicodedata.normalize("NFKD", ch) if not unicodedata.combining(c))
+        if len(base) == 1 and base.isascii() and base != ch:
+            table[cp] = base.lower()
+    # separador do lote nunca aparece dentro de uma descrição
+    table[ord("\n")] = " "
+    return table
+
+
+_FOLD = _build_fold_table()
+
+
+def normalize_text(s: str | None) -> str:
+    """Minúsculas, sem acento, sem quebra de linha."""
+    t = (s or "").lower()
+    if not t.isascii():
+        return t.translate(_FOLD)
+    return t.replace("\n", " ") if "\n" in t else t
+
+
+def _trie_pattern(words: Sequence[str]) -> str:
+    """Alternância fatorada por prefixo (o `re` não otimiza alternâncias de literais)."""
+    root: dict = {}
+    for w in words:
+        node = root
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        # fim de palavra-chave aqui: o resto é opcional (guloso = mais longa primeiro)
+        return "(?:" + body + ")?" if "" in node else body
+
+    return emit(root)
+
+
+@dataclass(frozen=True)
+class RuleMatch:
+    rule: dict[str, Any]
+    keyword: str
+
+
+class KeywordMatcher:
+    """Regex único sobre todas as palavras-chave; classifica uma descrição ou um lote."""
+
+    def __init__(self, rules: Sequence[dict[str, Any]]) -> None:
+        self.rules = list(rules)
+        # palavra-chave normalizada -> (prioridade, regra, palavra original); a primeira ocorrência vence
+        self._by_keyword: dict[str, tuple[tuple[int, int], dict[str, Any], str]] = {}
+        for ri, rule in enumerate(self.rules):
+            for ki, kw in enumerate(rule.get("keywords") or []):
+                norm = normalize_text(kw).strip()
+                if norm and norm not in self._by_keyword:
+                    self._by_keyword[norm] = ((ri, ki), rule, kw)
+
+        # o regex devolve a palavra-chave mais longa numa posição; palavras-chave de prefixo
+        # mais curtas também casariam ali, então a prioridade efetiva é a melhor entre elas
+        for kw in list(self._by_keyword):
+            for other, entry in list(self._by_keyword.items()):
+                if other != kw and len(other) > _WHOLE_WORD_MAX_LEN and kw.startswith(other) and entry[0] < self._by_keyword[kw][0]:
+                    self._by_keyword[kw] = entry
+
+        prefix_kws = [kw for kw in self._by_keyword if len(kw) > _WHOLE_WORD_MAX_LEN]
+        word_kws = [kw for kw in self._by_keyword if len(kw) <= _WHOLE_WORD_MAX_LEN]
+        alternatives = []
+        if prefix_kws:
+            alternatives.append(_trie_pattern(prefix_kws))
+        if word_kws:
+            alternatives.append("(?:" + _trie_pattern(word_kws) + r")\b")
+        self.pattern = re.compile(r"(?<!\w)(?:" + "|".join(alternatives) + ")") if alternatives else None
+
+    def _best(self, matches) -> RuleMatch | None:
+        best = None
+        for m in matches:
+            entry = self._by_keyword[m.group()]
+            if best is None or entry[0] < best[0]:
+                best = entry
+        return RuleMatch(rule=best[1], keyword=best[2]) if best else None
+
+    def match(self, description: str | None) -> RuleMatch | None:
+        if self.pattern is None:
+            return None
+        return self._best(self.pattern.finditer(normalize_text(description)))
+
+    def match_many(self, descriptions: Sequence[str | None]) -> list[RuleMatch | None]:
+        """
+        Classifica um lote numa só varredura: as descrições normalizadas são unidas
+        por "\\n" e cada casamento é atribuído à linha pelo seu offset.
+        """
+        out: list[RuleMatch | None] = [None] * len(descriptions)
+        if self.pattern is None or not descriptions:
+            return out
+
+        texts = [normalize_text(d) for d in descriptions]
+        ends = list(accumulate(len(t) + 1 for t in texts))  # offset logo após o "\n" de cada linha
+        joined = "\n".join(texts)
+
+        best: dict[int, tuple[tuple[int, int], dict[str, Any], str]] = {}
+        row = 0
+        for m in self.pattern.finditer(joined):
+            start = m.start()
+            while ends[row] <= start:
+                row += 1
+            entry = self._by_keyword[m.group()]
+            cur = best.get(row)
+            if cur is None or entry[0] < cur[0]:
+                best[row] = entry
+
+        for i, (_prio, rule, kw) in best.items():
+            out[i] = RuleMatch(rule=rule, keyword=kw)
+        return out
+
+
+def rules_version(rules: Sequence[dict[str, Any]]) -> str:
+    raw = json.dumps(list(rules), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+_matchers: dict[str, KeywordMatcher] = {}
+_matchers_lock = threading.Lock()
+
+
+_DEFAULT_VERSION = rules_version(DEFAULT_RULES)
+
+
+def get_matcher(rules: Sequence[dict[str, Any]] | None = None) -> KeywordMatcher:
+    """Matcher compilado, em cache por versão (hash) das regras."""
+    rules = DEFAULT_RULES if rules is None else rules
+    version = _DEFAULT_VERSION if rules is DEFAULT_RULES else rules_version(rules)
+    matcher = _matchers.get(version)
+    if matcher is None:
+        with _matchers_lock:
+            matcher = _matchers.get(version)
+            if matcher is None:
+                matcher = KeywordMatcher(rules)
+                _matchers[version] = matcher
+    return matcher
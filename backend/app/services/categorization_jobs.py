@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, or_, select, text
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.db import SessionLocal
+from app.models.categorization_job import CategorizationJob as Job
+from app.services import categorization_suggest
+from app.services import categorize_apply
+from app.services import transaction_listing as listing
+
+logger = logging.getLogger(__name__)
+
+# Categorização do backlog inteiro de uma empresa em background.
+# POST /ai/categorize-jobs cria a linha (pending) e acorda o worker (thread no processo
+# da API). O worker pega um job com SKIP LOCKED e percorre as transações sem categoria
+# em keyset (occurred_at DESC, id DESC), em lotes de batch_size: regras aprendidas +
+# regras fixas (+ provider de IA se use_ai) e UPDATE set-based (categorize_apply).
+# Cada lote grava contadores + cursor na MESMA transação do UPDATE; queda/redeploy =>
+# o job volta depois de CATEGORIZE_JOB_LEASE_S sem heartbeat e continua do cursor.
+# Fatias: a cada CATEGORIZE_JOB_SLICE_BATCHES lotes o job volta para pending (com o cursor)
+# e vai para o fim da fila (heartbeat_at): um backlog grande não segura os outros tenants.
+
+ACTIVE = ("pending", "running")
+_ERROR_MAX_LEN = 200
+
+_stats = {"runs": 0, "last_job": None}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _admin_mode(db: Session) -> None:
+    # worker atende todos os tenants (filtra tenant_id explicitamente)
+    if db.get_bind().dialect.name.startswith("postgres"):
+        db.execute(text("SET row_security = off"))
+
+
+# -----------------------------
+# API
+# -----------------------------
+
+def create_job(
+    db: Session,
+    *,
+    tenant_id: int,
+    company_id: int,
+    start_dt: datetime | None,
+    end_dt: datetime | None,
+    use_ai: bool,
+    batch_size: int | None,
+) -> tuple[Job, bool]:
+    """Cria o job (commit) ou devolve o job ativo da empresa. Retorna (job, criado?)."""
+    active = db.scalar(
+        select(Job)
+        .where(Job.tenant_id == tenant_id, Job.company_id == company_id, Job.status.in_(ACTIVE))
+        .order_by(Job.id)
+        .limit(1)
+    )
+    if active is not None:
+        return active, False
+
+    job = Job(
+        tenant_id=tenant_id,
+        company_id=company_id,
+        status="pending",
+        start_dt=start_dt,
+        end_dt=end_dt,
+        use_ai=use_ai,
+        batch_size=int(batch_size or settings.CATEGORIZE_JOB_BATCH),
+        scanned=0,
+        suggested=0,
+        updated=0,
+        skipped=0,
+        batches=0,
+        providers={},
+        elapsed_ms=0,
+        attempts=0,
+        created_at=_utcnow(),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job, True
+
+
+def get_job(db: Session, *, tenant_id: int, job_id: int) -> Job | None:
+    return db.scalar(select(Job).where(Job.id == job_id, Job.tenant_id == tenant_id))
+
+
+def job_out(job: Job) -> dict:
+    elapsed_s = (job.elapsed_ms or 0) / 1000.0
+    cursor = None
+    if job.cursor_id is not None:
+        cursor = listing.encode_cursor(listing.Cursor(occurred_at=job.cursor_occurred_at, id=job.cursor_id))
+    return {
+        "job_id": job.id,
+        "company_id": job.company_id,
+        "status": job.status,
+        "period": {
+            "start": job.start_dt.date().isoformat() if job.start_dt else None,
+            "end": job.end_dt.date().isoformat() if job.end_dt else None,
+        },
+        "use_ai": bool(job.use_ai),
+        "batch_size": job.batch_size,
+        "batches": job.batches,
+        "scanned": job.scanned,
+        "suggested": job.suggested,
+        "updated": job.updated,
+        "skipped": job.skipped,
+        "providers": dict(job.providers or {}),
+        "rows_per_s": round(job.scanned / elapsed_s, 1) if elapsed_s > 0 else 0.0,
+        "cursor": cursor,
+        "attempts": job.attempts,
+        "last_error": job.last_error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+# -----------------------------
+# Worker
+# -----------------------------
+
+def _claim(db: Session) -> Job | None:
+    now = _utcnow()
+    lease_expired = now - timedelta(seconds=settings.CATEGORIZE_JOB_LEASE_S)
+    job = db.scalar(
+        select(Job)
+        .where(
+            or_(
+                Job.status == "pending",
+                # worker que morreu no meio: o job volta depois do lease e segue do cursor
+                and_(Job.status == "running", Job.heartbeat_at < lease_expired),
+            )
+        )
+        # nunca rodou primeiro; depois quem cedeu a vez há mais tempo
+        .order_by(Job.heartbeat_at.asc().nulls_first(), Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    if job is None:
+        return None
+    # nova tentativa: 1ª execução ou retomada após queda (retry após erro conta em run_job);
+    # job que só cedeu a vez continua na mesma tentativa
+    if job.attempts == 0 or job.status == "running":
+        job.attempts += 1
+    job.status = "running"
+    job.started_at = job.started_at or now
+    job.heartbeat_at = now
+    db.commit()
+    return job
+
+
+def _run_batch(db: Session, job: Job) -> bool:
+    """Processa um lote e grava o checkpoint (um commit). False = backlog acabou."""
+    t0 = time.perf_counter()
+    after = None
+    if job.cursor_id is not None:
+        after = listing.Cursor(occurred_at=job.cursor_occurred_at, id=job.cursor_id)
+    rows = categorization_suggest.uncategorized_page(
+        db,
+        tenant_id=job.tenant_id,
+        company_id=job.company_id,
+        start_dt=job.start_dt,
+        end_dt=job.end_dt,
+        limit=job.batch_size,
+        after=after,
+    )
+    if rows:
+        suggestions = categorization_suggest.suggest_for_rows(
+            db,
+            tenant_id=job.tenant_id,
+            company_id=job.company_id,
+            rows=rows,
+            include_no_match=False,
+            use_ai=bool(job.use_ai),
+        )
+        ids_by_category: dict[int, list[int]] = {}
+        mix: Counter[str] = Counter(job.providers or {})
+        for s in suggestions:
+            ids_by_category.setdefault(s["suggested_category_id"], []).append(s["id"])
+            mix[s.get("provider") or "rule-based"] += 1
+        mix["no_match"] += len(rows) - len(suggestions)
+
+        res = categorize_apply.apply_categories(
+            db, tenant_id=job.tenant_id, company_id=job.company_id, ids_by_category=ids_by_category
+        )
+        job.scanned += len(rows)
+        job.suggested += len(suggestions)
+        job.updated += res.updated
+        job.skipped += len(res.skipped_ids)
+        job.batches += 1
+        job.providers = dict(mix)
+        job.cursor_occurred_at, job.cursor_id = rows[-1].occurred_at, rows[-1].id
+
+    now = _utcnow()
+    job.heartbeat_at = now
+    job.elapsed_ms += int((time.perf_counter() - t0) * 1000)
+    more = len(rows) == job.batch_size
+    if not more:
+        job.status, job.finished_at = "done", now
+    db.commit()
+    return more
+
+
+def run_job(job_id: int, *, max_batches: int | None = None, slice_batches: int | None = None) -> dict | None:
+    """
+    Roda uma fatia de um job já reivindicado: slice_batches lotes (default
+    CATEGORIZE_JOB_SLICE_BATCHES; 0 = até o fim) e devolve o job para pending, no fim da fila.
+    max_batches para sem liberar o job (como uma queda: só volta depois do lease).
+    Erro => volta para pending (retoma do último checkpoint) até CATEGORIZE_JOB_MAX_ATTEMPTS;
+    depois failed.
+    """
+    if slice_batches is None:
+        slice_batches = int(settings.CATEGORIZE_JOB_SLICE_BATCHES)
+    with SessionLocal() as db:
+        _admin_mode(db)
+        job = db.get(Job, job_id)
+        if job is None or job.status != "running":
+            return None
+        done = 0
+        try:
+            while _run_batch(db, job):
+                done += 1
+                if max_batches is not None and done >= max_batches:
+                    break
+                if slice_batches > 0 and done >= slice_batches:
+                    # cede a vez: volta para a fila com o cursor (heartbeat_at = fim da fila)
+                    job.status = "pending"
+                    db.commit()
+                    break
+        except Exception as e:
+            db.rollback()
+            logger.exception("categorization_job_failed job_id=%s", job_id)
+            job = db.get(Job, job_id)
+            if job.attempts >= settings.CATEGORIZE_JOB_MAX_ATTEMPTS:
+                job.status, job.finished_at = "failed", _utcnow()
+            else:
+                job.status = "pending"
+                job.attempts += 1
+            job.last_error = f"{type(e).__name__}: {e}"[:_ERROR_MAX_LEN]
+            db.commit()
+        out = job_out(job)
+    _stats["runs"] += 1
+    _stats["last_job"] = {k: out[k] for k in ("job_id", "status", "scanned", "updated", "rows_per_s")}
+    return out
+
+
+def run_once(*, max_batches: int | None = None, slice_batches: int | None = None) -> dict | None:
+    """Reivindica o próximo job pendente (ou abandonado) e processa uma fatia dele."""
+    with SessionLocal() as db:
+        _admin_mode(db)
+        job = _claim(db)
+        job_id = job.id if job is not None else None
+    if job_id is None:
+        return None
+    return run_job(job_id, max_batches=max_batches, slice_batches=slice_batches)
+
+
+class CategorizationJobWorker:
+    """Thread daemon: processa uma fatia de job por vez; POST acorda a thread sem esperar o poll."""
+
+    def __init__(self) -> None:
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="ia-cnpj-categorize-jobs", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                out = run_once()
+            except Exception:
+                logger.exception("categorization_job_run_failed")
+                out = None
+            if out is None:
+                self._wake.wait(float(settings.CATEGORIZE_JOB_POLL_S))
+                self._wake.clear()
+
+
+categorization_worker = CategorizationJobWorker()
+
+
+def categorization_job_stats() -> dict:
+    return {"worker_running": categorization_worker.running, **_stats}
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from app.ai.provider import SuggestInputItem
+from app.ai.registry import ai_registry
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.services import categorization
+from app.services import learned_rules
+from app.services import transaction_listing as listing
+from app.services.ai_suggest_cache import DbSuggestCache
+
+# Sugestão de categoria para transações sem categoria (data quality).
+# Usado pelas rotas /transactions/uncategorized, /suggest-categories, /apply-suggestions
+# e pelo worker de jobs de categorização (categorization_jobs): página em keyset
+# (occurred_at DESC, id DESC) + sugestões aprendidas -> regras fixas -> IA.
+
+
+def _rules() -> list[dict[str, Any]]:
+    # Ordem importa: primeira regra que casar vence (confidence pode variar)
+    return list(categorization.DEFAULT_RULES)
+
+
+def _ensure_categories_by_name(db: Session, tenant_id: int, names: list[str]) -> dict[str, int]:
+    # cria categorias que não existirem, e retorna mapa name->id
+    existing = list(db.scalars(select(Category).where(Category.tenant_id == tenant_id)))
+    mp = {c.name: c.id for c in existing}
+    changed = False
+    for name in names:
+        if name not in mp:
+            c = Category(name=name, tenant_id=tenant_id)
+            db.add(c)
+            db.flush()
+            mp[name] = c.id
+            changed = True
+    if changed:
+        db.commit()
+    return mp
+
+
+def _ai_suggestions(db: Session, tenant_id: int, company_id: int, rows: list, cat_map: dict[str, int]) -> dict[int, Any]:
+    """Sugestões do provider de IA (AI_ENABLED=true) para o que as regras não resolveram: {tx_id: SuggestOutputItem}."""
+    if not rows or ai_registry.active is None:
+        return {}
+    cache = DbSuggestCache(db, tenant_id)
+    items = [
+        SuggestInputItem(
+            id=r.id,
+            description=r.description or "",
+            kind=r.kind,
+            amount_cents=int(r.amount_cents or 0),
+            occurred_at=r.occurred_at.isoformat() if r.occurred_at else None,
+        )
+        for r in rows
+    ]
+    res = ai_registry.suggest(
+        company_id,
+        items,
+        categories=[{"id": cid, "name": name} for name, cid in cat_map.items()],
+        cache=cache,
+    )
+    if cache.writes:
+        db.commit()
+    return {x.id: x for x in (res or []) if x.category_id is not None}
+
+
+def uncategorized_page(
+    db: Session,
+    *,
+    tenant_id: int,
+    company_id: int,
+    start_dt: datetime | None,
+    end_dt: datetime | None,
+    limit: int,
+    after: listing.Cursor | None,
+    offset: int = 0,
+) -> list:
+    """
+    Página de transações sem categoria em (occurred_at DESC, id DESC), após o cursor.
+    Sem período: todo o histórico datado (occurred_at NULL fica de fora).
+    `offset` só existe para o parâmetro legado de /uncategorized.
+    """
+    q = (
+        select(
+            Transaction.id,
+            Transaction.description,
+            Transaction.amount_cents,
+            Transaction.kind,
+            Transaction.occurred_at,
+        )
+        .where(Transaction.company_id == company_id).where(Transaction.tenant_id == tenant_id)
+        .where(Transaction.occurred_at.is_not(None))
+        .where(Transaction.category_id.is_(None))
+    )
+    if start_dt is not None:
+        q = q.where(Transaction.occurred_at >= start_dt)
+    if end_dt is not None:
+        q = q.where(Transaction.occurred_at <= end_dt)
+    if after is not None and after.occurred_at is not None:
+        q = q.where(
+            or_(
+                Transaction.occurred_at < after.occurred_at,
+                and_(Transaction.occurred_at == after.occurred_at, Transaction.id < after.id),
+            )
+        )
+    q = q.order_by(Transaction.occurred_at.desc(), Transaction.id.desc()).limit(limit)
+    if offset:
+        q = q.offset(offset)
+    return db.execute(q).all()
+
+
+def suggest_for_rows(
+    db: Session, *, tenant_id: int, company_id: int, rows: list, include_no_match: bool, use_ai: bool = True
+) -> list[dict]:
+    """
+    Sugestão por linha: regras aprendidas do tenant, regras fixas e (use_ai) o provider de IA
+    para o que sobrar. Sem include_no_match, só devolve sugestões aplicáveis.
+    """
+    rules = _rules()
+    needed_names = sorted({r["category_name"] for r in rules})
+    cat_map = _ensure_categories_by_name(db, tenant_id, needed_names)
+
+    descriptions = [r.description for r in rows]
+    learned = learned_rules.suggest_many(db, tenant_id, descriptions)
+    matches = categorization.get_matcher().match_many(descriptions)
+    ai_hits = _ai_suggestions(
+        db,
+        tenant_id,
+        company_id,
+        [r for r, learned_hit, hit in zip(rows, learned, matches) if not learned_hit and not hit],
+        cat_map,
+    ) if use_ai else {}
+
+    out = []
+    for r, learned_hit, hit in zip(rows, learned, matches):
+        ai_hit = ai_hits.get(r.id)
+        if learned_hit:
+            out.append({
+                "id": r.id,
+                "suggested_category_id": learned_hit.category_id,
+                "confidence": learned_hit.confidence,
+                "rule": f"learned:{learned_hit.token}",
+                "description": r.description or "",
+                # D11: auditável
+                "provider": "learned",
+                "reason": f"learned token: {learned_hit.token} ({learned_hit.hits}/{learned_hit.total})",
+                "signals": ["rule:learned", f"token:{learned_hit.token}", f"support:{learned_hit.hits}"],
+            })
+        elif hit:
+            suggested = hit.rule
+            matched_kw = hit.keyword
+            out.append({
+                "id": r.id,
+                "suggested_category_id": cat_map.get(suggested["category_name"]),
+                "confidence": suggested["confidence"],
+                "rule": suggested["rule"],
+                "description": r.description or "",
+                # D11: auditável
+                "provider": "rule-based",
+                "reason": (f"keyword match: {matched_kw}" if matched_kw else f"matched rule: {suggested['rule']}"),
+                "signals": ([f"rule:{suggested['rule']}"] + ([f"kw:{matched_kw}"] if matched_kw else [])),
+            })
+        elif ai_hit:
+            out.append({
+                "id": r.id,
+                "suggested_category_id": ai_hit.category_id,
+                "confidence": round(ai_hit.confidence, 2),
+                "rule": ai_hit.rule,
+                "description": r.description or "",
+                # D11: auditável
+                "provider": "openai",
+                "reason": ai_hit.notes or "ai suggestion",
+                "signals": ["rule:ai"],
+            })
+        elif include_no_match:
+            out.append({
+                "id": r.id,
+                "suggested_category_id": None,
+                "confidence": 0.0,
+                "rule": "no_match",
+                "description": r.description or "",
+                # D11: auditável
+                "provider": "rule-based",
+                "reason": "no keyword match",
+                "signals": ["rule:no_match"],
+            })
+    # por padrão, NÃO devolve no_match (só sugestões aplicáveis)
+    if not include_no_match:
+        out = [x for x in out if x.get("suggested_category_id") is not None]
+    return out
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.services import daily_rollup_service as daily_rollup
+from app.services import learned_rules
+from app.services.report_cache import bump_company_version
+
+# Aplicação em massa de sugestões de categoria (apply-suggestions).
+# Um UPDATE ... WHERE id IN (...) AND tenant/empresa AND category_id IS NULL por
+# categoria e bloco de CATEGORIZE_APPLY_CHUNK ids, com RETURNING das colunas que o
+# rollup diário e o índice de regras aprendidas precisam (sem carregar objetos ORM).
+# Só toca linhas ainda sem categoria: o que outra request categorizou no meio volta
+# em skipped_ids. Não faz commit (o chamador fecha tudo numa transação).
+
+
+@dataclass
+class ApplyResult:
+    updated: int = 0
+    updated_by_category: dict[int, int] = field(default_factory=dict)
+    skipped_ids: list[int] = field(default_factory=list)
+    invalid_category_ids: list[int] = field(default_factory=list)
+
+
+def _chunks(ids: list[int], size: int):
+    for i in range(0, len(ids), size):
+        yield ids[i : i + size]
+
+
+def apply_categories(
+    db: Session,
+    *,
+    tenant_id: int,
+    company_id: int,
+    ids_by_category: dict[int, list[int]],
+    chunk_size: int | None = None,
+) -> ApplyResult:
+    result = ApplyResult()
+    if not ids_by_category:
+        return result
+    size = max(1, int(chunk_size or settings.CATEGORIZE_APPLY_CHUNK))
+
+    valid = set(
+        db.scalars(select(Category.id).where(Category.tenant_id == tenant_id, Category.id.in_(list(ids_by_category))))
+    )
+    result.invalid_category_ids = sorted(c for c in ids_by_category if c not in valid)
+
+    for category_id in sorted(valid):
+        ids = list(dict.fromkeys(ids_by_category[category_id]))
+        changed = []
+        for chunk in _chunks(ids, size):
+            stmt = (
+                update(Transaction)
+                .where(
+                    Transaction.id.in_(chunk),
+                    Transaction.tenant_id == tenant_id,
+                    Transaction.company_id == company_id,
+                    Transaction.category_id.is_(None),
+                )
+                .values(category_id=category_id)
+                .returning(Transaction.id, Transaction.occurred_at, Transaction.kind, Transaction.amount_cents, Transaction.description)
+                .execution_options(synchronize_session=False)
+            )
+            changed += db.execute(stmt).all()
+
+        done = {r.id for r in changed}
+        result.skipped_ids += [i for i in ids if i not in done]
+        if not changed:
+            continue
+
+        daily_rollup.shift_rows(
+            db,
+            tenant_id=tenant_id,
+            company_id=company_id,
+            rows=[(r.occurred_at, r.kind, r.amount_cents) for r in changed],
+            old_category_id=None,
+            new_category_id=category_id,
+        )
+        learned_rules.record_recategorization(
+            db,
+            tenant_id=tenant_id,
+            changes=[(r.description, None, category_id) for r in changed],
+        )
+        result.updated_by_category[category_id] = len(changed)
+        result.updated += len(changed)
+
+    if result.updated:
+        bump_company_version(db, tenant_id=tenant_id, company_id=company_id)
+    return result
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Callable
+
+from fastapi import HTTPException
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.cache import MemoryCache
+from app.core.settings import settings
+from app.db import SessionLocal
+from app.models.cnpj_registry_cache import CnpjRegistryCache
+
+logger = logging.getLogger(__name__)
+
+# Cache dos dados públicos de CNPJ (iguais para todos os tenants).
+# Camadas: LRU em processo -> tabela cnpj_registry_cache -> provedor externo.
+# Idade <= CNPJ_CACHE_FRESH_S: serve direto. Até + CNPJ_CACHE_STALE_S: serve o dado
+# antigo na hora e revalida em background (stale-while-revalidate). Além disso, busca
+# no provedor; se ele falhar, o dado antigo ainda é servido (stale-if-error).
+
+_DATE_FIELDS = ("data_situacao_cadastral", "data_situacao_especial", "data_abertura", "data_baixa")
+_DECIMAL_FIELDS = ("capital_social",)
+
+Fetcher = Callable[[str], "dict | None"]
+
+_memory: MemoryCache | None = None
+_memory_lock = threading.Lock()
+_refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cnpj-refresh")
+_inflight: set[str] = set()
+_inflight_lock = threading.Lock()
+_stats = {"fresh_hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "stale_on_error": 0}
+
+
+def _enabled() -> bool:
+    return bool(settings.CNPJ_CACHE_ENABLED)
+
+
+def _memory_cache() -> MemoryCache:
+    global _memory
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                _memory = MemoryCache(
+                    max_entries=settings.CNPJ_CACHE_MAX_ENTRIES,
+                    ttl_s=settings.CNPJ_CACHE_FRESH_S + settings.CNPJ_CACHE_STALE_S,
+                )
+    return _memory
+
+
+def reset_memory_cache() -> None:
+    """Descarta o LRU em processo (testes / troca de config); a tabela fica."""
+    global _memory
+    with _memory_lock:
+        _memory = None
+
+
+def encode_payload(data: dict) -> dict:
+    out = {}
+    for k, v in data.items():
+        if isinstance(v, (date, datetime)):
+            out[k] = v.isoformat()
+        elif isinstance(v, Decimal):
+            out[k] = str(v)
+        else:
+            out[k] = v
+    return out
+
+
+def decode_payload(data: dict) -> dict:
+    out = dict(data)
+    for k in _DATE_FIELDS:
+        if out.get(k):
+            out[k] = date.fromisoformat(str(out[k])[:10])
+    for k in _DECIMAL_FIELDS:
+        if out.get(k) is not None:
+            out[k] = Decimal(str(out[k]))
+    return out
+
+
+def _load_row(cnpj: str) -> tuple[float, dict] | None:
+    try:
+        with SessionLocal() as db:
+            row = db.get(CnpjRegistryCache, cnpj)
+            if row is None:
+                return None
+            fetched_at = row.fetched_at.replace(tzinfo=timezone.utc).timestamp()
+            return fetched_at, json.loads(row.payload)
+    except (SQLAlchemyError, ValueError):
+        logger.warning("cnpj_cache_read_failed cnpj=%s", cnpj, exc_info=True)
+        return None
+
+
+def _store_row(cnpj: str, fetched_at: float, payload: dict) -> None:
+    try:
+        with SessionLocal() as db:
+            db.merge(
+                CnpjRegistryCache(
+                    cnpj=cnpj,
+                    payload=json.dumps(payload, ensure_ascii=False, separators=(",", ":")),
+                    fetched_at=datetime.fromtimestamp(fetched_at, tz=timezone.utc).replace(tzinfo=None),
+                )
+            )
+            db.commit()
+    except SQLAlchemyError:
+        # corrida entre dois processos gravando o mesmo CNPJ: o outro venceu, tudo bem
+        logger.warning("cnpj_cache_write_failed cnpj=%s", cnpj, exc_info=True)
+
+
+def _get_entry(cnpj: str) -> tuple[float, dict] | None:
+    mem = _memory_cache()
+    hit = mem.get(cnpj)
+    if hit is not None:
+        return hit[0], hit[1]
+    entry = _load_row(cnpj)
+    if entry is not None:
+        mem.set(cnpj, [entry[0], entry[1]])
+    return entry
+
+
+def _put_entry(cnpj: str, data: dict) -> None:
+    now = time.time()
+    payload = encode_payload(data)
+    _memory_cache().set(cnpj, [now, payload])
+    _store_row(cnpj, now, payload)
+
+
+def _refresh(cnpj: str, fetch: Fetcher) -> None:
+    try:
+        data = fetch(cnpj)
+        if data is not None:
+            _put_entry(cnpj, data)
+        _stats["refreshes"] += 1
+    except HTTPException:
+        pass  # provedor fora: o dado antigo continua servindo até a janela de stale acabar
+    except Exception:
+        logger.exception("cnpj_cache_refresh_failed cnpj=%s", cnpj)
+    finally:
+        with _inflight_lock:
+            _inflight.discard(cnpj)
+
+
+def _schedule_refresh(cnpj: str, fetch: Fetcher) -> None:
+    with _inflight_lock:
+        if cnpj in _inflight:
+            return
+        _inflight.add(cnpj)
+    _refresh_pool.submit(_refresh, cnpj, fetch)
+
+
+def lookup(cnpj: str, fetch: Fetcher) -> dict | None:
+    """Dados normalizados do CNPJ (já normalizado), passando pelo cache; `fetch` consulta o provedor."""
+    if not _enabled():
+        return fetch(cnpj)
+
+    entry = _get_entry(cnpj)
+    if entry is not None:
+        age = time.time() - entry[0]
+        if age <= settings.CNPJ_CACHE_FRESH_S:
+            _stats["fresh_hits"] += 1
+            return decode_payload(entry[1])
+        if age <= settings.CNPJ_CACHE_FRESH_S + settings.CNPJ_CACHE_STALE_S:
+            _stats["stale_hits"] += 1
+            _schedule_refresh(cnpj, fetch)
+            return decode_payload(entry[1])
+
+    _stats["misses"] += 1
+    try:
+        data = fetch(cnpj)
+    except HTTPException:
+        if entry is None:
+            raise
+        _stats["stale_on_error"] += 1
+        return decode_payload(entry[1])
+
+    if data is not None:
+        _put_entry(cnpj, data)
+    return data
+
+
+def cnpj_cache_stats() -> dict:
+    out = {"enabled": _enabled(), **_stats}
+    if _memory is not None:
+        out["memory"] = _memory.stats()
+    return out
@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.db import SessionLocal
+from app.models.company import Company
+from app.services import company_lookup_service as lookup
+from app.tenant_context import set_tenant_on_session
+
+logger = logging.getLogger(__name__)
+
+# Enriquecimento em lote (/companies/bulk-lookup).
+# Normaliza + deduplica, resolve o que já existe com um IN, consulta as faltantes em
+# paralelo (CNPJ_BULK_CONCURRENCY threads; o TokenBucket do lookup segura a taxa ao
+# provedor) e grava em lotes de CNPJ_BULK_UPSERT_BATCH (um commit por lote).
+#
+# status por CNPJ: invalid | duplicate | existing | created | enriched | not_found | error
+
+_IN_CHUNK = 500
+
+ProgressFn = Callable[[int, Counter], None]
+
+
+@dataclass
+class _Fetched:
+    cnpj: str
+    data: dict | None = None
+    error: str | None = None
+
+
+def _normalize_inputs(cnpjs: list[str]) -> tuple[list[dict], list[str]]:
+    items: list[dict] = []
+    seen: set[str] = set()
+    unique: list[str] = []
+    for raw in cnpjs:
+        try:
+            cnpj = lookup.normalize_cnpj(raw)
+        except HTTPException:
+            items.append({"input": raw, "cnpj": None, "status": "invalid", "company_id": None, "error": "CNPJ inválido"})
+            continue
+        if cnpj in seen:
+            items.append({"input": raw, "cnpj": cnpj, "status": "duplicate", "company_id": None, "error": None})
+            continue
+        seen.add(cnpj)
+        unique.append(cnpj)
+        items.append({"input": raw, "cnpj": cnpj, "status": None, "company_id": None, "error": None})
+    return items, unique
+
+
+def _load_local(db: Session, tenant_id: int, cnpjs: list[str]) -> dict[str, Company]:
+    out: dict[str, Company] = {}
+    for i in range(0, len(cnpjs), _IN_CHUNK):
+        q = select(Company).where(Company.tenant_id == tenant_id, Company.cnpj.in_(cnpjs[i:i + _IN_CHUNK]))
+        out.update({c.cnpj: c for c in db.scalars(q)})
+    return out
+
+
+def _fetch(cnpj: str) -> _Fetched:
+    try:
+        return _Fetched(cnpj=cnpj, data=lookup._lookup_company_external(cnpj))
+    except HTTPException as e:
+        return _Fetched(cnpj=cnpj, error=str(e.detail))
+    except Exception:
+        logger.exception("bulk_lookup_fetch_failed cnpj=%s", cnpj)
+        return _Fetched(cnpj=cnpj, error="Falha inesperada na consulta")
+
+
+def _upsert_batch(db: Session, tenant_id: int, local: dict[str, Company], batch: list[_Fetched], status: dict[str, tuple]) -> None:
+    """Aplica um lote de resultados externos com um único commit (fallback linha a linha em conflito)."""
+    set_tenant_on_session(db, tenant_id)  # set_config é por transação (Postgres)
+    pending: list[tuple[_Fetched, Company, str]] = []
+    for res in batch:
+        if res.error is not None:
+            company = local.get(res.cnpj)
+            status[res.cnpj] = ("existing" if company else "error", company.id if company else None, res.error)
+            continue
+        if res.data is None:
+            company = local.get(res.cnpj)
+            status[res.cnpj] = ("existing" if company else "not_found", company.id if company else None, None)
+            continue
+        company = local.get(res.cnpj)
+        if company is not None:
+            lookup._apply_company_business_data(company, res.data)
+            pending.append((res, company, "enriched"))
+        else:
+            company = Company(cnpj=res.cnpj, razao_social=res.data["razao_social"], tenant_id=tenant_id)
+            lookup._apply_company_business_data(company, res.data)
+            db.add(company)
+            pending.append((res, company, "created"))
+
+    if not pending:
+        return
+    try:
+        db.flush()
+        ids = [company.id for _res, company, _st in pending]
+        db.commit()
+    except IntegrityError:
+        # outra requisição criou algum desses CNPJs no meio do caminho
+        db.rollback()
+        _upsert_rows(db, tenant_id, pending, status)
+        return
+    for (res, _company, st), company_id in zip(pending, ids):
+        status[res.cnpj] = (st, company_id, None)
+
+
+def _upsert_rows(db: Session, tenant_id: int, pending: list[tuple[_Fetched, Company, str]], status: dict[str, tuple]) -> None:
+    for res, _company, _st in pending:
+        set_tenant_on_session(db, tenant_id)
+        company = lookup.get_company_by_cnpj_local(db=db, tenant_id=tenant_id, cnpj=res.cnpj)
+        st = "enriched"
+        if company is None:
+            company = Company(cnpj=res.cnpj, razao_social=res.data["razao_social"], tenant_id=tenant_id)
+            db.add(company)
+            st = "created"
+        lookup._apply_company_business_data(company, res.data)
+        try:
+            db.flush()
+            company_id = company.id
+            db.commit()
+            status[res.cnpj] = (st, company_id, None)
+        except IntegrityError:
+            db.rollback()
+            status[res.cnpj] = ("error", None, "Conflito ao gravar empresa")
+
+
+def sync_max() -> int:
+    """
+    Maior lista aceita em mode=sync: CNPJ_BULK_SYNC_MAX, limitado ao que a taxa do provedor
+    consegue consultar dentro de REQUEST_DEADLINE_S (80%, folga para banco e resposta).
+    """
+    limit = int(settings.CNPJ_BULK_SYNC_MAX)
+    rate, deadline_s = float(settings.CNPJ_LOOKUP_RATE_PER_S), float(settings.REQUEST_DEADLINE_S or 0)
+    if rate > 0 and deadline_s > 0:
+        limit = min(limit, int(settings.CNPJ_LOOKUP_RATE_BURST) + int(rate * deadline_s * 0.8))
+    return max(1, limit)
+
+
+def run_bulk_lookup(
+    db: Session,
+    tenant_id: int,
+    cnpjs: list[str],
+    *,
+    on_progress: ProgressFn | None = None,
+) -> dict:
+    items, unique = _normalize_inputs(cnpjs)
+    local = _load_local(db, tenant_id, unique)
+
+    status: dict[str, tuple] = {}
+    to_fetch: list[str] = []
+    for cnpj in unique:
+        company = local.get(cnpj)
+        if company is not None and not lookup._company_needs_business_enrichment(company):
+            status[cnpj] = ("existing", company.id, None)
+        else:
+            to_fetch.append(cnpj)
+
+    def report() -> None:
+        if on_progress:
+            on_progress(len(status), Counter(st for st, _id, _err in status.values()))
+
+    report()
+    batch_size = max(1, int(settings.CNPJ_BULK_UPSERT_BATCH))
+    if to_fetch:
+        with ThreadPoolExecutor(max_workers=max(1, int(settings.CNPJ_BULK_CONCURRENCY)), thread_name_prefix="cnpj-bulk") as ex:
+            # cópia do contexto por tarefa: o prazo da request (mode=sync) vale nas threads
+            futures = [ex.submit(contextvars.copy_context().run, _fetch, cnpj) for cnpj in to_fetch]
+            batch: list[_Fetched] = []
+            for fut in as_completed(futures):
+                batch.append(fut.result())
+                if len(batch) >= batch_size:
+                    _upsert_batch(db, tenant_id, local, batch, status)
+                    batch = []
+                    report()
+            if batch:
+                _upsert_batch(db, tenant_id, local, batch, status)
+                report()
+
+    for item in items:
+        if item["status"] is None:
+            st, company_id, err = status[item["cnpj"]]
+            item.update(status=st, company_id=company_id, error=err)
+
+    counts = Counter(item["status"] for item in items)
+    return {"total": len(items), "unique": len(unique), "counts": dict(counts), "items": items}
+
+
+# -----------------------------
+# Modo job (listas grandes): roda em thread, progresso consultável
+# -----------------------------
+
+_JOB_TTL_S = 3600
+_MAX_JOBS = 200
+
+
+@dataclass
+class BulkLookupJob:
+    id: str
+    tenant_id: int
+    total: int
+    unique: int = 0
+    status: str = "queued"  # queued | running | done | failed
+    done: int = 0
+    counts: dict = field(default_factory=dict)
+    result: dict | None = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+
+    def as_dict(self, *, include_items: bool = True) -> dict:
+        out = {
+            "job_id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "unique": self.unique,
+            "done": self.done,
+            "counts": dict(self.counts),
+            "error": self.error,
+        }
+        if include_items and self.result is not None:
+            out["counts"] = self.result["counts"]
+            out["items"] = self.result["items"]
+        return out
+
+
+_jobs: dict[str, BulkLookupJob] = {}
+_jobs_lock = threading.Lock()
+_job_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cnpj-bulk-job")
+
+
+def _prune_jobs() -> None:
+    now = time.time()
+    with _jobs_lock:
+        for job_id in [j.id for j in _jobs.values() if j.finished_at and now - j.finished_at > _JOB_TTL_S]:
+            _jobs.pop(job_id, None)
+        while len(_jobs) > _MAX_JOBS:
+            _jobs.pop(next(iter(_jobs)))
+
+
+def _run_job(job: BulkLookupJob, cnpjs: list[str]) -> None:
+    job.status = "running"
+
+    def progress(done: int, counts: Counter) -> None:
+        job.done = done
+        job.counts = dict(counts)
+
+    try:
+        with SessionLocal() as db:
+            set_tenant_on_session(db, job.tenant_id)
+            job.result = run_bulk_lookup(db, job.tenant_id, cnpjs, on_progress=progress)
+        job.status = "done"
+    except Exception as e:
+        logger.exception("bulk_lookup_job_failed job_id=%s", job.id)
+        job.status, job.error = "failed", str(e)
+    finally:
+        job.finished_at = time.time()
+
+
+def start_bulk_lookup_job(tenant_id: int, cnpjs: list[str]) -> BulkLookupJob:
+    _prune_jobs()
+    _items, unique = _normalize_inputs(cnpjs)
+    job = BulkLookupJob(id=uuid.uuid4().hex, tenant_id=tenant_id, total=len(cnpjs), unique=len(unique))
+    with _jobs_lock:
+        _jobs[job.id] = job
+    _job_pool.submit(_run_job, job, list(cnpjs))
+    return job
+
+
+def get_bulk_lookup_job(tenant_id: int, job_id: str) -> BulkLookupJob | None:
+    job = _jobs.get(job_id)
+    if job is None or job.tenant_id != tenant_id:
+        return None
+    return job
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import and_, bindparam, insert, or_, select, text, update
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.db import SessionLocal
+from app.models.company import Company
+from app.models.company_enrichment import CompanyEnrichmentRun, CompanyEnrichmentTask as Task
+from app.services import company_lookup_service as lookup
+
+logger = logging.getLogger(__name__)
+
+# (Re)enriquecimento de empresas fora do caminho da request.
+# As rotas só enfileiram (company_enrichment_queue, uma linha por empresa) e devolvem o
+# registro local. O worker (thread no processo da API ou scripts/run_company_enrichment.py)
+# pega lotes com SKIP LOCKED, consulta o provedor (cache global + TokenBucket do lookup)
+# e grava; falha => nova tentativa com backoff até COMPANY_ENRICH_MAX_ATTEMPTS.
+# A cada COMPANY_REFRESH_SCAN_INTERVAL_S o agendador enfileira empresas cujo
+# registry_checked_at passou de COMPANY_REFRESH_MAX_AGE_S (ou nunca foi preenchido).
+
+_RUNNING_LEASE_S = 600
+_MAX_BACKOFF_S = 3600
+_ERROR_MAX_LEN = 200
+
+_stats = {"runs": 0, "last_run": None, "last_scan_at": None}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def registry_is_stale(company: Company, *, now: datetime | None = None) -> bool:
+    checked = company.registry_checked_at
+    if checked is None:
+        return True
+    return (now or _utcnow()) - checked > timedelta(seconds=settings.COMPANY_REFRESH_MAX_AGE_S)
+
+
+# -----------------------------
+# Enfileiramento
+# -----------------------------
+
+def enqueue(db: Session, *, tenant_id: int, company_id: int, cnpj: str, reason: str) -> bool:
+    """Coloca a empresa na fila (idempotente). Não faz commit. True se criou/reabriu a tarefa."""
+    now = _utcnow()
+    task = db.scalar(select(Task).where(Task.tenant_id == tenant_id, Task.company_id == company_id))
+    if task is None:
+        db.add(
+            Task(
+                tenant_id=tenant_id,
+                company_id=company_id,
+                cnpj=cnpj,
+                reason=reason,
+                status="pending",
+                attempts=0,
+                run_after=now,
+                created_at=now,
+                updated_at=now,
+            )
+        )
+        return True
+    if task.status in ("pending", "running"):
+        return False
+    task.status, task.reason, task.attempts = "pending", reason, 0
+    task.run_after, task.updated_at, task.last_error = now, now, None
+    return True
+
+
+def request_enrichment(db: Session, company: Company, *, reason: str) -> None:
+    """Caminho da request: enfileira e faz commit; conflito com outra request = já enfileirado."""
+    try:
+        if enqueue(db, tenant_id=company.tenant_id, company_id=company.id, cnpj=company.cnpj, reason=reason):
+            db.commit()
+    except IntegrityError:
+        db.rollback()
+    except SQLAlchemyError:
+        # fila indisponível não pode derrubar a leitura da empresa
+        db.rollback()
+        logger.warning("company_enrichment_enqueue_failed company_id=%s", company.id, exc_info=True)
+
+
+def enqueue_stale(db: Session, *, limit: int) -> int:
+    """Agendador: enfileira até `limit` empresas com dados cadastrais vencidos. Não faz commit."""
+    now = _utcnow()
+    cutoff = now - timedelta(seconds=settings.COMPANY_REFRESH_MAX_AGE_S)
+    q = (
+        select(Company.id, Company.tenant_id, Company.cnpj, Task.id.label("task_id"))
+        .outerjoin(Task, and_(Task.tenant_id == Company.tenant_id, Task.company_id == Company.id))
+        .where(or_(Company.registry_checked_at.is_(None), Company.registry_checked_at < cutoff))
+        .where(
+            or_(
+                Task.id.is_(None),
+                Task.status == "done",
+                # falhou de vez: só tenta de novo na próxima janela
+                and_(Task.status == "failed", Task.updated_at < cutoff),
+            )
+        )
+        .order_by(Company.id)
+        .limit(limit)
+    )
+    rows = db.execute(q).all()
+    if not rows:
+        return 0
+
+    reopen = [{"b_id": r.task_id} for r in rows if r.task_id is not None]
+    create = [
+        {
+            "tenant_id": r.tenant_id,
+            "company_id": r.id,
+            "cnpj": r.cnpj,
+            "reason": "stale",
+            "status": "pending",
+            "attempts": 0,
+            "run_after": now,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for r in rows
+        if r.task_id is None
+    ]
+    table = Task.__table__
+    if reopen:
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(status="pending", reason="stale", attempts=0, run_after=now, updated_at=now, last_error=None),
+            reopen,
+        )
+    if create:
+        db.execute(insert(Task), create)
+    return len(rows)
+
+
+# -----------------------------
+# Worker
+# -----------------------------
+
+def _admin_mode(db: Session) -> None:
+    # worker atende todos os tenants (filtra tenant_id explicitamente)
+    if db.get_bind().dialect.name.startswith("postgres"):
+        db.execute(text("SET row_security = off"))
+
+
+def _claim(db: Session, limit: int) -> list[tuple[Task, str]]:
+    now = _utcnow()
+    lease_expired = now - timedelta(seconds=_RUNNING_LEASE_S)
+    q = (
+        select(Task)
+        .where(
+            or_(
+                and_(Task.status == "pending", Task.run_after <= now),
+                # worker que morreu no meio: a tarefa volta depois do lease
+                and_(Task.status == "running", Task.updated_at < lease_expired),
+            )
+        )
+        .order_by(Task.run_after, Task.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = [(task, task.cnpj) for task in db.scalars(q)]
+    for task, _cnpj in claimed:
+        task.status, task.updated_at = "running", now
+    db.commit()
+    return claimed
+
+
+def _fetch(cnpj: str) -> tuple[dict | None, str | None]:
+    try:
+        return lookup._lookup_company_external(cnpj), None
+    except HTTPException as e:
+        return None, str(e.detail)
+    except Exception as e:
+        logger.exception("company_enrichment_fetch_failed cnpj=%s", cnpj)
+        return None, type(e).__name__
+
+
+def _backoff_s(attempts: int) -> float:
+    return min(_MAX_BACKOFF_S, max(1.0, float(settings.COMPANY_ENRICH_POLL_S)) * (2 ** attempts))
+
+
+def _apply_result(task: Task, company: Company | None, data: dict | None, error: str | None, metrics: dict) -> None:
+    now = _utcnow()
+    task.updated_at = now
+    if error is not None:
+        task.attempts += 1
+        task.last_error = error[:_ERROR_MAX_LEN]
+        if task.attempts >= settings.COMPANY_ENRICH_MAX_ATTEMPTS:
+            task.status = "failed"
+            metrics["failed"] += 1
+        else:
+            task.status = "pending"
+            task.run_after = now + timedelta(seconds=_backoff_s(task.attempts))
+            metrics["retried"] += 1
+        return
+
+    task.status, task.last_error = "done", None
+    if company is None:
+        return
+    if data is None:
+        # provedor não conhece o CNPJ: marca como conferido para não reconsultar a cada varredura
+        company.registry_checked_at = now
+        task.last_error = "not_found"
+        metrics["not_found"] += 1
+        return
+    lookup._apply_company_business_data(company, data)
+    metrics["updated"] += 1
+
+
+def run_once(*, trigger: str = "worker", scan: bool = True, limit: int | None = None) -> dict:
+    """Uma rodada: (opcional) varredura de vencidos + um lote da fila. Devolve as métricas."""
+    t0 = time.perf_counter()
+    started_at = _utcnow()
+    limit = int(limit or settings.COMPANY_ENRICH_BATCH)
+    metrics = {"enqueued_stale": 0, "claimed": 0, "updated": 0, "not_found": 0, "retried": 0, "failed": 0}
+
+    with SessionLocal() as db:
+        _admin_mode(db)
+        if scan:
+            try:
+                metrics["enqueued_stale"] = enqueue_stale(db, limit=int(settings.COMPANY_REFRESH_SCAN_LIMIT))
+                db.commit()
+            except IntegrityError:
+                # outro worker enfileirou as mesmas empresas na mesma hora
+                db.rollback()
+            _stats["last_scan_at"] = started_at.isoformat()
+
+        claimed = _claim(db, limit)
+        metrics["claimed"] = len(claimed)
+        if claimed:
+            workers = max(1, min(int(settings.COMPANY_ENRICH_CONCURRENCY), len(claimed)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="company-enrich") as ex:
+                results = list(ex.map(_fetch, [cnpj for _task, cnpj in claimed]))
+            ids = [task.company_id for task, _cnpj in claimed]
+            companies = {(c.tenant_id, c.id): c for c in db.scalars(select(Company).where(Company.id.in_(ids)))}
+            for (task, _cnpj), (data, error) in zip(claimed, results):
+                _apply_result(task, companies.get((task.tenant_id, task.company_id)), data, error, metrics)
+            db.commit()
+
+        duration_ms = int((time.perf_counter() - t0) * 1000)
+        if metrics["claimed"] or metrics["enqueued_stale"]:
+            db.add(CompanyEnrichmentRun(trigger=trigger, started_at=started_at, duration_ms=duration_ms, **metrics))
+            db.commit()
+
+    out = {"trigger": trigger, "started_at": started_at.isoformat(), "duration_ms": duration_ms, **metrics}
+    _stats["runs"] += 1
+    if metrics["claimed"] or metrics["enqueued_stale"]:
+        _stats["last_run"] = out
+    return out
+
+
+class EnrichmentWorker:
+    """Thread daemon que roda run_once a cada COMPANY_ENRICH_POLL_S (varredura no seu próprio intervalo)."""
+
+    def __init__(self) -> None:
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._last_scan = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="ia-cnpj-company-enrich", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            scan = time.monotonic() - self._last_scan >= settings.COMPANY_REFRESH_SCAN_INTERVAL_S
+            try:
+                out = run_once(scan=scan)
+                if scan:
+                    self._last_scan = time.monotonic()
+            except Exception:
+                logger.exception("company_enrichment_run_failed")
+                out = None
+            # lote cheio => ainda tem fila, segue sem esperar
+            if out is None or out["claimed"] < int(settings.COMPANY_ENRICH_BATCH):
+                self._stop.wait(float(settings.COMPANY_ENRICH_POLL_S))
+
+
+enrichment_worker = EnrichmentWorker()
+
+
+def company_enrichment_stats() -> dict:
+    return {
+        "async": bool(settings.COMPANY_ENRICH_ASYNC),
+        "worker_running": enrichment_worker.running,
+        **_stats,
+    }
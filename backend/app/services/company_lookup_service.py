@@ -1,15 +1,22 @@
 from __future__ import annotations
 
-from datetime import date, datetime
+from datetime import date, datetime, timezone
 from decimal import Decimal, InvalidOperation
 
+import anyio
 import httpx
 from fastapi import HTTPException
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.core.http_client import get_http_client
+from app.core.rate_limit import TokenBucket
+from app.core.resilience import ProviderUnavailable, get_guard, remaining_s
 from app.core.settings import settings
 from app.models.company import Company
+from app.services import cnpj_registry_cache as registry_cache
+from app.services import company_enrichment
 
 
 def normalize_cnpj(raw: str) -> str:
@@ -296,6 +303,11 @@ def _apply_company_business_data(company: Company, company_data: dict) -> Compan
         if value is not None:
             setattr(company, field, value)
 
+    company.registry_checked_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    if company.id is not None:
+        # dados cadastrais entram no AI Consult (JSON e PDF em cache): nova data_version.
+        # Expressão SQL (data_version + 1) para compor com bump_company_version concorrente.
+        company.data_version = Company.data_version + 1
     return company
 
 
@@ -322,25 +334,42 @@ def create_company_record(
     return company
 
 
-def _lookup_company_external(cnpj: str) -> dict | None:
-    provider = (settings.CNPJ_LOOKUP_PROVIDER or "").strip().lower()
-    normalized_cnpj = normalize_cnpj(cnpj)
+_provider_rate: TokenBucket | None = None
 
-    if provider in ("", "none", "off", "disabled"):
-        return None
 
-    if provider != "brasilapi":
-        raise HTTPException(status_code=503, detail="Provedor de CNPJ não suportado")
+def _provider_rate_limiter() -> TokenBucket:
+    # BrasilAPI limita por IP: todas as consultas do processo (avulsas, lote, revalidação) dividem o balde
+    global _provider_rate
+    rate, burst = float(settings.CNPJ_LOOKUP_RATE_PER_S), int(settings.CNPJ_LOOKUP_RATE_BURST)
+    if _provider_rate is None or (_provider_rate.rate_per_s, _provider_rate.burst) != (rate, max(1, burst)):
+        _provider_rate = TokenBucket(rate, burst=burst)
+    return _provider_rate
+
 
+def _fetch_company_external(normalized_cnpj: str) -> dict | None:
     url = f"{settings.CNPJ_LOOKUP_BASE_URL.rstrip('/')}/{normalized_cnpj}"
 
+    guard = get_guard("brasilapi")
+    # a espera pela taxa fica fora do guard: não segura vaga no bulkhead nem conta como latência.
+    # Com prazo de request, não espera além dele (503 imediato em vez de estourar o prazo);
+    # prazo já esgotado fica para o guard recusar (e contar).
+    left = remaining_s()
+    if left is None or left > 0:
+        if not _provider_rate_limiter().acquire(max_wait_s=left):
+            raise HTTPException(status_code=503, detail="Provedor de CNPJ indisponível")
     try:
-        with httpx.Client(timeout=settings.CNPJ_LOOKUP_TIMEOUT_S) as client:
-            response = client.get(url, headers={"Accept": "application/json"})
-    except httpx.TimeoutException:
-        raise HTTPException(status_code=504, detail="Timeout ao consultar provedor de CNPJ")
-    except httpx.HTTPError:
-        raise HTTPException(status_code=503, detail="Falha de comunicação com provedor de CNPJ")
+        with guard.call():
+            try:
+                response = get_http_client().get(url, timeout=guard.timeout(settings.CNPJ_LOOKUP_TIMEOUT_S))
+            except httpx.TimeoutException:
+                raise HTTPException(status_code=504, detail="Timeout ao consultar provedor de CNPJ")
+            except httpx.HTTPError:
+                raise HTTPException(status_code=503, detail="Falha de comunicação com provedor de CNPJ")
+            if response.status_code >= 500 or response.status_code == 429:
+                raise HTTPException(status_code=503, detail="Provedor de CNPJ indisponível")
+    except ProviderUnavailable as e:
+        # circuito aberto / bulkhead cheio / prazo da request esgotado: responde sem esperar a rede
+        raise HTTPException(status_code=503, detail="Provedor de CNPJ indisponível") from e
 
     if response.status_code == 404:
         return None
@@ -359,6 +388,19 @@ def _lookup_company_external(cnpj: str) -> dict | None:
     )
 
 
+def _lookup_company_external(cnpj: str) -> dict | None:
+    provider = (settings.CNPJ_LOOKUP_PROVIDER or "").strip().lower()
+    normalized_cnpj = normalize_cnpj(cnpj)
+
+    if provider in ("", "none", "off", "disabled"):
+        return None
+
+    if provider != "brasilapi":
+        raise HTTPException(status_code=503, detail="Provedor de CNPJ não suportado")
+
+    return registry_cache.lookup(normalized_cnpj, _fetch_company_external)
+
+
 def _company_needs_business_enrichment(company: Company) -> bool:
     business_fields = (
         company.situacao_cadastral,
@@ -374,6 +416,42 @@ def _company_needs_business_enrichment(company: Company) -> bool:
     return not any(value is not None and str(value).strip() for value in business_fields)
 
 
+def _enrichment_reason(company: Company) -> str | None:
+    """missing = sem nenhum dado cadastral; stale = dados além de COMPANY_REFRESH_MAX_AGE_S."""
+    if _company_needs_business_enrichment(company):
+        return "missing"
+    if company_enrichment.registry_is_stale(company):
+        return "stale"
+    return None
+
+
+def _store_external(
+    *,
+    db: Session,
+    tenant_id: int,
+    company: Company | None,
+    external: dict | None,
+) -> Company:
+    if company:
+        if external:
+            _apply_company_business_data(company, external)
+            db.commit()
+            db.refresh(company)
+        return company
+
+    if not external:
+        raise HTTPException(status_code=404, detail="Empresa não encontrada")
+
+    company = create_company_record(
+        db=db,
+        tenant_id=tenant_id,
+        company_data=external,
+    )
+    db.commit()
+    db.refresh(company)
+    return company
+
+
 def get_or_create_company_by_cnpj(
     *,
     db: Session,
@@ -387,30 +465,61 @@ def get_or_create_company_by_cnpj(
     )
 
     if company:
-        if not _company_needs_business_enrichment(company):
+        reason = _enrichment_reason(company)
+        if reason is None:
+            return company
+
+        if settings.COMPANY_ENRICH_ASYNC:
+            # worker busca no provedor; a request devolve o que já existe
+            company_enrichment.request_enrichment(db, company, reason=reason)
+            return company
+
+        if reason != "missing":
             return company
 
         try:
             external = _lookup_company_external(cnpj)
         except HTTPException:
             return company
+    else:
+        external = _lookup_company_external(cnpj)
 
-        if external:
-            _apply_company_business_data(company, external)
-            db.commit()
-            db.refresh(company)
-        return company
+    return _store_external(db=db, tenant_id=tenant_id, company=company, external=external)
 
-    external = _lookup_company_external(cnpj)
 
-    if not external:
-        raise HTTPException(status_code=404, detail="Empresa não encontrada")
+async def get_or_create_company_by_cnpj_async(
+    *,
+    db: AsyncSession,
+    tenant_id: int,
+    cnpj: str,
+) -> Company:
+    """
+    Versão async: leituras/escritas pela AsyncSession; a consulta externa (cache +
+    cliente httpx compartilhado) roda numa thread para não bloquear o event loop.
+    """
+    company = await db.run_sync(
+        lambda s: get_company_by_cnpj_local(db=s, tenant_id=tenant_id, cnpj=cnpj)
+    )
 
-    company = create_company_record(
-        db=db,
-        tenant_id=tenant_id,
-        company_data=external,
+    if company:
+        reason = _enrichment_reason(company)
+        if reason is None:
+            return company
+
+        if settings.COMPANY_ENRICH_ASYNC:
+            await db.run_sync(lambda s: company_enrichment.request_enrichment(s, company, reason=reason))
+            return company
+
+        if reason != "missing":
+            return company
+
+        try:
+            external = await anyio.to_thread.run_sync(_lookup_company_external, cnpj)
+        except HTTPException:
+            return company
+    else:
+        external = await anyio.to_thread.run_sync(_lookup_company_external, cnpj)
+
+    return await db.run_sync(
+        lambda s: _store_external(db=s, tenant_id=tenant_id, company=company, external=external)
     )
-    db.commit()
-    db.refresh(company)
-    return company
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from typing import Iterable
+
+from sqlalchemy import Date, and_, delete, func, insert, literal, select, type_coerce, union_all
+from sqlalchemy.orm import Session
+
+from app.db import dialect_insert
+from app.models.transaction import Transaction
+from app.models.transaction_daily_rollup import ROLLUP_KEY, TransactionDailyRollup as Rollup
+
+
+# -----------------------------
+# Manutenção incremental
+# -----------------------------
+
+def apply_delta(
+    db: Session,
+    *,
+    tenant_id: int,
+    company_id: int,
+    day: date,
+    category_id: int | None,
+    kind: str,
+    amount_cents: int,
+    tx_count: int,
+) -> None:
+    """
+    Soma (ou subtrai) um delta na linha do rollup; cria a linha se ainda não existir.
+    Um único INSERT ... ON CONFLICT DO UPDATE contra ux_transaction_daily_rollup_key:
+    escritores concorrentes somam na mesma linha em vez de duplicá-la.
+    """
+    stmt = dialect_insert(db, Rollup).values(
+        tenant_id=tenant_id,
+        company_id=company_id,
+        day=day,
+        category_id=category_id,
+        kind=kind,
+        amount_cents=int(amount_cents),
+        tx_count=int(tx_count),
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=ROLLUP_KEY,
+            set_={
+                "amount_cents": Rollup.amount_cents + stmt.excluded.amount_cents,
+                "tx_count": Rollup.tx_count + stmt.excluded.tx_count,
+            },
+        )
+    )
+
+
+def record_transaction(db: Session, tx: Transaction) -> None:
+    """Contabiliza uma transação recém-criada."""
+    if tx.occurred_at is None:
+        return
+    apply_delta(
+        db,
+        tenant_id=tx.tenant_id,
+        company_id=tx.company_id,
+        day=tx.occurred_at.date(),
+        category_id=tx.category_id,
+        kind=tx.kind,
+        amount_cents=tx.amount_cents,
+        tx_count=1,
+    )
+
+
+def record_rows(db: Session, rows: Iterable[dict]) -> None:
+    """Contabiliza um lote recém-inserido (dicts com as colunas de Transaction): um delta por grupo."""
+    groups: dict[tuple, list[int]] = {}
+    for r in rows:
+        if r.get("occurred_at") is None:
+            continue
+        key = (r["tenant_id"], r["company_id"], r["occurred_at"].date(), r.get("category_id"), r["kind"])
+        acc = groups.setdefault(key, [0, 0])
+        acc[0] += int(r["amount_cents"])
+        acc[1] += 1
+
+    for (tenant_id, company_id, day, category_id, kind), (amount_cents, tx_count) in groups.items():
+        apply_delta(
+            db,
+            tenant_id=tenant_id,
+            company_id=company_id,
+            day=day,
+            category_id=category_id,
+            kind=kind,
+            amount_cents=amount_cents,
+            tx_count=tx_count,
+        )
+
+
+def _as_date(v) -> date:
+    return v if isinstance(v, date) else date.fromisoformat(str(v)[:10])
+
+
+def shift_category(
+    db: Session,
+    *,
+    tenant_id: int,
+    company_id: int,
+    tx_ids: Iterable[int],
+    new_category_id: int | None,
+) -> None:
+    """
+    Move as transações `tx_ids` para `new_category_id` no rollup.
+    Deve ser chamado ANTES do UPDATE em `transactions` (lê a categoria atual).
+    """
+    ids = list(tx_ids)
+    if not ids:
+        return
+
+    day = func.date(Transaction.occurred_at)
+    q = (
+        select(
+            day.label("day"),
+            Transaction.category_id,
+            Transaction.kind,
+            func.sum(Transaction.amount_cents).label("amount_cents"),
+            func.count(Transaction.id).label("tx_count"),
+        )
+        .where(
+            Transaction.tenant_id == tenant_id,
+            Transaction.company_id == company_id,
+            Transaction.id.in_(ids),
+            Transaction.occurred_at.is_not(None),
+        )
+        .group_by(day, Transaction.category_id, Transaction.kind)
+    )
+
+    for r in db.execute(q).all():
+        if r.category_id == new_category_id:
+            continue
+        key = dict(tenant_id=tenant_id, company_id=company_id, day=_as_date(r.day), kind=r.kind)
+        apply_delta(db, **key, category_id=r.category_id, amount_cents=-int(r.amount_cents), tx_count=-int(r.tx_count))
+        apply_delta(db, **key, category_id=new_category_id, amount_cents=int(r.amount_cents), tx_count=int(r.tx_count))
+
+
+def shift_rows(
+    db: Session,
+    *,
+    tenant_id: int,
+    company_id: int,
+    rows: Iterable[tuple[datetime | None, str, int]],
+    old_category_id: int | None,
+    new_category_id: int | None,
+) -> None:
+    """
+    Move (occurred_at, kind, amount_cents) de old_category_id para new_category_id no rollup.
+    Para quem já tem as linhas alteradas em mãos (ex.: UPDATE ... RETURNING); sem SELECT extra.
+    """
+    if old_category_id == new_category_id:
+        return
+    acc: dict[tuple[date, str], list[int]] = {}
+    for occurred_at, kind, amount_cents in rows:
+        if occurred_at is None:
+            continue
+        a = acc.setdefault((occurred_at.date(), kind), [0, 0])
+        a[0] += int(amount_cents)
+        a[1] += 1
+    for (day, kind), (amount, count) in acc.items():
+        key = dict(tenant_id=tenant_id, company_id=company_id, day=day, kind=kind)
+        apply_delta(db, **key, category_id=old_category_id, amount_cents=-amount, tx_count=-count)
+        apply_delta(db, **key, category_id=new_category_id, amount_cents=amount, tx_count=count)
+
+
+def rebuild(db: Session, *, tenant_id: int | None = None, company_id: int | None = None) -> int:
+    """Recalcula o rollup a partir de `transactions` (escopo opcional). Retorna linhas geradas."""
+    scope_rollup = []
+    scope_tx = [Transaction.occurred_at.is_not(None)]
+    if tenant_id is not None:
+        scope_rollup.append(Rollup.tenant_id == tenant_id)
+        scope_tx.append(Transaction.tenant_id == tenant_id)
+    if company_id is not None:
+        scope_rollup.append(Rollup.company_id == company_id)
+        scope_tx.append(Transaction.company_id == company_id)
+
+    db.execute(delete(Rollup).where(*scope_rollup))
+
+    day = func.date(Transaction.occurred_at)
+    src = (
+        select(
+            Transaction.tenant_id,
+            Transaction.company_id,
+            day,
+            Transaction.category_id,
+            Transaction.kind,
+            func.sum(Transaction.amount_cents),
+            func.count(Transaction.id),
+        )
+        .where(*scope_tx)
+        .group_by(Transaction.tenant_id, Transaction.company_id, day, Transaction.category_id, Transaction.kind)
+    )
+    res = db.execute(
+        insert(Rollup).from_select(
+            ["tenant_id", "company_id", "day", "category_id", "kind", "amount_cents", "tx_count"],
+            src,
+        )
+    )
+    return int(res.rowcount or 0)
+
+
+# -----------------------------
+# Leitura (dias cheios no rollup + bordas parciais nas transações)
+# -----------------------------
+
+def full_day_span(start_dt: datetime, end_dt: datetime) -> tuple[date, date] | None:
+    """Maior intervalo de dias inteiros contido em [start_dt, end_dt]."""
+    first = start_dt.date() if start_dt.time() == time.min else start_dt.date() + timedelta(days=1)
+    last = end_dt.date() if end_dt.time() == time.max else end_dt.date() - timedelta(days=1)
+    if first > last:
+        return None
+    return first, last
+
+
+def _raw_daily(tenant_id: int, company_id: int, lower: datetime, upper: datetime, *, upper_inclusive: bool, bucket):
+    day = type_coerce(func.date(Transaction.occurred_at), Date)
+    upper_cond = Transaction.occurred_at <= upper if upper_inclusive else Transaction.occurred_at < upper
+    cols = [
+        day.label("day"),
+        Transaction.category_id.label("category_id"),
+        Transaction.kind.label("kind"),
+        func.sum(Transaction.amount_cents).label("amount_cents"),
+        func.count(Transaction.id).label("tx_count"),
+    ]
+    if bucket is not None:
+        cols.insert(0, literal(bucket).label("bucket"))
+    return (
+        select(*cols)
+        .where(
+            Transaction.tenant_id == tenant_id,
+            Transaction.company_id == company_id,
+            Transaction.occurred_at.is_not(None),
+            Transaction.occurred_at >= lower,
+            upper_cond,
+        )
+        .group_by(day, Transaction.category_id, Transaction.kind)
+    )
+
+
+def daily_source_parts(
+    *,
+    tenant_id: int,
+    company_id: int,
+    start_dt: datetime,
+    end_dt: datetime,
+    bucket: str | None = None,
+    use_rollup: bool = True,
+) -> list:
+    """
+    Selects com colunas (day, category_id, kind, amount_cents, tx_count) cobrindo [start_dt, end_dt].
+    Dias inteiros vêm do rollup; bordas parciais são agregadas das transações.
+    Com `bucket`, adiciona uma coluna literal "bucket" (para unir vários períodos).
+    Com `use_rollup=False`, agrega tudo direto das transações (mesmas colunas).
+    """
+    span = full_day_span(start_dt, end_dt) if use_rollup else None
+    if span is None:
+        return [_raw_daily(tenant_id, company_id, start_dt, end_dt, upper_inclusive=True, bucket=bucket)]
+
+    first, last = span
+    cols = [
+        Rollup.day.label("day"),
+        Rollup.category_id.label("category_id"),
+        Rollup.kind.label("kind"),
+        Rollup.amount_cents.label("amount_cents"),
+        Rollup.tx_count.label("tx_count"),
+    ]
+    if bucket is not None:
+        cols.insert(0, literal(bucket).label("bucket"))
+    parts = [
+        select(*cols).where(
+            Rollup.tenant_id == tenant_id,
+            Rollup.company_id == company_id,
+            and_(Rollup.day >= first, Rollup.day <= last),
+        )
+    ]
+
+    head_end = datetime.combine(first, time.min)
+    if start_dt < head_end:
+        parts.append(_raw_daily(tenant_id, company_id, start_dt, head_end, upper_inclusive=False, bucket=bucket))
+
+    tail_start = datetime.combine(last + timedelta(days=1), time.min)
+    if end_dt >= tail_start:
+        parts.append(_raw_daily(tenant_id, company_id, tail_start, end_dt, upper_inclusive=True, bucket=bucket))
+
+    return parts
+
+
+def union_parts(parts: list):
+    """UNION ALL plano (SQLite não aceita compostos entre parênteses)."""
+    return parts[0] if len(parts) == 1 else union_all(*parts)
+
+
+def daily_source(**kwargs):
+    return union_parts(daily_source_parts(**kwargs))
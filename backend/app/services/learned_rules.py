@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.db import dialect_insert
+from app.models.category import Category
+from app.models.category_token_stat import CategoryTokenStat as Stat
+from app.models.transaction import Transaction
+from app.services.categorization import normalize_text
+
+# Regras aprendidas por tenant (data quality).
+# Cada descrição categorizada vira um conjunto de tokens; o índice guarda, por
+# (tenant, token, categoria), quantas transações tinham aquele token. Na sugestão
+# vence o token mais discriminante: share = hits da melhor categoria / hits do token,
+# ponderado pelo suporte (poucos exemplos => confiança menor).
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_TOKEN_MIN_LEN = 3
+_TOKEN_MAX_LEN = 40
+_MAX_TOKENS_PER_DESC = 12
+_CONFIDENCE_CAP = 0.95
+_SUPPORT_PRIOR = 2
+_IN_CHUNK = 500
+
+_STOPWORDS = frozenset({
+    "com", "para", "por", "pelo", "pela", "dos", "nos", "nas", "uma", "que", "sem",
+    "via", "ref", "referente", "nro", "num", "doc", "the", "and",
+})
+
+
+@dataclass(frozen=True)
+class LearnedMatch:
+    category_id: int
+    token: str
+    hits: int
+    total: int
+    confidence: float
+
+
+def tokenize(description: str | None) -> tuple[str, ...]:
+    """Tokens distintos (ordem de aparição) usados no índice."""
+    seen: dict[str, None] = {}
+    for tok in _TOKEN_RE.findall(normalize_text(description)):
+        if len(tok) < _TOKEN_MIN_LEN or tok.isdigit() or tok in _STOPWORDS:
+            continue
+        seen.setdefault(tok[:_TOKEN_MAX_LEN], None)
+        if len(seen) >= _MAX_TOKENS_PER_DESC:
+            break
+    return tuple(seen)
+
+
+def _chunks(items: list, size: int = _IN_CHUNK) -> Iterable[list]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# -----------------------------
+# Manutenção incremental
+# -----------------------------
+
+def apply_deltas(db: Session, *, tenant_id: int, deltas: dict[tuple[str, int], int]) -> None:
+    """
+    Soma `deltas[(token, category_id)]` no índice; cria/remove linhas conforme o saldo. Não faz commit.
+    INSERT ... ON CONFLICT DO UPDATE contra ux_category_token_stats_key: escritores concorrentes
+    somam na mesma linha (chaves em ordem fixa para não se travarem em ordem cruzada).
+    """
+    deltas = {k: int(v) for k, v in deltas.items() if v}
+    if not deltas:
+        return
+
+    rows = [
+        {"tenant_id": tenant_id, "token": tok, "category_id": cat, "hits": d}
+        for (tok, cat), d in sorted(deltas.items())
+    ]
+    stmt = dialect_insert(db, Stat.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["tenant_id", "token", "category_id"],
+        set_={"hits": Stat.__table__.c.hits + stmt.excluded.hits},
+    )
+    db.execute(stmt, rows)
+
+    # saldo zerado (ou negativo, se a linha nem existia) sai do índice
+    shrunk = sorted({tok for (tok, _cat), d in deltas.items() if d < 0})
+    for part in _chunks(shrunk):
+        db.execute(delete(Stat).where(Stat.tenant_id == tenant_id, Stat.token.in_(part), Stat.hits <= 0))
+
+
+def record_recategorization(
+    db: Session,
+    *,
+    tenant_id: int,
+    changes: Iterable[tuple[str | None, int | None, int | None]],
+) -> None:
+    """
+    Atualiza o índice para transações que mudaram de categoria: (descrição, categoria antiga, nova).
+    Deve ser chamado junto com o UPDATE em `transactions` (mesma transação do banco);
+    transação criada já categorizada entra como (descrição, None, categoria).
+    """
+    deltas: Counter[tuple[str, int]] = Counter()
+    for description, old_category_id, new_category_id in changes:
+        if old_category_id == new_category_id:
+            continue
+        for tok in tokenize(description):
+            if old_category_id is not None:
+                deltas[(tok, old_category_id)] -= 1
+            if new_category_id is not None:
+                deltas[(tok, new_category_id)] += 1
+    apply_deltas(db, tenant_id=tenant_id, deltas=deltas)
+
+
+def rebuild(db: Session, *, tenant_id: int | None = None, batch_size: int = 5000) -> int:
+    """Minera o índice a partir das transações já categorizadas (escopo opcional). Retorna linhas geradas."""
+    scope_stats = [] if tenant_id is None else [Stat.tenant_id == tenant_id]
+    scope_tx = [Transaction.category_id.is_not(None)]
+    if tenant_id is not None:
+        scope_tx.append(Transaction.tenant_id == tenant_id)
+
+    db.execute(delete(Stat).where(*scope_stats))
+
+    counts: Counter[tuple[int, str, int]] = Counter()
+    q = (
+        select(Transaction.tenant_id, Transaction.description, Transaction.category_id)
+        .where(*scope_tx)
+        .execution_options(yield_per=batch_size)
+    )
+    for r in db.execute(q):
+        for tok in tokenize(r.description):
+            counts[(r.tenant_id, tok, r.category_id)] += 1
+
+    rows = [{"tenant_id": t, "token": tok, "category_id": c, "hits": n} for (t, tok, c), n in counts.items()]
+    for part in _chunks(rows, batch_size):
+        db.execute(insert(Stat), part)
+    return len(rows)
+
+
+# -----------------------------
+# Sugestão
+# -----------------------------
+
+def _load(db: Session, tenant_id: int, tokens: list[str]) -> dict[str, dict[int, int]]:
+    out: dict[str, dict[int, int]] = {}
+    for part in _chunks(tokens):
+        q = (
+            select(Stat.token, Stat.category_id, Stat.hits)
+            .join(Category, Category.id == Stat.category_id)
+            .where(Stat.tenant_id == tenant_id, Category.tenant_id == tenant_id, Stat.token.in_(part), Stat.hits > 0)
+        )
+        for r in db.execute(q):
+            out.setdefault(r.token, {})[r.category_id] = int(r.hits)
+    return out
+
+
+def _confidence(hits: int, total: int) -> float:
+    return min(_CONFIDENCE_CAP, (hits / total) * (hits / (hits + _SUPPORT_PRIOR)))
+
+
+def _best_for_token(token: str, by_category: dict[int, int]) -> LearnedMatch | None:
+    total = sum(by_category.values())
+    category_id, hits = max(by_category.items(), key=lambda kv: (kv[1], -kv[0]))
+    if hits < settings.LEARNED_RULES_MIN_SUPPORT or hits / total < settings.LEARNED_RULES_MIN_SHARE:
+        return None
+    return LearnedMatch(
+        category_id=category_id,
+        token=token,
+        hits=hits,
+        total=total,
+        confidence=round(_confidence(hits, total), 2),
+    )
+
+
+def suggest_many(db: Session, tenant_id: int, descriptions: Sequence[str | None]) -> list[LearnedMatch | None]:
+    """Melhor sugestão aprendida por descrição (None se nenhum token for discriminante o bastante)."""
+    out: list[LearnedMatch | None] = [None] * len(descriptions)
+    if not settings.LEARNED_RULES_ENABLED or not descriptions:
+        return out
+
+    per_row = [tokenize(d) for d in descriptions]
+    tokens = sorted({tok for toks in per_row for tok in toks})
+    if not tokens:
+        return out
+
+    index = _load(db, tenant_id, tokens)
+    best_by_token = {tok: _best_for_token(tok, cats) for tok, cats in index.items()}
+
+    for i, toks in enumerate(per_row):
+        best = None
+        for tok in toks:
+            cand = best_by_token.get(tok)
+            if cand is not None and (best is None or (cand.confidence, cand.hits) > (best.confidence, best.hits)):
+                best = cand
+        out[i] = best
+    return out
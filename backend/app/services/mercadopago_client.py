@@ -2,6 +2,7 @@ from typing import Any
 
 import httpx
 
+from app.core.resilience import get_guard
 from app.core.settings import settings
 
 
@@ -56,9 +57,10 @@ class MercadoPagoClient:
             if payer_email:
                 payload["payer"]["email"] = payer_email
 
-        with httpx.Client(
+        guard = get_guard("mercadopago")
+        with guard.call(), httpx.Client(
             base_url=self.base_url,
-            timeout=self.timeout_s,
+            timeout=guard.timeout(self.timeout_s),
             headers={
                 "Authorization": f"Bearer {self.access_token}",
                 "Content-Type": "application/json",
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta, timezone
 
 import httpx
 
+from app.core.resilience import get_guard
 from app.core.settings import settings
 
 
@@ -11,6 +12,7 @@ class PagBankClient:
         self.enabled = bool(settings.PAGBANK_ENABLED)
         self.token = settings.PAGBANK_TOKEN
         self.base_url = settings.PAGBANK_BASE_URL.rstrip("/")
+        self.timeout_s = settings.PAGBANK_TIMEOUT_S
 
     def create_pix_order(
         self,
@@ -60,9 +62,10 @@ class PagBankClient:
             ],
         }
 
-        with httpx.Client(
+        guard = get_guard("pagbank")
+        with guard.call(), httpx.Client(
             base_url=self.base_url,
-            timeout=30,
+            timeout=guard.timeout(self.timeout_s),
             headers={
                 "Authorization": f"Bearer {self.token}",
                 "accept": "application/json",
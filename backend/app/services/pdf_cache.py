@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: só o lock do processo
+    fcntl = None
+
+from app.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Cache de PDFs do AI Consult endereçado por conteúdo da requisição:
+# chave = sha256(report_key) -> tenant, empresa (+ cnpj), data_version e período normalizado.
+# Qualquer escrita na empresa (transações, categorias, dados cadastrais) muda a data_version,
+# então nunca há invalidação explícita:
+# a chave antiga só deixa de ser pedida e sai pelo LRU (limite em bytes).
+# O backend entrega um caminho local (FileResponse / sendfile, com ETag e Range);
+# um object store remoto precisaria materializar o objeto num spool local.
+
+_PDF_SUFFIX = ".pdf"
+_TMP_SUFFIX = ".tmp"
+_LOCK_NAME = ".lock"
+# lido/gravado há menos que isso: não sai pelo LRU (download em andamento em outro processo)
+_EVICT_GRACE_S = 300.0
+# .tmp mais velho que isso é de escrita interrompida
+_TMP_MAX_AGE_S = 3600.0
+# abaixo do limite (contagem local), o diretório só é re-medido a cada intervalo:
+# escritas de outros processos entram no total na próxima varredura
+_SWEEP_INTERVAL_S = 60.0
+
+
+def _touch(p: Path) -> None:
+    # relógio fino: o mtime do kernel tem granularidade de tick e empataria no LRU
+    now = time.time_ns()
+    os.utime(p, ns=(now, now))
+
+
+def content_key(report_key: str) -> str:
+    return hashlib.sha256(report_key.encode("utf-8")).hexdigest()
+
+
+class PdfStore:
+    """Interface mínima: objetos imutáveis por chave, lidos como arquivo local."""
+
+    name = "base"
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key: str) -> Path | None:
+        raise NotImplementedError
+
+    def put(self, key: str, data: bytes) -> Path:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "hits": self.hits, "misses": self.misses}
+
+
+class FilesystemPdfStore(PdfStore):
+    """
+    Arquivos <root>/<k[:2]>/<k>.pdf com LRU por tamanho total (max_bytes).
+    O disco é a fonte da verdade: o mtime é a "última leitura" e o total é medido no
+    diretório na varredura, sob um lock de arquivo (flock) — vários processos
+    (workers do uvicorn) dividem o diretório e o mesmo max_bytes.
+    Arquivo lido há menos de grace_s não é removido: outro processo pode estar
+    enviando-o (FileResponse abre o caminho só na hora de enviar).
+    A varredura (lock + glob + stat) só roda quando o total conhecido passa de max_bytes
+    ou a última tem mais de sweep_interval_s; escritas de outros processos entram no total
+    na próxima varredura. Métodos bloqueantes: chamar fora do event loop.
+    """
+
+    name = "fs"
+
+    def __init__(
+        self,
+        root: str | Path,
+        max_bytes: int,
+        *,
+        grace_s: float = _EVICT_GRACE_S,
+        sweep_interval_s: float = _SWEEP_INTERVAL_S,
+    ) -> None:
+        super().__init__()
+        self.root = Path(root)
+        self.max_bytes = max(0, int(max_bytes))
+        self.grace_s = float(grace_s)
+        self.sweep_interval_s = float(sweep_interval_s)
+        self.evictions = 0
+        self.sweeps = 0
+        self._swept_at = 0.0
+        self._lock = threading.Lock()
+        self._entries = 0
+        self._bytes = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.sweep()
+
+    def _file(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}{_PDF_SUFFIX}"
+
+    def path(self, key: str) -> Path | None:
+        p = self._file(key)
+        try:
+            # "toca" o arquivo: vira o mais recente no LRU (visto por todos os processos)
+            # e fica protegido da remoção durante o envio
+            _touch(p)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return p
+
+    def put(self, key: str, data: bytes) -> Path:
+        p = self._file(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        # escrita atômica: leitores nunca veem um PDF pela metade
+        fd, tmp = tempfile.mkstemp(dir=p.parent, suffix=_TMP_SUFFIX)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            _touch(Path(tmp))
+            os.replace(tmp, p)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        with self._lock:
+            self._bytes += len(data)
+            self._entries += 1
+            due = self._bytes > self.max_bytes or time.monotonic() - self._swept_at >= self.sweep_interval_s
+        if due:
+            self.sweep(keep=key)
+        return p
+
+    @contextmanager
+    def _dir_lock(self) -> Iterator[None]:
+        with self._lock, open(self.root / _LOCK_NAME, "a+b") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def sweep(self, *, keep: str | None = None) -> None:
+        """Mede o diretório, apaga .tmp abandonados (processo morto no meio da escrita) e aplica o LRU."""
+        now = time.time()
+        with self._dir_lock():
+            files: list[tuple[float, Path, int]] = []
+            for p in self.root.glob("*/*"):
+                try:
+                    st = p.stat()
+                except FileNotFoundError:
+                    continue
+                if p.suffix == _TMP_SUFFIX:
+                    if now - st.st_mtime > _TMP_MAX_AGE_S:
+                        p.unlink(missing_ok=True)
+                elif p.suffix == _PDF_SUFFIX:
+                    files.append((st.st_mtime, p, st.st_size))
+
+            files.sort()
+            total = sum(size for _mtime, _p, size in files)
+            entries = len(files)
+            for mtime, p, size in files:
+                if total <= self.max_bytes or now - mtime < self.grace_s:
+                    break
+                if p.stem == keep:
+                    continue
+                p.unlink(missing_ok=True)
+                total -= size
+                entries -= 1
+                self.evictions += 1
+            self._bytes, self._entries = total, entries
+            self._swept_at = time.monotonic()
+            self.sweeps += 1
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "entries": self._entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "sweeps": self.sweeps,
+        }
+
+
+_store: PdfStore | None = None
+_store_ready = False
+
+
+def _build_store() -> PdfStore | None:
+    backend = (settings.PDF_CACHE_BACKEND or "").strip().lower()
+    if backend in ("", "off", "none", "disabled"):
+        return None
+    if backend != "fs":
+        raise ValueError(f"PDF_CACHE_BACKEND inválido: {settings.PDF_CACHE_BACKEND!r} (use fs | off)")
+    root = settings.PDF_CACHE_DIR or os.path.join(tempfile.gettempdir(), "ia-cnpj-pdf-cache")
+    try:
+        return FilesystemPdfStore(root, settings.PDF_CACHE_MAX_BYTES)
+    except OSError:
+        logger.warning("pdf_cache_unavailable dir=%s", root)
+        return None
+
+
+def get_pdf_store() -> PdfStore | None:
+    global _store, _store_ready
+    if not _store_ready:
+        _store = _build_store()
+        _store_ready = True
+    return _store
+
+
+def set_pdf_store(store: PdfStore | None) -> None:
+    """Troca o backend (testes / bootstrap)."""
+    global _store, _store_ready
+    _store = store
+    _store_ready = True
+
+
+def pdf_cache_stats() -> dict:
+    store = get_pdf_store()
+    return store.stats() if store is not None else {"backend": "off"}
@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import asyncio
+import datetime as _dt
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from io import BytesIO
+from typing import Iterator
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+logger = logging.getLogger(__name__)
+
+# Renderização do PDF do AI Consult (POST /reports/ai-consult/pdf).
+# O ReportLab é CPU-bound e segura o GIL: roda num pool de processos limitado
+# (PDF_RENDER_PROCESSES; 0 = thread do asyncio, p/ ambientes sem fork/spawn), nunca
+# no event loop. No máximo PDF_RENDER_MAX_PENDING renders em voo por processo da API;
+# acima disso a request recebe 503 (PdfRenderBusy) em vez de enfileirar sem limite.
+# Este módulo não importa nada do app: é o que os processos "spawn" carregam.
+
+_DEJAVU_TTF = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+CHUNK_SIZE = 64 * 1024
+# spawn + import do ReportLab por worker no startup
+_WARMUP_TIMEOUT_S = 60.0
+
+_font_name: str | None = None
+
+
+def register_fonts() -> str:
+    """Registra a DejaVu uma vez por processo (startup / initializer do pool) e devolve o nome da fonte."""
+    global _font_name
+    if _font_name is None:
+        _font_name = "Helvetica"
+        if os.path.exists(_DEJAVU_TTF):
+            try:
+                pdfmetrics.registerFont(TTFont("DejaVu", _DEJAVU_TTF))
+                _font_name = "DejaVu"
+            except Exception:
+                logger.warning("pdf_font_register_failed path=%s", _DEJAVU_TTF)
+    return _font_name
+
+
+def _warmup() -> int:
+    """No-op do aquecimento do pool: garante o initializer e devolve o pid do worker."""
+    register_fonts()
+    # segura o worker um instante: os no-ops se espalham pelos processos
+    time.sleep(0.05)
+    return os.getpid()
+
+
+def build_pdf_bytes(title: str, payload: dict, consult: dict) -> bytes:
+    """Renderiza o PDF do AI Consult (CPU-bound: roda no pool, não no event loop)."""
+    buf = BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    font = register_fonts()
+    width, height = A4
+
+    c.setTitle(title)
+    c.setFont(font, 16)
+    c.drawString(20*mm, height - 20*mm, title)
+
+    c.setFont(font, 10)
+    generated_at = _dt.datetime.now(_dt.timezone.utc).isoformat(timespec="seconds").replace("+00:00","Z")
+    y = height - 30*mm
+    c.drawString(20*mm, y, f"Gerado em: {generated_at}")
+    y -= 8*mm
+    c.drawString(20*mm, y, f"company_id: {payload.get('company_id')}")
+    y -= 8*mm
+    # compat: period{start,end} OU start/end no root; fallback consult.period
+    period = {}
+    _p = payload.get('period')
+    if isinstance(_p, dict):
+        period.update(_p)
+    if payload.get('start') and not period.get('start'):
+        period['start'] = payload.get('start')
+    if payload.get('end') and not period.get('end'):
+        period['end'] = payload.get('end')
+    if not period.get('start') and not period.get('end'):
+        _cp = consult.get('period') if isinstance(consult, dict) else None
+        if isinstance(_cp, dict) and (_cp.get('start') or _cp.get('end')):
+            period = _cp
+    c.drawString(20*mm, y, f"period: {period.get('start')} → {period.get('end')}")
+    y -= 12*mm
+
+    # PDF Premium (seções) — evita dump bruto do JSON
+    c.setFont(font, 9)
+    left = 20*mm
+
+    def _new_text(ypos):
+        t = c.beginText(left, ypos)
+        t.setLeading(12)
+        return t
+
+    text = _new_text(y)
+
+    def _flush_page():
+        nonlocal text
+        c.drawText(text)
+        c.showPage()
+        c.setFont(font, 9)
+        text = _new_text(height - 20*mm)
+
+    def _line(msg=""):
+        nonlocal text
+        if text.getY() < 20*mm:
+            _flush_page()
+        msg = "" if msg is None else str(msg)
+        text.textLine(msg[:180])
+
+    def _h(title):
+        _line(title)
+        _line("-" * min(80, len(title)))
+        _line("")
+
+    def _first(d, *keys):
+        if not isinstance(d, dict):
+            return None
+        for k in keys:
+            v = d.get(k)
+            if v is not None:
+                return v
+        return None
+
+    def _money(v):
+        if v is None:
+            return "-"
+        try:
+            if isinstance(v, int):
+                cents = v
+            elif isinstance(v, float):
+                cents = int(round(v * 100))
+            elif isinstance(v, str):
+                vv = v.strip().replace(",", ".")
+                cents = int(vv) if vv.isdigit() else int(round(float(vv) * 100))
+            else:
+                cents = int(v)
+            sign = "-" if cents < 0 else ""
+            cents = abs(cents)
+            val = cents / 100.0
+            sbr = f"{val:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+            return f"{sign}R$ {sbr}"
+        except Exception:
+            return str(v)
+
+    data = consult if isinstance(consult, dict) else {}
+
+    _h("Resumo")
+    headline = data.get("headline")
+    if headline:
+        _line(headline)
+        _line("")
+
+    numbers = data.get("numbers") if isinstance(data.get("numbers"), dict) else {}
+    if numbers:
+        _h("Indicadores do período")
+        entradas = _first(numbers, "entradas_cents", "in_cents", "income_cents", "entradas")
+        saidas   = _first(numbers, "saidas_cents", "out_cents", "expense_cents", "saidas")
+        saldo    = _first(numbers, "saldo_cents", "balance_cents", "saldo")
+        _line(f"Entradas: {_money(entradas)}")
+        _line(f"Saídas:   {_money(saidas)}")
+        _line(f"Saldo:    {_money(saldo)}")
+        _line("")
+
+    cats = data.get("top_categories") if isinstance(data.get("top_categories"), list) else []
+    if cats:
+        _h("Top categorias (saídas)")
+        for i, ccat in enumerate(cats[:6], start=1):
+            if not isinstance(ccat, dict):
+                continue
+            name = ccat.get("category_name") or f"category_id={ccat.get('category_id')}"
+            outv = _first(ccat, "saidas_cents", "out_cents", "saidas")
+            balv = _first(ccat, "saldo_cents", "balance_cents", "saldo")
+            _line(f"{i}. {name} — saídas {_money(outv)} | saldo {_money(balv)}")
+        _line("")
+
+    def _bullets(title, items):
+        if not items:
+            return
+        _h(title)
+        for it in items[:12]:
+            _line(f"• {it}")
+        _line("")
+
+    _bullets("Insights", data.get("insights") if isinstance(data.get("insights"), list) else [])
+    _bullets("Riscos", data.get("risks") if isinstance(data.get("risks"), list) else [])
+    _bullets("Ações recomendadas", data.get("actions") if isinstance(data.get("actions"), list) else [])
+
+    txs = data.get("recent_transactions") if isinstance(data.get("recent_transactions"), list) else []
+    if txs:
+        _h("Transações recentes (amostra)")
+        for tx in txs[:10]:
+            if not isinstance(tx, dict):
+                continue
+            dte = tx.get("date") or tx.get("created_at") or ""
+            desc = tx.get("description") or tx.get("memo") or ""
+            amt = _first(tx, "amount_cents", "value_cents", "amount", "value")
+            _line(f"- {dte} | {_money(amt)} | {desc}")
+        _line("")
+
+    _h("Anexo técnico (campos)")
+    _line(", ".join(sorted(data.keys())))
+
+    c.drawText(text)
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+# -----------------------------
+# Pool
+# -----------------------------
+
+class PdfRenderBusy(Exception):
+    """Todos os slots de render ocupados (PDF_RENDER_MAX_PENDING)."""
+
+
+class PdfRenderer:
+    def __init__(self, processes: int, max_pending: int) -> None:
+        self.processes = max(0, int(processes))
+        self.max_pending = max(1, int(max_pending))
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pool: ProcessPoolExecutor | None = None
+        self._stats = {"rendered": 0, "rejected": 0, "failed": 0, "in_flight": 0}
+        self._warm_workers = 0
+
+    def _executor(self) -> ProcessPoolExecutor | None:
+        if self.processes == 0:
+            return None
+        with self._lock:
+            if self._pool is None:
+                # spawn: o filho não herda conexões/locks do processo da API
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=register_fonts,
+                )
+            return self._pool
+
+    def start(self) -> None:
+        """
+        Sobe o pool aquecido. O ProcessPoolExecutor só cria um worker por submit sem worker
+        ocioso: um no-op (_warmup) por processo, submetidos juntos, sobe todos; repete até
+        cada worker responder (initializer + imports prontos antes da primeira request).
+        """
+        register_fonts()
+        pool = self._executor()
+        if pool is None:
+            return
+        deadline = time.monotonic() + _WARMUP_TIMEOUT_S
+        pids: set[int] = set()
+        while len(pids) < self.processes and time.monotonic() < deadline:
+            futures = [pool.submit(_warmup) for _ in range(self.processes)]
+            done, _pending = wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+            pids.update(f.result() for f in done if f.exception() is None)
+        self._warm_workers = len(pids)
+        if len(pids) < self.processes:
+            logger.warning("pdf_render_warmup_incomplete warm=%s processes=%s", len(pids), self.processes)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._warm_workers = 0
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def render(self, title: str, payload: dict, consult: dict) -> bytes:
+        if not self._slots.acquire(blocking=False):
+            self._stats["rejected"] += 1
+            raise PdfRenderBusy()
+        self._stats["in_flight"] += 1
+        try:
+            pool = self._executor()
+            if pool is None:
+                register_fonts()
+                pdf = await asyncio.to_thread(build_pdf_bytes, title, payload, consult)
+            else:
+                pdf = await asyncio.get_running_loop().run_in_executor(pool, build_pdf_bytes, title, payload, consult)
+        except Exception:
+            self._stats["failed"] += 1
+            raise
+        finally:
+            self._stats["in_flight"] -= 1
+            self._slots.release()
+        self._stats["rendered"] += 1
+        return pdf
+
+    def snapshot(self) -> dict:
+        return {
+            "processes": self.processes,
+            "max_pending": self.max_pending,
+            "started": self._pool is not None,
+            "warm_workers": self._warm_workers,
+            **self._stats,
+        }
+
+
+def iter_chunks(data: bytes, size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
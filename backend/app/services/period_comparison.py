@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.models.category import Category
+from app.schemas.reports import (
+    CategoryComparison,
+    Period,
+    PeriodComparisonTotals,
+    PeriodDelta,
+    Totals,
+    TrendPoint,
+)
+from app.services.daily_rollup_service import daily_source_parts, union_parts
+
+# Comparação de períodos (relatórios + /ai/consult).
+# Uma só query sobre o rollup diário (ou sobre `transactions`, com o rollup desligado)
+# devolve linhas (bucket, dia, categoria, kind) para três janelas: atual, anterior
+# equivalente e mesmo período do ano anterior. Totais, deltas por categoria e a série
+# diária com média móvel saem dessas linhas em Python (calendário completo, dias sem
+# movimento contam como zero na média).
+
+_CUR = "cur"
+_PREV = "prev"
+_YOY = "yoy"
+
+DEFAULT_MOVING_AVERAGE_DAYS = 7
+
+
+@dataclass
+class _Acc:
+    in_cents: int = 0
+    out_cents: int = 0
+    cnt: int = 0
+
+    def add(self, kind: str, amount_cents: int, cnt: int) -> None:
+        if kind == "in":
+            self.in_cents += amount_cents
+        elif kind == "out":
+            self.out_cents += amount_cents
+        self.cnt += cnt
+
+    def totals(self) -> Totals:
+        return Totals(
+            entradas_cents=self.in_cents,
+            saidas_cents=self.out_cents,
+            saldo_cents=self.in_cents - self.out_cents,
+            qtd_transacoes=self.cnt,
+        )
+
+
+@dataclass
+class PeriodComparison:
+    totals: PeriodComparisonTotals
+    by_category: list[CategoryComparison]
+    series: list[TrendPoint]
+    moving_average_days: int
+
+
+def previous_range(start_dt: datetime, end_dt: datetime) -> tuple[datetime, datetime]:
+    """Janela anterior equivalente: mesmo número de dias, encerrando na véspera de start."""
+    days = (end_dt.date() - start_dt.date()).days + 1
+    prev_end = start_dt.date() - timedelta(days=1)
+    prev_start = prev_end - timedelta(days=days - 1)
+    return (
+        datetime(prev_start.year, prev_start.month, prev_start.day, 0, 0, 0),
+        datetime(prev_end.year, prev_end.month, prev_end.day, 23, 59, 59, 999999),
+    )
+
+
+def _minus_one_year(dt: datetime) -> datetime:
+    try:
+        return dt.replace(year=dt.year - 1)
+    except ValueError:
+        # 29/02 => 28/02
+        return dt.replace(year=dt.year - 1, day=28)
+
+
+def yoy_range(start_dt: datetime, end_dt: datetime) -> tuple[datetime, datetime]:
+    """Mesmo período do ano anterior (mesmos horários de corte)."""
+    return _minus_one_year(start_dt), _minus_one_year(end_dt)
+
+
+def _period(r: tuple[datetime, datetime]) -> Period:
+    return Period(start=r[0].date().isoformat(), end=r[1].date().isoformat())
+
+
+def _pct(current: int, base: int) -> float | None:
+    if not base:
+        return None
+    return round((current - base) * 100.0 / base, 2)
+
+
+def _delta(cur: Totals, base: Totals) -> PeriodDelta:
+    return PeriodDelta(
+        entradas_cents=cur.entradas_cents - base.entradas_cents,
+        saidas_cents=cur.saidas_cents - base.saidas_cents,
+        saldo_cents=cur.saldo_cents - base.saldo_cents,
+        qtd_transacoes=cur.qtd_transacoes - base.qtd_transacoes,
+        entradas_pct=_pct(cur.entradas_cents, base.entradas_cents),
+        saidas_pct=_pct(cur.saidas_cents, base.saidas_cents),
+    )
+
+
+def _as_date(v) -> date:
+    return v if isinstance(v, date) else date.fromisoformat(str(v)[:10])
+
+
+def _comparison_query(*, tenant_id: int, company_id: int, ranges: dict[str, tuple[datetime, datetime]]):
+    use_rollup = bool(settings.REPORTS_USE_DAILY_ROLLUP)
+    parts = []
+    for bucket, (lo, hi) in ranges.items():
+        parts += daily_source_parts(
+            tenant_id=tenant_id,
+            company_id=company_id,
+            start_dt=lo,
+            end_dt=hi,
+            bucket=bucket,
+            use_rollup=use_rollup,
+        )
+    src = union_parts(parts).subquery("src")
+
+    cat_name = func.coalesce(Category.name, "Sem categoria").label("category_name")
+    return (
+        select(
+            src.c.bucket,
+            src.c.day,
+            src.c.category_id,
+            cat_name,
+            src.c.kind,
+            func.coalesce(func.sum(src.c.amount_cents), 0).label("amount_cents"),
+            func.coalesce(func.sum(src.c.tx_count), 0).label("cnt"),
+        )
+        .select_from(src)
+        .outerjoin(Category, Category.id == src.c.category_id)
+        .group_by(src.c.bucket, src.c.day, src.c.category_id, Category.name, src.c.kind)
+        .having(func.sum(src.c.tx_count) > 0)
+    )
+
+
+def _moving_average(values: list[int], window: int) -> list[int]:
+    out: list[int] = []
+    acc = 0
+    for i, v in enumerate(values):
+        acc += v
+        if i >= window:
+            acc -= values[i - window]
+        out.append(round(acc / min(i + 1, window)))
+    return out
+
+
+def compare_periods(
+    db: Session,
+    *,
+    tenant_id: int,
+    company_id: int,
+    start_dt: datetime,
+    end_dt: datetime,
+    moving_average_days: int = DEFAULT_MOVING_AVERAGE_DAYS,
+) -> PeriodComparison:
+    """Atual x anterior x ano anterior + deltas por categoria + série com média móvel (uma query)."""
+    ranges = {
+        _CUR: (start_dt, end_dt),
+        _PREV: previous_range(start_dt, end_dt),
+        _YOY: yoy_range(start_dt, end_dt),
+    }
+    q = _comparison_query(tenant_id=tenant_id, company_id=company_id, ranges=ranges)
+
+    totals = {b: _Acc() for b in ranges}
+    cats: dict[tuple, dict[str, _Acc]] = {}
+    days: dict[date, _Acc] = {}
+    for r in db.execute(q).all():
+        amount, cnt = int(r.amount_cents or 0), int(r.cnt or 0)
+        totals[r.bucket].add(r.kind, amount, cnt)
+        cats.setdefault((r.category_id, str(r.category_name)), {b: _Acc() for b in ranges})[r.bucket].add(r.kind, amount, cnt)
+        if r.bucket == _CUR:
+            days.setdefault(_as_date(r.day), _Acc()).add(r.kind, amount, cnt)
+
+    cur, prev, yoy = totals[_CUR].totals(), totals[_PREV].totals(), totals[_YOY].totals()
+    comparison = PeriodComparisonTotals(
+        previous_period=_period(ranges[_PREV]),
+        yoy_period=_period(ranges[_YOY]),
+        current=cur,
+        previous=prev,
+        yoy=yoy,
+        vs_previous=_delta(cur, prev),
+        vs_yoy=_delta(cur, yoy),
+    )
+
+    by_category = [
+        CategoryComparison(
+            category_id=cat_id,
+            category_name=name,
+            entradas_cents=a[_CUR].in_cents,
+            saidas_cents=a[_CUR].out_cents,
+            previous_entradas_cents=a[_PREV].in_cents,
+            previous_saidas_cents=a[_PREV].out_cents,
+            yoy_entradas_cents=a[_YOY].in_cents,
+            yoy_saidas_cents=a[_YOY].out_cents,
+            saidas_delta_cents=a[_CUR].out_cents - a[_PREV].out_cents,
+            saidas_delta_pct=_pct(a[_CUR].out_cents, a[_PREV].out_cents),
+        )
+        for (cat_id, name), a in sorted(
+            cats.items(),
+            key=lambda kv: (-abs(kv[1][_CUR].out_cents - kv[1][_PREV].out_cents), kv[0][0] is None, kv[0][0] or 0),
+        )
+    ]
+
+    window = max(1, int(moving_average_days))
+    calendar = [start_dt.date() + timedelta(days=i) for i in range((end_dt.date() - start_dt.date()).days + 1)]
+    daily = [days.get(d, _Acc()) for d in calendar]
+    in_mm = _moving_average([a.in_cents for a in daily], window)
+    out_mm = _moving_average([a.out_cents for a in daily], window)
+    series = [
+        TrendPoint(
+            date=d.isoformat(),
+            entradas_cents=a.in_cents,
+            saidas_cents=a.out_cents,
+            saldo_cents=a.in_cents - a.out_cents,
+            entradas_mm_cents=in_mm[i],
+            saidas_mm_cents=out_mm[i],
+        )
+        for i, (d, a) in enumerate(zip(calendar, daily))
+    ]
+
+    return PeriodComparison(totals=comparison, by_category=by_category, series=series, moving_average_days=window)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+from datetime import datetime
+from typing import Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import CacheBackend, CacheUnavailable, MemoryCache, redis_cache_from_url
+from app.core.settings import settings
+from app.models.company import Company
+
+logger = logging.getLogger(__name__)
+
+_cache: CacheBackend | None = None
+_cache_ready = False
+
+
+def _build_cache() -> CacheBackend | None:
+    backend = (settings.REPORT_CACHE_BACKEND or "").strip().lower()
+    if backend in ("", "off", "none", "disabled"):
+        return None
+    if backend == "redis":
+        return redis_cache_from_url(settings.REPORT_CACHE_REDIS_URL, ttl_s=settings.REPORT_CACHE_TTL_S)
+    return MemoryCache(max_entries=settings.REPORT_CACHE_MAX_ENTRIES, ttl_s=settings.REPORT_CACHE_TTL_S)
+
+
+def get_report_cache() -> CacheBackend | None:
+    global _cache, _cache_ready
+    if not _cache_ready:
+        _cache = _build_cache()
+        _cache_ready = True
+    return _cache
+
+
+def set_report_cache(cache: CacheBackend | None) -> None:
+    """Troca o backend (testes / bootstrap)."""
+    global _cache, _cache_ready
+    _cache = cache
+    _cache_ready = True
+
+
+def report_cache_stats() -> dict:
+    cache = get_report_cache()
+    return cache.stats() if cache is not None else {"backend": "off"}
+
+
+# -----------------------------
+# Invalidação: contador de versão por empresa
+# -----------------------------
+
+def bump_company_version(db: Session, *, tenant_id: int, company_id: int) -> None:
+    """Incrementa companies.data_version na mesma transação da escrita (invalida o cache da empresa)."""
+    db.execute(
+        update(Company)
+        .where(Company.id == company_id, Company.tenant_id == tenant_id)
+        .values(data_version=Company.data_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# -----------------------------
+# Chave + leitura/escrita
+# -----------------------------
+
+def _period_part(raw: str | None, resolved: datetime) -> str:
+    # limites derivados de "agora" (start/end omitidos) são truncados no minuto
+    if raw is None:
+        return resolved.replace(second=0, microsecond=0).isoformat()
+    return resolved.isoformat()
+
+
+def report_key(
+    endpoint: str,
+    *,
+    tenant_id: int,
+    company: Company,
+    start: str | None,
+    end: str | None,
+    start_dt: datetime,
+    end_dt: datetime,
+    **params: Any,
+) -> str:
+    extra = ",".join(f"{k}={params[k]}" for k in sorted(params))
+    return (
+        f"reports:{endpoint}:t{tenant_id}:c{company.id}:v{int(company.data_version or 0)}:"
+        f"{_period_part(start, start_dt)}:{_period_part(end, end_dt)}:{extra}"
+    )
+
+
+def cached_report(key: str, compute: Callable[[], Any]) -> Any:
+    """Devolve o valor em cache (forma JSON) ou calcula, serializa e guarda."""
+    cache = get_report_cache()
+    if cache is None:
+        return compute()
+
+    # cache fora do ar não derruba o relatório: loga e calcula direto do banco
+    try:
+        hit = cache.get(key)
+    except CacheUnavailable:
+        logger.warning("report_cache_get_failed key=%s", key, exc_info=True)
+        return compute()
+    if hit is not None:
+        return hit
+
+    value = jsonable_encoder(compute())
+    try:
+        cache.set(key, value)
+    except CacheUnavailable:
+        logger.warning("report_cache_set_failed key=%s", key, exc_info=True)
+    return value
+
+
+async def cached_report_async(db: AsyncSession, key: str, compute: Callable[[Session], Any]) -> Any:
+    """
+    cached_report para as rotas async: compute(session) roda via db.run_sync e o cache via
+    aget/aset (backend de rede numa thread), sem prender o event loop no I/O do Redis.
+    """
+    cache = get_report_cache()
+    if cache is None:
+        return await db.run_sync(compute)
+
+    try:
+        hit = await cache.aget(key)
+    except CacheUnavailable:
+        logger.warning("report_cache_get_failed key=%s", key, exc_info=True)
+        return await db.run_sync(compute)
+    if hit is not None:
+        return hit
+
+    value = jsonable_encoder(await db.run_sync(compute))
+    try:
+        await cache.aset(key, value)
+    except CacheUnavailable:
+        logger.warning("report_cache_set_failed key=%s", key, exc_info=True)
+    return value
+
+
+# -----------------------------
+# ETag (GET condicional)
+# -----------------------------
+
+def report_etag(key: str) -> str:
+    """ETag forte derivado da chave (tenant, empresa, data_version, período, parâmetros)."""
+    return '"' + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match usa comparação fraca (RFC 9110): ignora o prefixo W/."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Date, case, cast, func, literal, literal_column, select, true
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.models.category import Category
+from app.schemas.reports import CategorySeries, SeriesPoint
+from app.services.daily_rollup_service import daily_source_parts, union_parts
+
+# Série temporal dos relatórios (/reports/series).
+# Uma query: fonte diária (rollup + bordas, ou transações) agregada por bucket
+# (dia/semana/mês), calendário completo do período (generate_series no Postgres,
+# CTE recursiva no SQLite) em LEFT JOIN, e saldo acumulado por window function.
+# Semanas começam na segunda (date_trunc('week')); o ponto é rotulado pelo início do bucket.
+
+GRANULARITIES = ("day", "week", "month")
+
+_PG_STEP = {"day": "interval '1 day'", "week": "interval '1 week'", "month": "interval '1 month'"}
+_SQLITE_STEP = {"day": "+1 day", "week": "+7 days", "month": "+1 month"}
+
+
+def bucket_start(d: date, granularity: str) -> date:
+    if granularity == "week":
+        return d - timedelta(days=d.weekday())
+    if granularity == "month":
+        return d.replace(day=1)
+    return d
+
+
+def count_buckets(start: date, end: date, granularity: str) -> int:
+    first, last = bucket_start(start, granularity), bucket_start(end, granularity)
+    if granularity == "month":
+        return (last.year - first.year) * 12 + (last.month - first.month) + 1
+    if granularity == "week":
+        return (last - first).days // 7 + 1
+    return (last - first).days + 1
+
+
+def _as_date(v) -> date:
+    return v if isinstance(v, date) else date.fromisoformat(str(v)[:10])
+
+
+def _sql_str(value: str):
+    # literal no SQL (não bind): SELECT e GROUP BY precisam da mesma expressão no Postgres
+    return literal_column(f"'{value}'")
+
+
+def _bucket_expr(day, granularity: str, is_postgres: bool):
+    if is_postgres:
+        if granularity == "day":
+            return cast(day, Date)
+        return cast(func.date_trunc(_sql_str(granularity), day), Date)
+    if granularity == "week":
+        # próximo domingo (ou o próprio) - 6 dias => segunda-feira da semana
+        return func.date(day, _sql_str("weekday 0"), _sql_str("-6 days"))
+    if granularity == "month":
+        return func.date(day, _sql_str("start of month"))
+    return func.date(day)
+
+
+def _calendar(first: date, last: date, granularity: str, is_postgres: bool):
+    if is_postgres:
+        step = func.generate_series(
+            literal(datetime.combine(first, datetime.min.time())),
+            literal(datetime.combine(last, datetime.min.time())),
+            literal_column(_PG_STEP[granularity]),
+        )
+        return select(cast(step, Date).label("bucket")).subquery("cal")
+
+    cal = select(literal(first.isoformat()).label("bucket")).cte("cal", recursive=True)
+    return cal.union_all(
+        select(func.date(cal.c.bucket, _SQLITE_STEP[granularity])).where(cal.c.bucket < last.isoformat())
+    )
+
+
+def series_query(
+    db: Session,
+    *,
+    tenant_id: int,
+    company_id: int,
+    start_dt: datetime,
+    end_dt: datetime,
+    granularity: str,
+    by_category: bool = False,
+):
+    """
+    Linhas (bucket, [category_id, category_name,] in_cents, out_cents, cnt, running_cents)
+    para todos os buckets do período (sem movimento => zeros), ordenadas por [categoria,] bucket.
+    """
+    is_postgres = str(db.get_bind().dialect.name).startswith("postgres")
+
+    src = union_parts(
+        daily_source_parts(
+            tenant_id=tenant_id,
+            company_id=company_id,
+            start_dt=start_dt,
+            end_dt=end_dt,
+            use_rollup=bool(settings.REPORTS_USE_DAILY_ROLLUP),
+        )
+    ).subquery("src")
+
+    bucket = _bucket_expr(src.c.day, granularity, is_postgres).label("bucket")
+    keys = [bucket, src.c.category_id] if by_category else [bucket]
+    agg = (
+        select(
+            *keys,
+            func.sum(case((src.c.kind == "in", src.c.amount_cents), else_=0)).label("in_cents"),
+            func.sum(case((src.c.kind == "out", src.c.amount_cents), else_=0)).label("out_cents"),
+            func.sum(src.c.tx_count).label("cnt"),
+        )
+        .group_by(*keys)
+        .cte("agg")
+    )
+
+    cal = _calendar(
+        bucket_start(start_dt.date(), granularity),
+        bucket_start(end_dt.date(), granularity),
+        granularity,
+        is_postgres,
+    )
+
+    in_c = func.coalesce(agg.c.in_cents, 0)
+    out_c = func.coalesce(agg.c.out_cents, 0)
+
+    if not by_category:
+        return (
+            select(
+                cal.c.bucket,
+                in_c.label("in_cents"),
+                out_c.label("out_cents"),
+                func.coalesce(agg.c.cnt, 0).label("cnt"),
+                func.sum(in_c - out_c).over(order_by=cal.c.bucket, rows=(None, 0)).label("running_cents"),
+            )
+            .select_from(cal)
+            .outerjoin(agg, agg.c.bucket == cal.c.bucket)
+            .order_by(cal.c.bucket)
+        )
+
+    # só categorias com movimento no período; cada uma recebe o calendário inteiro
+    cats = select(agg.c.category_id).distinct().subquery("cats")
+    cat_name = func.coalesce(Category.name, "Sem categoria")
+    return (
+        select(
+            cal.c.bucket,
+            cats.c.category_id,
+            cat_name.label("category_name"),
+            in_c.label("in_cents"),
+            out_c.label("out_cents"),
+            func.coalesce(agg.c.cnt, 0).label("cnt"),
+            func.sum(in_c - out_c)
+            .over(partition_by=cats.c.category_id, order_by=cal.c.bucket, rows=(None, 0))
+            .label("running_cents"),
+        )
+        .select_from(cal.join(cats, true()))
+        .outerjoin(Category, Category.id == cats.c.category_id)
+        .outerjoin(
+            agg,
+            (agg.c.bucket == cal.c.bucket) & agg.c.category_id.is_not_distinct_from(cats.c.category_id),
+        )
+        .order_by(cats.c.category_id.is_(None), cats.c.category_id, cal.c.bucket)
+    )
+
+
+def _point(r) -> SeriesPoint:
+    entradas, saidas = int(r.in_cents or 0), int(r.out_cents or 0)
+    return SeriesPoint(
+        date=_as_date(r.bucket).isoformat(),
+        entradas_cents=entradas,
+        saidas_cents=saidas,
+        saldo_cents=entradas - saidas,
+        saldo_acumulado_cents=int(r.running_cents or 0),
+        qtd_transacoes=int(r.cnt or 0),
+    )
+
+
+def build_series(
+    db: Session,
+    *,
+    tenant_id: int,
+    company_id: int,
+    start_dt: datetime,
+    end_dt: datetime,
+    granularity: str,
+    by_category: bool = False,
+) -> tuple[list[SeriesPoint], list[CategorySeries] | None]:
+    """Série total (+ por categoria). Com categorias, o total é a soma das séries (mesma query)."""
+    q = series_query(
+        db,
+        tenant_id=tenant_id,
+        company_id=company_id,
+        start_dt=start_dt,
+        end_dt=end_dt,
+        granularity=granularity,
+        by_category=by_category,
+    )
+    rows = db.execute(q).all()
+    if not by_category:
+        return [_point(r) for r in rows], None
+
+    per_cat: OrderedDict[int | None, CategorySeries] = OrderedDict()
+    totals: dict[date, list[int]] = {}
+    for r in rows:
+        cs = per_cat.get(r.category_id)
+        if cs is None:
+            cs = per_cat[r.category_id] = CategorySeries(
+                category_id=r.category_id, category_name=str(r.category_name), series=[]
+            )
+        p = _point(r)
+        cs.series.append(p)
+        acc = totals.setdefault(_as_date(r.bucket), [0, 0, 0])
+        acc[0] += p.entradas_cents
+        acc[1] += p.saidas_cents
+        acc[2] += p.qtd_transacoes
+
+    calendar = _calendar_dates(start_dt.date(), end_dt.date(), granularity)
+    series: list[SeriesPoint] = []
+    running = 0
+    for d in calendar:
+        entradas, saidas, cnt = totals.get(d, (0, 0, 0))
+        running += entradas - saidas
+        series.append(
+            SeriesPoint(
+                date=d.isoformat(),
+                entradas_cents=entradas,
+                saidas_cents=saidas,
+                saldo_cents=entradas - saidas,
+                saldo_acumulado_cents=running,
+                qtd_transacoes=cnt,
+            )
+        )
+    return series, list(per_cat.values())
+
+
+def _calendar_dates(start: date, end: date, granularity: str) -> list[date]:
+    d, last = bucket_start(start, granularity), bucket_start(end, granularity)
+    out = []
+    while d <= last:
+        out.append(d)
+        if granularity == "month":
+            d = date(d.year + (d.month == 12), d.month % 12 + 1, 1)
+        else:
+            d += timedelta(days=7 if granularity == "week" else 1)
+    return out
@@ -0,0 +1,382 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import and_, case, func, literal_column, or_, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.schemas.reports import CategoryBreakdown, Totals, TransactionBrief
+from app.services.daily_rollup_service import daily_source_parts, union_parts
+
+
+# Agregação única dos relatórios.
+# Uma só query agrupada (por bucket de período x categoria [x descrição]) alimenta
+# totals, by_category, top descrições e recorrentes. Postgres usa GROUPING SETS;
+# SQLite (lab) agrupa no grão mais fino e consolida em Python.
+# Sem descrições, a query lê o rollup diário (dias inteiros) + bordas parciais.
+
+_CUR = "cur"
+_PREV = "prev"
+
+
+@dataclass
+class DescriptionGroup:
+    sample: str
+    sum: int
+    cnt: int
+
+    def as_dict(self) -> dict:
+        return {"sample": self.sample, "sum": self.sum, "cnt": self.cnt}
+
+
+@dataclass
+class ReportAggregate:
+    totals: Totals
+    by_category: list[CategoryBreakdown]
+    top_descriptions: list[DescriptionGroup] = field(default_factory=list)
+    recurring: list[DescriptionGroup] = field(default_factory=list)
+    previous_totals: Totals | None = None
+
+
+@dataclass
+class _Acc:
+    in_cents: int = 0
+    out_cents: int = 0
+    cnt: int = 0
+    out_cnt: int = 0
+    sample: str | None = None
+
+    def add(self, r) -> None:
+        self.in_cents += int(r.in_cents or 0)
+        self.out_cents += int(r.out_cents or 0)
+        self.cnt += int(r.cnt or 0)
+        self.out_cnt += int(getattr(r, "out_cnt", 0) or 0)
+        s = getattr(r, "sample", None)
+        if s is not None and (self.sample is None or s > self.sample):
+            self.sample = s
+
+
+def _is_postgres(db: Session) -> bool:
+    return str(db.get_bind().dialect.name).startswith("postgres")
+
+
+def _totals(acc: _Acc) -> Totals:
+    return Totals(
+        entradas_cents=acc.in_cents,
+        saidas_cents=acc.out_cents,
+        saldo_cents=acc.in_cents - acc.out_cents,
+        qtd_transacoes=acc.cnt,
+    )
+
+
+def _base_rows(
+    *,
+    tenant_id: int,
+    company_id: int,
+    start_dt: datetime,
+    end_dt: datetime,
+    prev_range: tuple[datetime, datetime] | None,
+    with_descriptions: bool,
+):
+    """Subquery com uma linha por transação do(s) período(s), já com bucket/chaves calculados."""
+    in_range = and_(Transaction.occurred_at >= start_dt, Transaction.occurred_at <= end_dt)
+    if prev_range is not None:
+        in_range = or_(
+            in_range,
+            and_(Transaction.occurred_at >= prev_range[0], Transaction.occurred_at <= prev_range[1]),
+        )
+
+    cols = [
+        case((Transaction.occurred_at >= start_dt, literal_column(f"'{_CUR}'")), else_=literal_column(f"'{_PREV}'")).label("bucket"),
+        Transaction.category_id.label("category_id"),
+        func.coalesce(Category.name, "Sem categoria").label("category_name"),
+        Transaction.kind.label("kind"),
+        Transaction.amount_cents.label("amount_cents"),
+    ]
+    if with_descriptions:
+        desc_raw = func.coalesce(Transaction.description, "")
+        desc_key = func.lower(func.trim(desc_raw))
+        desc_key = case((desc_key == "", literal_column("'(sem descrição)'")), else_=desc_key)
+        cols += [desc_key.label("desc_key"), desc_raw.label("desc_raw")]
+
+    return (
+        select(*cols)
+        .select_from(Transaction)
+        .outerjoin(Category, Category.id == Transaction.category_id)
+        .where(
+            Transaction.company_id == company_id,
+            Transaction.tenant_id == tenant_id,
+            Transaction.occurred_at.is_not(None),
+            in_range,
+        )
+        .subquery("tx")
+    )
+
+
+def _measures(tx, with_descriptions: bool) -> list:
+    is_out = tx.c.kind == "out"
+    cols = [
+        func.coalesce(func.sum(case((tx.c.kind == "in", tx.c.amount_cents), else_=0)), 0).label("in_cents"),
+        func.coalesce(func.sum(case((is_out, tx.c.amount_cents), else_=0)), 0).label("out_cents"),
+        func.count().label("cnt"),
+    ]
+    if with_descriptions:
+        cols += [
+            func.count(case((is_out, 1))).label("out_cnt"),
+            func.max(case((is_out, tx.c.desc_raw))).label("sample"),
+        ]
+    return cols
+
+
+def _rank_descriptions(groups: dict[str, _Acc]) -> tuple[list[DescriptionGroup], list[DescriptionGroup]]:
+    ranked = sorted(
+        ((k, a) for k, a in groups.items() if a.out_cnt > 0),
+        key=lambda kv: (-kv[1].out_cents, kv[0]),
+    )
+
+    def _group(k: str, a: _Acc) -> DescriptionGroup:
+        sample = (a.sample or k or "(sem descrição)").strip()
+        return DescriptionGroup(sample=sample[:80], sum=a.out_cents, cnt=a.out_cnt)
+
+    top = [_group(k, a) for k, a in ranked[:5]]
+    # mesmo contrato do /ai/consult: top 3 com >= 2 ocorrências, depois corte de valor mínimo
+    recurring = [_group(k, a) for k, a in ranked if a.out_cnt >= 2][:3]
+    recurring = [g for g in recurring if g.sum >= 1000]
+    return top, recurring
+
+
+def aggregate_period(
+    db: Session,
+    *,
+    tenant_id: int,
+    company_id: int,
+    start_dt: datetime,
+    end_dt: datetime,
+    prev_range: tuple[datetime, datetime] | None = None,
+    with_descriptions: bool = False,
+) -> ReportAggregate:
+    """
+    Calcula totals + by_category (+ descrições/recorrentes e totals do período anterior)
+    numa única query. Sem descrições, lê o rollup diário; com descrições, `transactions`.
+    """
+    if not with_descriptions and settings.REPORTS_USE_DAILY_ROLLUP:
+        q = _rollup_query(
+            tenant_id=tenant_id,
+            company_id=company_id,
+            start_dt=start_dt,
+            end_dt=end_dt,
+            prev_range=prev_range,
+        )
+        return _build_aggregate(db.execute(q).all(), prev_range=prev_range, with_descriptions=False, grouped_by_sets=False)
+
+    tx = _base_rows(
+        tenant_id=tenant_id,
+        company_id=company_id,
+        start_dt=start_dt,
+        end_dt=end_dt,
+        prev_range=prev_range,
+        with_descriptions=with_descriptions,
+    )
+
+    cat_keys = (tx.c.bucket, tx.c.category_id, tx.c.category_name)
+    grouped_by_sets = with_descriptions and _is_postgres(db)
+
+    if grouped_by_sets:
+        q = (
+            select(
+                *cat_keys,
+                tx.c.desc_key,
+                func.grouping(tx.c.category_id, tx.c.category_name, tx.c.desc_key).label("gset"),
+                *_measures(tx, True),
+            )
+            .group_by(func.grouping_sets(tuple_(*cat_keys), tuple_(tx.c.bucket, tx.c.desc_key)))
+        )
+    elif with_descriptions:
+        q = select(*cat_keys, tx.c.desc_key, *_measures(tx, True)).group_by(*cat_keys, tx.c.desc_key)
+    else:
+        q = select(*cat_keys, *_measures(tx, False)).group_by(*cat_keys)
+
+    return _build_aggregate(
+        db.execute(q).all(),
+        prev_range=prev_range,
+        with_descriptions=with_descriptions,
+        grouped_by_sets=grouped_by_sets,
+    )
+
+
+def _rollup_query(
+    *,
+    tenant_id: int,
+    company_id: int,
+    start_dt: datetime,
+    end_dt: datetime,
+    prev_range: tuple[datetime, datetime] | None,
+):
+    parts = daily_source_parts(tenant_id=tenant_id, company_id=company_id, start_dt=start_dt, end_dt=end_dt, bucket=_CUR)
+    if prev_range is not None:
+        parts += daily_source_parts(
+            tenant_id=tenant_id,
+            company_id=company_id,
+            start_dt=prev_range[0],
+            end_dt=prev_range[1],
+            bucket=_PREV,
+        )
+    src = union_parts(parts).subquery("src")
+
+    cat_name = func.coalesce(Category.name, "Sem categoria").label("category_name")
+    return (
+        select(
+            src.c.bucket,
+            src.c.category_id,
+            cat_name,
+            func.coalesce(func.sum(case((src.c.kind == "in", src.c.amount_cents), else_=0)), 0).label("in_cents"),
+            func.coalesce(func.sum(case((src.c.kind == "out", src.c.amount_cents), else_=0)), 0).label("out_cents"),
+            func.coalesce(func.sum(src.c.tx_count), 0).label("cnt"),
+        )
+        .select_from(src)
+        .outerjoin(Category, Category.id == src.c.category_id)
+        .group_by(src.c.bucket, src.c.category_id, Category.name)
+        .having(func.sum(src.c.tx_count) > 0)
+    )
+
+
+def _build_aggregate(
+    rows,
+    *,
+    prev_range: tuple[datetime, datetime] | None,
+    with_descriptions: bool,
+    grouped_by_sets: bool,
+) -> ReportAggregate:
+    totals = {_CUR: _Acc(), _PREV: _Acc()}
+    cats: dict[tuple, _Acc] = {}
+    descs: dict[str, _Acc] = {}
+
+    for r in rows:
+        # GROUPING(category_id, category_name, desc_key): 1 => set por categoria; 6 => set por descrição
+        is_desc_row = grouped_by_sets and int(r.gset) == 6
+        is_cat_row = not grouped_by_sets or int(r.gset) == 1
+
+        if is_cat_row:
+            totals[r.bucket].add(r)
+            if r.bucket == _CUR:
+                cats.setdefault((r.category_id, str(r.category_name)), _Acc()).add(r)
+        if r.bucket == _CUR and with_descriptions and (is_desc_row or not grouped_by_sets):
+            descs.setdefault(str(r.desc_key), _Acc()).add(r)
+
+    by_category = [
+        CategoryBreakdown(
+            category_id=cat_id,
+            category_name=name,
+            entradas_cents=a.in_cents,
+            saidas_cents=a.out_cents,
+            saldo_cents=a.in_cents - a.out_cents,
+            qtd_transacoes=a.cnt,
+        )
+        for (cat_id, name), a in sorted(
+            cats.items(),
+            key=lambda kv: (-(kv[1].in_cents + kv[1].out_cents), kv[0][0] is None, kv[0][0] or 0),
+        )
+    ]
+
+    top, recurring = _rank_descriptions(descs) if with_descriptions else ([], [])
+
+    return ReportAggregate(
+        totals=_totals(totals[_CUR]),
+        by_category=by_category,
+        top_descriptions=top,
+        recurring=recurring,
+        previous_totals=_totals(totals[_PREV]) if prev_range is not None else None,
+    )
+
+
+def daily_points_query(
+    db: Session,
+    *,
+    tenant_id: int,
+    company_id: int,
+    start_dt: datetime,
+    end_dt: datetime,
+):
+    """Query (day, in_cents, out_cents) por dia com movimento, em ordem crescente."""
+    if settings.REPORTS_USE_DAILY_ROLLUP:
+        src = union_parts(
+            daily_source_parts(tenant_id=tenant_id, company_id=company_id, start_dt=start_dt, end_dt=end_dt)
+        ).subquery("src")
+        return (
+            select(
+                src.c.day,
+                func.coalesce(func.sum(case((src.c.kind == "in", src.c.amount_cents), else_=0)), 0).label("in_cents"),
+                func.coalesce(func.sum(case((src.c.kind == "out", src.c.amount_cents), else_=0)), 0).label("out_cents"),
+            )
+            .group_by(src.c.day)
+            .having(func.sum(src.c.tx_count) > 0)
+            .order_by(src.c.day.asc())
+        )
+
+    day = func.date(Transaction.occurred_at).label("day")
+    return (
+        select(
+            day,
+            func.coalesce(func.sum(case((Transaction.kind == "in", Transaction.amount_cents), else_=0)), 0).label("in_cents"),
+            func.coalesce(func.sum(case((Transaction.kind == "out", Transaction.amount_cents), else_=0)), 0).label("out_cents"),
+        )
+        .where(
+            Transaction.company_id == company_id,
+            Transaction.tenant_id == tenant_id,
+            Transaction.occurred_at.is_not(None),
+            Transaction.occurred_at >= start_dt,
+            Transaction.occurred_at <= end_dt,
+        )
+        .group_by(day)
+        .order_by(day.asc())
+    )
+
+
+def recent_transactions(
+    db: Session,
+    *,
+    tenant_id: int,
+    company_id: int,
+    start_dt: datetime,
+    end_dt: datetime,
+    limit: int,
+) -> list[TransactionBrief]:
+    q = (
+        select(
+            Transaction.id,
+            Transaction.occurred_at,
+            Transaction.kind,
+            Transaction.amount_cents,
+            Transaction.category_id,
+            func.coalesce(Category.name, "Sem categoria").label("category_name"),
+            Transaction.description,
+        )
+        .select_from(Transaction)
+        .outerjoin(Category, Category.id == Transaction.category_id)
+        .where(
+            Transaction.company_id == company_id,
+            Transaction.tenant_id == tenant_id,
+            Transaction.occurred_at.is_not(None),
+            Transaction.occurred_at >= start_dt,
+            Transaction.occurred_at <= end_dt,
+        )
+        .order_by(Transaction.occurred_at.desc())
+        .limit(limit)
+    )
+
+    return [
+        TransactionBrief(
+            id=r.id,
+            occurred_at=r.occurred_at,
+            kind=r.kind,
+            amount_cents=int(r.amount_cents),
+            category_id=r.category_id,
+            category_name=str(r.category_name),
+            description=r.description or "",
+        )
+        for r in db.execute(q).all()
+    ]
@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Iterable, Iterator
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.db import dialect_insert
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.services import daily_rollup_service as daily_rollup
+from app.services import learned_rules
+
+# Importação em lote de transações (/transactions/bulk).
+# Entrada (JSON, NDJSON, CSV ou OFX) vira um iterador de (linha, dict bruto);
+# cada lote é normalizado contra o mapa de categorias pré-carregado e inserido com um
+# único executemany; linhas com external_id usam ON CONFLICT DO NOTHING (idempotente).
+
+CHUNK_SIZE = 1000
+MAX_ERRORS_REPORTED = 500
+
+_DESC_MAX = 200
+_EXTERNAL_ID_MAX = 80
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class CategoryMap:
+    ids: set[int]
+    by_name: dict[str, int]
+
+    @classmethod
+    def load(cls, db: Session, tenant_id: int) -> "CategoryMap":
+        rows = db.execute(select(Category.id, Category.name).where(Category.tenant_id == tenant_id)).all()
+        return cls(ids={r.id for r in rows}, by_name={(r.name or "").strip().lower(): r.id for r in rows})
+
+
+@dataclass
+class IngestResult:
+    company_id: int
+    received: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    errors: list[dict] = field(default_factory=list)
+    error_count: int = 0
+
+    def add_error(self, row: int, error: str, external_id: str | None = None) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS_REPORTED:
+            self.errors.append({"row": row, "external_id": external_id, "error": error})
+
+
+# -----------------------------
+# Parsers (linha é 1-based; CSV conta o cabeçalho como linha 1)
+# -----------------------------
+
+def parse_json_array(body: bytes) -> Iterator[tuple[int, Any]]:
+    try:
+        data = json.loads(body or b"[]")
+    except ValueError as e:
+        raise RowError(f"JSON inválido: {e}")
+    if isinstance(data, dict):
+        data = data.get("items")
+    if not isinstance(data, list):
+        raise RowError("esperado um array JSON (ou {\"items\": [...]})")
+    for i, item in enumerate(data, start=1):
+        yield i, item
+
+
+def parse_ndjson_line(line: str | bytes) -> Any:
+    """Objeto da linha NDJSON, None para linha vazia ou RowError (vira erro da linha, não do lote)."""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return RowError(f"JSON inválido: {e}")
+
+
+def decode_text(body: bytes) -> str:
+    # extratos de bancos brasileiros ainda saem em latin-1/cp1252
+    try:
+        return body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return body.decode("latin-1")
+
+
+def parse_csv(text: str) -> Iterator[tuple[int, Any]]:
+    head = text[:4096]
+    try:
+        dialect = csv.Sniffer().sniff(head.splitlines()[0] if head else "", delimiters=",;\t|")
+        delimiter = dialect.delimiter
+    except csv.Error:
+        delimiter = ","
+    # ";" é o CSV do Excel pt-BR: vírgula decimal ("1.500,00"); nos demais o separador é adivinhado
+    decimal = "," if delimiter == ";" else None
+    reader = csv.DictReader(io.StringIO(text), delimiter=delimiter)
+    for i, row in enumerate(reader, start=2):
+        yield i, _with_amount({(k or "").strip().lower(): v for k, v in row.items()}, decimal)
+
+
+_OFX_TX = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.IGNORECASE | re.DOTALL)
+_OFX_TAG = re.compile(r"<([A-Z0-9.]+)>([^<\r\n]*)", re.IGNORECASE)
+
+
+def parse_ofx(text: str) -> Iterator[tuple[int, Any]]:
+    for i, m in enumerate(_OFX_TX.finditer(text), start=1):
+        tags = {k.upper(): v.strip() for k, v in _OFX_TAG.findall(m.group(1))}
+        raw_date = re.sub(r"[^0-9]", "", (tags.get("DTPOSTED") or "").split("[")[0])
+        # TRNAMT não tem separador de milhar; o decimal pode ser "." ou ","
+        yield i, _with_amount(
+            {
+                "external_id": tags.get("FITID"),
+                "amount": (tags.get("TRNAMT") or "").replace(",", "."),
+                "occurred_at": _ofx_datetime(raw_date),
+                "description": tags.get("MEMO") or tags.get("NAME") or "",
+                "trntype": tags.get("TRNTYPE"),
+            },
+            ".",
+        )
+
+
+def _ofx_datetime(digits: str) -> str | None:
+    if len(digits) >= 14:
+        return f"{digits[0:4]}-{digits[4:6]}-{digits[6:8]}T{digits[8:10]}:{digits[10:12]}:{digits[12:14]}"
+    if len(digits) >= 8:
+        return f"{digits[0:4]}-{digits[4:6]}-{digits[6:8]}T00:00:00"
+    return None
+
+
+# -----------------------------
+# Normalização de uma linha
+# -----------------------------
+
+def _guess_decimal(s: str, raw: Any) -> str:
+    """Separador decimal de um valor sem locale conhecido (JSON/NDJSON, CSV com "," ou tab)."""
+    if "," in s and "." in s:
+        return "," if s.rfind(",") > s.rfind(".") else "."
+    sep = "," if "," in s else "." if "." in s else None
+    if sep is None:
+        return "."
+    if s.count(sep) > 1:
+        # "1.500.000" / "1,500,000": só pode ser milhar
+        return "," if sep == "." else "."
+    whole, frac = s.rsplit(sep, 1)
+    if len(frac) == 3 and whole.lstrip("+-") not in ("", "0"):
+        raise RowError(f"amount ambíguo: {raw!r} (use 1500.00, 1.500,00 ou amount_cents)")
+    return sep
+
+
+def _parse_amount(raw: Any, decimal: str | None = None) -> Decimal:
+    if isinstance(raw, (int, float, Decimal)):
+        value = Decimal(str(raw))
+    else:
+        s = str(raw or "").strip().replace("R$", "").replace(" ", "")
+        if decimal is None:
+            decimal = _guess_decimal(s, raw)
+        s = s.replace("." if decimal == "," else ",", "")
+        if s.count(decimal) > 1:
+            raise RowError(f"amount inválido: {raw!r}")
+        try:
+            value = Decimal(s.replace(decimal, "."))
+        except InvalidOperation:
+            raise RowError(f"amount inválido: {raw!r}")
+    if not value.is_finite():
+        raise RowError(f"amount inválido: {raw!r}")
+    return value
+
+
+def _with_amount(row: dict, decimal: str | None) -> dict | RowError:
+    """Converte `amount` com o locale do arquivo; valor inválido vira erro da linha."""
+    if row.get("amount") in (None, ""):
+        return row
+    try:
+        row["amount"] = _parse_amount(row["amount"], decimal)
+    except RowError as e:
+        return e
+    return row
+
+
+def _parse_datetime(raw: Any) -> datetime:
+    if raw in (None, ""):
+        raise RowError("occurred_at (ou date) obrigatório")
+    s = str(raw).strip().replace(" ", "T")
+    if s.endswith("Z"):
+        s = s[:-1] + "+00:00"
+    try:
+        dt = datetime.fromisoformat(s)
+    except ValueError:
+        try:
+            dt = datetime.strptime(s[:10], "%d/%m/%Y")
+        except ValueError:
+            raise RowError(f"occurred_at inválido: {raw!r}")
+    return dt.replace(tzinfo=None) if dt.tzinfo else dt
+
+
+def _optional_int(raw: Any, name: str) -> int | None:
+    if raw in (None, ""):
+        return None
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        raise RowError(f"{name} inválido: {raw!r}")
+
+
+def normalize_row(raw: Any, *, tenant_id: int, company_id: int, categories: CategoryMap) -> dict:
+    """Dict pronto para INSERT em transactions (ou RowError)."""
+    if isinstance(raw, RowError):
+        raise raw
+    if not isinstance(raw, dict):
+        raise RowError("linha deve ser um objeto")
+
+    row_company = _optional_int(raw.get("company_id"), "company_id")
+    if row_company is not None and row_company != company_id:
+        raise RowError("company_id da linha difere do company_id do lote")
+
+    if raw.get("amount_cents") not in (None, ""):
+        amount_cents = _optional_int(raw.get("amount_cents"), "amount_cents")
+    elif raw.get("amount") not in (None, ""):
+        amount_cents = int((_parse_amount(raw.get("amount")) * 100).to_integral_value())
+    else:
+        raise RowError("amount_cents (ou amount) obrigatório")
+
+    kind = str(raw.get("kind") or "").strip().lower()
+    if not kind:
+        trntype = str(raw.get("trntype") or "").strip().upper()
+        if amount_cents < 0 or trntype == "DEBIT":
+            kind = "out"
+        else:
+            kind = "in"
+    if kind not in ("in", "out"):
+        raise RowError(f"kind inválido: {raw.get('kind')!r} (use in | out)")
+    amount_cents = abs(int(amount_cents))
+
+    category_id = _optional_int(raw.get("category_id"), "category_id")
+    if category_id is not None:
+        if category_id not in categories.ids:
+            raise RowError(f"category_id {category_id} nao existe")
+    elif str(raw.get("category") or "").strip():
+        name = str(raw.get("category")).strip()
+        category_id = categories.by_name.get(name.lower())
+        if category_id is None:
+            raise RowError(f"categoria {name!r} nao existe")
+
+    external_id = str(raw.get("external_id") or "").strip() or None
+    if external_id is not None and len(external_id) > _EXTERNAL_ID_MAX:
+        raise RowError(f"external_id maior que {_EXTERNAL_ID_MAX} caracteres")
+
+    return {
+        "tenant_id": tenant_id,
+        "company_id": company_id,
+        "category_id": category_id,
+        "kind": kind,
+        "amount_cents": amount_cents,
+        "description": str(raw.get("description") or "")[:_DESC_MAX],
+        "occurred_at": _parse_datetime(raw.get("occurred_at") or raw.get("date")),
+        "external_id": external_id,
+    }
+
+
+# -----------------------------
+# Lote
+# -----------------------------
+
+def _insert_keyed(db: Session, rows: list[dict]) -> list[dict]:
+    """
+    INSERT ... ON CONFLICT (tenant_id, company_id, external_id) DO NOTHING RETURNING external_id.
+    Devolve só as linhas que entraram: um reenvio concorrente do mesmo extrato não gera
+    IntegrityError, as chaves que o outro já gravou contam como duplicadas.
+    """
+    stmt = (
+        dialect_insert(db, Transaction.__table__)
+        .on_conflict_do_nothing(
+            index_elements=["tenant_id", "company_id", "external_id"],
+            index_where=Transaction.external_id.is_not(None),
+        )
+        .returning(Transaction.external_id)
+    )
+    inserted = set(db.scalars(stmt, rows))
+    return [r for r in rows if r["external_id"] in inserted]
+
+
+def ingest_chunk(
+    db: Session,
+    chunk: list[tuple[int, Any]],
+    *,
+    result: IngestResult,
+    tenant_id: int,
+    categories: CategoryMap,
+    seen_keys: set[str],
+) -> None:
+    """Normaliza, deduplica (external_id) e insere um lote. Não faz commit."""
+    ok: list[tuple[int, dict]] = []
+    for line, raw in chunk:
+        result.received += 1
+        try:
+            ok.append((line, normalize_row(raw, tenant_id=tenant_id, company_id=result.company_id, categories=categories)))
+        except RowError as e:
+            ext = raw.get("external_id") if isinstance(raw, dict) else None
+            result.add_error(line, str(e), ext)
+
+    plain: list[dict] = []
+    keyed: list[dict] = []
+    for _line, r in ok:
+        key = r["external_id"]
+        if key is None:
+            plain.append(r)
+        elif key in seen_keys:
+            result.duplicates += 1
+        else:
+            seen_keys.add(key)
+            keyed.append(r)
+
+    if keyed:
+        fresh = _insert_keyed(db, keyed)
+        result.duplicates += len(keyed) - len(fresh)
+        keyed = fresh
+    if plain:
+        db.execute(insert(Transaction), plain)
+
+    rows = plain + keyed
+    if not rows:
+        return
+    daily_rollup.record_rows(db, rows)
+    learned_rules.record_recategorization(
+        db,
+        tenant_id=tenant_id,
+        changes=[(r["description"], None, r["category_id"]) for r in rows if r["category_id"] is not None],
+    )
+    result.inserted += len(rows)
+
+
+def chunked(items: Iterable[tuple[int, Any]], size: int = CHUNK_SIZE) -> Iterator[list[tuple[int, Any]]]:
+    buf: list[tuple[int, Any]] = []
+    for item in items:
+        buf.append(item)
+        if len(buf) >= size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, select
+
+from app.models.transaction import Transaction
+
+# Listagem de /transactions: keyset em (occurred_at DESC, id DESC), o mesmo
+# prefixo do índice ix_transactions_tenant_company_occurred. Linhas legadas
+# sem occurred_at vêm depois de todas as datadas (segunda fase, id DESC).
+
+FIELDS: tuple[str, ...] = ("id", "company_id", "kind", "amount_cents", "description", "occurred_at", "category_id")
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+STREAM_BATCH_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class ListFilters:
+    tenant_id: int
+    company_id: int | None = None
+    start_dt: datetime | None = None
+    end_dt: datetime | None = None
+    kind: str | None = None
+    category_id: int | None = None
+
+
+@dataclass(frozen=True)
+class Cursor:
+    occurred_at: datetime | None
+    id: int
+
+
+def parse_fields(raw: str | None) -> tuple[str, ...]:
+    if raw is None or not raw.strip():
+        return FIELDS
+    wanted = [f.strip() for f in raw.split(",") if f.strip()]
+    invalid = [f for f in wanted if f not in FIELDS]
+    if invalid or not wanted:
+        raise HTTPException(status_code=422, detail={
+            "error_code": "INVALID_FIELDS",
+            "message": "fields inválido",
+            "value": invalid or raw,
+            "allowed": list(FIELDS),
+        })
+    # ordem canônica, sem duplicatas
+    return tuple(f for f in FIELDS if f in wanted)
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    raw = json.dumps(
+        {"t": cursor.occurred_at.isoformat() if cursor.occurred_at else None, "id": cursor.id},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token: str | None) -> Cursor | None:
+    if not token:
+        return None
+    try:
+        pad = "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode((token + pad).encode("ascii")))
+        t = data.get("t")
+        return Cursor(occurred_at=datetime.fromisoformat(t) if t else None, id=int(data["id"]))
+    except Exception:
+        raise HTTPException(status_code=422, detail={
+            "error_code": "INVALID_CURSOR",
+            "message": "cursor inválido",
+            "value": token,
+        })
+
+
+def _filtered(q, f: ListFilters):
+    q = q.where(Transaction.tenant_id == f.tenant_id)
+    if f.company_id is not None:
+        q = q.where(Transaction.company_id == f.company_id)
+    if f.kind is not None:
+        q = q.where(Transaction.kind == f.kind)
+    if f.category_id is not None:
+        q = q.where(Transaction.category_id == f.category_id)
+    if f.start_dt is not None:
+        q = q.where(Transaction.occurred_at >= f.start_dt)
+    if f.end_dt is not None:
+        q = q.where(Transaction.occurred_at <= f.end_dt)
+    return q
+
+
+def _columns(fields: tuple[str, ...]):
+    # id/occurred_at sempre lidos: formam o cursor
+    names = list(dict.fromkeys(("id", "occurred_at") + fields))
+    return [getattr(Transaction, n) for n in names]
+
+
+def page_queries(f: ListFilters, fields: tuple[str, ...], cursor: Cursor | None, limit: int | None) -> list:
+    """
+    Queries (em ordem) que, concatenadas, dão a página a partir do cursor:
+    fase 1 = linhas datadas; fase 2 = occurred_at NULL (só sem filtro de período).
+    """
+    cols = _columns(fields)
+    out = []
+
+    if cursor is None or cursor.occurred_at is not None:
+        q = _filtered(select(*cols), f).where(Transaction.occurred_at.is_not(None))
+        if cursor is not None:
+            q = q.where(
+                or_(
+                    Transaction.occurred_at < cursor.occurred_at,
+                    and_(Transaction.occurred_at == cursor.occurred_at, Transaction.id < cursor.id),
+                )
+            )
+        q = q.order_by(Transaction.occurred_at.desc(), Transaction.id.desc())
+        out.append(q.limit(limit) if limit is not None else q)
+
+    if f.start_dt is None and f.end_dt is None:
+        q = _filtered(select(*cols), f).where(Transaction.occurred_at.is_(None))
+        if cursor is not None and cursor.occurred_at is None:
+            q = q.where(Transaction.id < cursor.id)
+        q = q.order_by(Transaction.id.desc())
+        out.append(q.limit(limit) if limit is not None else q)
+
+    return out
+
+
+def row_cursor(row: Any) -> Cursor:
+    return Cursor(occurred_at=row.occurred_at, id=row.id)
+
+
+def row_to_dict(row: Any, fields: tuple[str, ...]) -> dict:
+    out = {}
+    for name in fields:
+        value = getattr(row, name)
+        out[name] = value.isoformat() if isinstance(value, datetime) else value
+    return out
@@ -1,4 +1,5 @@
 from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 def set_tenant_on_session(db: Session, tenant_id: int) -> None:
@@ -13,3 +14,12 @@ def set_tenant_on_session(db: Session, tenant_id: int) -> None:
         db.execute(text("SELECT set_config(\'app.tenant_id\', :tid, true)"), {"tid": str(int(tenant_id))})
     else:
         db.info["tenant_id"] = tenant_id
+
+
+async def set_tenant_on_async_session(db: AsyncSession, tenant_id: int) -> None:
+    """Equivalente async de set_tenant_on_session."""
+    dialect = db.get_bind().dialect.name
+    if str(dialect).startswith("postgres"):
+        await db.execute(text("SELECT set_config(\'app.tenant_id\', :tid, true)"), {"tid": str(int(tenant_id))})
+    else:
+        db.info["tenant_id"] = tenant_id
@@ -0,0 +1,197 @@
+"""
+Benchmark de carga: endpoints de relatório sync (threadpool) vs async (AsyncSession).
+
+Em processo (default): monta um app "sync" gêmeo com as mesmas consultas dos
+endpoints antigos (`def` + SessionLocal) e compara com o app real (async),
+ambos via httpx.ASGITransport, com N clientes concorrentes.
+
+Contra um servidor rodando: --base-url http://127.0.0.1:8000 (mede só o que está no ar).
+
+Exemplo:
+    DATABASE_URL=sqlite:////tmp/bench.db AUTH_ENABLED=true ... \\
+        python scripts/bench_async_reports.py --username userA@teste.com --password dev --seed 5000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import httpx
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compara throughput sync vs async dos relatórios")
+    parser.add_argument("--base-url", default="", help="Servidor já rodando (sem isso: em processo, sync vs async)")
+    parser.add_argument("--username", default="userA@teste.com")
+    parser.add_argument("--password", default="dev")
+    parser.add_argument("--company-id", type=int, default=None, help="Empresa alvo (default: cria uma)")
+    parser.add_argument("--seed", type=int, default=2000, help="Transações a criar na empresa nova")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=4000, help="Total de requisições por rodada")
+    parser.add_argument("--with-cache", action="store_true", help="Mantém o cache de relatórios ligado")
+    return parser.parse_args()
+
+
+def _sync_app():
+    from fastapi import Depends, FastAPI, Query
+    from sqlalchemy.orm import Session
+
+    from app.api import reports as rep
+    from app.core.tenant import get_current_tenant_id
+    from app.deps import get_db
+    from app.schemas.reports import SummaryResponse
+    from app.services.report_service import aggregate_period
+
+    bench = FastAPI()
+
+    @bench.get("/reports/summary", response_model=SummaryResponse)
+    def summary_sync(
+        company_id: int = Query(..., ge=1),
+        start: str | None = None,
+        end: str | None = None,
+        db: Session = Depends(get_db),
+        tenant_id: int = Depends(get_current_tenant_id),
+    ):
+        start_dt, end_dt, period = rep._resolve_period(start, end)
+        rep._get_company(db, company_id, tenant_id)
+        agg = aggregate_period(db, tenant_id=tenant_id, company_id=company_id, start_dt=start_dt, end_dt=end_dt)
+        return SummaryResponse(company_id=company_id, period=period, totals=agg.totals, by_category=agg.by_category)
+
+    return bench
+
+
+async def _login(client: httpx.AsyncClient, username: str, password: str) -> dict:
+    r = await client.post("/auth/login", json={"username": username, "password": password})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def _seed(client: httpx.AsyncClient, headers: dict, n: int) -> int:
+    digits = "".join(str(random.randint(0, 9)) for _ in range(8))
+    r = await client.post(
+        "/companies",
+        json={"cnpj": f"77889900{digits}"[:14], "razao_social": f"Empresa Bench {digits}"},
+        headers=headers,
+    )
+    r.raise_for_status()
+    company_id = r.json()["id"]
+
+    base = datetime(2024, 1, 1)
+    sem = asyncio.Semaphore(20)
+
+    async def _one(i: int):
+        async with sem:
+            await client.post(
+                "/transactions",
+                json={
+                    "company_id": company_id,
+                    "kind": "in" if i % 3 == 0 else "out",
+                    "amount_cents": random.randint(100, 50_000),
+                    "description": f"bench {i % 37}",
+                    "occurred_at": (base + timedelta(minutes=37 * i)).isoformat(),
+                },
+                headers=headers,
+            )
+
+    await asyncio.gather(*(_one(i) for i in range(n)))
+    return company_id
+
+
+async def _run(client: httpx.AsyncClient, url: str, headers: dict, total: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def _worker():
+        nonlocal errors
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            t0 = time.perf_counter()
+            try:
+                r = await client.get(url, headers=headers)
+                if r.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+    }
+
+
+def _print(label: str, res: dict) -> None:
+    print(
+        f"{label:<6} rps={res['rps']:<8} p50={res['p50_ms']}ms p95={res['p95_ms']}ms "
+        f"errors={res['errors']} elapsed={res['elapsed_s']}s"
+    )
+
+
+async def main_async(args) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+            headers = await _login(client, args.username, args.password)
+            company_id = args.company_id or await _seed(client, headers, args.seed)
+            url = f"/reports/summary?company_id={company_id}&start=2024-01-01&end=2024-12-31"
+            _print("server", await _run(client, url, headers, args.requests, args.concurrency))
+        return
+
+    from app.db import Base, engine
+    from app.main import app
+    from app.services.report_cache import set_report_cache
+
+    Base.metadata.create_all(bind=engine)
+    if not args.with_cache:
+        set_report_cache(None)
+
+    transport_async = httpx.ASGITransport(app=app)
+    transport_sync = httpx.ASGITransport(app=_sync_app())
+
+    async with httpx.AsyncClient(transport=transport_async, base_url="http://bench", limits=limits, timeout=60) as ac:
+        headers = await _login(ac, args.username, args.password)
+        company_id = args.company_id or await _seed(ac, headers, args.seed)
+        url = f"/reports/summary?company_id={company_id}&start=2024-01-01&end=2024-12-31"
+
+        async with httpx.AsyncClient(transport=transport_sync, base_url="http://bench", limits=limits, timeout=60) as sc:
+            # aquecimento
+            await _run(sc, url, headers, 50, 10)
+            await _run(ac, url, headers, 50, 10)
+
+            print(f"company_id={company_id} concurrency={args.concurrency} requests={args.requests}")
+            _print("sync", await _run(sc, url, headers, args.requests, args.concurrency))
+            _print("async", await _run(ac, url, headers, args.requests, args.concurrency))
+
+
+def main():
+    asyncio.run(main_async(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark de importação: POST /transactions/bulk (lote) vs POST /transactions (uma por requisição).
+
+Em processo (default) via httpx.ASGITransport; contra um servidor: --base-url http://127.0.0.1:8000.
+A rodada unitária usa uma amostra (--single-sample) e extrapola para --rows.
+
+Exemplo:
+    DATABASE_URL=sqlite:////tmp/bench.db AUTH_ENABLED=true ... \\
+        python scripts/bench_bulk_ingest.py --rows 100000 --format ndjson
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import httpx
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Mede throughput da importação em lote")
+    parser.add_argument("--base-url", default="", help="Servidor já rodando (sem isso: em processo)")
+    parser.add_argument("--username", default="userA@teste.com")
+    parser.add_argument("--password", default="dev")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--format", choices=["json", "ndjson", "csv"], default="ndjson")
+    parser.add_argument("--single-sample", type=int, default=1000, help="Linhas da rodada unitária (0 = pula)")
+    return parser.parse_args()
+
+
+def _rows(n: int, prefix: str):
+    base = datetime(2024, 1, 1)
+    for i in range(n):
+        yield {
+            "kind": "in" if i % 3 == 0 else "out",
+            "amount_cents": random.randint(100, 50_000),
+            "description": f"bench bulk {i % 53}",
+            "occurred_at": (base + timedelta(minutes=7 * i)).isoformat(),
+            "external_id": f"{prefix}-{i}",
+        }
+
+
+def _payload(fmt: str, n: int, prefix: str) -> tuple[bytes, str]:
+    if fmt == "json":
+        return json.dumps(list(_rows(n, prefix))).encode(), "application/json"
+    if fmt == "ndjson":
+        return "".join(json.dumps(r) + "\n" for r in _rows(n, prefix)).encode(), "application/x-ndjson"
+    lines = ["occurred_at,kind,amount_cents,description,external_id"]
+    lines += [f"{r['occurred_at']},{r['kind']},{r['amount_cents']},{r['description']},{r['external_id']}" for r in _rows(n, prefix)]
+    return ("\n".join(lines) + "\n").encode(), "text/csv"
+
+
+async def _login(client: httpx.AsyncClient, username: str, password: str) -> dict:
+    r = await client.post("/auth/login", json={"username": username, "password": password})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def _company(client: httpx.AsyncClient, headers: dict) -> int:
+    digits = "".join(str(random.randint(0, 9)) for _ in range(8))
+    r = await client.post(
+        "/companies",
+        json={"cnpj": f"99887766{digits}"[:14], "razao_social": f"Empresa Bulk Bench {digits}"},
+        headers=headers,
+    )
+    r.raise_for_status()
+    return r.json()["id"]
+
+
+async def main_async(args) -> None:
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+    else:
+        from app.db import Base, engine
+        from app.main import app
+
+        Base.metadata.create_all(bind=engine)
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=None) as client:
+        headers = await _login(client, args.username, args.password)
+        prefix = f"bench{random.randint(0, 10**9)}"
+
+        company_id = await _company(client, headers)
+        body, content_type = _payload(args.format, args.rows, prefix)
+        t0 = time.perf_counter()
+        r = await client.post(
+            f"/transactions/bulk?company_id={company_id}",
+            content=body,
+            headers={**headers, "Content-Type": content_type},
+        )
+        elapsed = time.perf_counter() - t0
+        r.raise_for_status()
+        res = r.json()
+        print(
+            f"bulk   format={args.format} rows={args.rows} inserted={res['inserted']} errors={res['error_count']} "
+            f"elapsed={elapsed:.2f}s rows/s={args.rows / elapsed:,.0f} payload={len(body) / 1e6:.1f}MB"
+        )
+
+        t0 = time.perf_counter()
+        r = await client.post(
+            f"/transactions/bulk?company_id={company_id}",
+            content=body,
+            headers={**headers, "Content-Type": content_type},
+        )
+        elapsed = time.perf_counter() - t0
+        print(f"retry  duplicates={r.json()['duplicates']} elapsed={elapsed:.2f}s")
+
+        if args.single_sample:
+            company_id = await _company(client, headers)
+            sample = list(_rows(args.single_sample, prefix + "s"))
+            t0 = time.perf_counter()
+            for row in sample:
+                row.pop("external_id")
+                (await client.post("/transactions", json={**row, "company_id": company_id}, headers=headers)).raise_for_status()
+            elapsed = time.perf_counter() - t0
+            rate = args.single_sample / elapsed
+            print(
+                f"single rows={args.single_sample} elapsed={elapsed:.2f}s rows/s={rate:,.0f} "
+                f"(~{args.rows / rate:.0f}s para {args.rows} linhas)"
+            )
+
+
+async def _run(args) -> None:
+    try:
+        await main_async(args)
+    finally:
+        if not args.base_url:
+            from app.db import async_engine
+
+            # fecha as conexões aiosqlite (a thread de cada uma segura a saída do processo)
+            await async_engine.dispose()
+
+
+def main():
+    asyncio.run(_run(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark da categorização rule-based sobre descrições sintéticas.
+
+Compara o laço antigo (linhas x regras x palavras-chave, substring) com o
+matcher compilado (por linha e em lote).
+
+Exemplo:
+    python scripts/bench_categorization.py --rows 1000000 --batch 10000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.services.categorization import DEFAULT_RULES, get_matcher
+
+_NOISE = [
+    "pagto", "ref", "nf", "loja", "matriz", "filial", "boleto", "cartao", "debito", "credito",
+    "compra", "parcela", "ltda", "me", "eireli", "sp", "sc", "pr", "001", "2024", "servicos",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark do matcher de categorização")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10_000, help="Tamanho do lote em match_many")
+    parser.add_argument("--legacy-rows", type=int, default=200_000, help="Linhas do laço antigo (extrapolado)")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def synthetic_descriptions(n: int, seed: int) -> list[str]:
+    rnd = random.Random(seed)
+    keywords = [kw for rule in DEFAULT_RULES for kw in rule["keywords"]]
+    out = []
+    for _ in range(n):
+        words = rnd.choices(_NOISE, k=rnd.randint(2, 6))
+        if rnd.random() < 0.6:
+            kw = rnd.choice(keywords)
+            words.insert(rnd.randint(0, len(words)), kw.upper() if rnd.random() < 0.3 else kw)
+        out.append(" ".join(words))
+    return out
+
+
+def legacy(descriptions: list[str]) -> int:
+    rules = list(DEFAULT_RULES)
+    hits = 0
+    for d in descriptions:
+        desc = (d or "").strip().lower()
+        found = False
+        for rule in rules:
+            for k in rule["keywords"]:
+                if k in desc:
+                    found = True
+                    break
+            if found:
+                break
+        hits += found
+    return hits
+
+
+def _timed(label: str, n: int, fn) -> None:
+    t0 = time.perf_counter()
+    hits = fn()
+    elapsed = time.perf_counter() - t0
+    print(f"{label:<12} rows={n:<9} hits={hits:<9} elapsed={elapsed:.2f}s rows/s={n / elapsed:,.0f}")
+
+
+def main():
+    args = parse_args()
+    descriptions = synthetic_descriptions(args.rows, args.seed)
+    matcher = get_matcher()
+
+    sample = descriptions[: args.legacy_rows]
+    _timed("legacy", len(sample), lambda: legacy(sample))
+    _timed("match", args.rows, lambda: sum(1 for d in descriptions if matcher.match(d)))
+
+    def _many():
+        hits = 0
+        for i in range(0, len(descriptions), args.batch):
+            hits += sum(1 for h in matcher.match_many(descriptions[i : i + args.batch]) if h)
+        return hits
+
+    _timed("match_many", args.rows, _many)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark do PDF do AI Consult: PDFs/s (e por core) e atraso do event loop.
+
+Renderiza N PDFs com um consult sintético (sem banco) em três modos:
+  - inline: ReportLab direto no event loop (comportamento antigo);
+  - thread: PdfRenderer(processes=0) -> asyncio.to_thread (GIL compartilhado);
+  - pool:   PdfRenderer(processes=P) para cada P em --processes.
+Enquanto renderiza, um ticker de 5 ms mede o maior atraso do loop.
+
+Exemplo:
+    python scripts/bench_pdf_render.py --pdfs 200 --concurrency 20 --processes 1,2,4
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.services.pdf_render import PdfRenderer, build_pdf_bytes, register_fonts  # noqa: E402
+
+TITLE = "IA-CNPJ — Relatório AI Consult"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Mede PDFs/s por core e responsividade do event loop")
+    parser.add_argument("--pdfs", type=int, default=200, help="PDFs por rodada")
+    parser.add_argument("--concurrency", type=int, default=20, help="Renders simultâneos")
+    parser.add_argument("--processes", default="1,2,4", help="Tamanhos de pool, ex.: 1,2,4")
+    parser.add_argument("--lines", type=int, default=12, help="Itens por seção (tamanho do PDF)")
+    return parser.parse_args()
+
+
+def _consult(lines: int) -> tuple[dict, dict]:
+    payload = {"company_id": 1, "period": {"start": "2024-01-01", "end": "2024-12-31"}}
+    consult = {
+        "headline": "Saldo positivo no período, com saídas concentradas em poucas categorias.",
+        "numbers": {"entradas_cents": 12_345_678, "saidas_cents": 9_876_543, "saldo_cents": 2_469_135},
+        "top_categories": [
+            {"category_name": f"Categoria {i}", "saidas_cents": 100_000 * (i + 1), "saldo_cents": -50_000 * i}
+            for i in range(6)
+        ],
+        "insights": [f"Insight {i}: variação relevante frente ao período anterior." for i in range(lines)],
+        "risks": [f"Risco {i}: concentração de saídas em fornecedor único." for i in range(lines)],
+        "actions": [f"Ação {i}: revisar contratos recorrentes." for i in range(lines)],
+        "recent_transactions": [
+            {"date": f"2024-12-{d:02d}", "amount_cents": 1000 * d, "description": f"transação {d}"}
+            for d in range(1, 11)
+        ],
+    }
+    return payload, consult
+
+
+async def _measure(render, pdfs: int, concurrency: int) -> dict:
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def _ticker():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - t0 - 0.005)
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def _one():
+        async with sem:
+            await render()
+
+    ticker = asyncio.create_task(_ticker())
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_one() for _ in range(pdfs)))
+    elapsed = time.perf_counter() - t0
+    done.set()
+    await ticker
+
+    lags.sort()
+    return {
+        "pdfs_s": pdfs / elapsed if elapsed else 0.0,
+        "elapsed_s": elapsed,
+        "lag_p99_ms": lags[int(len(lags) * 0.99) - 1] * 1000 if lags else 0.0,
+        "lag_max_ms": lags[-1] * 1000 if lags else 0.0,
+    }
+
+
+def _print(label: str, cores: int, res: dict) -> None:
+    print(
+        f"{label:<8} pdfs/s={res['pdfs_s']:<8.1f} pdfs/s/core={res['pdfs_s'] / cores:<8.1f} "
+        f"loop_lag_p99={res['lag_p99_ms']:.1f}ms loop_lag_max={res['lag_max_ms']:.1f}ms "
+        f"elapsed={res['elapsed_s']:.2f}s"
+    )
+
+
+async def main_async(args) -> None:
+    payload, consult = _consult(args.lines)
+    register_fonts()
+    size = len(build_pdf_bytes(TITLE, payload, consult))
+    print(f"cpus={os.cpu_count()} pdfs={args.pdfs} concurrency={args.concurrency} pdf_bytes={size}")
+
+    async def _inline():
+        build_pdf_bytes(TITLE, payload, consult)
+        await asyncio.sleep(0)
+
+    _print("inline", 1, await _measure(_inline, args.pdfs, args.concurrency))
+
+    renderer = PdfRenderer(processes=0, max_pending=args.concurrency)
+    _print("thread", 1, await _measure(lambda: renderer.render(TITLE, payload, consult), args.pdfs, args.concurrency))
+
+    for p in [int(x) for x in args.processes.split(",") if x.strip()]:
+        renderer = PdfRenderer(processes=p, max_pending=args.concurrency)
+        # start() sobe os processos; um render por processo aquece o ReportLab antes de medir
+        renderer.start()
+        await asyncio.gather(*(renderer.render(TITLE, payload, consult) for _ in range(p)))
+        res = await _measure(lambda: renderer.render(TITLE, payload, consult), args.pdfs, args.concurrency)
+        renderer.shutdown()
+        _print(f"pool={p}", p, res)
+
+
+def main():
+    asyncio.run(main_async(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
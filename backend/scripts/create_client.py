@@ -11,6 +11,7 @@ if str(ROOT) not in sys.path:
 from app.db import SessionLocal
 from app.utils.db_sequence_fix import fix_sequences
 from app.core.security import hash_password
+from app.core.tenant_cache import invalidate_tenant_member
 from app.models.tenant import Tenant, TenantMember
 from app.models.user import User
 from sqlalchemy import text
@@ -83,6 +84,8 @@ def main():
         db.add(member)
 
         db.commit()
+        # só alcança o processo da API com TENANT_CACHE_BACKEND=redis (memory é por processo)
+        invalidate_tenant_member(email)
 
         print("OK: cliente provisionado com sucesso")
         print(f"tenant_id={tenant.id}")
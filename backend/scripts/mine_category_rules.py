@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.db import SessionLocal
+from app.services.learned_rules import rebuild
+from sqlalchemy import text
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Minera category_token_stats (regras aprendidas) a partir das transações categorizadas")
+    parser.add_argument("--tenant-id", type=int, default=None, help="Restringe a um tenant (default: todos)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    db = SessionLocal()
+
+    # 🔓 modo admin (bypass RLS)
+    if db.get_bind().dialect.name.startswith("postgres"):
+        db.execute(text("SET row_security = off"))
+
+    try:
+        rows = rebuild(db, tenant_id=args.tenant_id)
+        db.commit()
+        print("OK: regras aprendidas recalculadas")
+        print(f"tenant_id={args.tenant_id or '*'}")
+        print(f"rows={rows}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.db import SessionLocal
+from app.services.daily_rollup_service import rebuild
+from sqlalchemy import text
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recalcula transaction_daily_rollup a partir de transactions")
+    parser.add_argument("--tenant-id", type=int, default=None, help="Restringe a um tenant (default: todos)")
+    parser.add_argument("--company-id", type=int, default=None, help="Restringe a uma empresa (default: todas)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    db = SessionLocal()
+
+    # 🔓 modo admin (bypass RLS)
+    if db.get_bind().dialect.name.startswith("postgres"):
+        db.execute(text("SET row_security = off"))
+
+    try:
+        rows = rebuild(db, tenant_id=args.tenant_id, company_id=args.company_id)
+        db.commit()
+        print("OK: rollup diário recalculado")
+        print(f"tenant_id={args.tenant_id or '*'}")
+        print(f"company_id={args.company_id or '*'}")
+        print(f"rows={rows}")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
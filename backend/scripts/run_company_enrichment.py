@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.core.settings import settings
+from app.services.company_enrichment import run_once
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Processa a fila company_enrichment_queue (e a varredura de dados cadastrais vencidos)"
+    )
+    parser.add_argument("--no-scan", action="store_true", help="Não enfileira empresas vencidas, só drena a fila")
+    parser.add_argument("--limit", type=int, default=None, help="Tarefas por rodada (default: COMPANY_ENRICH_BATCH)")
+    parser.add_argument("--drain", action="store_true", help="Repete até a fila ficar vazia")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    limit = args.limit or settings.COMPANY_ENRICH_BATCH
+    scan = not args.no_scan
+    while True:
+        out = run_once(trigger="script", scan=scan, limit=limit)
+        print(json.dumps(out, ensure_ascii=False))
+        if not args.drain or out["claimed"] < limit:
+            break
+        scan = False
+
+
+if __name__ == "__main__":
+    main()
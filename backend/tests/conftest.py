@@ -1,4 +1,5 @@
 import os
+import random
 
 import pytest
 
@@ -82,3 +83,16 @@ def auth_header(client):
     )
     token = r.json()["access_token"]
     return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def create_company(client, auth_header):
+    """Fábrica: cria uma empresa com CNPJ aleatório (14 dígitos, sem colisão entre arquivos) e devolve o id."""
+
+    def _create(razao_social: str = "Empresa Teste") -> int:
+        digits = "".join(str(random.randint(0, 9)) for _ in range(14))
+        r = client.post("/companies", json={"cnpj": digits, "razao_social": f"{razao_social} {digits}"}, headers=auth_header)
+        assert r.status_code == 201, r.text
+        return r.json()["id"]
+
+    return _create
@@ -0,0 +1,236 @@
+import asyncio
+import os
+import time
+
+import httpx
+import pytest
+
+from app.api import reports
+from app.core.settings import settings
+from app.db import SessionLocal, async_engine
+from app.main import app
+from app.models.company import Company
+from app.services import pdf_cache
+from app.services.company_lookup_service import _apply_company_business_data
+from app.services.pdf_render import PdfRenderer
+
+
+def _seed(client, auth_header, create_company):
+    company_id = create_company()
+    for i in range(5):
+        r = client.post(
+            "/transactions",
+            json={
+                "company_id": company_id,
+                "kind": "in" if i % 2 else "out",
+                "amount_cents": 1000 + i,
+                "description": f"pdf {i}",
+                "occurred_at": f"2002-04-{i + 1:02d}T10:00:00",
+            },
+            headers=auth_header,
+        )
+        assert r.status_code == 200, r.text
+    return company_id
+
+
+def test_pdf_is_rendered_in_pool_and_streamed(client, auth_header, create_company, monkeypatch):
+    monkeypatch.setattr(pdf_cache, "_store", None)
+    monkeypatch.setattr(pdf_cache, "_store_ready", True)
+    company_id = _seed(client, auth_header, create_company)
+    before = reports.pdf_renderer.snapshot()["rendered"]
+
+    r = client.post(
+        "/reports/ai-consult/pdf",
+        json={"company_id": company_id, "period": {"start": "2002-04-01", "end": "2002-04-30"}},
+        headers=auth_header,
+    )
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"] == "application/pdf"
+    # sem Content-Length: o servidor envia em chunks
+    assert "content-length" not in r.headers
+    assert r.content.startswith(b"%PDF") and b"%%EOF" in r.content[-64:]
+
+    stats = reports.pdf_renderer.snapshot()
+    assert stats["rendered"] == before + 1 and stats["started"] and stats["in_flight"] == 0
+
+
+def test_event_loop_stays_responsive_while_20_pdfs_render(client, auth_header, create_company):
+    company_id = _seed(client, auth_header, create_company)
+    body = {"company_id": company_id, "start": "2002-04-01", "end": "2002-04-30"}
+    reports.pdf_renderer.start()
+
+    async def _run():
+        lags: list[float] = []
+        done = asyncio.Event()
+
+        async def _ticker():
+            while not done.is_set():
+                t0 = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lags.append(time.perf_counter() - t0 - 0.005)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as ac:
+            ticker = asyncio.create_task(_ticker())
+            responses = await asyncio.gather(
+                *(ac.post("/reports/ai-consult/pdf", json=body, headers=auth_header) for _ in range(20))
+            )
+            done.set()
+            await ticker
+        # conexões aiosqlite abertas neste loop não podem sobrar no pool
+        await async_engine.dispose()
+        return responses, lags
+
+    responses, lags = asyncio.run(_run())
+    assert [r.status_code for r in responses] == [200] * 20
+    assert all(r.content.startswith(b"%PDF") for r in responses)
+    # render no pool: o loop só é ocupado pelo ai-consult (consultas curtas), nunca pelo ReportLab
+    assert max(lags) < 0.25, max(lags)
+
+
+def test_pdf_renderer_start_warms_every_worker():
+    renderer = PdfRenderer(processes=2, max_pending=2)
+    try:
+        renderer.start()
+        # cada worker já respondeu (initializer rodou), sem esperar a primeira request
+        stats = renderer.snapshot()
+        assert stats["started"] and stats["warm_workers"] == 2
+    finally:
+        renderer.shutdown()
+
+
+def test_pdf_busy_when_all_slots_are_taken(client, auth_header, create_company, monkeypatch):
+    company_id = _seed(client, auth_header, create_company)
+    renderer = PdfRenderer(processes=0, max_pending=1)
+    monkeypatch.setattr(reports, "pdf_renderer", renderer)
+
+    renderer._slots.acquire()
+    r = client.post("/reports/ai-consult/pdf", json={"company_id": company_id}, headers=auth_header)
+    assert r.status_code == 503
+    assert r.json()["detail"]["error_code"] == "PDF_BUSY" and r.headers["retry-after"] == "1"
+
+    renderer._slots.release()
+    r = client.post("/reports/ai-consult/pdf", json={"company_id": company_id}, headers=auth_header)
+    assert r.status_code == 200 and r.content.startswith(b"%PDF")
+    assert renderer.snapshot()["rejected"] == 1
+
+
+def test_repeat_downloads_come_from_pdf_cache(client, auth_header, create_company, monkeypatch, tmp_path):
+    store = pdf_cache.FilesystemPdfStore(tmp_path, max_bytes=10**7)
+    monkeypatch.setattr(pdf_cache, "_store", store)
+    monkeypatch.setattr(pdf_cache, "_store_ready", True)
+    company_id = _seed(client, auth_header, create_company)
+    url = f"/reports/ai-consult/pdf?company_id={company_id}&start=2002-04-01&end=2002-04-30"
+    rendered = reports.pdf_renderer.snapshot()["rendered"]
+
+    first = client.get(url, headers=auth_header)
+    assert first.status_code == 200, first.text
+    etag = first.headers["etag"]
+    assert first.headers["accept-ranges"] == "bytes" and first.content.startswith(b"%PDF")
+
+    # repetição: mesmo arquivo, sem consult nem render
+    run_ai_consult_async = reports.run_ai_consult_async
+    monkeypatch.setattr(reports, "run_ai_consult_async", lambda **_kw: pytest.fail("consult rodou com PDF em cache"))
+    again = client.post(
+        "/reports/ai-consult/pdf",
+        json={"company_id": company_id, "period": {"start": "2002-04-01", "end": "2002-04-30"}},
+        headers=auth_header,
+    )
+    assert again.content == first.content and again.headers["etag"] == etag
+    assert reports.pdf_renderer.snapshot()["rendered"] == rendered + 1
+    assert store.stats()["hits"] == 1 and store.stats()["entries"] == 1
+
+    r = client.get(url, headers={**auth_header, "If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+
+    r = client.get(url, headers={**auth_header, "Range": "bytes=0-99"})
+    assert r.status_code == 206 and r.content == first.content[:100]
+    assert r.headers["content-range"] == f"bytes 0-99/{len(first.content)}"
+
+    # escrita na empresa => nova data_version => novo PDF
+    monkeypatch.setattr(reports, "run_ai_consult_async", run_ai_consult_async)
+    r = client.post(
+        "/transactions",
+        json={"company_id": company_id, "kind": "in", "amount_cents": 5, "description": "pdf nova", "occurred_at": "2002-04-20T10:00:00"},
+        headers=auth_header,
+    )
+    assert r.status_code == 200, r.text
+    r = client.get(url, headers={**auth_header, "If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag
+    assert store.stats()["entries"] == 2
+
+
+def test_registry_update_invalidates_cached_pdf(client, auth_header, create_company, monkeypatch, tmp_path):
+    monkeypatch.setattr(pdf_cache, "_store", pdf_cache.FilesystemPdfStore(tmp_path, max_bytes=10**7))
+    monkeypatch.setattr(pdf_cache, "_store_ready", True)
+    company_id = _seed(client, auth_header, create_company)
+    url = f"/reports/ai-consult/pdf?company_id={company_id}&start=2002-04-01&end=2002-04-30"
+    etag = client.get(url, headers=auth_header).headers["etag"]
+
+    # revalidação cadastral (lookup avulso, lote ou worker) passa por _apply_company_business_data
+    with SessionLocal() as db:
+        company = db.get(Company, company_id)
+        _apply_company_business_data(company, {"situacao_cadastral": "BAIXADA"})
+        db.commit()
+
+    r = client.get(url, headers={**auth_header, "If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag
+
+
+def test_pdf_store_evicts_least_recently_used(tmp_path):
+    store = pdf_cache.FilesystemPdfStore(tmp_path, max_bytes=250, grace_s=0)
+    for key in ("a1", "b2", "c3"):
+        store.put(key * 32, b"x" * 100)
+    # só cabem 2: o mais antigo saiu do disco
+    assert store.path("a1" * 32) is None
+    assert store.path("b2" * 32) is not None  # vira o mais recente
+    store.put("d4" * 32, b"x" * 100)
+    assert store.path("c3" * 32) is None
+    assert store.stats()["evictions"] == 2 and store.stats()["bytes"] == 200
+
+    # tamanho medido no disco: outro processo / restart vê o mesmo diretório
+    reopened = pdf_cache.FilesystemPdfStore(tmp_path, max_bytes=250, grace_s=0)
+    assert reopened.stats()["entries"] == 2
+    assert reopened.path("b2" * 32).read_bytes() == b"x" * 100
+
+
+def test_pdf_store_shares_budget_across_processes_and_sweeps_tmp(tmp_path):
+    # dois "processos" no mesmo diretório: o limite vale para o total no disco
+    a = pdf_cache.FilesystemPdfStore(tmp_path, max_bytes=250, grace_s=0, sweep_interval_s=0)
+    b = pdf_cache.FilesystemPdfStore(tmp_path, max_bytes=250, grace_s=0, sweep_interval_s=0)
+    a.put("a1" * 32, b"x" * 100)
+    b.put("b2" * 32, b"x" * 100)
+    a.put("c3" * 32, b"x" * 100)
+    assert sum(p.stat().st_size for p in tmp_path.glob("*/*.pdf")) == 200
+    assert b.path("a1" * 32) is None
+
+    # lido agora (envio em andamento): fica mesmo acima do limite
+    held = pdf_cache.FilesystemPdfStore(tmp_path, max_bytes=100, grace_s=60)
+    held.put("d4" * 32, b"x" * 100)
+    assert len(list(tmp_path.glob("*/*.pdf"))) == 3
+
+    stale = tmp_path / "zz" / "tmpabc.tmp"
+    stale.parent.mkdir()
+    stale.write_bytes(b"partial")
+    os.utime(stale, (time.time() - 7200, time.time() - 7200))
+    fresh = tmp_path / "zz" / "tmpdef.tmp"
+    fresh.write_bytes(b"writing")
+    held.sweep()
+    assert not stale.exists() and fresh.exists()
+
+
+def test_pdf_store_sweeps_only_over_budget_or_interval(tmp_path):
+    store = pdf_cache.FilesystemPdfStore(tmp_path, max_bytes=250, grace_s=0)
+    swept = store.stats()["sweeps"]
+    store.put("a1" * 32, b"x" * 100)
+    store.put("b2" * 32, b"x" * 100)
+    # abaixo do limite e dentro do intervalo: sem lock nem varredura do diretório
+    assert store.stats()["sweeps"] == swept and store.stats()["bytes"] == 200
+    store.put("c3" * 32, b"x" * 100)
+    assert store.stats()["sweeps"] == swept + 1 and store.stats()["bytes"] == 200
+
+
+def test_unknown_pdf_cache_backend_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "PDF_CACHE_BACKEND", "s3")
+    with pytest.raises(ValueError):
+        pdf_cache._build_store()
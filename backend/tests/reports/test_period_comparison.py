@@ -0,0 +1,114 @@
+import random
+
+from app.core.settings import settings
+from app.services import report_cache
+
+
+def _create_category(client, auth_header):
+    random_digits = "".join(str(random.randint(0, 9)) for _ in range(8))
+    resp = client.post("/categories", json={"name": f"Categoria Cmp {random_digits}"}, headers=auth_header)
+    assert resp.status_code == 200, resp.text
+    return resp.json()
+
+
+def _tx(client, auth_header, company_id, kind, amount_cents, occurred_at, category_id=None):
+    resp = client.post(
+        "/transactions",
+        json={
+            "company_id": company_id,
+            "category_id": category_id,
+            "kind": kind,
+            "amount_cents": amount_cents,
+            "description": f"mov {kind}",
+            "occurred_at": occurred_at,
+        },
+        headers=auth_header,
+    )
+    assert resp.status_code == 200, resp.text
+
+
+def _seed(client, auth_header, create_company):
+    company_id = create_company()
+    category = _create_category(client, auth_header)
+    cat_id = category["id"]
+
+    # atual: março/2006
+    _tx(client, auth_header, company_id, "in", 100000, "2006-03-02T10:00:00", cat_id)
+    _tx(client, auth_header, company_id, "out", 5000, "2006-03-05T10:00:00")
+    _tx(client, auth_header, company_id, "out", 20000, "2006-03-28T10:00:00", cat_id)
+    # anterior equivalente: 29/01 a 28/02
+    _tx(client, auth_header, company_id, "in", 200000, "2006-02-10T10:00:00", cat_id)
+    _tx(client, auth_header, company_id, "out", 4000, "2006-02-15T10:00:00", cat_id)
+    _tx(client, auth_header, company_id, "out", 5000, "2006-02-20T10:00:00")
+    # mesmo período do ano anterior
+    _tx(client, auth_header, company_id, "out", 10000, "2005-03-10T10:00:00")
+    # fora de todas as janelas
+    _tx(client, auth_header, company_id, "out", 777, "2006-04-01T10:00:00")
+    return company_id, category
+
+
+def test_compare_current_previous_and_yoy(client, auth_header, create_company):
+    company_id, category = _seed(client, auth_header, create_company)
+
+    r = client.get(
+        f"/reports/compare?company_id={company_id}&start=2006-03-01&end=2006-03-31&window=7",
+        headers=auth_header,
+    )
+    assert r.status_code == 200, r.text
+    data = r.json()
+    cmp = data["comparison"]
+
+    assert cmp["previous_period"] == {"start": "2006-01-29", "end": "2006-02-28"}
+    assert cmp["yoy_period"] == {"start": "2005-03-01", "end": "2005-03-31"}
+    assert cmp["current"] == {"entradas_cents": 100000, "saidas_cents": 25000, "saldo_cents": 75000, "qtd_transacoes": 3}
+    assert cmp["previous"]["saidas_cents"] == 9000 and cmp["previous"]["entradas_cents"] == 200000
+    assert cmp["yoy"] == {"entradas_cents": 0, "saidas_cents": 10000, "saldo_cents": -10000, "qtd_transacoes": 1}
+    assert cmp["vs_previous"]["entradas_pct"] == -50.0
+    assert cmp["vs_previous"]["saidas_cents"] == 16000
+    assert cmp["vs_yoy"]["saidas_pct"] == 150.0
+    assert cmp["vs_yoy"]["entradas_pct"] is None
+
+    first = data["by_category"][0]
+    assert first["category_id"] == category["id"]
+    assert (first["saidas_cents"], first["previous_saidas_cents"]) == (20000, 4000)
+    assert first["saidas_delta_pct"] == 400.0
+    uncategorized = next(c for c in data["by_category"] if c["category_id"] is None)
+    assert uncategorized["saidas_delta_cents"] == 0 and uncategorized["yoy_saidas_cents"] == 10000
+
+    series = {p["date"]: p for p in data["series"]}
+    assert len(data["series"]) == 31 and data["moving_average_days"] == 7
+    assert series["2006-03-05"]["saidas_mm_cents"] == 1000  # 5000 / 5 dias
+    assert series["2006-03-28"]["saidas_mm_cents"] == round(20000 / 7)
+    assert series["2006-03-15"]["saidas_cents"] == 0
+
+
+def test_compare_rollup_matches_raw_rows(client, auth_header, create_company, monkeypatch):
+    monkeypatch.setattr(report_cache, "_cache", None)
+    monkeypatch.setattr(report_cache, "_cache_ready", True)
+    company_id, _category = _seed(client, auth_header, create_company)
+
+    url = f"/reports/compare?company_id={company_id}&start=2006-03-02T12:00:00&end=2006-03-28T12:00:00"
+    from_rollup = client.get(url, headers=auth_header).json()
+    monkeypatch.setattr(settings, "REPORTS_USE_DAILY_ROLLUP", False)
+    from_raw = client.get(url, headers=auth_header).json()
+
+    assert from_rollup == from_raw
+    assert from_rollup["comparison"]["current"]["qtd_transacoes"] == 2
+
+
+def test_ai_consult_uses_comparison_signals(client, auth_header, create_company):
+    company_id, category = _seed(client, auth_header, create_company)
+
+    r = client.post(
+        "/ai/consult",
+        json={"company_id": company_id, "start": "2006-03-01", "end": "2006-03-31"},
+        headers=auth_header,
+    )
+    assert r.status_code == 200, r.text
+    data = r.json()
+
+    assert data["comparison"]["previous"]["saidas_cents"] == 9000
+    assert "As saídas cresceram em relação ao período anterior equivalente." in data["risks"]
+    assert "As entradas caíram 50.0% em relação ao período anterior equivalente." in data["risks"]
+    assert f"Saídas em '{category['name']}' subiram 400.0% frente ao período anterior." in data["risks"]
+    assert "Saídas 150.0% acima do mesmo período do ano anterior." in data["insights"]
@@ -0,0 +1,97 @@
+import random
+
+from sqlalchemy import event
+
+from app.db import async_engine, engine
+
+
+def _create_category(client, auth_header):
+    random_digits = "".join(str(random.randint(0, 9)) for _ in range(8))
+    resp = client.post("/categories", json={"name": f"Categoria Agg {random_digits}"}, headers=auth_header)
+    assert resp.status_code == 200, resp.text
+    return resp.json()["id"]
+
+
+def _tx(client, auth_header, company_id, kind, amount_cents, description, occurred_at, category_id=None):
+    resp = client.post(
+        "/transactions",
+        json={
+            "company_id": company_id,
+            "category_id": category_id,
+            "kind": kind,
+            "amount_cents": amount_cents,
+            "description": description,
+            "occurred_at": occurred_at,
+        },
+        headers=auth_header,
+    )
+    assert resp.status_code == 200, resp.text
+
+
+def _seed(client, auth_header, create_company):
+    company_id = create_company()
+    category_id = _create_category(client, auth_header)
+
+    _tx(client, auth_header, company_id, "in", 500000, "venda balcão", "2001-03-02T10:00:00", category_id)
+    _tx(client, auth_header, company_id, "out", 12000, "Aluguel sala", "2001-03-05T10:00:00")
+    _tx(client, auth_header, company_id, "out", 12000, "aluguel sala ", "2001-03-20T10:00:00")
+    _tx(client, auth_header, company_id, "out", 3000, "padaria", "2001-03-21T10:00:00", category_id)
+    # período anterior equivalente (fevereiro)
+    _tx(client, auth_header, company_id, "out", 1000, "padaria", "2001-02-10T10:00:00")
+    return company_id, category_id
+
+
+def test_summary_totals_and_categories_from_single_aggregation(client, auth_header, create_company):
+    company_id, category_id = _seed(client, auth_header, create_company)
+
+    r = client.get(
+        f"/reports/summary?company_id={company_id}&start=2001-03-01&end=2001-03-31",
+        headers=auth_header,
+    )
+    assert r.status_code == 200, r.text
+    data = r.json()
+
+    assert data["totals"] == {
+        "entradas_cents": 500000,
+        "saidas_cents": 27000,
+        "saldo_cents": 473000,
+        "qtd_transacoes": 4,
+    }
+    by_cat = {c["category_id"]: c for c in data["by_category"]}
+    assert by_cat[category_id]["entradas_cents"] == 500000
+    assert by_cat[category_id]["saidas_cents"] == 3000
+    assert by_cat[None]["saidas_cents"] == 24000
+    assert by_cat[None]["category_name"] == "Sem categoria"
+    assert [c["category_id"] for c in data["by_category"]] == [category_id, None]
+
+
+def test_ai_consult_uses_one_aggregation_query(client, auth_header, create_company):
+    company_id, _category_id = _seed(client, auth_header, create_company)
+
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if "transactions" in statement and statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    for eng in (engine, async_engine.sync_engine):
+        event.listen(eng, "before_cursor_execute", _capture)
+    try:
+        r = client.post(
+            "/ai/consult",
+            json={"company_id": company_id, "start": "2001-03-01", "end": "2001-03-31"},
+            headers=auth_header,
+        )
+    finally:
+        for eng in (engine, async_engine.sync_engine):
+            event.remove(eng, "before_cursor_execute", _capture)
+
+    assert r.status_code == 200, r.text
+    data = r.json()
+
+    # agregação (atual + anterior + descrições) e amostra de recentes
+    assert len(statements) == 2, statements
+    assert data["numbers"]["saidas_cents"] == 27000
+    assert "Foram identificadas despesas recorrentes no período." in data["insights"]
+    assert any("aluguel sala" in i.lower() for i in data["insights"])
+    assert "As saídas cresceram em relação ao período anterior equivalente." in data["risks"]
@@ -0,0 +1,221 @@
+import asyncio
+import fnmatch
+import random
+
+from sqlalchemy import event
+
+from app.core.cache import MemoryCache, RedisCache
+from app.core import tenant_cache
+from app.core.security import create_access_token
+from app.db import async_engine, engine
+from app.services import report_cache
+
+
+class FakeRedis:
+    """Subconjunto da API do redis-py usado pelo RedisCache."""
+
+    def __init__(self):
+        self.store = {}
+
+    def get(self, name):
+        return self.store.get(name)
+
+    def set(self, name, value, ex=None):
+        self.store[name] = value.encode("utf-8")
+
+    def scan_iter(self, match="*"):
+        return [k for k in list(self.store) if fnmatch.fnmatch(k, match)]
+
+    def delete(self, *names):
+        for n in names:
+            self.store.pop(n, None)
+
+
+def _tx(client, auth_header, company_id, amount_cents):
+    resp = client.post(
+        "/transactions",
+        json={
+            "company_id": company_id,
+            "kind": "out",
+            "amount_cents": amount_cents,
+            "description": "cache",
+            "occurred_at": "2005-03-10T10:00:00",
+        },
+        headers=auth_header,
+    )
+    assert resp.status_code == 200, resp.text
+    return resp.json()["id"]
+
+
+def _count_report_selects(fn):
+    seen = []
+
+    def _spy(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and (
+            "transactions" in statement or "transaction_daily_rollup" in statement
+        ):
+            seen.append(statement)
+
+    for eng in (engine, async_engine.sync_engine):
+        event.listen(eng, "before_cursor_execute", _spy)
+    try:
+        result = fn()
+    finally:
+        for eng in (engine, async_engine.sync_engine):
+            event.remove(eng, "before_cursor_execute", _spy)
+    return result, len(seen)
+
+
+def test_repeated_reports_hit_cache_and_writes_invalidate(client, auth_header, create_company, monkeypatch):
+    cache = MemoryCache(max_entries=64, ttl_s=60)
+    monkeypatch.setattr(report_cache, "_cache", cache)
+    monkeypatch.setattr(report_cache, "_cache_ready", True)
+
+    company_id = create_company()
+    tx_id = _tx(client, auth_header, company_id, 500)
+    url = f"/reports/summary?company_id={company_id}&start=2005-03-01&end=2005-03-31"
+
+    first, n_first = _count_report_selects(lambda: client.get(url, headers=auth_header).json())
+    second, n_second = _count_report_selects(lambda: client.get(url, headers=auth_header).json())
+    assert n_first >= 1
+    assert n_second == 0
+    assert first == second
+    assert first["totals"]["saidas_cents"] == 500
+
+    health = client.get("/health").json()["report_cache"]
+    assert health["backend"] == "memory"
+    assert health["hits"] >= 1 and health["misses"] >= 1
+
+    # nova transação -> versão da empresa muda -> recalcula
+    _tx(client, auth_header, company_id, 250)
+    assert client.get(url, headers=auth_header).json()["totals"]["saidas_cents"] == 750
+
+    # recategorização também invalida
+    cat = client.post("/categories", json={"name": f"Cat Cache {random.randint(0, 10**8)}"}, headers=auth_header)
+    r = client.patch(
+        f"/transactions/{tx_id}/category?company_id={company_id}",
+        json={"category_id": cat.json()["id"]},
+        headers=auth_header,
+    )
+    assert r.status_code == 200, r.text
+    by_cat = client.get(url, headers=auth_header).json()["by_category"]
+    assert {c["category_id"] for c in by_cat} == {None, cat.json()["id"]}
+
+
+def test_redis_backend_serves_consult(client, auth_header, create_company, monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(report_cache, "_cache", RedisCache(fake, ttl_s=60))
+    monkeypatch.setattr(report_cache, "_cache_ready", True)
+
+    company_id = create_company()
+    _tx(client, auth_header, company_id, 900)
+    body = {"company_id": company_id, "start": "2005-03-01", "end": "2005-03-31"}
+
+    first, _ = _count_report_selects(lambda: client.post("/ai/consult", json=body, headers=auth_header))
+    second, n_second = _count_report_selects(lambda: client.post("/ai/consult", json=body, headers=auth_header))
+    assert first.status_code == second.status_code == 200
+    assert n_second == 0
+    assert first.json() == second.json()
+    assert any(":ai-consult:" in k for k in fake.store)
+
+
+class DownRedis(FakeRedis):
+    def get(self, name):
+        raise ConnectionError("redis down")
+
+    def set(self, name, value, ex=None):
+        raise ConnectionError("redis down")
+
+
+def test_redis_outage_falls_back_to_compute(client, auth_header, create_company, monkeypatch):
+    monkeypatch.setattr(report_cache, "_cache", RedisCache(DownRedis(), ttl_s=60))
+    monkeypatch.setattr(report_cache, "_cache_ready", True)
+
+    company_id = create_company()
+    _tx(client, auth_header, company_id, 900)
+    r = client.get(f"/reports/summary?company_id={company_id}&start=2005-03-01&end=2005-03-31", headers=auth_header)
+    assert r.status_code == 200, r.text
+    assert r.json()["totals"]["saidas_cents"] == 900
+
+
+class LoopSpyRedis(FakeRedis):
+    """Registra se cada chamada ao Redis (síncrono) aconteceu com um event loop rodando na thread."""
+
+    def __init__(self):
+        super().__init__()
+        self.on_loop = []
+
+    def _spy(self):
+        try:
+            asyncio.get_running_loop()
+            self.on_loop.append(True)
+        except RuntimeError:
+            self.on_loop.append(False)
+
+    def get(self, name):
+        self._spy()
+        return super().get(name)
+
+    def set(self, name, value, ex=None):
+        self._spy()
+        super().set(name, value, ex)
+
+
+def test_async_routes_call_redis_off_the_event_loop(client, auth_header, create_company, monkeypatch):
+    reports_redis, tenants_redis = LoopSpyRedis(), LoopSpyRedis()
+    monkeypatch.setattr(report_cache, "_cache", RedisCache(reports_redis, ttl_s=60))
+    monkeypatch.setattr(report_cache, "_cache_ready", True)
+    tenant_cache.set_tenant_cache(RedisCache(tenants_redis, ttl_s=60, prefix="t:"))
+    try:
+        company_id = create_company()
+        _tx(client, auth_header, company_id, 300)
+        me = client.get("/auth/me", headers=auth_header).json()
+        # token só com email: a rota async resolve o tenant pelo cache
+        headers = {"Authorization": f"Bearer {create_access_token(sub=me['sub'])}"}
+        qs = f"company_id={company_id}&start=2005-03-01&end=2005-03-31"
+        for _ in range(2):
+            assert client.get(f"/reports/summary?{qs}", headers=headers).status_code == 200
+        r = client.post("/ai/consult", json={"company_id": company_id, "start": "2005-03-01", "end": "2005-03-31"}, headers=headers)
+        assert r.status_code == 200, r.text
+    finally:
+        tenant_cache.set_tenant_cache(None)
+        tenant_cache._cache_ready = False
+
+    assert reports_redis.on_loop and not any(reports_redis.on_loop)
+    assert tenants_redis.on_loop and not any(tenants_redis.on_loop)
+
+
+def test_conditional_get_skips_aggregation(client, auth_header, create_company, monkeypatch):
+    # sem cache: o 304 não depende do cache de relatórios
+    monkeypatch.setattr(report_cache, "_cache", None)
+    monkeypatch.setattr(report_cache, "_cache_ready", True)
+
+    company_id = create_company()
+    _tx(client, auth_header, company_id, 700)
+    qs = f"company_id={company_id}&start=2005-03-01&end=2005-03-31"
+
+    for path in ("summary", "daily", "series", "context", "top-categories", "compare"):
+        r = client.get(f"/reports/{path}?{qs}", headers=auth_header)
+        assert r.status_code == 200, (path, r.text)
+        etag = r.headers["etag"]
+        assert etag.startswith('"') and r.headers["cache-control"] == "private, no-cache"
+
+        r, n = _count_report_selects(
+            lambda: client.get(f"/reports/{path}?{qs}", headers={**auth_header, "If-None-Match": etag})
+        )
+        assert r.status_code == 304, path
+        assert r.content == b"" and r.headers["etag"] == etag
+        assert n == 0, path
+
+    url = f"/reports/summary?{qs}"
+    etag = client.get(url, headers=auth_header).headers["etag"]
+    assert client.get(url, headers={**auth_header, "If-None-Match": f'"x", W/{etag}'}).status_code == 304
+    # outro período => outra versão
+    assert client.get(url.replace("2005-03-31", "2005-03-30"), headers=auth_header).headers["etag"] != etag
+
+    # escrita na empresa muda o data_version => ETag antigo não vale mais
+    _tx(client, auth_header, company_id, 300)
+    r = client.get(url, headers={**auth_header, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    assert r.json()["totals"]["saidas_cents"] == 1000
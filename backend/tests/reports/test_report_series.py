@@ -0,0 +1,120 @@
+import random
+
+from app.core.settings import settings
+from app.services import report_cache
+
+
+def _create_category(client, auth_header):
+    random_digits = "".join(str(random.randint(0, 9)) for _ in range(8))
+    resp = client.post("/categories", json={"name": f"Categoria Serie {random_digits}"}, headers=auth_header)
+    assert resp.status_code == 200, resp.text
+    return resp.json()["id"]
+
+
+def _tx(client, auth_header, company_id, kind, amount_cents, occurred_at, category_id=None):
+    resp = client.post(
+        "/transactions",
+        json={
+            "company_id": company_id,
+            "category_id": category_id,
+            "kind": kind,
+            "amount_cents": amount_cents,
+            "description": "serie",
+            "occurred_at": occurred_at,
+        },
+        headers=auth_header,
+    )
+    assert resp.status_code == 200, resp.text
+
+
+def _seed(client, auth_header, create_company):
+    company_id = create_company()
+    category_id = _create_category(client, auth_header)
+
+    # 01/01/2007 é segunda-feira
+    _tx(client, auth_header, company_id, "in", 1000, "2007-01-01T09:00:00", category_id)
+    _tx(client, auth_header, company_id, "out", 300, "2007-01-03T09:00:00")
+    _tx(client, auth_header, company_id, "out", 200, "2007-01-10T09:00:00", category_id)
+    _tx(client, auth_header, company_id, "in", 500, "2007-02-15T09:00:00")
+    _tx(client, auth_header, company_id, "out", 100, "2007-03-31T09:00:00")
+    return company_id, category_id
+
+
+def _get(client, auth_header, company_id, qs):
+    r = client.get(f"/reports/series?company_id={company_id}&{qs}", headers=auth_header)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_series_fills_gaps_and_accumulates_saldo(client, auth_header, create_company):
+    company_id, _category_id = _seed(client, auth_header, create_company)
+
+    daily = _get(client, auth_header, company_id, "start=2007-01-01&end=2007-01-10")["series"]
+    assert [p["date"] for p in daily] == [f"2007-01-{d:02d}" for d in range(1, 11)]
+    assert daily[1] == {
+        "date": "2007-01-02",
+        "entradas_cents": 0,
+        "saidas_cents": 0,
+        "saldo_cents": 0,
+        "saldo_acumulado_cents": 1000,
+        "qtd_transacoes": 0,
+    }
+    assert daily[-1]["saldo_acumulado_cents"] == 500
+
+    weekly = _get(client, auth_header, company_id, "start=2007-01-01&end=2007-03-31&granularity=week")["series"]
+    assert len(weekly) == 13
+    assert weekly[0]["date"] == "2007-01-01" and weekly[-1]["date"] == "2007-03-26"
+    assert (weekly[0]["entradas_cents"], weekly[0]["saidas_cents"]) == (1000, 300)
+    assert weekly[1]["saidas_cents"] == 200 and weekly[1]["saldo_acumulado_cents"] == 500
+
+    monthly = _get(client, auth_header, company_id, "start=2007-01-01&end=2007-03-31&granularity=month")
+    assert monthly["granularity"] == "month" and monthly["by_category"] is None
+    assert [(p["date"], p["saldo_cents"], p["saldo_acumulado_cents"]) for p in monthly["series"]] == [
+        ("2007-01-01", 500, 500),
+        ("2007-02-01", 500, 1000),
+        ("2007-03-01", -100, 900),
+    ]
+
+
+def test_series_by_category(client, auth_header, create_company):
+    company_id, category_id = _seed(client, auth_header, create_company)
+
+    data = _get(client, auth_header, company_id, "start=2007-01-01&end=2007-03-31&granularity=month&by_category=true")
+    by_cat = {c["category_id"]: c for c in data["by_category"]}
+    assert set(by_cat) == {category_id, None}
+    assert [p["saldo_acumulado_cents"] for p in by_cat[category_id]["series"]] == [800, 800, 800]
+    assert [p["saldo_acumulado_cents"] for p in by_cat[None]["series"]] == [-300, 200, 100]
+    assert by_cat[None]["category_name"] == "Sem categoria"
+
+    plain = _get(client, auth_header, company_id, "start=2007-01-01&end=2007-03-31&granularity=month")
+    assert data["series"] == plain["series"]
+
+
+def test_series_rollup_matches_raw_rows(client, auth_header, create_company, monkeypatch):
+    monkeypatch.setattr(report_cache, "_cache", None)
+    monkeypatch.setattr(report_cache, "_cache_ready", True)
+    company_id, _category_id = _seed(client, auth_header, create_company)
+
+    qs = "start=2007-01-01T12:00:00&end=2007-03-31T08:00:00&granularity=week&by_category=true"
+    from_rollup = _get(client, auth_header, company_id, qs)
+    monkeypatch.setattr(settings, "REPORTS_USE_DAILY_ROLLUP", False)
+    from_raw = _get(client, auth_header, company_id, qs)
+
+    assert from_rollup == from_raw
+    # bordas parciais: 01/01 09h e 31/03 09h ficam fora
+    assert sum(p["qtd_transacoes"] for p in from_rollup["series"]) == 3
+
+
+def test_series_validates_granularity_and_size(client, auth_header, create_company, monkeypatch):
+    company_id = create_company()
+    url = f"/reports/series?company_id={company_id}&start=2007-01-01&end=2007-12-31"
+
+    r = client.get(f"{url}&granularity=hour", headers=auth_header)
+    assert r.status_code == 422
+    assert r.json()["detail"]["error_code"] == "INVALID_GRANULARITY"
+
+    monkeypatch.setattr(settings, "REPORTS_SERIES_MAX_POINTS", 20)
+    r = client.get(url, headers=auth_header)
+    assert r.status_code == 422
+    assert r.json()["detail"]["points"] == 365
+    assert client.get(f"{url}&granularity=month", headers=auth_header).json()["series"][-1]["date"] == "2007-12-01"
@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from app.ai import http_client
+from app.ai.provider import NullSuggestProvider, PromptFile, SuggestInputItem
+from app.ai.registry import ProviderRegistry, ai_registry
+from app.core.settings import settings
+
+
+def _items(n=2):
+    return [SuggestInputItem(id=i, description=f"d{i}", kind="out", amount_cents=1) for i in range(n)]
+
+
+def test_reload_resolves_validates_and_counts(monkeypatch):
+    reg = ProviderRegistry()
+    monkeypatch.setattr(settings, "AI_ENABLED", False)
+    assert reg.reload().active is None
+    assert reg.suggest(1, _items()) is None
+
+    monkeypatch.setattr(settings, "AI_ENABLED", True)
+    monkeypatch.setattr(settings, "AI_PROVIDER", "null")
+    assert isinstance(reg.reload().active, NullSuggestProvider)
+    assert reg.suggest(1, _items(3), include_no_match=True)[0].rule == "no_match"
+    assert reg.stats()["providers"]["null"]["calls"] == 1
+    assert reg.stats()["providers"]["null"]["items"] == 3
+
+    # openai sem chave: desligado (fallback rule-based), com o motivo exposto
+    monkeypatch.setattr(settings, "AI_PROVIDER", "openai")
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "")
+    reg.reload()
+    assert reg.active is None
+    assert "OPENAI_API_KEY" in reg.stats()["problem"]
+
+    monkeypatch.setattr(settings, "AI_PROVIDER", "skynet")
+    with pytest.raises(ValueError):
+        reg.reload()
+
+
+def test_provider_errors_are_counted_and_swallowed(monkeypatch):
+    class Boom:
+        def suggest_categories(self, *args, **kwargs):
+            raise RuntimeError("x")
+
+    reg = ProviderRegistry()
+    monkeypatch.setattr(settings, "AI_ENABLED", True)
+    monkeypatch.setattr(settings, "AI_PROVIDER", "null")
+    reg.reload()
+    reg.provider = Boom()
+    assert reg.suggest(1, _items()) is None
+    assert reg.stats()["providers"]["null"]["errors"] == 1
+
+
+def test_prompt_hot_reload_on_mtime_change(tmp_path):
+    assert "suggest_categories_v1" in PromptFile("suggest_categories_v1.md").text
+
+    path = tmp_path / "p.md"
+    path.write_text("v1", encoding="utf-8")
+    os.utime(path, (1_000_000, 1_000_000))
+    prompt = PromptFile("p.md", path=path, check_interval_s=0)
+    assert prompt.text == "v1"
+
+    prompt.path.write_text("v2", encoding="utf-8")
+    os.utime(prompt.path, (2_000_000, 2_000_000))
+    assert prompt.text == "v2"
+
+
+def test_admin_ai_endpoints(client, auth_header, monkeypatch, request):
+    assert client.get("/admin/ai/provider", headers=auth_header).status_code == 403
+
+    monkeypatch.setattr(settings, "ONBOARDING_ADMIN_EMAILS", "userA@teste.com")
+    r = client.get("/admin/ai/provider", headers=auth_header)
+    assert r.status_code == 200, r.text
+    assert r.json()["provider"] == ai_registry.name
+
+    # reload relê o ambiente (não o singleton montado no import)
+    for field in ("AI_ENABLED", "AI_PROVIDER"):
+        monkeypatch.setattr(settings, field, getattr(settings, field))  # restaurado no teardown
+    monkeypatch.setenv("AI_ENABLED", "true")
+    monkeypatch.setenv("AI_PROVIDER", "skynet")
+    request.addfinalizer(ai_registry.reload)
+    assert client.post("/admin/ai/reload", headers=auth_header).status_code == 422
+    assert settings.AI_PROVIDER != "skynet"  # config inválida não é publicada
+
+    monkeypatch.setenv("AI_PROVIDER", "null")
+    r = client.post("/admin/ai/reload", headers=auth_header)
+    assert r.status_code == 200
+    assert r.json()["active"] is True and r.json()["provider"] == "null"
+    assert settings.AI_ENABLED is True and settings.AI_PROVIDER == "null"
+
+    # openai sem chave: provider desligado e nada publicado
+    for field in ("OPENAI_API_KEY", "OPENAI_TIMEOUT_S"):
+        monkeypatch.setattr(settings, field, getattr(settings, field))
+    monkeypatch.setenv("AI_PROVIDER", "openai")
+    monkeypatch.setenv("OPENAI_API_KEY", "")
+    r = client.post("/admin/ai/reload", headers=auth_header)
+    assert r.status_code == 200 and r.json()["active"] is False
+    assert settings.AI_PROVIDER == "null"
+
+    # config válida: publicada e o cliente HTTP compartilhado é recriado com o timeout novo
+    async def _client():
+        return http_client.get_async_client()
+
+    old = http_client.run_async(_client())
+    request.addfinalizer(http_client.close)
+    monkeypatch.setenv("AI_PROVIDER", "null")
+    monkeypatch.setenv("OPENAI_TIMEOUT_S", "7")
+    assert client.post("/admin/ai/reload", headers=auth_header).status_code == 200
+    assert settings.OPENAI_TIMEOUT_S == 7
+    new = http_client.run_async(_client())
+    assert new is not old and new.timeout.read == 7
@@ -0,0 +1,128 @@
+import random
+import string
+from datetime import timedelta
+
+from app.db import SessionLocal
+from app.models.categorization_job import CategorizationJob
+from app.services import categorization_jobs
+
+
+def _word():
+    return "zj" + "".join(random.choice(string.ascii_lowercase) for _ in range(8))
+
+
+def _tx(client, auth_header, company_id, description, day):
+    r = client.post(
+        "/transactions",
+        json={
+            "company_id": company_id,
+            "kind": "out",
+            "amount_cents": 100 + day,
+            "description": description,
+            "occurred_at": f"2009-07-{day:02d}T10:00:00",
+        },
+        headers=auth_header,
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+def _drain():
+    while categorization_jobs.run_once() is not None:
+        pass
+
+
+def test_categorize_job_resumes_from_checkpoint(client, auth_header, create_company):
+    _drain()
+    company_id = create_company()
+    for day in range(1, 6):
+        _tx(client, auth_header, company_id, f"aluguel {_word()}", day)
+    for day in range(10, 13):
+        _tx(client, auth_header, company_id, f"aluguel {_word()}", day)
+    # sem regra e mais recentes: primeiro lote não atualiza nada
+    no_match = [_tx(client, auth_header, company_id, _word(), day) for day in range(20, 24)]
+
+    r = client.post("/ai/categorize-jobs", json={"company_id": company_id, "batch_size": 3}, headers=auth_header)
+    assert r.status_code == 202, r.text
+    job = r.json()
+    assert job["status"] == "pending" and job["period"] == {"start": None, "end": None}
+
+    first = categorization_jobs.run_once(max_batches=1)
+    assert first["job_id"] == job["job_id"] and first["status"] == "running"
+    assert (first["batches"], first["scanned"], first["updated"]) == (1, 3, 0)
+    assert first["cursor"] is not None
+
+    # job ativo: um segundo POST devolve o mesmo job
+    again = client.post("/ai/categorize-jobs", json={"company_id": company_id}, headers=auth_header).json()
+    assert again["job_id"] == job["job_id"]
+
+    # worker caiu no meio: sem heartbeat além do lease, outro worker retoma do cursor
+    assert categorization_jobs.run_once() is None
+    with SessionLocal() as db:
+        row = db.get(CategorizationJob, job["job_id"])
+        row.heartbeat_at -= timedelta(days=1)
+        db.commit()
+    done = categorization_jobs.run_once()
+    assert done["status"] == "done" and done["attempts"] == 2
+
+    status = client.get(f"/ai/categorize-jobs/{job['job_id']}", headers=auth_header).json()
+    assert status["scanned"] == 12 and status["batches"] == 4
+    assert status["updated"] == 8 and status["suggested"] == 8 and status["skipped"] == 0
+    # lotes anteriores alimentam as regras aprendidas: o mix mostra quem sugeriu cada linha
+    mix = status["providers"]
+    assert mix.pop("no_match") == 4 and set(mix) <= {"rule-based", "learned"} and sum(mix.values()) == 8
+    assert status["rows_per_s"] >= 0 and status["finished_at"] is not None
+
+    left = client.get(f"/transactions/uncategorized?company_id={company_id}&start=2009-07-01&end=2009-07-31", headers=auth_header).json()
+    assert sorted(t["id"] for t in left) == sorted(no_match)
+
+
+def test_categorize_job_period_and_validation(client, auth_header, create_company):
+    _drain()
+    company_id = create_company()
+    _tx(client, auth_header, company_id, f"aluguel {_word()}", 5)
+    outside = _tx(client, auth_header, company_id, f"aluguel {_word()}", 25)
+
+    r = client.post(
+        "/ai/categorize-jobs",
+        json={"company_id": company_id, "start": "2009-07-01", "end": "2009-07-10"},
+        headers=auth_header,
+    )
+    assert r.status_code == 202, r.text
+    out = categorization_jobs.run_once()
+    assert out["status"] == "done" and out["scanned"] == 1 and out["updated"] == 1
+
+    left = client.get(f"/transactions/uncategorized?company_id={company_id}&start=2009-07-01&end=2009-07-31", headers=auth_header).json()
+    assert [t["id"] for t in left] == [outside]
+
+    assert client.get("/ai/categorize-jobs/999999999", headers=auth_header).status_code == 404
+    assert client.post("/ai/categorize-jobs", json={"company_id": 999999999}, headers=auth_header).status_code == 404
+    r = client.post(
+        "/ai/categorize-jobs",
+        json={"company_id": company_id, "start": "2009-07-10", "end": "2009-07-01"},
+        headers=auth_header,
+    )
+    assert r.status_code == 422
+
+
+def test_categorize_jobs_interleave_by_slice(client, auth_header, create_company):
+    _drain()
+    jobs = []
+    for _ in range(2):
+        company_id = create_company()
+        for day in range(1, 5):
+            _tx(client, auth_header, company_id, f"aluguel {_word()}", day)
+        r = client.post("/ai/categorize-jobs", json={"company_id": company_id, "batch_size": 1}, headers=auth_header)
+        jobs.append(r.json()["job_id"])
+
+    # uma fatia de 1 lote por vez: o job cede a vez e vai para o fim da fila
+    order = []
+    while (out := categorization_jobs.run_once(slice_batches=1)) is not None:
+        order.append(out["job_id"])
+        assert out["status"] in ("pending", "done") and out["attempts"] == 1
+    assert order[:4] == [jobs[0], jobs[1], jobs[0], jobs[1]]
+    assert sorted(order) == sorted(jobs * 5)
+
+    for job_id in jobs:
+        status = client.get(f"/ai/categorize-jobs/{job_id}", headers=auth_header).json()
+        assert status["status"] == "done" and status["scanned"] == 4 and status["updated"] == 4
@@ -0,0 +1,49 @@
+import random
+
+from app.services.categorization import DEFAULT_RULES, KeywordMatcher, get_matcher
+
+
+def _category(matcher, description):
+    hit = matcher.match(description)
+    return hit.rule["category_name"] if hit else None
+
+
+def test_word_boundaries_and_accents():
+    m = get_matcher()
+    assert _category(m, "DAS simples nacional") == "Impostos"
+    assert _category(m, "Vendas balcão") == "Vendas"
+    assert _category(m, "LOCAÇÃO sala 3") == "Aluguel"
+    assert _category(m, "Conta de ÁGUA") == "Água"
+    assert _category(m, "Transferência recebida") == "Vendas"
+    assert _category(m, "supermercado central") == "Compras"
+    assert _category(m, "pixel art studio") is None
+
+
+def test_first_rule_then_first_listed_keyword_wins():
+    m = get_matcher()
+    hit = m.match("pagamento fornecedor via pix")
+    assert (hit.rule["rule"], hit.keyword) == ("pix|qr|transfer", "pix")
+
+    hit = m.match("transfer via qr")
+    assert hit.keyword == "qr"
+
+
+def test_match_many_equals_match_per_row():
+    m = get_matcher()
+    words = ["venda", "frete", "aluguel", "energia", "água", "internet", "aws", "mercado", "posto",
+             "folha", "das", "testes", "pix", "vendas", "xpto", "loja", "cliente", "\n", "ÇÃO"]
+    rnd = random.Random(7)
+    descriptions = [" ".join(rnd.choice(words) for _ in range(rnd.randint(0, 5))) for _ in range(2000)]
+    descriptions += [None, ""]
+
+    batch = m.match_many(descriptions)
+    single = [m.match(d) for d in descriptions]
+    assert batch == single
+
+
+def test_matcher_is_cached_per_rules_version():
+    assert get_matcher() is get_matcher(DEFAULT_RULES)
+    custom = [{"rule": "x", "keywords": ["xpto"], "category_name": "X", "confidence": 0.5}]
+    assert get_matcher(custom) is get_matcher([dict(custom[0])])
+    assert get_matcher(custom) is not get_matcher()
+    assert isinstance(get_matcher(custom), KeywordMatcher)
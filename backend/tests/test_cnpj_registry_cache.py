@@ -0,0 +1,131 @@
+import json
+import random
+import threading
+import time
+from decimal import Decimal
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi import HTTPException
+
+from app.core import resilience
+from app.core.settings import settings
+from app.services import cnpj_registry_cache as registry_cache
+from app.services import company_lookup_service as lookup_service
+
+
+class StubBrasilAPI:
+    def __init__(self):
+        self.requests = 0
+        self.status = 200
+        self.razao = "EMPRESA STUB LTDA"
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.requests += 1
+                cnpj = self.path.rsplit("/", 1)[-1]
+                body = {
+                    "cnpj": cnpj,
+                    "razao_social": stub.razao,
+                    "capital_social": 1500.5,
+                    "data_inicio_atividade": "2011-04-05",
+                    "uf": "sc",
+                }
+                raw = json.dumps(body).encode() if stub.status == 200 else b"{}"
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/api/cnpj/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub(monkeypatch, client):
+    s = StubBrasilAPI()
+    monkeypatch.setattr(settings, "CNPJ_LOOKUP_PROVIDER", "brasilapi")
+    monkeypatch.setattr(settings, "CNPJ_LOOKUP_BASE_URL", s.base_url)
+    registry_cache.reset_memory_cache()
+    resilience.reset_guards()
+    yield s
+    registry_cache.reset_memory_cache()
+    resilience.reset_guards()
+    s.close()
+
+
+def _cnpj():
+    return "77" + "".join(str(random.randint(0, 9)) for _ in range(12))
+
+
+def _wait_for(cond, timeout=5.0):
+    t0 = time.monotonic()
+    while not cond():
+        assert time.monotonic() - t0 < timeout
+        time.sleep(0.01)
+
+
+def test_lookup_is_cached_in_memory_and_table(stub):
+    cnpj = _cnpj()
+    first = lookup_service._lookup_company_external(cnpj)
+    assert first["razao_social"] == "EMPRESA STUB LTDA"
+    assert first["capital_social"] == Decimal("1500.5")
+    assert first["data_abertura"] == date(2011, 4, 5)
+
+    assert lookup_service._lookup_company_external(cnpj) == first
+    assert stub.requests == 1
+
+    # outro processo (LRU vazio) ainda acha na tabela, com os tipos restaurados
+    registry_cache.reset_memory_cache()
+    assert lookup_service._lookup_company_external(cnpj) == first
+    assert stub.requests == 1
+
+
+def test_stale_entry_served_then_revalidated_in_background(stub, monkeypatch):
+    cnpj = _cnpj()
+    lookup_service._lookup_company_external(cnpj)
+    stub.razao = "EMPRESA RENOMEADA LTDA"
+
+    monkeypatch.setattr(settings, "CNPJ_CACHE_FRESH_S", -1)
+    stale = lookup_service._lookup_company_external(cnpj)
+    assert stale["razao_social"] == "EMPRESA STUB LTDA"
+    _wait_for(lambda: stub.requests == 2 and cnpj not in registry_cache._inflight)
+
+    monkeypatch.setattr(settings, "CNPJ_CACHE_FRESH_S", 3600)
+    assert lookup_service._lookup_company_external(cnpj)["razao_social"] == "EMPRESA RENOMEADA LTDA"
+    assert stub.requests == 2
+
+
+def test_expired_entry_is_served_when_provider_fails(stub, monkeypatch):
+    cnpj = _cnpj()
+    lookup_service._lookup_company_external(cnpj)
+
+    monkeypatch.setattr(settings, "CNPJ_CACHE_FRESH_S", -1)
+    monkeypatch.setattr(settings, "CNPJ_CACHE_STALE_S", -1)
+    stub.status = 500
+    assert lookup_service._lookup_company_external(cnpj)["razao_social"] == "EMPRESA STUB LTDA"
+
+    with pytest.raises(HTTPException) as exc:
+        lookup_service._lookup_company_external(_cnpj())
+    assert exc.value.status_code == 503
+
+
+def test_second_tenant_gets_cached_registry_data(stub, client, auth_header):
+    cnpj = _cnpj()
+    lookup_service._lookup_company_external(cnpj)  # outro tenant consultou antes
+
+    r = client.get(f"/companies/by-cnpj/{cnpj}", headers=auth_header)
+    assert r.status_code == 200, r.text
+    assert r.json()["razao_social"] == "EMPRESA STUB LTDA"
+    assert stub.requests == 1
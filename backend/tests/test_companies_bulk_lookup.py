@@ -0,0 +1,176 @@
+import random
+import threading
+import time
+
+from fastapi import HTTPException
+
+from app.core.rate_limit import TokenBucket
+from app.core.settings import settings
+from app.services import company_lookup_service as lookup_service
+
+
+def get_auth_headers(client):
+    resp = client.post(
+        "/auth/login",
+        json={"username": "userA@teste.com", "password": "dev"},
+    )
+    assert resp.status_code == 200
+    token = resp.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _cnpj(prefix="66"):
+    return prefix + "".join(str(random.randint(0, 9)) for _ in range(12))
+
+
+class FakeProvider:
+    """Substitui _lookup_company_external: conta chamadas e mede a concorrência."""
+
+    def __init__(self, *, missing=(), failing=(), delay=0.0):
+        self.calls = []
+        self.missing = set(missing)
+        self.failing = set(failing)
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, cnpj):
+        with self._lock:
+            self.calls.append(cnpj)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if cnpj in self.failing:
+                raise HTTPException(status_code=502, detail="Falha ao consultar CNPJ externo")
+            if cnpj in self.missing:
+                return None
+            return {"cnpj": cnpj, "razao_social": f"EMPRESA {cnpj}", "uf": "SC", "situacao_cadastral": "ATIVA"}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def test_bulk_lookup_sync_statuses(client, monkeypatch):
+    headers = get_auth_headers(client)
+    existing = _cnpj()
+    resp = client.post("/companies", json={"cnpj": existing, "razao_social": "Ja Cadastrada"}, headers=headers)
+    assert resp.status_code == 201
+    existing_id = resp.json()["id"]
+
+    created, missing, failing = _cnpj(), _cnpj(), _cnpj()
+    fake = FakeProvider(missing={missing}, failing={failing})
+    monkeypatch.setattr(lookup_service, "_lookup_company_external", fake)
+    monkeypatch.setattr(settings, "CNPJ_BULK_UPSERT_BATCH", 2)
+
+    formatted = f"{created[:2]}.{created[2:5]}.{created[5:8]}/{created[8:12]}-{created[12:]}"
+    payload = {"cnpjs": [created, formatted, "123", missing, failing, existing]}
+    resp = client.post("/companies/bulk-lookup", json=payload, headers=headers)
+    assert resp.status_code == 200, resp.text
+    data = resp.json()
+
+    assert data["total"] == 6
+    assert data["unique"] == 4
+    statuses = [(i["input"], i["status"]) for i in data["items"]]
+    assert statuses == [
+        (created, "created"),
+        (formatted, "duplicate"),
+        ("123", "invalid"),
+        (missing, "not_found"),
+        (failing, "error"),
+        (existing, "enriched"),
+    ]
+    assert data["counts"]["created"] == 1
+    # CNPJ repetido só é consultado uma vez
+    assert sorted(fake.calls) == sorted([created, missing, failing, existing])
+    assert data["items"][5]["company_id"] == existing_id
+
+    out = client.get(f"/companies/{data['items'][0]['company_id']}", headers=headers)
+    assert out.status_code == 200
+    assert out.json()["razao_social"] == f"EMPRESA {created}"
+
+    # segunda chamada: tudo resolvido localmente, nenhuma consulta externa
+    fake.calls.clear()
+    resp = client.post("/companies/bulk-lookup", json={"cnpjs": [created, existing]}, headers=headers)
+    assert [i["status"] for i in resp.json()["items"]] == ["existing", "existing"]
+    assert fake.calls == []
+
+
+def test_bulk_lookup_bounded_concurrency(client, monkeypatch):
+    headers = get_auth_headers(client)
+    fake = FakeProvider(delay=0.05)
+    monkeypatch.setattr(lookup_service, "_lookup_company_external", fake)
+    monkeypatch.setattr(settings, "CNPJ_BULK_CONCURRENCY", 3)
+
+    cnpjs = [_cnpj("67") for _ in range(12)]
+    resp = client.post("/companies/bulk-lookup", json={"cnpjs": cnpjs}, headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["counts"] == {"created": 12}
+    assert 1 < fake.max_active <= 3
+
+
+def test_bulk_lookup_sync_limit_and_job_mode(client, monkeypatch):
+    headers = get_auth_headers(client)
+    fake = FakeProvider(missing=set())
+    monkeypatch.setattr(lookup_service, "_lookup_company_external", fake)
+    monkeypatch.setattr(settings, "CNPJ_BULK_SYNC_MAX", 2)
+
+    cnpjs = [_cnpj("68") for _ in range(5)]
+    resp = client.post("/companies/bulk-lookup", json={"cnpjs": cnpjs}, headers=headers)
+    assert resp.status_code == 413
+
+    resp = client.post("/companies/bulk-lookup?mode=job", json={"cnpjs": cnpjs}, headers=headers)
+    assert resp.status_code == 202
+    job = resp.json()
+    assert job["total"] == 5 and job["status"] in ("queued", "running", "done")
+
+    t0 = time.monotonic()
+    while job["status"] not in ("done", "failed"):
+        assert time.monotonic() - t0 < 10
+        time.sleep(0.05)
+        job = client.get(f"/companies/bulk-lookup/{job['job_id']}", headers=headers).json()
+
+    assert job["status"] == "done", job
+    assert job["done"] == 5
+    assert [i["status"] for i in job["items"]] == ["created"] * 5
+
+    assert client.get("/companies/bulk-lookup/nao-existe", headers=headers).status_code == 404
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(50, burst=2)
+    t0 = time.monotonic()
+    for _ in range(7):
+        bucket.acquire()
+    # 2 imediatas (burst) + 5 a 50/s => ~0.1s
+    assert time.monotonic() - t0 >= 0.08
+    assert bucket.waits == 5
+
+    unlimited = TokenBucket(0, burst=1)
+    t0 = time.monotonic()
+    for _ in range(100):
+        unlimited.acquire()
+    assert time.monotonic() - t0 < 0.05
+
+
+def test_token_bucket_refuses_waits_past_the_deadline():
+    bucket = TokenBucket(1, burst=1)
+    assert bucket.acquire(max_wait_s=0)
+    t0 = time.monotonic()
+    # próxima ficha só em ~1s: recusa sem dormir nem consumir
+    assert not bucket.acquire(max_wait_s=0.2)
+    assert time.monotonic() - t0 < 0.05
+    assert (bucket.rejected, bucket.waits) == (1, 0)
+
+
+def test_bulk_sync_limit_follows_provider_rate(client, monkeypatch):
+    headers = get_auth_headers(client)
+    monkeypatch.setattr(settings, "CNPJ_BULK_SYNC_MAX", 1000)
+    monkeypatch.setattr(settings, "CNPJ_LOOKUP_RATE_PER_S", 0.1)
+    monkeypatch.setattr(settings, "CNPJ_LOOKUP_RATE_BURST", 1)
+    monkeypatch.setattr(settings, "REQUEST_DEADLINE_S", 30.0)
+
+    # 1 (burst) + 0.1/s x 30s x 0.8 = 3
+    resp = client.post("/companies/bulk-lookup", json={"cnpjs": [_cnpj("69") for _ in range(4)]}, headers=headers)
+    assert resp.status_code == 413 and "Acima de 3" in resp.json()["detail"]
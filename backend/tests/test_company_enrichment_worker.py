@@ -0,0 +1,134 @@
+import random
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.core.settings import settings
+from app.db import SessionLocal
+from app.models.company import Company
+from app.models.company_enrichment import CompanyEnrichmentRun, CompanyEnrichmentTask
+from app.services import company_enrichment
+from app.services import company_lookup_service as lookup_service
+
+
+def _cnpj():
+    return "88" + "".join(str(random.randint(0, 9)) for _ in range(12))
+
+
+def _create(client, headers, cnpj):
+    resp = client.post("/companies", json={"cnpj": cnpj, "razao_social": "Sem Dados"}, headers=headers)
+    assert resp.status_code == 201
+    return resp.json()["id"]
+
+
+def _task(company_id):
+    with SessionLocal() as db:
+        return db.scalar(select(CompanyEnrichmentTask).where(CompanyEnrichmentTask.company_id == company_id))
+
+
+def _company(company_id):
+    with SessionLocal() as db:
+        return db.get(Company, company_id)
+
+
+def _provider(monkeypatch, *, fail=False):
+    calls = []
+
+    def fake_lookup(cnpj):
+        calls.append(cnpj)
+        if fail:
+            raise HTTPException(status_code=503, detail="Provedor de CNPJ indisponível")
+        return {"cnpj": cnpj, "razao_social": f"EMPRESA {cnpj}", "uf": "SC", "situacao_cadastral": "ATIVA"}
+
+    monkeypatch.setattr(lookup_service, "_lookup_company_external", fake_lookup)
+    return calls
+
+
+def test_request_enqueues_and_worker_enriches(client, auth_header, monkeypatch):
+    calls = _provider(monkeypatch)
+    cnpj = _cnpj()
+    company_id = _create(client, auth_header, cnpj)
+
+    resp = client.get(f"/companies/by-cnpj/{cnpj}", headers=auth_header)
+    assert resp.status_code == 200
+    assert resp.json()["situacao_cadastral"] is None
+    # nenhuma consulta externa no caminho da request
+    assert calls == []
+    task = _task(company_id)
+    assert (task.status, task.reason) == ("pending", "missing")
+
+    # segunda visita não duplica a tarefa
+    client.get(f"/companies/by-cnpj/{cnpj}", headers=auth_header)
+    assert _task(company_id).id == task.id
+
+    out = company_enrichment.run_once(trigger="test", scan=False, limit=10000)
+    assert out["claimed"] >= 1 and out["updated"] >= 1
+    assert cnpj in calls
+
+    company = _company(company_id)
+    assert company.situacao_cadastral == "ATIVA"
+    assert company.razao_social == f"EMPRESA {cnpj}"
+    assert company.registry_checked_at is not None
+    assert _task(company_id).status == "done"
+
+    with SessionLocal() as db:
+        run = db.scalar(select(CompanyEnrichmentRun).order_by(CompanyEnrichmentRun.id.desc()))
+    assert run.trigger == "test" and run.claimed == out["claimed"]
+
+    calls.clear()
+    resp = client.get(f"/companies/by-cnpj/{cnpj}", headers=auth_header)
+    assert resp.json()["situacao_cadastral"] == "ATIVA"
+    assert calls == []
+
+
+def test_provider_failure_is_retried_then_marked_failed(client, auth_header, monkeypatch):
+    _provider(monkeypatch, fail=True)
+    monkeypatch.setattr(settings, "COMPANY_ENRICH_MAX_ATTEMPTS", 2)
+    cnpj = _cnpj()
+    company_id = _create(client, auth_header, cnpj)
+    client.get(f"/companies/by-cnpj/{cnpj}", headers=auth_header)
+
+    company_enrichment.run_once(trigger="test", scan=False, limit=10000)
+    task = _task(company_id)
+    assert (task.status, task.attempts) == ("pending", 1)
+    assert task.run_after > datetime.utcnow()
+    assert "indisponível" in task.last_error
+
+    with SessionLocal() as db:
+        t = db.get(CompanyEnrichmentTask, task.id)
+        t.run_after = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+
+    company_enrichment.run_once(trigger="test", scan=False, limit=10000)
+    task = _task(company_id)
+    assert (task.status, task.attempts) == ("failed", 2)
+
+
+def test_scheduler_enqueues_only_stale_companies(client, auth_header, monkeypatch):
+    _provider(monkeypatch)
+    stale_cnpj, fresh_cnpj = _cnpj(), _cnpj()
+    stale_id = _create(client, auth_header, stale_cnpj)
+    fresh_id = _create(client, auth_header, fresh_cnpj)
+
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        db.get(Company, stale_id).registry_checked_at = now - timedelta(seconds=settings.COMPANY_REFRESH_MAX_AGE_S + 60)
+        db.get(Company, fresh_id).registry_checked_at = now
+        db.commit()
+
+    with SessionLocal() as db:
+        assert company_enrichment.enqueue_stale(db, limit=100000) >= 1
+        db.commit()
+
+    assert (_task(stale_id).status, _task(stale_id).reason) == ("pending", "stale")
+    assert _task(fresh_id) is None
+
+    company_enrichment.run_once(trigger="test", scan=False, limit=100000)
+    assert _company(stale_id).registry_checked_at > now - timedelta(seconds=5)
+
+    # já conferida: a próxima varredura não a reenfileira
+    with SessionLocal() as db:
+        company_enrichment.enqueue_stale(db, limit=100000)
+        db.commit()
+    assert _task(stale_id).status == "done"
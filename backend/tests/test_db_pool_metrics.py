@@ -0,0 +1,69 @@
+from sqlalchemy import event, text
+
+from app import db as db_module
+from app import deps
+from app.core.pool_metrics import PoolMetrics
+from app.core.settings import settings
+
+
+def test_wait_histogram_buckets_and_timeouts():
+    m = PoolMetrics("t")
+    m.observe_wait(0.0004)
+    m.observe_wait(0.020)
+    m.observe_wait(9.0, timed_out=True)
+
+    s = m.stats()
+    assert s["timeouts"] == 1
+    assert s["wait"]["count"] == 3
+    assert s["wait"]["buckets"]["le_1ms"] == 1
+    assert s["wait"]["buckets"]["le_25ms"] == 1
+    assert s["wait"]["buckets"]["le_inf"] == 1
+    assert s["wait"]["max_ms"] >= 9000
+
+
+def test_admin_pool_endpoint_reports_checkouts(client, auth_header, monkeypatch):
+    r = client.get("/admin/db/pool", headers=auth_header)
+    assert r.status_code == 403
+
+    monkeypatch.setattr(settings, "ONBOARDING_ADMIN_EMAILS", "userA@teste.com")
+    client.get("/companies", headers=auth_header)
+
+    r = client.get("/admin/db/pool", headers=auth_header)
+    assert r.status_code == 200, r.text
+    body = r.json()
+
+    pools = {p["name"]: p for p in body["pools"]}
+    assert set(pools) == {"sync", "async"}
+    assert pools["sync"]["checkouts"] >= 1
+    assert pools["sync"]["wait"]["count"] >= 1
+    assert "checkedout" in pools["sync"]
+    assert body["config"]["pool_size"] == settings.DB_POOL_SIZE
+
+
+def test_statement_timeout_is_scoped_to_request_sessions(monkeypatch):
+    # SQLite não tem statement_timeout: finge Postgres e troca o SET LOCAL por um no-op
+    monkeypatch.setattr(db_module, "_is_sqlite", False)
+    monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 1234)
+    seen = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SET LOCAL statement_timeout"):
+            seen.append(statement)
+            return "SELECT 1", ()
+        return statement, parameters
+
+    event.listen(db_module.engine, "before_cursor_execute", _capture, retval=True)
+    try:
+        gen = deps.get_db()
+        db = next(gen)
+        db.execute(text("SELECT 1"))
+        db.commit()
+        db.execute(text("SELECT 1"))  # nova transação, novo SET LOCAL
+        gen.close()
+        assert seen == ["SET LOCAL statement_timeout = 1234"] * 2
+
+        with db_module.SessionLocal() as worker:  # scripts/workers: sem limite
+            worker.execute(text("SELECT 1"))
+        assert len(seen) == 2
+    finally:
+        event.remove(db_module.engine, "before_cursor_execute", _capture)
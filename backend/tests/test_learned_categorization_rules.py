@@ -0,0 +1,108 @@
+import random
+import string
+
+from sqlalchemy import select
+
+from app.db import SessionLocal
+from app.models.category_token_stat import CategoryTokenStat
+from app.services import learned_rules
+
+
+def _word():
+    return "zq" + "".join(random.choice(string.ascii_lowercase) for _ in range(8))
+
+
+def _setup(client, auth_header, create_company):
+    company_id = create_company()
+    cats = []
+    for _ in range(2):
+        r = client.post("/categories", json={"name": "Learned " + _word()}, headers=auth_header)
+        assert r.status_code == 200, r.text
+        cats.append(r.json()["id"])
+    return company_id, cats
+
+
+def _tx(client, auth_header, company_id, description):
+    r = client.post(
+        "/transactions",
+        json={"company_id": company_id, "kind": "out", "amount_cents": 100, "description": description, "occurred_at": "2007-03-10T10:00:00"},
+        headers=auth_header,
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+def _suggest(client, auth_header, company_id):
+    r = client.get(f"/transactions/suggest-categories?company_id={company_id}&start=2007-03-01&end=2007-03-31", headers=auth_header)
+    assert r.status_code == 200, r.text
+    return {s["id"]: s for s in r.json()}
+
+
+def test_tokenize_folds_accents_and_drops_noise():
+    assert learned_rules.tokenize("Pagto REF 123 Açougue do Zé, açougue") == ("pagto", "acougue")
+
+
+def test_learned_rules_from_history_beat_static_rules(client, auth_header, create_company):
+    company_id, (cat_a, cat_b) = _setup(client, auth_header, create_company)
+    vendor = _word()
+
+    history = [_tx(client, auth_header, company_id, f"{vendor} mensal") for _ in range(3)]
+    pending = _tx(client, auth_header, company_id, f"PIX {vendor.upper()} outubro")
+
+    # sem histórico: só a regra fixa (pix -> Vendas)
+    assert _suggest(client, auth_header, company_id)[pending]["provider"] == "rule-based"
+
+    r = client.post("/transactions/bulk-categorize", json={"transaction_ids": history, "category_id": cat_a}, headers=auth_header)
+    assert r.status_code == 200, r.text
+
+    s = _suggest(client, auth_header, company_id)[pending]
+    assert s["provider"] == "learned"
+    assert s["suggested_category_id"] == cat_a
+    assert s["rule"] == f"learned:{vendor}"
+    assert 0 < s["confidence"] < 1
+
+    # recategorizar um exemplo derruba o share (2/3 < 0.8): volta para a regra fixa
+    r = client.patch(f"/transactions/{history[0]}/category?company_id={company_id}", json={"category_id": cat_b}, headers=auth_header)
+    assert r.status_code == 200, r.text
+    assert _suggest(client, auth_header, company_id)[pending]["provider"] == "rule-based"
+
+
+def test_incremental_index_matches_rebuild(client, auth_header, create_company):
+    company_id, (cat_a, cat_b) = _setup(client, auth_header, create_company)
+    vendor = _word()
+    ids = [_tx(client, auth_header, company_id, f"{vendor} loja {i}") for i in range(4)]
+    client.post("/transactions/bulk-categorize", json={"transaction_ids": ids, "category_id": cat_a}, headers=auth_header)
+    client.patch(f"/transactions/{ids[0]}/category?company_id={company_id}", json={"category_id": cat_b}, headers=auth_header)
+
+    # criadas já categorizadas (POST e /bulk) também entram no índice
+    r = client.post(
+        "/transactions",
+        json={"company_id": company_id, "category_id": cat_b, "kind": "out", "amount_cents": 100, "description": f"{vendor} avulsa", "occurred_at": "2007-03-11T10:00:00"},
+        headers=auth_header,
+    )
+    assert r.status_code == 200, r.text
+    r = client.post(
+        f"/transactions/bulk?company_id={company_id}",
+        json=[{"category_id": cat_a, "kind": "out", "amount_cents": 100, "description": f"{vendor} lote", "occurred_at": "2007-03-12"}],
+        headers=auth_header,
+    )
+    assert r.json()["inserted"] == 1
+
+    def snapshot(db):
+        q = select(CategoryTokenStat.token, CategoryTokenStat.category_id, CategoryTokenStat.hits).where(
+            CategoryTokenStat.token == vendor
+        )
+        return sorted(tuple(r) for r in db.execute(q))
+
+    with SessionLocal() as db:
+        incremental = snapshot(db)
+        assert incremental == sorted([(vendor, cat_a, 4), (vendor, cat_b, 2)])
+        tenant_id = db.scalar(select(CategoryTokenStat.tenant_id).where(CategoryTokenStat.token == vendor).limit(1))
+        learned_rules.rebuild(db, tenant_id=tenant_id)
+        db.commit()
+        assert snapshot(db) == incremental
+
+        # saldo zerado sai do índice
+        learned_rules.apply_deltas(db, tenant_id=tenant_id, deltas={(vendor, cat_b): -2, (vendor, cat_a): 1})
+        db.commit()
+        assert snapshot(db) == [(vendor, cat_a, 5)]
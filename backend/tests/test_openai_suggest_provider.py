@@ -0,0 +1,225 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sqlalchemy import func, select
+
+from app.ai.provider import CachedSuggestion, OpenAISuggestProvider, SuggestInputItem
+from app.ai.registry import ai_registry
+from app.core import resilience
+from app.core.settings import settings
+from app.db import SessionLocal
+from app.models.ai_suggestion_cache import AISuggestionCache
+from app.services.ai_suggest_cache import DbSuggestCache
+
+
+class StubOpenAI:
+    """Servidor local no lugar da API: /v1/chat/completions sugere a 1ª categoria p/ descrições com "zeta"."""
+
+    def __init__(self, fail_first: int = 0, fail_status: int = 503, delay_s: float = 0.05):
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.delay_s = delay_s
+        self.requests = 0
+        self.batches: list[list[str]] = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub._lock:
+                    stub.requests += 1
+                    n = stub.requests
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                try:
+                    time.sleep(stub.delay_s)
+                    if self.path != "/v1/chat/completions" or n <= stub.fail_first:
+                        return self._send(stub.fail_status, {"error": "unavailable"})
+                    payload = json.loads(body["messages"][1]["content"])
+                    with stub._lock:
+                        stub.batches.append([t["description"] for t in payload["transactions"]])
+                    cat = payload["categories"][0]["id"]
+                    suggestions = [
+                        {"transaction_id": t["id"], "suggested_category_id": cat, "confidence": 0.9, "reason": "stub"}
+                        for t in payload["transactions"]
+                        if "zeta" in t["description"].lower()
+                    ]
+                    content = json.dumps({"suggestions": suggestions})
+                    return self._send(200, {"choices": [{"message": {"content": content}}]})
+                finally:
+                    with stub._lock:
+                        stub.active -= 1
+
+            def _send(self, status, data):
+                raw = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MemoryCache:
+    def __init__(self):
+        self.data = {}
+
+    def get_many(self, keys):
+        return {k: self.data[k] for k in keys if k in self.data}
+
+    def set_many(self, entries):
+        self.data.update(entries)
+
+
+@pytest.fixture
+def stub():
+    resilience.reset_guards()
+    s = StubOpenAI()
+    yield s
+    s.close()
+    resilience.reset_guards()
+
+
+def _provider(stub, **kw):
+    cfg = dict(api_key="test", base_url=stub.base_url, batch_size=2, max_concurrency=2, backoff_base_s=0.01, deadline_s=10)
+    cfg.update(kw)
+    return OpenAISuggestProvider(**cfg)
+
+
+def _items(descriptions):
+    return [SuggestInputItem(id=i, description=d, kind="out", amount_cents=100) for i, d in enumerate(descriptions, start=1)]
+
+
+CATS = [{"id": 7, "name": "Fornecedores"}, {"id": 8, "name": "Outros"}]
+
+
+def test_dedup_batches_concurrency_and_cache(stub):
+    prov = _provider(stub)
+    cache = MemoryCache()
+    items = _items(["Zeta Ltda", "ZETA   ltda", "Ômega", "omega", "alfa", "beta zeta", "gama"])
+
+    out = prov.suggest_categories(1, items, categories=CATS, cache=cache)
+    assert sorted(x.id for x in out) == [1, 2, 6]
+    assert {x.category_id for x in out} == {7}
+    assert all(x.category_name == "Fornecedores" and x.rule == "ai" for x in out)
+
+    sent = [d for b in stub.batches for d in b]
+    assert len(sent) == 5  # duplicadas normalizadas vão uma vez só
+    assert max(len(b) for b in stub.batches) <= 2
+    assert stub.max_active <= 2
+    assert len(cache.data) == 5  # inclui as respostas "sem sugestão"
+
+    before = stub.requests
+    again = prov.suggest_categories(1, items, categories=CATS, cache=cache, include_no_match=True)
+    assert stub.requests == before
+    assert sum(1 for x in again if x.category_id == 7) == 3
+    assert len(again) == len(items)
+
+
+def test_retries_within_budget(stub):
+    stub.fail_first = 2
+    out = _provider(stub, batch_size=10, max_retries=2, retry_budget_ratio=5).suggest_categories(
+        1, _items(["zeta"]), categories=CATS
+    )
+    assert [x.id for x in out] == [1]
+    assert stub.requests == 3
+
+
+def test_exhausted_budget_returns_nothing_and_does_not_cache(stub):
+    stub.fail_first = 1000
+    stub.fail_status = 500
+    cache = MemoryCache()
+    out = _provider(stub, batch_size=1, max_retries=5, retry_budget_ratio=0.5).suggest_categories(
+        1, _items(["zeta a", "zeta b"]), categories=CATS, cache=cache
+    )
+    assert out == []
+    assert cache.data == {}
+    # 2 lotes, orçamento = max(1, 2 * 0.5) = 1 retry para a chamada inteira
+    assert stub.requests == 3
+
+
+def test_non_retryable_status_is_not_retried(stub):
+    stub.fail_first = 1000
+    stub.fail_status = 401
+    assert _provider(stub).suggest_categories(1, _items(["zeta"]), categories=CATS) == []
+    assert stub.requests == 1
+
+
+def test_open_circuit_skips_network(stub, monkeypatch):
+    monkeypatch.setattr(settings, "PROVIDER_BREAKER_FAILURES", 2)
+    resilience.reset_guards()
+    stub.fail_first = 1000
+    prov = _provider(stub, batch_size=1, max_retries=0)
+    assert prov.suggest_categories(1, _items(["zeta a", "zeta b"]), categories=CATS) == []
+    assert stub.requests == 2
+
+    t0 = time.perf_counter()
+    assert prov.suggest_categories(1, _items(["zeta c", "zeta d"]), categories=CATS) == []
+    assert stub.requests == 2
+    assert time.perf_counter() - t0 < 0.1
+    assert resilience.get_guard("openai").snapshot()["state"] == "open"
+
+
+def test_suggest_endpoint_uses_provider_and_persistent_cache(client, auth_header, stub, monkeypatch, request):
+    monkeypatch.setattr(settings, "AI_ENABLED", True)
+    monkeypatch.setattr(settings, "AI_PROVIDER", "openai")
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(settings, "OPENAI_BASE_URL", stub.base_url)
+    ai_registry.reload()
+    request.addfinalizer(ai_registry.reload)  # roda depois do undo do monkeypatch
+
+    digits = "".join(str(random.randint(0, 9)) for _ in range(8))
+    r = client.post("/companies", json={"cnpj": f"44332211{digits}"[:14], "razao_social": f"Empresa IA {digits}"}, headers=auth_header)
+    company_id = r.json()["id"]
+    tag = "zeta" + digits
+    ids = []
+    for desc in (f"{tag} consultoria", f"{tag.upper()}  CONSULTORIA", "energia celesc"):
+        r = client.post(
+            "/transactions",
+            json={"company_id": company_id, "kind": "out", "amount_cents": 100, "description": desc, "occurred_at": "2008-05-10T10:00:00"},
+            headers=auth_header,
+        )
+        ids.append(r.json()["id"])
+
+    url = f"/transactions/suggest-categories?company_id={company_id}&start=2008-05-01&end=2008-05-31"
+    items = {s["id"]: s for s in client.get(url, headers=auth_header).json()}
+    assert items[ids[0]]["provider"] == "openai"
+    assert items[ids[0]]["suggested_category_id"] == items[ids[1]]["suggested_category_id"]
+    assert items[ids[2]]["provider"] == "rule-based"
+    assert stub.requests == 1
+
+    again = {s["id"]: s for s in client.get(url, headers=auth_header).json()}
+    assert again[ids[0]]["suggested_category_id"] == items[ids[0]]["suggested_category_id"]
+    assert stub.requests == 1  # veio do cache (tenant, descrição normalizada)
+
+
+def test_db_suggest_cache_upserts_existing_keys():
+    tenant_id = random.randint(10**6, 10**7)
+    key = f"{random.getrandbits(160):040x}"
+    with SessionLocal() as a, SessionLocal() as b:
+        DbSuggestCache(a, tenant_id).set_many({key: CachedSuggestion(category_id=1, confidence=0.5, reason="a")})
+        a.commit()
+        # outra request grava a mesma chave sem ter visto a primeira: renova em vez de violar o índice
+        DbSuggestCache(b, tenant_id).set_many({key: CachedSuggestion(category_id=2, confidence=0.9, reason="b")})
+        b.commit()
+
+    with SessionLocal() as db:
+        assert DbSuggestCache(db, tenant_id).get_many([key]) == {key: CachedSuggestion(category_id=2, confidence=0.9, reason="b")}
+        assert db.scalar(select(func.count()).select_from(AISuggestionCache).where(AISuggestionCache.tenant_id == tenant_id)) == 1
@@ -0,0 +1,181 @@
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.core import resilience
+from app.core.resilience import ProviderGuard, ProviderUnavailable, deadline
+from app.core.settings import settings
+from app.services import cnpj_registry_cache as registry_cache
+from app.services import company_lookup_service as lookup_service
+
+
+def _guard(**kw):
+    cfg = {"failure_threshold": 3, "reset_timeout_s": 0.2, "max_inflight": 4}
+    cfg.update(kw)
+    return ProviderGuard("test", **cfg)
+
+
+def _fail(guard):
+    with pytest.raises(httpx.ConnectError):
+        with guard.call():
+            raise httpx.ConnectError("down")
+
+
+def test_breaker_opens_fails_fast_and_recovers():
+    guard = _guard()
+    for _ in range(3):
+        _fail(guard)
+    assert guard.state == "open"
+
+    t0 = time.perf_counter()
+    with pytest.raises(ProviderUnavailable) as exc:
+        with guard.call():
+            pytest.fail("circuito aberto não pode chamar o provider")
+    assert exc.value.reason == "circuit_open"
+    assert time.perf_counter() - t0 < 0.01
+
+    time.sleep(0.25)
+    assert guard.snapshot()["state"] == "half_open"
+    with guard.call():
+        pass
+    assert guard.state == "closed"
+    snap = guard.snapshot()
+    assert snap["failure"] == 3 and snap["ok"] == 1 and snap["opened"] == 1
+    assert snap["latency"]["count"] == 4
+
+
+def test_half_open_probe_failure_reopens():
+    guard = _guard(reset_timeout_s=0.05)
+    for _ in range(3):
+        _fail(guard)
+    time.sleep(0.06)
+    _fail(guard)
+    assert guard.state == "open"
+    assert guard.snapshot()["opened"] == 2
+
+
+def test_business_errors_do_not_open_circuit():
+    guard = _guard(failure_threshold=1)
+    request = httpx.Request("POST", "http://gateway/payments")
+    with pytest.raises(httpx.HTTPStatusError):
+        with guard.call():
+            raise httpx.HTTPStatusError("bad", request=request, response=httpx.Response(400, request=request))
+    with pytest.raises(ValueError):
+        with guard.call():
+            raise ValueError("cpf obrigatório")
+    assert guard.state == "closed"
+
+
+def test_bulkhead_caps_inflight_calls():
+    guard = _guard(max_inflight=1)
+    entered, release = threading.Event(), threading.Event()
+
+    def slow():
+        with guard.call():
+            entered.set()
+            release.wait(2)
+
+    t = threading.Thread(target=slow)
+    t.start()
+    assert entered.wait(2)
+    with pytest.raises(ProviderUnavailable) as exc:
+        with guard.call():
+            pass
+    assert exc.value.reason == "bulkhead_full"
+    release.set()
+    t.join()
+    with guard.call():
+        pass
+    assert guard.snapshot()["rejected_bulkhead"] == 1
+
+
+def test_deadline_caps_timeout_and_rejects_when_expired():
+    guard = _guard()
+    assert guard.timeout(12) == 12
+    with deadline(0.05):
+        assert guard.timeout(12) <= 0.05
+        with deadline(10):
+            # prazo externo mais curto prevalece
+            assert guard.timeout(12) <= 0.05
+        time.sleep(0.06)
+        with pytest.raises(ProviderUnavailable) as exc:
+            guard.timeout(12)
+        assert exc.value.reason == "deadline"
+    assert resilience.remaining_s() is None
+
+
+class FailingBrasilAPI:
+    def __init__(self):
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stub.requests += 1
+                self.send_response(500)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/api/cnpj/v1"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def failing_stub(monkeypatch, client):
+    s = FailingBrasilAPI()
+    monkeypatch.setattr(settings, "CNPJ_LOOKUP_PROVIDER", "brasilapi")
+    monkeypatch.setattr(settings, "CNPJ_LOOKUP_BASE_URL", s.base_url)
+    monkeypatch.setattr(settings, "PROVIDER_BREAKER_FAILURES", 2)
+    monkeypatch.setattr(settings, "PROVIDER_BREAKER_RESET_S", 60)
+    resilience.reset_guards()
+    registry_cache.reset_memory_cache()
+    yield s
+    resilience.reset_guards()
+    registry_cache.reset_memory_cache()
+    s.close()
+
+
+def _cnpj():
+    return "99" + "".join(str(random.randint(0, 9)) for _ in range(12))
+
+
+def test_cnpj_lookup_stops_calling_degraded_provider(failing_stub, client, auth_header):
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc:
+            lookup_service._lookup_company_external(_cnpj())
+        assert exc.value.status_code == 503
+    assert failing_stub.requests == 2
+
+    t0 = time.perf_counter()
+    for _ in range(5):
+        with pytest.raises(HTTPException) as exc:
+            lookup_service._lookup_company_external(_cnpj())
+        assert exc.value.status_code == 503
+    assert time.perf_counter() - t0 < 0.5
+    assert failing_stub.requests == 2
+
+    providers = client.get("/health").json()["providers"]
+    assert providers["brasilapi"]["state"] == "open"
+    assert providers["brasilapi"]["rejected_open"] == 5
+
+
+def test_request_deadline_reaches_provider_call(failing_stub, client, auth_header, monkeypatch):
+    monkeypatch.setattr(settings, "REQUEST_DEADLINE_S", 1e-6)
+    resp = client.get(f"/companies/by-cnpj/{_cnpj()}", headers=auth_header)
+    assert resp.status_code == 503
+    assert failing_stub.requests == 0
+    assert resilience.get_guard("brasilapi").snapshot()["rejected_deadline"] == 1
@@ -0,0 +1,89 @@
+from sqlalchemy import event
+
+from app.core import tenant_cache
+from app.core.cache import MemoryCache, RedisCache
+from app.core.security import create_access_token
+from app.db import async_engine, engine
+
+
+def _count_member_selects(fn):
+    seen = []
+
+    def _spy(conn, cursor, statement, parameters, context, executemany):
+        if "tenant_members" in statement and statement.lstrip().upper().startswith("SELECT"):
+            seen.append(statement)
+
+    for eng in (engine, async_engine.sync_engine):
+        event.listen(eng, "before_cursor_execute", _spy)
+    try:
+        result = fn()
+    finally:
+        for eng in (engine, async_engine.sync_engine):
+            event.remove(eng, "before_cursor_execute", _spy)
+    return result, len(seen)
+
+
+def test_signed_tenant_claim_skips_member_lookup(client, auth_header):
+    r, n = _count_member_selects(lambda: client.get("/categories", headers=auth_header))
+    assert r.status_code == 200, r.text
+    assert n == 0
+
+    r, n = _count_member_selects(lambda: client.get("/transactions", headers=auth_header))
+    assert r.status_code == 200, r.text
+    assert n == 0
+
+
+def test_email_only_token_resolves_once_until_invalidated(client, auth_header):
+    tenant_cache.set_tenant_cache(MemoryCache(max_entries=16, ttl_s=60))
+    try:
+        me = client.get("/auth/me", headers=auth_header).json()
+        headers = {"Authorization": f"Bearer {create_access_token(sub=me['sub'])}"}
+
+        r, n = _count_member_selects(lambda: client.get("/categories", headers=headers))
+        assert r.status_code == 200, r.text
+        assert n == 1
+
+        r, n = _count_member_selects(lambda: client.get("/categories", headers=headers))
+        assert r.status_code == 200, r.text
+        assert n == 0
+
+        r, n = _count_member_selects(lambda: client.get("/transactions", headers=headers))
+        assert r.status_code == 200, r.text
+        assert n == 0
+
+        tenant_cache.invalidate_tenant_member(me["sub"])
+        r, n = _count_member_selects(lambda: client.get("/categories", headers=headers))
+        assert r.status_code == 200, r.text
+        assert n == 1
+    finally:
+        tenant_cache.set_tenant_cache(None)
+        tenant_cache._cache_ready = False
+
+
+class _DownRedis:
+    """Client com a API do redis-py que sempre falha na conexão."""
+
+    def _down(self, *_a, **_kw):
+        raise ConnectionError("redis down")
+
+    get = set = delete = scan_iter = _down
+
+
+def test_cache_outage_falls_back_to_member_lookup(client, auth_header):
+    tenant_cache.set_tenant_cache(RedisCache(_DownRedis(), ttl_s=60))
+    try:
+        me = client.get("/auth/me", headers=auth_header).json()
+        headers = {"Authorization": f"Bearer {create_access_token(sub=me['sub'])}"}
+
+        # sync (categories) e async (reports): cache fora do ar => consulta o banco, sem 401
+        r, n = _count_member_selects(lambda: client.get("/categories", headers=headers))
+        assert r.status_code == 200, r.text
+        assert n == 1
+        r = client.get("/reports/summary?company_id=1&start=2001-01-01&end=2001-01-31", headers=headers)
+        assert r.status_code != 401, r.text
+
+        tenant_cache.invalidate_tenant_member(me["sub"])
+        tenant_cache.invalidate_tenant_member()
+    finally:
+        tenant_cache.set_tenant_cache(None)
+        tenant_cache._cache_ready = False
@@ -0,0 +1,135 @@
+import random
+import string
+
+from sqlalchemy import event
+
+from app.core.settings import settings
+from app.db import SessionLocal, engine
+from app.models.company import Company
+from app.services import categorize_apply, report_cache
+
+
+def _word():
+    return "zq" + "".join(random.choice(string.ascii_lowercase) for _ in range(8))
+
+
+def _tx(client, auth_header, company_id, description, amount_cents, day):
+    r = client.post(
+        "/transactions",
+        json={
+            "company_id": company_id,
+            "kind": "out",
+            "amount_cents": amount_cents,
+            "description": description,
+            "occurred_at": f"2008-05-{day:02d}T10:00:00",
+        },
+        headers=auth_header,
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["id"]
+
+
+def _seed(client, auth_header, create_company):
+    company_id = create_company()
+    for i in range(5):
+        _tx(client, auth_header, company_id, f"aluguel {_word()}", 1000 + i, 2 + i)
+    for i in range(3):
+        _tx(client, auth_header, company_id, f"energia {_word()}", 500 + i, 10 + i)
+    # sem regra e mais recentes: a primeira página só tem no_match
+    no_match = [_tx(client, auth_header, company_id, _word(), 70, 25 + i) for i in range(4)]
+    return company_id, no_match
+
+
+def test_apply_suggestions_pages_through_backlog_with_set_based_updates(client, auth_header, create_company, monkeypatch):
+    monkeypatch.setattr(report_cache, "_cache", None)
+    monkeypatch.setattr(report_cache, "_cache_ready", True)
+    monkeypatch.setattr(settings, "CATEGORIZE_APPLY_CHUNK", 2)
+    company_id, no_match = _seed(client, auth_header, create_company)
+    base = f"/transactions/apply-suggestions?company_id={company_id}&start=2008-05-01&end=2008-05-31&limit=4"
+
+    updates = []
+
+    def _spy(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE TRANSACTIONS"):
+            updates.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _spy)
+    try:
+        pages, cursor = [], None
+        while True:
+            r = client.post(base + (f"&cursor={cursor}" if cursor else ""), headers=auth_header)
+            assert r.status_code == 200, r.text
+            pages.append(r.json())
+            cursor = pages[-1]["next_cursor"]
+            if cursor is None:
+                break
+            assert len(pages) < 10
+    finally:
+        event.remove(engine, "before_cursor_execute", _spy)
+
+    # 12 linhas em páginas de 4; a primeira só tinha no_match
+    assert [p["scanned"] for p in pages] == [4, 4, 4, 0]
+    assert pages[0]["updated"] == 0
+    assert sum(p["updated"] for p in pages) == 8
+    for p in pages:
+        assert sum(p["updated_by_category"].values()) == p["updated"]
+        assert p["skipped_ids"] == [] and p["invalid_category_ids"] == []
+    # um UPDATE por categoria e bloco de CATEGORIZE_APPLY_CHUNK ids (por página)
+    assert len(updates) == sum(-(-n // 2) for p in pages for n in p["updated_by_category"].values())
+
+    left = client.get(
+        f"/transactions/uncategorized?company_id={company_id}&start=2008-05-01&end=2008-05-31", headers=auth_header
+    ).json()
+    assert sorted(t["id"] for t in left) == sorted(no_match)
+
+    # rollup acompanhou o UPDATE: mesmo resultado lendo transações cruas
+    url = f"/reports/summary?company_id={company_id}&start=2008-05-01&end=2008-05-31"
+    from_rollup = client.get(url, headers=auth_header).json()
+    monkeypatch.setattr(settings, "REPORTS_USE_DAILY_ROLLUP", False)
+    assert client.get(url, headers=auth_header).json() == from_rollup
+    uncategorized = next(c for c in from_rollup["by_category"] if c["category_id"] is None)
+    assert uncategorized["saidas_cents"] == 4 * 70
+
+
+def test_dry_run_reports_without_writing(client, auth_header, create_company):
+    company_id, _no_match = _seed(client, auth_header, create_company)
+    r = client.post(
+        f"/transactions/apply-suggestions?company_id={company_id}&start=2008-05-01&end=2008-05-31&dry_run=true",
+        headers=auth_header,
+    )
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert data["dry_run"] is True and data["updated"] == 0
+    assert data["scanned"] == 12 and data["suggested"] == 8 and data["next_cursor"] is None
+
+    r = client.post(f"/transactions/apply-suggestions?company_id={company_id}&cursor=%%%", headers=auth_header)
+    assert r.status_code == 422
+
+
+def test_apply_categories_skips_rows_categorized_meanwhile(client, auth_header, create_company):
+    company_id = create_company()
+    tx_a = _tx(client, auth_header, company_id, f"aluguel {_word()}", 100, 3)
+    tx_b = _tx(client, auth_header, company_id, f"aluguel {_word()}", 200, 4)
+    cats = [client.post("/categories", json={"name": f"Apply {_word()}"}, headers=auth_header).json()["id"] for _ in range(2)]
+
+    r = client.patch(f"/transactions/{tx_b}/category?company_id={company_id}", json={"category_id": cats[0]}, headers=auth_header)
+    assert r.status_code == 200, r.text
+
+    with SessionLocal() as db:
+        tenant_id = db.get(Company, company_id).tenant_id
+        res = categorize_apply.apply_categories(
+            db,
+            tenant_id=tenant_id,
+            company_id=company_id,
+            ids_by_category={cats[1]: [tx_a, tx_b], 10**9: [tx_a]},
+        )
+        db.commit()
+
+    assert res.updated == 1 and res.updated_by_category == {cats[1]: 1}
+    assert res.skipped_ids == [tx_b]
+    assert res.invalid_category_ids == [10**9]
+
+    txs = {t["id"]: t for t in client.get(f"/transactions?company_id={company_id}", headers=auth_header).json()}
+    assert txs[tx_a]["category_id"] == cats[1]
+    # já categorizada por outra request: não é sobrescrita
+    assert txs[tx_b]["category_id"] == cats[0]
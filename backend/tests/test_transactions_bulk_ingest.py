@@ -0,0 +1,119 @@
+import json
+import random
+
+
+def _create_category(client, auth_header):
+    name = "Categoria Bulk " + "".join(str(random.randint(0, 9)) for _ in range(6))
+    resp = client.post("/categories", json={"name": name}, headers=auth_header)
+    assert resp.status_code == 200, resp.text
+    return resp.json()["id"], name
+
+
+def _summary(client, auth_header, company_id):
+    r = client.get(f"/reports/summary?company_id={company_id}&start=2006-01-01&end=2006-12-31", headers=auth_header)
+    assert r.status_code == 200, r.text
+    return r.json()["totals"]
+
+
+def test_json_bulk_reports_row_errors_and_is_idempotent(client, auth_header, create_company):
+    company_id = create_company()
+    cat_id, cat_name = _create_category(client, auth_header)
+
+    rows = [
+        {"kind": "in", "amount_cents": 1000, "occurred_at": "2006-02-01T10:00:00", "external_id": "a1"},
+        {"kind": "out", "amount_cents": 250, "occurred_at": "2006-02-02", "category": cat_name, "external_id": "a2"},
+        {"kind": "out", "amount": "-12,50", "occurred_at": "2006-02-03", "category_id": cat_id},
+        {"kind": "sideways", "amount_cents": 1},
+        {"kind": "in", "amount_cents": 5, "category_id": 999999},
+        {"kind": "in", "amount_cents": 1000, "occurred_at": "2006-02-01T10:00:00", "external_id": "a1"},
+    ]
+    url = f"/transactions/bulk?company_id={company_id}"
+    r = client.post(url, json=rows, headers=auth_header)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["received"] == 6
+    assert body["inserted"] == 3
+    assert body["duplicates"] == 1
+    assert [e["row"] for e in body["errors"]] == [4, 5]
+
+    totals = _summary(client, auth_header, company_id)
+    assert totals["entradas_cents"] == 1000
+    assert totals["saidas_cents"] == 250 + 1250
+
+    # reenvio: nada novo
+    r = client.post(url, json=rows[:2], headers=auth_header)
+    assert r.json()["inserted"] == 0
+    assert r.json()["duplicates"] == 2
+    assert _summary(client, auth_header, company_id) == totals
+
+
+def test_ndjson_csv_and_ofx_uploads(client, auth_header, create_company):
+    company_id = create_company()
+    url = f"/transactions/bulk?company_id={company_id}"
+
+    ndjson = "\n".join(
+        json.dumps({"kind": "in", "amount_cents": 100 + i, "occurred_at": "2006-03-01", "external_id": f"n{i}"})
+        for i in range(3)
+    ) + "\n{broken\n"
+    r = client.post(url, content=ndjson, headers={**auth_header, "Content-Type": "application/x-ndjson"})
+    assert r.status_code == 200, r.text
+    assert (r.json()["inserted"], r.json()["error_count"]) == (3, 1)
+
+    csv_body = "date;description;amount;external_id\n05/03/2006;Aluguel;-1.500,00;c1\n06/03/2006;Venda;320,10;c2\n"
+    r = client.post(url, content=csv_body.encode("latin-1"), headers={**auth_header, "Content-Type": "text/csv"})
+    assert r.status_code == 200, r.text
+    assert r.json()["inserted"] == 2
+
+    ofx = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20060310120000[-3:BRT]<TRNAMT>-45.90<FITID>F1<MEMO>Energia</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20060311<TRNAMT>99.00<FITID>F2<MEMO>Pix recebido</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+    r = client.post(url + "&format=ofx", content=ofx, headers={**auth_header, "Content-Type": "text/plain"})
+    assert r.status_code == 200, r.text
+    assert r.json()["inserted"] == 2
+    r = client.post(url + "&format=ofx", content=ofx, headers={**auth_header, "Content-Type": "text/plain"})
+    assert r.json()["duplicates"] == 2
+
+    totals = _summary(client, auth_header, company_id)
+    assert totals["entradas_cents"] == 100 + 101 + 102 + 32010 + 9900
+    assert totals["saidas_cents"] == 150000 + 4590
+
+
+def test_ambiguous_amounts_and_missing_dates_are_row_errors(client, auth_header, create_company):
+    company_id = create_company()
+    url = f"/transactions/bulk?company_id={company_id}"
+
+    rows = [
+        {"kind": "out", "amount": "1.500", "occurred_at": "2006-04-01"},
+        {"kind": "out", "amount": "1,500", "occurred_at": "2006-04-01"},
+        {"kind": "out", "amount": "1.500.000", "occurred_at": "2006-04-01"},
+        {"kind": "out", "amount": "0.250", "occurred_at": "2006-04-01"},
+        {"kind": "out", "amount": "NaN", "occurred_at": "2006-04-01"},
+        {"kind": "out", "amount_cents": 1},
+    ]
+    r = client.post(url, json=rows, headers=auth_header)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["inserted"] == 2
+    assert [e["row"] for e in body["errors"]] == [1, 2, 5, 6]
+    assert "ambíguo" in body["errors"][0]["error"] and "occurred_at" in body["errors"][3]["error"]
+
+    # CSV com ";" (Excel pt-BR): o locale resolve "1.500" como milhar
+    csv_body = "date;amount\n02/04/2006;-1.500\n03/04/2006;-2,5\n"
+    r = client.post(url, content=csv_body, headers={**auth_header, "Content-Type": "text/csv"})
+    assert (r.json()["inserted"], r.json()["error_count"]) == (2, 0)
+
+    totals = client.get(f"/reports/summary?company_id={company_id}&start=2006-04-01&end=2006-04-30", headers=auth_header).json()["totals"]
+    assert totals["saidas_cents"] == 150000000 + 25 + 150000 + 250
+
+
+def test_bulk_rejects_unknown_content_type(client, auth_header, create_company):
+    company_id = create_company()
+    r = client.post(
+        f"/transactions/bulk?company_id={company_id}",
+        content=b"x",
+        headers={**auth_header, "Content-Type": "application/octet-stream"},
+    )
+    assert r.status_code == 415
@@ -0,0 +1,85 @@
+import json
+
+
+def _seed(client, auth_header, company_id, n=7):
+    ids = []
+    for i in range(n):
+        r = client.post(
+            "/transactions",
+            json={
+                "company_id": company_id,
+                "kind": "in" if i % 2 == 0 else "out",
+                "amount_cents": 100 + i,
+                "description": f"lista {i}",
+                # dois lançamentos no mesmo instante: desempate por id
+                "occurred_at": f"2005-03-{1 + i // 2:02d}T09:00:00",
+            },
+            headers=auth_header,
+        )
+        assert r.status_code == 200, r.text
+        ids.append(r.json()["id"])
+    return ids
+
+
+def test_keyset_pages_cover_all_rows_in_order(client, auth_header, create_company):
+    company_id = create_company()
+    ids = _seed(client, auth_header, company_id)
+
+    seen, cursor = [], None
+    while True:
+        url = f"/transactions?company_id={company_id}&limit=3" + (f"&cursor={cursor}" if cursor else "")
+        r = client.get(url, headers=auth_header)
+        assert r.status_code == 200, r.text
+        page = r.json()
+        assert len(page) <= 3
+        seen.extend(page)
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    assert [t["id"] for t in seen] == sorted(ids, key=lambda i: (ids.index(i) // 2, i), reverse=True)
+    assert set(seen[0]) == {"id", "company_id", "kind", "amount_cents", "description", "occurred_at", "category_id"}
+
+    # o frontend (outra origem) precisa ler o cursor para seguir as páginas
+    r = client.get(f"/transactions?company_id={company_id}&limit=1", headers={**auth_header, "Origin": "https://app.vercel.app"})
+    assert "x-next-cursor" in r.headers["access-control-expose-headers"].lower()
+
+
+def test_filters_and_field_projection(client, auth_header, create_company):
+    company_id = create_company()
+    _seed(client, auth_header, company_id)
+
+    r = client.get(
+        f"/transactions?company_id={company_id}&kind=out&start=2005-03-02&end=2005-03-03&fields=amount_cents,id",
+        headers=auth_header,
+    )
+    assert r.status_code == 200, r.text
+    data = r.json()
+    assert [set(t) for t in data] == [{"id", "amount_cents"}] * 2
+    assert sorted(t["amount_cents"] for t in data) == [103, 105]
+
+    r = client.get(f"/transactions?company_id={company_id}&fields=id,secret", headers=auth_header)
+    assert r.status_code == 422
+    assert r.json()["detail"]["error_code"] == "INVALID_FIELDS"
+
+    r = client.get("/transactions?cursor=not-a-cursor", headers=auth_header)
+    assert r.status_code == 422
+    assert r.json()["detail"]["error_code"] == "INVALID_CURSOR"
+
+
+def test_ndjson_streams_from_cursor(client, auth_header, create_company):
+    company_id = create_company()
+    ids = _seed(client, auth_header, company_id)
+
+    r = client.get(f"/transactions?company_id={company_id}&limit=2", headers=auth_header)
+    cursor = r.headers["x-next-cursor"]
+
+    r = client.get(
+        f"/transactions?company_id={company_id}&format=ndjson&fields=id&cursor={cursor}",
+        headers=auth_header,
+    )
+    assert r.status_code == 200, r.text
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert len(rows) == len(ids) - 2
+    assert set(rows[0]) == {"id"}
@@ -0,0 +1,100 @@
+import random
+import re
+
+from sqlalchemy import event
+
+from app.db import async_engine, engine
+
+
+# Tabelas quentes que nunca devem ser lidas por varredura completa.
+_HOT_TABLES = ("transactions", "transaction_daily_rollup")
+
+
+def _exercise_endpoints(client, auth_header, company_id):
+    h = auth_header
+    period = "start=2004-01-01&end=2004-01-31"
+
+    cat = client.post("/categories", json={"name": f"Cat Plan {random.randint(0, 10**8)}"}, headers=h).json()["id"]
+    ids = []
+    for i, desc in enumerate(["aluguel loja", "venda cliente", "sem pista"]):
+        r = client.post(
+            "/transactions",
+            json={
+                "company_id": company_id,
+                "kind": "out" if i % 2 == 0 else "in",
+                "amount_cents": 1000 + i,
+                "description": desc,
+                "occurred_at": f"2004-01-{10 + i:02d}T10:00:00",
+            },
+            headers=h,
+        )
+        assert r.status_code == 200, r.text
+        ids.append(r.json()["id"])
+
+    page = client.get(f"/transactions/uncategorized?company_id={company_id}&{period}&limit=1", headers=h)
+    cursor = page.headers["X-Next-Cursor"]
+
+    calls = [
+        ("get", f"/reports/summary?company_id={company_id}&{period}", None),
+        ("get", f"/reports/summary?company_id={company_id}&start=2004-01-01T12:00:00&end=2004-01-31T12:00:00", None),
+        ("get", f"/reports/daily?company_id={company_id}&{period}", None),
+        ("get", f"/reports/series?company_id={company_id}&{period}&granularity=week&by_category=true", None),
+        ("get", f"/reports/context?company_id={company_id}&{period}", None),
+        ("get", f"/reports/top-categories?company_id={company_id}&{period}", None),
+        ("post", "/ai/consult", {"company_id": company_id, "start": "2004-01-01", "end": "2004-01-31"}),
+        ("get", f"/transactions?company_id={company_id}", None),
+        ("get", f"/transactions/uncategorized?company_id={company_id}&{period}", None),
+        ("get", f"/transactions/uncategorized?company_id={company_id}&{period}&limit=1&cursor={cursor}", None),
+        ("get", f"/transactions/uncategorized/count?company_id={company_id}&start=2004-01-01T12:00:00&end=2004-01-31T12:00:00", None),
+        ("get", f"/transactions/suggest-categories?company_id={company_id}&{period}", None),
+        ("post", f"/transactions/apply-suggestions?company_id={company_id}&{period}&dry_run=true", None),
+        ("patch", f"/transactions/{ids[2]}/category?company_id={company_id}", {"category_id": cat}),
+        ("post", "/transactions/bulk-categorize", {"transaction_ids": ids[:1], "category_id": cat}),
+    ]
+    for method, url, body in calls:
+        r = getattr(client, method)(url, headers=h, **({"json": body} if body is not None else {}))
+        assert r.status_code == 200, (url, r.text)
+
+
+def _full_scans(conn, statement, parameters) -> list[str]:
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        details = [str(r[-1]) for r in rows]
+        pattern = re.compile(r"^SCAN ({})\b".format("|".join(_HOT_TABLES)))
+    else:
+        conn.exec_driver_sql("SET enable_seqscan = off")
+        rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()
+        details = [str(r[0]) for r in rows]
+        pattern = re.compile(r"Seq Scan on ({})\b".format("|".join(_HOT_TABLES)))
+    return [d for d in details if pattern.search(d.strip())]
+
+
+def test_report_and_transaction_queries_use_indexes(client, auth_header, create_company):
+    company_id = create_company()
+
+    captured = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        head = statement.lstrip().upper()
+        if head.startswith("SELECT") and any(t in statement for t in _HOT_TABLES):
+            captured.append((statement, parameters))
+
+    for eng in (engine, async_engine.sync_engine):
+        event.listen(eng, "before_cursor_execute", _capture)
+    try:
+        _exercise_endpoints(client, auth_header, company_id)
+    finally:
+        for eng in (engine, async_engine.sync_engine):
+            event.remove(eng, "before_cursor_execute", _capture)
+
+    assert captured
+
+    offenders = []
+    with engine.connect() as conn:
+        for statement, parameters in captured:
+            scans = _full_scans(conn, statement, parameters)
+            if scans:
+                offenders.append((scans, statement))
+        conn.rollback()
+
+    assert not offenders, "\n\n".join(f"{scans}\n{stmt}" for scans, stmt in offenders)
@@ -6,7 +6,7 @@ type RequestOptions = RequestInit & {
   auth?: boolean;
 };
 
-async function request<T>(path: string, options: RequestOptions = {}): Promise<T> {
+async function fetchOk(path: string, options: RequestOptions = {}): Promise<Response> {
   const { auth = false, headers, ...rest } = options;
 
   const finalHeaders = new Headers(headers || {});
@@ -56,6 +56,12 @@ async function request<T>(path: string, options: RequestOptions = {}): Promise<T
     throw new Error(typeof message === 'string' ? message : 'Erro ao processar a requisição');
   }
 
+  return response;
+}
+
+async function request<T>(path: string, options: RequestOptions = {}): Promise<T> {
+  const response = await fetchOk(path, options);
+
   if (response.status === 204) {
     return null as T;
   }
@@ -202,11 +208,26 @@ export async function createCompany(payload: CreateCompanyPayload): Promise<Comp
 }
 
 
+// GET /transactions é paginado por keyset: segue X-Next-Cursor até a última página.
+const TRANSACTIONS_PAGE_SIZE = 5000;
+
 export async function getTransactions(): Promise<Transaction[]> {
-  return request<Transaction[]>('/api/v1/transactions', {
-    method: 'GET',
-    auth: true,
-  });
+  const items: Transaction[] = [];
+  let cursor: string | null = null;
+
+  do {
+    const response = await fetchOk(
+      `/api/v1/transactions${buildQuery({ limit: TRANSACTIONS_PAGE_SIZE, cursor })}`,
+      {
+        method: 'GET',
+        auth: true,
+      }
+    );
+    items.push(...((await response.json()) as Transaction[]));
+    cursor = response.headers.get('X-Next-Cursor');
+  } while (cursor);
+
+  return items;
 }
 
 export async function getReportSummary(params: {